@@ -0,0 +1,85 @@
+import hashlib
+import re
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, Iterator, Mapping, Tuple, Union
+
+# Hex digits of the content hash embedded in fingerprinted file names (see nginx.conf)
+FINGERPRINT_LENGTH = 12
+
+# Files that are never referenced by URL from pages
+UNFINGERPRINTED_SUFFIXES = (".html", ".map", ".json")
+
+_ATTRIBUTE_RE = re.compile(r'(\b(?:src|href)\s*=\s*)(["\'])(\./|/)?([^"\'?#]+)([^"\']*)\2', re.IGNORECASE)
+
+
+def fingerprinted_name(relative_path: str, digest: str) -> str:
+    """assets/style.css -> assets/style.<hash>.css"""
+    path = PurePosixPath(relative_path)
+    return str(path.with_name(f"{path.stem}.{digest[:FINGERPRINT_LENGTH]}{path.suffix}"))
+
+
+def is_fingerprintable(relative_path: str) -> bool:
+    return bool(PurePosixPath(relative_path).suffix) and not relative_path.endswith(UNFINGERPRINTED_SUFFIXES)
+
+
+def fingerprint_files(files: Mapping[str, Union[str, bytes, Path]]) -> Tuple[Dict[str, Union[str, bytes, Path]], Dict[str, str]]:
+    """Add a content-hashed copy of every asset to files.
+
+    Returns the extended file mapping and the manifest of logical to
+    fingerprinted paths used to rewrite references.
+    """
+    extended = dict(files)
+    manifest = {}
+    for relative_path, source in files.items():
+        if not is_fingerprintable(relative_path):
+            continue
+        if isinstance(source, Path):
+            data = source.read_bytes()
+        elif isinstance(source, str):
+            data = source.encode("utf-8")
+        else:
+            data = source
+        hashed = fingerprinted_name(relative_path, hashlib.sha256(data).hexdigest())
+        extended[hashed] = data
+        manifest[relative_path] = hashed
+    return extended, manifest
+
+
+def rewrite_asset_urls(html: str, manifest: Mapping[str, str]) -> str:
+    """Point src/href attributes at the fingerprinted names in manifest.
+
+    References may be relative ("assets/x.css", "./assets/x.css") or
+    root-relative ("/assets/x.css"); the prefix and any query or fragment
+    are preserved.
+    """
+    if not manifest:
+        return html
+
+    def replace(match: re.Match) -> str:
+        hashed = manifest.get(match.group(4))
+        if hashed is None:
+            return match.group(0)
+        attribute, quote, prefix, _, suffix = match.groups()
+        return f"{attribute}{quote}{prefix or ''}{hashed}{suffix}{quote}"
+
+    return _ATTRIBUTE_RE.sub(replace, html)
+
+
+def rewrite_asset_urls_stream(chunks: Iterable[str], manifest: Mapping[str, str]) -> Iterator[str]:
+    """Streaming version of ``rewrite_asset_urls``.
+
+    Chunks are re-split after the last ">" they contain so no tag (and
+    thus no src/href attribute) is cut between two rewritten pieces.
+    """
+    if not manifest:
+        yield from chunks
+        return
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        end = pending.rfind(">") + 1
+        if end:
+            yield rewrite_asset_urls(pending[:end], manifest)
+            pending = pending[end:]
+    if pending:
+        yield rewrite_asset_urls(pending, manifest)
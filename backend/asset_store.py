@@ -0,0 +1,210 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from asset_fingerprint import fingerprinted_name, is_fingerprintable
+from precompress import PRECOMPRESS_ENABLED, precompress_tree
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+# Unreferenced entries younger than this are kept: a deploy may have published
+# one and not linked it yet
+GC_MIN_AGE = float(os.getenv("ASSET_GC_MIN_AGE", "3600"))
+
+
+class AssetStore:
+    """Content-addressed store of build asset trees.
+
+    Each distinct asset tree is published once to ``<root>/<hash>/`` along
+    with a manifest of its files, and deployed pages point at it through a
+    relative symlink instead of holding their own copy. Trees published with
+    ``fingerprint=True`` also get a content-hashed name for every file.
+    """
+
+    def __init__(self, root: Path, precompress: bool = PRECOMPRESS_ENABLED):
+        self.root = Path(root)
+        self.precompress = precompress
+        self._hashes: Dict[Tuple, str] = {}
+        self._lock = threading.Lock()
+
+    def _signature(self, source_dir: Path) -> Tuple:
+        """Cheap stat-based signature used to memoize content hashes"""
+        entries = []
+        for path in sorted(source_dir.rglob("*")):
+            if path.is_file():
+                stat = path.stat()
+                entries.append((str(path.relative_to(source_dir)), stat.st_size, stat.st_mtime_ns))
+        return (str(source_dir), tuple(entries))
+
+    def _build_manifest(self, source_dir: Path) -> Dict[str, str]:
+        manifest = {}
+        for path in sorted(source_dir.rglob("*")):
+            if path.is_file():
+                manifest[path.relative_to(source_dir).as_posix()] = hashlib.sha256(path.read_bytes()).hexdigest()
+        return manifest
+
+    def content_hash(self, source_dir: Path, fingerprint: bool = False) -> str:
+        """Hash of an asset tree, recomputed only when a file changes"""
+        signature = (self._signature(source_dir), fingerprint)
+        with self._lock:
+            if signature in self._hashes:
+                return self._hashes[signature]
+
+        manifest = self._build_manifest(source_dir)
+        payload = {"files": manifest, "fingerprint": True} if fingerprint else manifest
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self._hashes[signature] = digest
+        return digest
+
+    def publish(self, source_dir: Path, fingerprint: bool = False) -> Path:
+        """Publish an asset tree to the store if needed and return its directory"""
+        source_dir = Path(source_dir)
+        digest = self.content_hash(source_dir, fingerprint)
+        store_dir = self.root / digest
+        if (store_dir / MANIFEST_NAME).exists():
+            self._touch(store_dir)
+            return store_dir
+
+        # Copy to a temporary directory and rename so it is never seen half-written
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_dir = self.root / f".tmp-{digest}-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        shutil.copytree(source_dir, tmp_dir)
+        manifest = {"hash": digest, "files": self._build_manifest(tmp_dir)}
+        if fingerprint:
+            manifest["fingerprints"] = self._add_fingerprinted_names(tmp_dir, manifest["files"])
+        if self.precompress:
+            # Entries are immutable, so their .gz/.br variants are written once here
+            precompress_tree(tmp_dir)
+        with open(tmp_dir / MANIFEST_NAME, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        try:
+            os.rename(tmp_dir, store_dir)
+            logger.info(f"Published assets {source_dir} to {store_dir}")
+        except OSError:
+            # Another deploy published the same content concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not (store_dir / MANIFEST_NAME).exists():
+                raise
+        return store_dir
+
+    def _touch(self, store_dir: Path):
+        """Mark an entry as in use, so a concurrent collect_garbage keeps it"""
+        try:
+            os.utime(store_dir)
+        except OSError:
+            pass
+
+    def entry(self, name: str) -> Optional[Path]:
+        """A published entry by name, or None if it is missing (e.g. collected)"""
+        store_dir = self.root / name
+        if not (store_dir / MANIFEST_NAME).exists():
+            return None
+        self._touch(store_dir)
+        return store_dir
+
+    def referenced_entries(self, sites_root: Path) -> Set[str]:
+        """Names of the entries some symlink under sites_root points into"""
+        root = os.path.realpath(self.root)
+        referenced = set()
+        for dirpath, dirnames, filenames in os.walk(sites_root):
+            for name in dirnames + filenames:
+                path = os.path.join(dirpath, name)
+                if not os.path.islink(path):
+                    continue
+                relative = os.path.relpath(os.path.realpath(path), root)
+                if relative != os.curdir and not relative.startswith(os.pardir):
+                    referenced.add(relative.split(os.sep, 1)[0])
+            # Symlinks are not followed; the store and hidden directories (render cache) are skipped
+            dirnames[:] = [
+                name for name in dirnames
+                if not name.startswith(".") and os.path.realpath(os.path.join(dirpath, name)) != root
+            ]
+        return referenced
+
+    def collect_garbage(self, sites_root: Path, min_age: float = GC_MIN_AGE) -> List[str]:
+        """Delete published entries no deployed page links to; returns their names.
+
+        Entries used within min_age seconds are kept (see ``_touch``).
+        """
+        if not self.root.exists():
+            return []
+        referenced = self.referenced_entries(sites_root)
+        removed = []
+        for store_dir in self.root.iterdir():
+            if store_dir.name in referenced or not (store_dir / MANIFEST_NAME).exists():
+                continue
+            try:
+                if time.time() - store_dir.stat().st_mtime < min_age:
+                    continue
+                # Renamed first, so the entry disappears at once and is never seen half-deleted
+                doomed = self.root / f".gc-{store_dir.name}-{os.getpid()}-{threading.get_ident()}"
+                os.rename(store_dir, doomed)
+            except OSError:
+                continue
+            shutil.rmtree(doomed, ignore_errors=True)
+            removed.append(store_dir.name)
+        if removed:
+            logger.info(f"Collected {len(removed)} unreferenced asset entries from {self.root}")
+        return removed
+
+    def _add_fingerprinted_names(self, tree: Path, files: Dict[str, str]) -> Dict[str, str]:
+        """Hard-link every file under a name carrying its content hash"""
+        fingerprints = {}
+        for relative_path, file_hash in files.items():
+            if not is_fingerprintable(relative_path):
+                continue
+            hashed = fingerprinted_name(relative_path, file_hash)
+            try:
+                os.link(tree / relative_path, tree / hashed)
+            except OSError:
+                shutil.copy2(tree / relative_path, tree / hashed)
+            fingerprints[relative_path] = hashed
+        return fingerprints
+
+    def fingerprints(self, store_dir: Path) -> Dict[str, str]:
+        """Logical to fingerprinted paths of a published entry"""
+        try:
+            with open(Path(store_dir) / MANIFEST_NAME, encoding="utf-8") as f:
+                return json.load(f).get("fingerprints", {})
+        except (OSError, ValueError):
+            return {}
+
+    def link(self, store_dir: Path, target: Path):
+        """Atomically point target at a store directory with a relative symlink"""
+        relative = os.path.relpath(store_dir, target.parent)
+        if target.is_symlink() and os.readlink(target) == relative:
+            return
+
+        # Older deployments hold a real copy of the directory
+        if target.exists() and not target.is_symlink():
+            shutil.rmtree(target)
+
+        tmp_link = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        if tmp_link.is_symlink():
+            tmp_link.unlink()
+        tmp_link.symlink_to(relative, target_is_directory=True)
+        os.replace(tmp_link, target)
+
+    def verify(self, target: Path) -> bool:
+        """Check that target points at a published store entry"""
+        if not target.is_symlink():
+            return False
+        store_dir = target.resolve()
+        try:
+            with open(store_dir / MANIFEST_NAME, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        # Entries are renamed into place complete and never modified afterwards
+        return manifest.get("hash") == store_dir.name and bool(manifest.get("files"))
@@ -4,9 +4,12 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from database import get_db
+from database import get_async_db
 from models import User
 
 # Configuración de seguridad
@@ -69,13 +72,35 @@ class AuthManager:
     def get_user_by_email(self, db: Session, email: str) -> Optional[User]:
         """Obtiene usuario por email"""
         return db.query(User).filter(User.email == email).first()
+    
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """verify_password fuera del event loop (bcrypt es costoso en CPU)"""
+        return await run_in_threadpool(self.verify_password, plain_password, hashed_password)
+    
+    async def get_password_hash_async(self, password: str) -> str:
+        """get_password_hash fuera del event loop"""
+        return await run_in_threadpool(self.get_password_hash, password)
+    
+    async def authenticate_user_async(self, db: AsyncSession, email: str, password: str) -> Optional[User]:
+        """authenticate_user con una sesión async"""
+        user = await self.get_user_by_email_async(db, email)
+        if not user:
+            return None
+        if not await self.verify_password_async(password, user.hashed_password):
+            return None
+        return user
+    
+    async def get_user_by_email_async(self, db: AsyncSession, email: str) -> Optional[User]:
+        """get_user_by_email con una sesión async"""
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
 
 # Instancia global del manager de autenticación
 auth_manager = AuthManager()
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     """Dependency para obtener el usuario actual autenticado"""
     
@@ -91,22 +116,22 @@ def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    user = auth_manager.get_user_by_email(db, email=token_data["email"])
+    user = await auth_manager.get_user_by_email_async(db, email=token_data["email"])
     if user is None:
         raise credentials_exception
     
     return user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Dependency para obtener usuario activo autenticado"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 # Dependency opcional para endpoints que pueden funcionar con o sin autenticación
-def get_current_user_optional(
+async def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Optional[User]:
     """Dependency opcional para obtener el usuario si está autenticado"""
     
@@ -120,7 +145,7 @@ def get_current_user_optional(
         if token_data is None:
             return None
         
-        user = auth_manager.get_user_by_email(db, email=token_data["email"])
+        user = await auth_manager.get_user_by_email_async(db, email=token_data["email"])
         return user if user and user.is_active else None
     
     except Exception:
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia: endpoint sync (threadpool) vs endpoint async.
+
+Sirve GET /api/pages/{id} con el router async real y, al lado, la misma
+consulta en un endpoint sync con Session como estaba antes. Cada consulta a
+la base espera --latency ms (simula el ida y vuelta de red a PostgreSQL): en
+el endpoint sync esa espera ocupa un hilo del threadpool, en el async libera
+el event loop. Reporta requests/s y p95 bajo --concurrency requests en curso.
+
+Uso:
+    python bench_db.py [--requests 400] [--concurrency 100] [--latency 5]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import aiosqlite
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from database import get_async_db
+from models import Base, Component, Page, User
+from routers import pages
+from schemas import Page as PageSchema
+
+
+def _seed(engine, page_count):
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, email="bench@example.com", username="bench"))
+    for page_id in range(1, page_count + 1):
+        page = Page(id=page_id, title=f"Página {page_id}", slug=f"p{page_id}", subdomain="bench",
+                    config={}, owner_id=1)
+        page.components = [
+            Component(type="text", content={"text": f"t{i}"}, styles={}, position=i) for i in range(10)
+        ]
+        session.add(page)
+    session.commit()
+    session.close()
+
+
+def _app(sync_engine, async_engine, latency):
+    app = FastAPI()
+    app.include_router(pages.router)
+
+    # Latencia sync: bloquea el hilo que ejecuta la consulta
+    event.listen(sync_engine, "before_cursor_execute", lambda *args: time.sleep(latency))
+
+    SyncSession = sessionmaker(bind=sync_engine)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    def get_sync_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    @app.get("/sync/pages/{page_id}", response_model=PageSchema)
+    def get_page_sync(page_id: int, db: Session = Depends(get_sync_db)):
+        page = db.query(Page).options(selectinload(Page.components)).filter(Page.id == page_id).first()
+        if not page:
+            raise HTTPException(status_code=404, detail="Page not found")
+        return page
+
+    return app
+
+
+def _patch_async_latency(latency):
+    """Latencia async: cada operación de aiosqlite espera sin bloquear el event loop"""
+    original = aiosqlite.Connection._execute
+
+    async def delayed(self, fn, *args, **kwargs):
+        if getattr(fn, "__name__", "") == "execute":
+            await asyncio.sleep(latency)
+        return await original(self, fn, *args, **kwargs)
+
+    aiosqlite.Connection._execute = delayed
+
+
+async def _load(app, path_template, page_count, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    durations = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path_template.format(i % page_count + 1))
+                durations.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        # Calentar conexiones y caches de SQLAlchemy
+        await asyncio.gather(*(one(i) for i in range(min(concurrency, total))))
+        durations.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    p95 = statistics.quantiles(durations, n=20)[-1]
+    return total / elapsed, p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput sync vs async de GET /api/pages/{id}")
+    parser.add_argument("--requests", type=int, default=400, help="Requests por variante")
+    parser.add_argument("--concurrency", type=int, default=100, help="Requests en curso a la vez")
+    parser.add_argument("--latency", type=float, default=5.0, help="Latencia simulada por consulta (ms)")
+    parser.add_argument("--pages", type=int, default=50, help="Páginas en la base de prueba")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(data_dir, "bench.db")
+        # Mismo tamaño de pool en ambas variantes: solo cambia cómo se espera a la base
+        pool = {"pool_size": args.concurrency, "max_overflow": 0}
+        sync_engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False},
+                                    poolclass=QueuePool, **pool)
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=AsyncAdaptedQueuePool, **pool)
+        Base.metadata.create_all(bind=sync_engine)
+        _seed(sync_engine, args.pages)
+
+        latency = args.latency / 1000
+        _patch_async_latency(latency)
+        app = _app(sync_engine, async_engine, latency)
+
+        print(f"GET /api/pages/{{id}}: {args.requests} requests, {args.concurrency} concurrentes, "
+              f"{args.latency:g} ms por consulta")
+        for label, path in (("sync (threadpool)", "/sync/pages/{}"), ("async", "/api/pages/{}")):
+            throughput, p95 = asyncio.run(_load(app, path, args.pages, args.requests, args.concurrency))
+            print(f"  {label:18s} {throughput:8.1f} req/s  p95 {p95 * 1000:8.1f} ms")
+
+        asyncio.run(async_engine.dispose())
+        sync_engine.dispose()
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del render de componentes del SiteGenerator.
+
+Mide el arranque en frío (compilar los templates de componentes con y sin
+cache de bytecode) y el costo por render de una página, con y sin la cache
+de fragmentos, comparado con el render con f-strings y if/elif anterior al
+registro de componentes. Los tipos integrados se renderizan con funciones
+del registro; los templates quedan para los tipos registrados aparte.
+
+Uso:
+    python bench_render.py [--components 200] [--repeat 20]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from typing import Any, Dict
+from unittest.mock import Mock
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+from generator import COMPONENT_TEMPLATES, SiteGenerator
+from render_cache import FragmentCache, hash_payload
+
+SAMPLE_COMPONENTS = [
+    ("header", {"title": "Mi Sitio", "logo": "/logo.png",
+                "menu_items": [{"text": f"Link {i}", "link": f"/link-{i}"} for i in range(6)]},
+     {"display": "flex", "justifyContent": "space-between"}),
+    ("hero", {"title": "Bienvenido", "subtitle": "Subtítulo", "image": "/hero.jpg",
+              "cta_text": "Empezar", "cta_link": "/start"},
+     {"backgroundColor": "#007bff", "color": "white", "textAlign": "center"}),
+    ("text", {"text": "<p>Lorem ipsum dolor sit amet</p>", "alignment": "center"}, {"padding": "20px"}),
+    ("image", {"src": "/img.jpg", "alt": "Imagen", "caption": "Pie de foto"}, {"borderRadius": "8px"}),
+    ("button", {"text": "Comprar", "link": "/buy", "variant": "outline"}, {"marginTop": "20px"}),
+    ("footer", {"text": "© 2024", "links": [{"text": "Privacidad", "url": "/privacy"}]}, {}),
+]
+
+
+class FStringRenderer:
+    """Render de componentes anterior a los templates (f-strings y if/elif), como referencia.
+
+    Copia de SiteGenerator antes de pasar a templates precompilados; incluye
+    las claves de la cache de fragmentos de entonces para comparar el mismo
+    camino sin cache.
+    """
+
+    def generate_component_html(self, component) -> str:
+        styles = component.styles or {}
+        # La clave de la cache de fragmentos de entonces se calculaba en cada render
+        cache_key = (component.type, hash_payload(component.content), hash_payload(styles))
+        return self._render_component(cache_key[0], component.content, styles)
+
+    def _render_component(self, component_type: str, content: Dict, styles: Dict[str, Any]) -> str:
+        # Convertir estilos a CSS
+        css_styles = self._dict_to_css(styles)
+        
+        if component_type == "hero":
+            return self._generate_hero(content, css_styles)
+        elif component_type == "text":
+            return self._generate_text(content, css_styles)
+        elif component_type == "image":
+            return self._generate_image(content, css_styles)
+        elif component_type == "button":
+            return self._generate_button(content, css_styles)
+        elif component_type == "header":
+            return self._generate_header(content, css_styles)
+        elif component_type == "footer":
+            return self._generate_footer(content, css_styles)
+        else:
+            return f'<div class="component-{component_type}" style="{css_styles}">Componente no implementado: {component_type}</div>'
+
+    def _dict_to_css(self, styles: Dict[str, Any]) -> str:
+        """Convierte un diccionario de estilos a CSS"""
+        css_rules = []
+        for key, value in styles.items():
+            # Saltar claves None o vacías
+            if key is None or key == "":
+                continue
+            # Convertir camelCase a kebab-case
+            css_key = ''.join(['-' + c.lower() if c.isupper() else c for c in str(key)]).lstrip('-')
+            css_rules.append(f"{css_key}: {value}")
+        return "; ".join(css_rules)
+
+    def _convert_styles_to_tailwind(self, styles: str) -> str:
+        """Convierte estilos CSS a clases de Tailwind"""
+        if not styles:
+            return ""
+        
+        # Mapeo básico de estilos CSS a clases de Tailwind
+        style_mappings = {
+            "background-color: #007bff": "bg-primary",
+            "background-color: #6c757d": "bg-secondary",
+            "background-color: #28a745": "bg-success",
+            "background-color: #dc3545": "bg-danger",
+            "color: white": "text-white",
+            "color: #333": "text-gray-900",
+            "color: #666": "text-gray-600",
+            "text-align: center": "text-center",
+            "text-align: left": "text-left",
+            "text-align: right": "text-right",
+            "padding: 20px": "p-5",
+            "padding: 40px 20px": "py-10 px-5",
+            "margin-bottom: 20px": "mb-5",
+            "margin-top: 20px": "mt-5",
+            "font-weight: bold": "font-bold",
+            "font-size: 1.5rem": "text-2xl",
+            "font-size: 3rem": "text-5xl",
+            "font-size: 1.2rem": "text-xl",
+            "border-radius: 5px": "rounded",
+            "border-radius: 8px": "rounded-lg",
+            "display: flex": "flex",
+            "justify-content: space-between": "justify-between",
+            "align-items: center": "items-center",
+        }
+        
+        tailwind_classes = []
+        for css_style in styles.split(";"):
+            css_style = css_style.strip()
+            if css_style in style_mappings:
+                tailwind_classes.append(style_mappings[css_style])
+        
+        return " ".join(tailwind_classes)
+
+    def _generate_hero(self, content: Dict, styles: str) -> str:
+        title = content.get("title", "")
+        subtitle = content.get("subtitle", "")
+        image = content.get("image", "")
+        cta_text = content.get("cta_text", "")
+        cta_link = content.get("cta_link", "#")
+        
+        # Convertir estilos a clases de Tailwind
+        tailwind_classes = self._convert_styles_to_tailwind(styles)
+        
+        html = f'''
+        <section class="hero text-center py-20 px-4 {tailwind_classes}">
+            {f'<img src="{image}" alt="Hero" class="max-w-full h-auto mb-8 rounded-lg">' if image else ''}
+            <h1 class="text-5xl font-bold mb-6 text-gray-900 dark:text-white">{title}</h1>
+            <p class="text-xl mb-8 text-gray-600 dark:text-gray-300">{subtitle}</p>
+            {f'<a href="{cta_link}" class="bg-primary hover:bg-primary/90 text-white px-8 py-4 rounded-lg font-semibold inline-block transition-all duration-300 hover:transform hover:-translate-y-1 hover:shadow-lg">{cta_text}</a>' if cta_text else ''}
+        </section>
+        '''
+        return html
+
+    def _generate_text(self, content: Dict, styles: str) -> str:
+        text = content.get("text", "")
+        alignment = content.get("alignment", "left")
+        
+        # Convertir estilos a clases de Tailwind
+        tailwind_classes = self._convert_styles_to_tailwind(styles)
+        alignment_class = "text-center" if alignment == "center" else "text-left" if alignment == "left" else "text-right"
+        
+        html = f'''
+        <section class="text-section py-10 px-5 {alignment_class} {tailwind_classes}">
+            <div class="max-w-4xl mx-auto">
+                {text}
+            </div>
+        </section>
+        '''
+        return html
+
+    def _generate_image(self, content: Dict, styles: str) -> str:
+        src = content.get("src", "")
+        alt = content.get("alt", "")
+        caption = content.get("caption", "")
+        
+        # Convertir estilos a clases de Tailwind
+        tailwind_classes = self._convert_styles_to_tailwind(styles)
+        
+        html = f'''
+        <section class="image-section py-10 px-5 text-center {tailwind_classes}">
+            <img src="{src}" alt="{alt}" class="max-w-full h-auto rounded-lg shadow-lg">
+            {f'<p class="mt-4 italic text-gray-600 dark:text-gray-400">{caption}</p>' if caption else ''}
+        </section>
+        '''
+        return html
+
+    def _generate_button(self, content: Dict, styles: str) -> str:
+        text = content.get("text", "Click me")
+        link = content.get("link", "#")
+        variant = content.get("variant", "primary")
+        
+        # Convertir estilos a clases de Tailwind
+        tailwind_classes = self._convert_styles_to_tailwind(styles)
+        
+        # Clases de botón según variante
+        button_classes = {
+            "primary": "bg-primary hover:bg-primary/90 text-white",
+            "secondary": "bg-secondary hover:bg-secondary/90 text-white",
+            "outline": "bg-transparent text-primary border-2 border-primary hover:bg-primary hover:text-white"
+        }
+        
+        html = f'''
+        <section class="button-section p-5 text-center {tailwind_classes}">
+            <a href="{link}" class="{button_classes.get(variant, button_classes['primary'])} px-8 py-4 rounded-lg font-semibold inline-block transition-all duration-300 hover:transform hover:-translate-y-1 hover:shadow-lg">
+                {text}
+            </a>
+        </section>
+        '''
+        return html
+
+    def _generate_header(self, content: Dict, styles: str) -> str:
+        title = content.get("title", "")
+        logo = content.get("logo", "")
+        menu_items = content.get("menu_items", [])
+        
+        # Convertir estilos a clases de Tailwind
+        tailwind_classes = self._convert_styles_to_tailwind(styles)
+        
+        menu_html = ""
+        if menu_items:
+            menu_html = '<nav class="inline-block">'
+            for item in menu_items:
+                menu_html += f'<a href="{item.get("link", "#")}" class="ml-5 text-gray-900 dark:text-white hover:text-primary transition-colors duration-200">{item.get("text", "")}</a>'
+            menu_html += "</nav>"
+        
+        html = f'''
+        <header class="p-5 border-b border-gray-200 dark:border-gray-700 flex justify-between items-center {tailwind_classes}">
+            <div class="flex items-center">
+                {f'<img src="{logo}" alt="Logo" class="h-10 mr-4">' if logo else ''}
+                <h1 class="m-0 text-2xl font-bold text-gray-900 dark:text-white">{title}</h1>
+            </div>
+            {menu_html}
+        </header>
+        '''
+        return html
+
+    def _generate_footer(self, content: Dict, styles: str) -> str:
+        text = content.get("text", "")
+        links = content.get("links", [])
+        
+        # Convertir estilos a clases de Tailwind
+        tailwind_classes = self._convert_styles_to_tailwind(styles)
+        
+        links_html = ""
+        if links:
+            links_html = '<div class="mt-5">'
+            for link in links:
+                links_html += f'<a href="{link.get("url", "#")}" class="mr-5 text-gray-600 dark:text-gray-400 hover:text-primary transition-colors duration-200">{link.get("text", "")}</a>'
+            links_html += "</div>"
+        
+        html = f'''
+        <footer class="py-10 px-5 text-center border-t border-gray-200 dark:border-gray-700 mt-10 {tailwind_classes}">
+            <p class="m-0 text-gray-600 dark:text-gray-400">{text}</p>
+            {links_html}
+        </footer>
+        '''
+        return html
+
+
+def _components(count):
+    components = []
+    for i in range(count):
+        component_type, content, styles = SAMPLE_COMPONENTS[i % len(SAMPLE_COMPONENTS)]
+        component = Mock()
+        component.type = component_type
+        # Contenido distinto por componente para que la cache de fragmentos no lo oculte
+        component.content = dict(content, title=f"{content.get('title', '')} {i}")
+        component.styles = styles
+        components.append(component)
+    return components
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_cold_start(templates_dir, repeat):
+    cache_dir = tempfile.mkdtemp()
+    try:
+        def compile_all(bytecode_cache):
+            env = Environment(loader=FileSystemLoader(str(templates_dir)), bytecode_cache=bytecode_cache)
+            for template_name in set(COMPONENT_TEMPLATES.values()):
+                env.get_template(template_name)
+
+        # Calentar la cache de bytecode
+        compile_all(FileSystemBytecodeCache(cache_dir))
+        without_cache = _best(lambda: compile_all(None), repeat)
+        with_cache = _best(lambda: compile_all(FileSystemBytecodeCache(cache_dir)), repeat)
+    finally:
+        shutil.rmtree(cache_dir)
+    return without_cache, with_cache
+
+
+def bench_page_render(generator, components, repeat):
+    def render(renderer):
+        for component in components:
+            renderer.generate_component_html(component)
+
+    baseline = _best(lambda: render(FStringRenderer()), repeat)
+    generator.fragment_cache = FragmentCache(0)
+    uncached = _best(lambda: render(generator), repeat)
+    generator.fragment_cache = FragmentCache(len(components))
+    render(generator)
+    cached = _best(lambda: render(generator), repeat)
+    return baseline, uncached, cached
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark del render de componentes")
+    parser.add_argument("--components", type=int, default=200, help="Componentes por página")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeticiones (se reporta la mejor)")
+    args = parser.parse_args()
+
+    output_dir = tempfile.mkdtemp()
+    try:
+        generator = SiteGenerator(output_dir=output_dir)
+        without_cache, with_cache = bench_cold_start(generator.templates_dir, args.repeat)
+        print(f"Compilar {len(set(COMPONENT_TEMPLATES.values()))} templates de componentes:")
+        print(f"  sin cache de bytecode: {without_cache * 1000:8.2f} ms")
+        print(f"  con cache de bytecode: {with_cache * 1000:8.2f} ms")
+
+        components = _components(args.components)
+        baseline, uncached, cached = bench_page_render(generator, components, args.repeat)
+        print(f"Render de una página con {args.components} componentes:")
+        print(f"  f-strings (anterior):    {baseline * 1000:8.2f} ms "
+              f"({baseline / args.components * 1e6:.1f} µs/componente)")
+        print(f"  sin cache de fragmentos: {uncached * 1000:8.2f} ms "
+              f"({uncached / args.components * 1e6:.1f} µs/componente, {uncached / baseline:.2f}x f-strings)")
+        print(f"  con cache de fragmentos: {cached * 1000:8.2f} ms "
+              f"({cached / args.components * 1e6:.1f} µs/componente)")
+    finally:
+        shutil.rmtree(output_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,18 +8,32 @@ Este script:
 3. Proporciona información sobre el proceso
 
 Uso:
-    python build_ssg.py [--update-sites]
+    python build_ssg.py [--update-sites] [--workers N] [--restart]
     
 Opciones:
     --update-sites: Actualiza los assets de todos los sitios deployados existentes
+    --workers N: Sitios que se actualizan en paralelo (por defecto ROLLOUT_WORKERS)
+    --restart: Ignora el progreso guardado de una actualización interrumpida
 """
 
+import argparse
+import json
 import subprocess
 import sys
 import os
-import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
+
+# Sitios que se actualizan en paralelo (cada uno es un cambio de symlink, limitado por I/O)
+ROLLOUT_WORKERS = int(os.getenv("ROLLOUT_WORKERS", "8"))
+
+# Progreso de --update-sites, dentro del directorio de sitios (oculto para nginx)
+ROLLOUT_CHECKPOINT = ".assets-rollout.json"
+
+# Cada cuántos sitios se guarda el progreso y se informa el avance
+CHECKPOINT_EVERY = 50
 
 
 def run_command(cmd: List[str], cwd: Optional[str] = None) -> tuple[bool, str]:
@@ -76,41 +90,101 @@ def build_ssg() -> bool:
         return False
 
 
-def update_deployed_sites() -> bool:
-    """Actualiza los assets de todos los sitios deployados."""
+def find_deployed_sites(generator, sites_dir: Path) -> List[Path]:
+    """Directorios de las páginas con assets Next.js, según el índice de cada subdominio."""
+    sites = []
+    for subdomain_dir in sorted(sites_dir.iterdir()):
+        # _assets y .render-cache son internos del generador, no subdominios
+        if not subdomain_dir.is_dir() or subdomain_dir.name.startswith(("_", ".")):
+            continue
+        for slug in sorted(generator.site_index.pages(subdomain_dir.name)):
+            page_dir = generator.site_index.page_path(subdomain_dir.name, slug)
+            if os.path.lexists(page_dir / "_next"):
+                sites.append(page_dir)
+    return sites
+
+
+def load_checkpoint(checkpoint_path: Path, store_hash: str) -> Set[str]:
+    """Sitios ya actualizados a este build por una ejecución interrumpida."""
+    try:
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    # El progreso de un build anterior no sirve: esos sitios apuntan a otros assets
+    if checkpoint.get("store") != store_hash:
+        return set()
+    return set(checkpoint.get("done", []))
+
+
+def save_checkpoint(checkpoint_path: Path, store_hash: str, done: Set[str]):
+    from deploy_manifest import atomic_write_bytes
+    
+    payload = json.dumps({"store": store_hash, "done": sorted(done)}, separators=(",", ":"))
+    atomic_write_bytes(checkpoint_path, payload.encode("utf-8"))
+
+
+def update_site(asset_store, store_dir: Path, page_dir: Path) -> bool:
+    """Apunta el _next/ de una página a los assets publicados; retorna si cambió."""
+    target = page_dir / "_next"
+    # El manifest del sitio ya corresponde al build nuevo: no hay nada que hacer
+    if asset_store.verify(target) and target.resolve() == store_dir.resolve():
+        return False
+    asset_store.link(store_dir, target)
+    return True
+
+
+def _format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def update_deployed_sites(sites_dir: Path = None, workers: int = None, restart: bool = False,
+                          assets_dir: Path = None) -> bool:
+    """Actualiza los assets de todos los sitios deployados.
+    
+    Los assets del build se publican una sola vez en el store y luego cada
+    sitio solo cambia su symlink _next/, en paralelo. Los sitios que ya apuntan
+    al build nuevo se saltean, y el progreso se guarda en ROLLOUT_CHECKPOINT
+    para que una ejecución interrumpida continúe donde quedó.
+    """
     print("🔄 Actualizando sitios deployados...")
     
     try:
         from nextjs_ssg_generator import NextJSSSGGenerator
         
         # Crear generador
-        sites_dir = Path(__file__).parent.parent / "generated-sites"
+        sites_dir = Path(sites_dir) if sites_dir else Path(__file__).parent.parent / "generated-sites"
         generator = NextJSSSGGenerator(str(sites_dir))
         
-        updated_count = 0
+        assets_dir = Path(assets_dir) if assets_dir else generator.nextjs_dir / "dist" / "_next"
+        if not assets_dir.exists():
+            raise FileNotFoundError(f"Assets de Next.js no encontrados en {assets_dir}")
+        store_dir = generator.asset_store.publish(assets_dir)
+        print(f"   📦 Assets publicados en {store_dir}")
+        
+        sites = find_deployed_sites(generator, sites_dir)
+        checkpoint_path = sites_dir / ROLLOUT_CHECKPOINT
+        done = set() if restart else load_checkpoint(checkpoint_path, store_dir.name)
+        pending = [site for site in sites if str(site.relative_to(sites_dir)) not in done]
+        if len(pending) < len(sites):
+            print(f"   ⏩ Retomando: {len(sites) - len(pending)} sitios ya actualizados a este build")
         
-        # Buscar todos los sitios deployados
-        for subdomain_dir in sites_dir.iterdir():
-            if subdomain_dir.is_dir():
-                # Buscar páginas en el subdominio
-                for page_dir in subdomain_dir.iterdir():
-                    if page_dir.is_dir():
-                        # Verificar si tiene assets Next.js
-                        assets_dir = page_dir / "_next"
-                        if assets_dir.exists():
-                            print(f"   📁 Actualizando {subdomain_dir.name}/{page_dir.name}")
-                            generator._copy_nextjs_assets(page_dir)
-                            updated_count += 1
-                    else:
-                        # Verificar si es una página root
-                        if page_dir.name == "index.html":
-                            assets_dir = subdomain_dir / "_next"
-                            if assets_dir.exists():
-                                print(f"   📁 Actualizando {subdomain_dir.name} (root)")
-                                generator._copy_nextjs_assets(subdomain_dir)
-                                updated_count += 1
+        stats = _rollout(generator.asset_store, store_dir, sites_dir, pending, done,
+                         workers or ROLLOUT_WORKERS, checkpoint_path)
         
-        print(f"✅ {updated_count} sitios actualizados")
+        print(f"✅ {stats['updated']} sitios actualizados, {stats['unchanged']} ya estaban al día"
+              + (f", {stats['failed']} con errores" if stats["failed"] else ""))
+        if stats["failed"]:
+            print("💡 Vuelve a ejecutar --update-sites para reintentar solo los sitios con errores")
+            return False
+        checkpoint_path.unlink(missing_ok=True)
+        
+        # Ningún sitio apunta ya a los builds anteriores: liberar sus entradas del store
+        removed = generator.asset_store.collect_garbage(sites_dir)
+        if removed:
+            print(f"   🧹 {len(removed)} builds de assets sin uso eliminados del store")
         return True
         
     except Exception as e:
@@ -118,13 +192,52 @@ def update_deployed_sites() -> bool:
         return False
 
 
+def _rollout(asset_store, store_dir: Path, sites_dir: Path, pending: List[Path], done: Set[str],
+             workers: int, checkpoint_path: Path) -> Dict[str, int]:
+    stats = {"updated": 0, "unchanged": 0, "failed": 0}
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(update_site, asset_store, store_dir, site): site for site in pending}
+        for completed, future in enumerate(as_completed(futures), 1):
+            key = str(futures[future].relative_to(sites_dir))
+            try:
+                stats["updated" if future.result() else "unchanged"] += 1
+                done.add(key)
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"   ❌ {key}: {e}")
+            
+            if completed % CHECKPOINT_EVERY == 0 or completed == len(pending):
+                save_checkpoint(checkpoint_path, store_dir.name, done)
+                elapsed = max(time.monotonic() - started, 1e-6)
+                rate = completed / elapsed
+                eta = (len(pending) - completed) / rate
+                print(f"   ⏱️  {completed}/{len(pending)} sitios · {rate:.1f} sitios/s · ETA {_format_eta(eta)}")
+    except BaseException:
+        # Interrumpido (p. ej. Ctrl+C): no arrancar los sitios en cola y guardar lo hecho
+        pool.shutdown(wait=True, cancel_futures=True)
+        save_checkpoint(checkpoint_path, store_dir.name, done)
+        print(f"⏸️  Progreso guardado en {checkpoint_path}: {len(done)} sitios actualizados")
+        raise
+    pool.shutdown()
+    return stats
+
+
 def main():
     """Función principal."""
     print("🚀 Rebuild SSG - Generador de sitios estáticos")
     print("=" * 50)
     
     # Verificar argumentos
-    update_sites = "--update-sites" in sys.argv
+    parser = argparse.ArgumentParser(description="Rebuild del SSG y actualización de sitios deployados")
+    parser.add_argument("--update-sites", action="store_true",
+                        help="actualiza los assets de todos los sitios deployados existentes")
+    parser.add_argument("--workers", type=int, default=ROLLOUT_WORKERS,
+                        help="sitios que se actualizan en paralelo")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignora el progreso guardado de una actualización interrumpida")
+    args = parser.parse_args()
     
     # Step 1: Build SSG
     if not build_ssg():
@@ -132,9 +245,9 @@ def main():
         sys.exit(1)
     
     # Step 2: Update deployed sites if requested
-    if update_sites:
+    if args.update_sites:
         print()
-        if not update_deployed_sites():
+        if not update_deployed_sites(workers=args.workers, restart=args.restart):
             print("❌ Fallo actualizando sitios deployados")
             sys.exit(1)
     
@@ -1,12 +1,16 @@
+from unittest.mock import Mock
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 from main import app
-from database import get_db
-from models import Base
+from auth import get_current_active_user
+from database import get_async_db, get_db
+from models import Base, Page
 
 @pytest.fixture(scope="session")
 def test_engine():
@@ -40,4 +44,58 @@ def client(db_session):
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
         yield test_client
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+def database(tmp_path):
+    # Archivo compartido: los datos se cargan con una sesión sync y la app lee con aiosqlite
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    async_engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://", 1), poolclass=NullPool)
+    yield sync_engine, async_engine
+    sync_engine.dispose()
+
+@pytest.fixture
+def engine(database):
+    """Engine por el que pasan las consultas de los routers async"""
+    return database[1].sync_engine
+
+@pytest.fixture
+def async_client(session, database):
+    # `session` la define cada módulo con sus datos, cargados sobre `database`
+    async_session_factory = async_sessionmaker(database[1], expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with async_session_factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_current_active_user] = lambda: Mock(id=1)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+@pytest.fixture
+def make_page():
+    """Fábrica de páginas simuladas para los tests del generador"""
+    def make(**fields):
+        page = Mock(spec=Page)
+        page.configure_mock(**{
+            "id": 1, "title": "Landing", "description": "", "slug": "landing", "subdomain": "demo",
+            "config": {}, "owner_id": 1, **fields,
+        })
+        return page
+    return make
+
+@pytest.fixture
+def make_db():
+    """Fábrica de sesiones simuladas: la página (query.filter.first) y sus componentes ordenados"""
+    def make(components=(), page=None):
+        db = Mock()
+        db.query.return_value.filter.return_value.first.return_value = page
+        db.query.return_value.filter.return_value.order_by.return_value.all.return_value = list(components)
+        # Sin assets subidos para las imágenes de la página
+        db.query.return_value.filter.return_value.all.return_value = []
+        return db
+    return make
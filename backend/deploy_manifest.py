@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".deploy-manifest.json"
+
+# Precompressed variants (see precompress.py) stored next to a file
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+# A file is given either as its content or as the path to copy it from
+FileSource = Union[bytes, str, Path]
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """Write a file through a temporary sibling and rename it into place"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class AtomicStreamWriter:
+    """Write a file chunk by chunk through a temporary sibling.
+
+    Nothing is visible at ``path`` until ``commit``. Occurrences of the
+    given markers are located while streaming so they can be overwritten in
+    place with a value of the same length once it is known (e.g. a URL that
+    depends on the whole document). Used as a context manager, an
+    uncommitted temporary file is removed on exit.
+    """
+
+    def __init__(self, path: Path, markers: Iterable[str] = ()):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        self.size = 0
+        self._markers = {marker: [] for marker in markers}
+        self._overlap = max((len(marker) for marker in self._markers), default=1) - 1
+        self._tail = ""
+        self._file = open(self.tmp_path, "wb")
+        self._committed = False
+
+    def write(self, text: str):
+        data = text.encode("utf-8")
+        if self._markers:
+            # Search the end of the previous chunk too (shorter than any marker, so a
+            # marker is never found twice): a marker may span two chunks
+            window = self._tail + text
+            window_start = self.size - len(self._tail.encode("utf-8"))
+            for marker, offsets in self._markers.items():
+                position = window.find(marker)
+                while position >= 0:
+                    offsets.append(window_start + len(window[:position].encode("utf-8")))
+                    position = window.find(marker, position + 1)
+            self._tail = window[-self._overlap:] if self._overlap else ""
+        self.write_bytes(data)
+
+    def write_bytes(self, data: bytes):
+        """Append raw bytes (not searched for markers)"""
+        self._file.write(data)
+        self.size += len(data)
+
+    def offsets(self, marker: str) -> List[int]:
+        return list(self._markers.get(marker, ()))
+
+    def patch(self, marker: str, value: str):
+        """Overwrite every occurrence of marker with value (same length in bytes)"""
+        data = value.encode("utf-8")
+        if len(data) != len(marker.encode("utf-8")):
+            raise ValueError(f"Patch for {marker!r} must be {len(marker)} bytes long")
+        for offset in self._markers.get(marker, ()):
+            self._file.seek(offset)
+            self._file.write(data)
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self) -> str:
+        """Finish writing and return the SHA-256 of the temporary file"""
+        if not self._file.closed:
+            self._file.close()
+        digest = hashlib.sha256()
+        with open(self.tmp_path, "rb") as f:
+            for block in iter(lambda: f.read(64 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def commit(self):
+        if not self._file.closed:
+            self._file.close()
+        os.replace(self.tmp_path, self.path)
+        self._committed = True
+
+    def discard(self):
+        if not self._file.closed:
+            self._file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "AtomicStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self._committed:
+            self.discard()
+
+
+def _read_source(source: FileSource) -> bytes:
+    if isinstance(source, Path):
+        return source.read_bytes()
+    if isinstance(source, str):
+        return source.encode("utf-8")
+    return source
+
+
+def remove_precompressed(path: Path):
+    """Delete the .gz/.br siblings of a file about to be replaced or removed.
+
+    Otherwise nginx's gzip_static/brotli_static would keep serving the old
+    content until the next precompress pass.
+    """
+    for suffix in COMPRESSED_SUFFIXES:
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def load_manifest(target_dir: Path) -> Dict[str, str]:
+    """Return the {relative path: sha256} manifest of a deployed directory"""
+    try:
+        with open(target_dir / MANIFEST_NAME, encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def sync_files(target_dir: Path, files: Dict[str, FileSource], scope: Optional[str] = None) -> Dict[str, int]:
+    """Bring target_dir in line with files, touching only what changed.
+
+    ``files`` maps relative paths to their new content. Entries whose hash
+    matches the manifest and that still exist on disk are left alone, the
+    rest are replaced atomically, and files listed in the previous manifest
+    but no longer present are deleted. When ``scope`` is given, only manifest
+    entries under that prefix are candidates for deletion.
+
+    Returns counters of written, unchanged and deleted files.
+    """
+    target_dir = Path(target_dir)
+    target_dir.mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(target_dir)
+    current = dict(previous)
+    stats = {"written": 0, "unchanged": 0, "deleted": 0}
+
+    for relative_path, source in files.items():
+        data = _read_source(source)
+        digest = hashlib.sha256(data).hexdigest()
+        path = target_dir / relative_path
+        if previous.get(relative_path) == digest and path.is_file():
+            stats["unchanged"] += 1
+        else:
+            remove_precompressed(path)
+            atomic_write_bytes(path, data)
+            stats["written"] += 1
+        current[relative_path] = digest
+
+    for relative_path in previous:
+        if relative_path in files:
+            continue
+        if scope is not None and not relative_path.startswith(scope):
+            continue
+        remove_precompressed(target_dir / relative_path)
+        (target_dir / relative_path).unlink(missing_ok=True)
+        del current[relative_path]
+        stats["deleted"] += 1
+
+    if current != previous:
+        _write_manifest(target_dir, current)
+
+    logger.info(f"Synced {target_dir}: {stats}")
+    return stats
+
+
+def sync_stream(target_dir: Path, relative_path: str, writer: AtomicStreamWriter) -> bool:
+    """Like ``sync_files`` for one file already streamed to a temporary file.
+
+    The file is renamed into place (and recorded in the manifest) only if
+    its content changed; otherwise the temporary file is discarded. Returns
+    whether the file was written.
+    """
+    target_dir = Path(target_dir)
+    previous = load_manifest(target_dir)
+    digest = writer.close()
+    if previous.get(relative_path) == digest and (target_dir / relative_path).is_file():
+        writer.discard()
+        return False
+    remove_precompressed(target_dir / relative_path)
+    writer.commit()
+    if previous.get(relative_path) != digest:
+        _write_manifest(target_dir, {**previous, relative_path: digest})
+    return True
+
+
+def _write_manifest(target_dir: Path, files: Dict[str, str]):
+    manifest = json.dumps({"files": files}, sort_keys=True, indent=1)
+    atomic_write_bytes(target_dir / MANIFEST_NAME, manifest.encode("utf-8"))
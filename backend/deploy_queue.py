@@ -0,0 +1,319 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import and_, exists, func, or_
+from sqlalchemy.orm import Session, aliased
+
+from deploy_manifest import atomic_write_bytes
+from models import DeployJob, Page
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTION_DEPLOY = "deploy"
+ACTION_UNDEPLOY = "undeploy"
+
+MAX_ATTEMPTS = int(os.getenv("DEPLOY_JOB_MAX_ATTEMPTS", "3"))
+RETRY_BASE_SECONDS = float(os.getenv("DEPLOY_RETRY_BASE_SECONDS", "10"))
+RETRY_MAX_SECONDS = float(os.getenv("DEPLOY_RETRY_MAX_SECONDS", "600"))
+# Workers refresh heartbeat_at of their running jobs this often
+HEARTBEAT_SECONDS = float(os.getenv("DEPLOY_JOB_HEARTBEAT_SECONDS", "30"))
+# Running jobs without a heartbeat for this long are assumed to belong to a dead worker
+STALE_AFTER_SECONDS = float(os.getenv("DEPLOY_JOB_STALE_SECONDS", "300"))
+# Stats files of workers that have not written them for this long are ignored
+WORKER_STATS_MAX_AGE = float(os.getenv("DEPLOY_WORKER_STATS_MAX_AGE", "300"))
+
+# Generator counters reported by workers: section -> generator attribute
+GENERATOR_STATS = {"render_cache": "render_cache", "fragment_cache": "fragment_cache", "html_minifier": "minifier"}
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff before the next attempt of a failed job"""
+    seconds = RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(seconds, RETRY_MAX_SECONDS))
+
+
+def enqueue_deploy(db: Session, page_id: int) -> DeployJob:
+    """Queue a deploy of a page, reusing a job that is still waiting"""
+    job = db.query(DeployJob).filter(
+        DeployJob.page_id == page_id,
+        DeployJob.action == ACTION_DEPLOY,
+        DeployJob.status == QUEUED,
+    ).first()
+    if job:
+        # Ya hay un deploy pendiente que leerá el contenido actual de la página
+        return job
+
+    job = DeployJob(page_id=page_id, action=ACTION_DEPLOY, status=QUEUED, max_attempts=MAX_ATTEMPTS)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def enqueue_undeploy(db: Session, page_id: int) -> DeployJob:
+    """Queue an undeploy of a page, cancelling deploys still waiting for it.
+
+    Undeploys go through the queue so they never run at the same time as a
+    deploy of the same page (see ``claim_jobs``).
+    """
+    db.query(DeployJob).filter(
+        DeployJob.page_id == page_id,
+        DeployJob.action == ACTION_DEPLOY,
+        DeployJob.status == QUEUED,
+    ).update({"status": CANCELLED, "finished_at": datetime.utcnow()}, synchronize_session=False)
+
+    job = db.query(DeployJob).filter(
+        DeployJob.page_id == page_id,
+        DeployJob.action == ACTION_UNDEPLOY,
+        DeployJob.status == QUEUED,
+    ).first()
+    if job is None:
+        job = DeployJob(page_id=page_id, action=ACTION_UNDEPLOY, status=QUEUED, max_attempts=MAX_ATTEMPTS)
+        db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def latest_job(db: Session, page_id: int) -> Optional[DeployJob]:
+    return db.query(DeployJob).filter(DeployJob.page_id == page_id).order_by(DeployJob.id.desc()).first()
+
+
+def claim_jobs(db: Session, worker_id: str, limit: int = 1) -> List[DeployJob]:
+    """Atomically move up to ``limit`` due jobs from queued to running.
+
+    On PostgreSQL the rows are locked with ``FOR UPDATE SKIP LOCKED`` so
+    concurrent workers never claim the same job. Jobs of a page run one at a
+    time and in order: a job is not claimed while the page has a running job
+    or an older one still queued.
+    """
+    now = datetime.utcnow()
+    other = aliased(DeployJob)
+    blocked = exists().where(
+        other.page_id == DeployJob.page_id,
+        or_(other.status == RUNNING, and_(other.status == QUEUED, other.id < DeployJob.id)),
+    )
+    jobs = db.query(DeployJob).filter(
+        DeployJob.status == QUEUED,
+        DeployJob.run_after <= now,
+        ~blocked,
+    ).order_by(DeployJob.id).limit(limit).with_for_update(skip_locked=True).all()
+
+    for job in jobs:
+        job.status = RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.heartbeat_at = now
+    db.commit()
+    return jobs
+
+
+def heartbeat(db: Session, worker_id: str, job_ids: List[int]) -> int:
+    """Mark the running jobs of a worker as alive; returns how many it still holds"""
+    count = db.query(DeployJob).filter(
+        DeployJob.id.in_(job_ids),
+        DeployJob.status == RUNNING,
+        DeployJob.locked_by == worker_id,
+    ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return count
+
+
+@contextmanager
+def keep_alive(session_factory: Callable[[], Session], worker_id: str, job_ids: List[int],
+               interval: float = HEARTBEAT_SECONDS) -> Iterator[None]:
+    """Send heartbeats for a set of jobs from a background thread while the block runs.
+
+    Uses its own sessions: the session running the jobs is busy deploying.
+    """
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(interval):
+            db = session_factory()
+            try:
+                if heartbeat(db, worker_id, job_ids) < len(job_ids):
+                    logger.warning(f"Worker {worker_id} lost some of the jobs {job_ids}")
+            except Exception as e:
+                logger.warning(f"Heartbeat of jobs {job_ids} failed: {e}")
+                db.rollback()
+            finally:
+                db.close()
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{worker_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def complete_job(db: Session, job: DeployJob, result_path: Optional[str] = None):
+    job.status = SUCCEEDED
+    job.result_path = result_path
+    job.last_error = None
+    job.locked_by = None
+    job.finished_at = datetime.utcnow()
+    db.commit()
+
+
+def fail_job(db: Session, job: DeployJob, error: str, retry: bool = True):
+    """Requeue a failed job with backoff, or mark it failed once out of attempts"""
+    job.last_error = error
+    job.locked_by = None
+    if retry and job.attempts < job.max_attempts:
+        job.status = QUEUED
+        job.run_after = datetime.utcnow() + retry_delay(job.attempts)
+        logger.warning(f"Deploy job {job.id} failed (attempt {job.attempts}/{job.max_attempts}), retrying: {error}")
+    else:
+        job.status = FAILED
+        job.finished_at = datetime.utcnow()
+        logger.error(f"Deploy job {job.id} failed: {error}")
+    db.commit()
+
+
+def requeue_stale_jobs(db: Session, stale_after: float = STALE_AFTER_SECONDS) -> int:
+    """Give running jobs of workers that died mid-deploy (no recent heartbeat) back to the queue"""
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+    stale = db.query(DeployJob).filter(
+        DeployJob.status == RUNNING,
+        func.coalesce(DeployJob.heartbeat_at, DeployJob.locked_at) < cutoff,
+    ).with_for_update(skip_locked=True).all()
+    for job in stale:
+        fail_job(db, job, f"Worker {job.locked_by} stopped while running the job")
+    return len(stale)
+
+
+def run_jobs(db: Session, jobs: List[DeployJob], generator: Any):
+    """Run a set of claimed jobs.
+
+    Undeploys delete the page files right away. Generators that support batch deploys export every page with a single
+    build; otherwise pages are deployed one by one.
+    """
+    pages: Dict[int, Page] = {
+        page.id: page
+        for page in db.query(Page).filter(Page.id.in_([job.page_id for job in jobs])).all()
+    }
+
+    runnable = []
+    for job in jobs:
+        page = pages.get(job.page_id)
+        if page is None:
+            fail_job(db, job, "Page not found", retry=False)
+        elif job.action == ACTION_UNDEPLOY:
+            try:
+                generator.delete_page(page.slug, page.subdomain)
+            except Exception as e:
+                fail_job(db, job, str(e))
+                continue
+            complete_job(db, job)
+        elif not page.is_published:
+            fail_job(db, job, "Page is not published", retry=False)
+        else:
+            runnable.append(job)
+
+    if len(runnable) > 1 and hasattr(generator, "deploy_pages"):
+        try:
+            deployed = generator.deploy_pages([pages[job.page_id] for job in runnable], db)
+        except Exception as e:
+            for job in runnable:
+                fail_job(db, job, str(e))
+            return
+        for job in runnable:
+            if job.page_id in deployed:
+                complete_job(db, job, deployed[job.page_id])
+            else:
+                fail_job(db, job, "Page was not exported by the batch build")
+        return
+
+    for job in runnable:
+        try:
+            result_path = generator.deploy_page(pages[job.page_id], db)
+        except Exception as e:
+            fail_job(db, job, str(e))
+            continue
+        complete_job(db, job, result_path)
+
+
+def worker_stats_dir(generator: Any) -> Path:
+    """Directory, shared by the API and the workers, where workers publish their counters"""
+    return Path(generator.output_dir) / ".worker-stats"
+
+
+def generator_stats(generator: Any) -> Dict[str, Dict[str, Any]]:
+    """Cache and minifier counters of a generator"""
+    return {
+        section: getattr(generator, attribute).stats()
+        for section, attribute in GENERATOR_STATS.items()
+        if hasattr(generator, attribute)
+    }
+
+
+def save_worker_stats(stats_dir: Path, worker_id: str, stats: Dict[str, Dict[str, Any]]):
+    """Publish a worker's counters; write errors are logged, never raised"""
+    try:
+        atomic_write_bytes(Path(stats_dir) / f"{worker_id}.json", json.dumps(stats).encode("utf-8"))
+    except OSError as e:
+        logger.warning(f"Could not write stats of worker {worker_id}: {e}")
+
+
+def load_worker_stats(stats_dir: Path, max_age: float = WORKER_STATS_MAX_AGE) -> Dict[str, Dict[str, Any]]:
+    """Counters of the live workers by worker id"""
+    cutoff = time.time() - max_age
+    stats = {}
+    for path in sorted(Path(stats_dir).glob("*.json")):
+        try:
+            if path.stat().st_mtime < cutoff:
+                continue
+            stats[path.stem] = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+    return stats
+
+
+def merge_worker_stats(per_worker: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Sum the counters of several workers, section by section"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for stats in per_worker.values():
+        for section, counters in stats.items():
+            totals = merged.setdefault(section, {})
+            for name, value in counters.items():
+                if isinstance(value, bool):
+                    totals[name] = totals.get(name, False) or value
+                elif isinstance(value, int):
+                    totals[name] = totals.get(name, 0) + value
+    minifier = merged.get("html_minifier")
+    if minifier and minifier.get("bytes_in"):
+        minifier["percent_saved"] = round(100 * minifier["bytes_saved"] / minifier["bytes_in"], 1)
+    elif minifier is not None:
+        minifier["percent_saved"] = 0.0
+    return merged
+
+
+def job_to_dict(job: DeployJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "page_id": job.page_id,
+        "action": job.action,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "last_error": job.last_error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
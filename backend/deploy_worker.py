@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Worker de deploys: procesa la cola de deploy_jobs fuera del proceso de la API.
+
+Uso:
+    python deploy_worker.py --concurrency 2
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+from database import SessionLocal
+from deploy_queue import (
+    HEARTBEAT_SECONDS, claim_jobs, generator_stats, keep_alive, requeue_stale_jobs, run_jobs,
+    save_worker_stats, worker_stats_dir,
+)
+
+logger = logging.getLogger("deploy_worker")
+
+LOG_FORMAT = "%(asctime)s %(processName)s %(levelname)s %(message)s"
+
+# Cada cuántos segundos publica un worker sus contadores (los lee /api/deploy/generator-info)
+STATS_INTERVAL = float(os.getenv("DEPLOY_WORKER_STATS_INTERVAL", "10"))
+# Cada cuántos segundos se poda la cache de render en disco (RENDER_CACHE_MAX_BYTES/MAX_AGE)
+PRUNE_INTERVAL = float(os.getenv("RENDER_CACHE_PRUNE_INTERVAL", "3600"))
+
+
+def work(worker_id: str, stop_event, poll_interval: float, batch_size: int):
+    """Bucle de un proceso worker: reclama jobs y los ejecuta hasta recibir stop"""
+    # Ignorar SIGINT aquí: el proceso principal coordina el apagado
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+    # El generador se crea en el propio proceso (workers de render, locks, cachés)
+    from routers.deployment import generator
+
+    logger.info(f"Worker {worker_id} started with {generator.__class__.__name__}")
+    # Las caches viven en este proceso: la API solo ve los contadores que se publican
+    stats_dir = worker_stats_dir(generator)
+    stats_written = float("-inf")
+    stale_checked = float("-inf")
+    pruned = float("-inf")
+    while not stop_event.is_set():
+        db = SessionLocal()
+        try:
+            # Recuperar jobs de workers caídos en cualquier momento, no solo al arrancar
+            if time.monotonic() - stale_checked >= HEARTBEAT_SECONDS:
+                requeued = requeue_stale_jobs(db)
+                if requeued:
+                    logger.info(f"Worker {worker_id} requeued {requeued} stale jobs")
+                stale_checked = time.monotonic()
+
+            jobs = claim_jobs(db, worker_id, batch_size)
+            if jobs:
+                job_ids = [job.id for job in jobs]
+                logger.info(f"Worker {worker_id} running jobs {job_ids}")
+                # El latido evita que un batch largo se tome por abandonado y se deploye dos veces
+                with keep_alive(SessionLocal, worker_id, job_ids):
+                    run_jobs(db, jobs, generator)
+        except Exception as e:
+            logger.exception(f"Worker {worker_id} error: {e}")
+            db.rollback()
+            jobs = []
+        finally:
+            db.close()
+
+        if jobs or time.monotonic() - stats_written >= STATS_INTERVAL:
+            save_worker_stats(stats_dir, worker_id, generator_stats(generator))
+            stats_written = time.monotonic()
+
+        # Sin poda la cache crece con cada versión de cada página (y sus sidecars)
+        if PRUNE_INTERVAL > 0 and time.monotonic() - pruned >= PRUNE_INTERVAL:
+            try:
+                generator.render_cache.prune()
+            except OSError as e:
+                logger.warning(f"Worker {worker_id} could not prune the render cache: {e}")
+            pruned = time.monotonic()
+
+        if not jobs:
+            stop_event.wait(poll_interval)
+    logger.info(f"Worker {worker_id} stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Procesa la cola de deploys")
+    parser.add_argument("--concurrency", type=int,
+                        default=int(os.getenv("DEPLOY_WORKER_CONCURRENCY", "2")),
+                        help="Número de procesos worker")
+    parser.add_argument("--poll-interval", type=float,
+                        default=float(os.getenv("DEPLOY_WORKER_POLL_INTERVAL", "2")),
+                        help="Segundos entre consultas cuando la cola está vacía")
+    parser.add_argument("--batch-size", type=int,
+                        default=int(os.getenv("DEPLOY_WORKER_BATCH_SIZE", "20")),
+                        help="Jobs reclamados a la vez (se despliegan en un solo build)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    hostname = socket.gethostname()
+    processes = [
+        context.Process(
+            target=work,
+            args=(f"{hostname}-{os.getpid()}-{i}", stop_event, args.poll_interval, args.batch_size),
+            name=f"deploy-worker-{i}",
+        )
+        for i in range(max(args.concurrency, 1))
+    ]
+
+    def shutdown(signum, frame):
+        logger.info("Stopping workers after their current jobs...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    return 0 if all(process.exitcode == 0 for process in processes) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
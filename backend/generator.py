@@ -1,14 +1,195 @@
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
 from pathlib import Path
 import os
+import tempfile
 import json
-from typing import Dict, List, Any
-from models import Page, Component
+from contextlib import ExitStack
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Set, Tuple
+from models import Asset, Page, Component
 from sqlalchemy.orm import Session
 from models import User
+from render_cache import FragmentCache, PreviewCache, RenderCache, hash_payload, hash_tree
+from deploy_manifest import AtomicStreamWriter, load_manifest, sync_files, sync_stream
+from asset_fingerprint import fingerprint_files, rewrite_asset_urls, rewrite_asset_urls_stream
+from style_translator import css_to_tailwind, translate_styles
+from site_index import SiteIndex
+from precompress import PRECOMPRESS_ENABLED, precompress_files, remove_precompressed
+from html_minifier import HtmlMinifier
+from image_pipeline import IMAGE_SOURCE_ROOT, ImagePipeline
+from tailwind_css import (
+    INLINE_STYLES_PLACEHOLDER, STYLESHEET_PLACEHOLDER, TAILWIND_BUILDER_VERSION, ClassCollector, TailwindBuilder,
+)
+
+# Incrementar cuando cambie el HTML que generan los componentes
+GENERATOR_VERSION = "2"
+
+# Número máximo de fragmentos de componentes en memoria
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "1024"))
+
+# Directorio de la cache de bytecode de Jinja2, compartida entre procesos y reinicios
+JINJA_BYTECODE_CACHE_DIR = os.getenv(
+    "JINJA_BYTECODE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "page-builder-jinja-cache")
+)
+
+# Registro tipo de componente -> template (relativo a templates/)
+COMPONENT_TEMPLATES: Dict[str, str] = {}
+# Registro tipo de componente -> función (content, tailwind_classes, images) -> HTML
+COMPONENT_RENDERERS: Dict[str, Callable[[Dict, str, Dict], str]] = {}
+# Campos del contenido con URLs de imágenes que pasan por el pipeline de imágenes responsivas
+COMPONENT_IMAGE_FIELDS: Dict[str, Tuple[str, ...]] = {}
+
+def register_component(component_type: str, template_name: str = None, image_fields: Tuple[str, ...] = (),
+                       renderer: Callable[[Dict, str, Dict], str] = None):
+    """Registra cómo se renderiza un tipo de componente: con una función o con un template"""
+    if renderer is not None:
+        COMPONENT_RENDERERS[component_type] = renderer
+        COMPONENT_TEMPLATES.pop(component_type, None)
+    else:
+        COMPONENT_TEMPLATES[component_type] = template_name or f"components/{component_type}.html"
+        COMPONENT_RENDERERS.pop(component_type, None)
+    if image_fields:
+        COMPONENT_IMAGE_FIELDS[component_type] = tuple(image_fields)
+
+# Clases de botón según variante (global del entorno de componentes)
+BUTTON_VARIANTS = {
+    "primary": "bg-primary hover:bg-primary/90 text-white",
+    "secondary": "bg-secondary hover:bg-secondary/90 text-white",
+    "outline": "bg-transparent text-primary border-2 border-primary hover:bg-primary hover:text-white"
+}
+
+def picture(image: Optional[Dict[str, Any]], src: str, alt: str, css_class: str, sizes: str = "100vw",
+            loading: str = "lazy") -> str:
+    """<picture> de una imagen responsiva, o un <img> simple si no pasó por el pipeline.
+
+    Global del entorno de componentes. Es una función y no un macro de Jinja:
+    llamar a un macro crea un contexto nuevo y era el paso más caro del render.
+    """
+    if not image:
+        return f'<img src="{src}" alt="{alt}" class="{css_class}">'
+    sources = "".join(
+        f'<source type="{source["type"]}" srcset="{source["srcset"]}" sizes="{sizes}">' for source in image["sources"]
+    )
+    return (
+        f'<picture>{sources}<img src="{image["src"]}" srcset="{image["srcset"]}" sizes="{sizes}" '
+        f'width="{image["width"]}" height="{image["height"]}" alt="{alt}" class="{css_class}" '
+        f'loading="{loading}" decoding="async">\n</picture>'
+    )
+
+# Los tipos que aparecen en casi todas las páginas se renderizan con f-strings: un
+# template de Jinja cuesta más por render (ver bench_render.py) y estos no cambian
+# entre sitios. Tipos nuevos registran un template.
+
+CTA_CLASSES = (
+    "px-8 py-4 rounded-lg font-semibold inline-block transition-all duration-300 "
+    "hover:transform hover:-translate-y-1 hover:shadow-lg"
+)
+
+def _hero_html(content: Dict, tailwind_classes: str, images: Dict[str, Dict]) -> str:
+    image = content.get("image")
+    cta_text = content.get("cta_text")
+    parts = [f'<section class="hero text-center py-20 px-4 {tailwind_classes}">\n']
+    if image:
+        parts.append(
+            f'    {picture(images.get(image), image, "Hero", "max-w-full h-auto mb-8 rounded-lg", loading="eager")}\n'
+        )
+    parts.append(
+        f'    <h1 class="text-5xl font-bold mb-6 text-gray-900 dark:text-white">{content.get("title") or ""}</h1>\n'
+        f'    <p class="text-xl mb-8 text-gray-600 dark:text-gray-300">{content.get("subtitle") or ""}</p>\n'
+    )
+    if cta_text:
+        parts.append(
+            f'    <a href="{content.get("cta_link") or "#"}" class="bg-primary hover:bg-primary/90 text-white '
+            f'{CTA_CLASSES}">{cta_text}</a>\n'
+        )
+    parts.append('</section>')
+    return "".join(parts)
+
+def _text_html(content: Dict, tailwind_classes: str, images: Dict[str, Dict]) -> str:
+    alignment = content.get("alignment") or "left"
+    alignment_class = "text-center" if alignment == "center" else "text-left" if alignment == "left" else "text-right"
+    return (
+        f'<section class="text-section py-10 px-5 {alignment_class} {tailwind_classes}">\n'
+        f'    <div class="max-w-4xl mx-auto">\n'
+        f'        {content.get("text") or ""}\n'
+        f'    </div>\n'
+        f'</section>'
+    )
+
+def _image_html(content: Dict, tailwind_classes: str, images: Dict[str, Dict]) -> str:
+    src = content.get("src")
+    caption = content.get("caption")
+    image = picture(images.get(src), src or "", content.get("alt") or "", "max-w-full h-auto rounded-lg shadow-lg")
+    caption_html = f'    <p class="mt-4 italic text-gray-600 dark:text-gray-400">{caption}</p>\n' if caption else ""
+    return (
+        f'<section class="image-section py-10 px-5 text-center {tailwind_classes}">\n'
+        f'    {image}\n'
+        f'{caption_html}'
+        f'</section>'
+    )
+
+def _button_html(content: Dict, tailwind_classes: str, images: Dict[str, Dict]) -> str:
+    variant = BUTTON_VARIANTS.get(content.get("variant") or "primary", BUTTON_VARIANTS["primary"])
+    return (
+        f'<section class="button-section p-5 text-center {tailwind_classes}">\n'
+        f'    <a href="{content.get("link") or "#"}" class="{variant} {CTA_CLASSES}">\n'
+        f'        {content.get("text") or "Click me"}\n'
+        f'    </a>\n'
+        f'</section>'
+    )
+
+def _header_html(content: Dict, tailwind_classes: str, images: Dict[str, Dict]) -> str:
+    logo = content.get("logo")
+    menu_items = content.get("menu_items")
+    parts = [
+        f'<header class="p-5 border-b border-gray-200 dark:border-gray-700 flex justify-between items-center '
+        f'{tailwind_classes}">\n'
+        f'    <div class="flex items-center">\n'
+    ]
+    if logo:
+        parts.append(f'        <img src="{logo}" alt="Logo" class="h-10 mr-4">\n')
+    parts.append(
+        f'        <h1 class="m-0 text-2xl font-bold text-gray-900 dark:text-white">{content.get("title") or ""}</h1>\n'
+        f'    </div>\n'
+    )
+    if menu_items:
+        parts.append('    <nav class="inline-block">\n')
+        parts.extend(
+            f'        <a href="{item.get("link") or "#"}" class="ml-5 text-gray-900 dark:text-white '
+            f'hover:text-primary transition-colors duration-200">{item.get("text") or ""}</a>\n'
+            for item in menu_items
+        )
+        parts.append('    </nav>\n')
+    parts.append('</header>')
+    return "".join(parts)
+
+def _footer_html(content: Dict, tailwind_classes: str, images: Dict[str, Dict]) -> str:
+    links = content.get("links")
+    parts = [
+        f'<footer class="py-10 px-5 text-center border-t border-gray-200 dark:border-gray-700 mt-10 '
+        f'{tailwind_classes}">\n'
+        f'    <p class="m-0 text-gray-600 dark:text-gray-400">{content.get("text") or ""}</p>\n'
+    ]
+    if links:
+        parts.append('    <div class="mt-5">\n')
+        parts.extend(
+            f'        <a href="{link.get("url") or "#"}" class="mr-5 text-gray-600 dark:text-gray-400 '
+            f'hover:text-primary transition-colors duration-200">{link.get("text") or ""}</a>\n'
+            for link in links
+        )
+        parts.append('    </div>\n')
+    parts.append('</footer>')
+    return "".join(parts)
+
+register_component("hero", renderer=_hero_html, image_fields=("image",))
+register_component("text", renderer=_text_html)
+register_component("image", renderer=_image_html, image_fields=("src",))
+register_component("button", renderer=_button_html)
+register_component("header", renderer=_header_html)
+register_component("footer", renderer=_footer_html)
+register_component("HeroIntroScroll", "components/hero_intro_scroll.html", image_fields=("image",))
 
 class SiteGenerator:
-    def __init__(self, output_dir: str = None):
+    def __init__(self, output_dir: str = None, cache_dir: str = None):
         if output_dir is None:
             # Usar el directorio estándar para nginx
             self.output_dir = Path("/var/www/sites")
@@ -17,249 +198,321 @@ class SiteGenerator:
         
         self.templates_dir = Path(__file__).parent / "templates"
         
+        # Cache de HTML renderizado, direccionado por contenido
+        self.render_cache = RenderCache(Path(cache_dir) if cache_dir else self.output_dir / ".render-cache")
+        self._fingerprint = None
+        
+        # Assets comunes con copias de nombre fingerprinted (memo por tamaño/mtime)
+        self._assets_memo = None
+        
+        # Hojas de Tailwind purgadas, compartidas entre sitios (servidas en /_tw/ por nginx)
+        self.tailwind = TailwindBuilder(self.output_dir / "_assets" / "css")
+        
+        # Índice de páginas deployadas y sitemap.xml por subdominio (actualización incremental)
+        self.site_index = SiteIndex(self.output_dir)
+        
+        # Variantes responsivas de las imágenes (servidas en /_img/ por nginx)
+        self.images = ImagePipeline(self.output_dir / "_assets" / "img")
+        
+        # Cache LRU del HTML de cada componente (headers y footers se repiten entre páginas)
+        self.fragment_cache = FragmentCache(FRAGMENT_CACHE_SIZE)
+        
+        # Previews del editor en memoria (LRU por página, validado con la clave de contenido)
+        self.preview_cache = PreviewCache()
+        self._asset_css = None
+        
+        # Minificación del HTML deployado (MINIFY_HTML) con métricas de bytes ahorrados
+        self.minifier = HtmlMinifier()
+        
         # Configurar Jinja2
+        Path(JINJA_BYTECODE_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(JINJA_BYTECODE_CACHE_DIR)
         self.env = Environment(
             loader=FileSystemLoader(str(self.templates_dir)),
-            autoescape=select_autoescape(['html', 'xml'])
+            autoescape=select_autoescape(['html', 'xml']),
+            bytecode_cache=bytecode_cache
         )
         
+        # Los componentes insertan el contenido del editor tal cual (puede contener HTML),
+        # así que su entorno no escapa. Se compilan una vez y no se recargan.
+        self.component_env = Environment(
+            loader=FileSystemLoader(str(self.templates_dir)),
+            autoescape=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            auto_reload=False,
+            bytecode_cache=bytecode_cache
+        )
+        self.component_env.globals["button_variants"] = BUTTON_VARIANTS
+        # <picture> de las imágenes responsivas, disponible en todos los componentes
+        self.component_env.globals["picture"] = picture
+        self._component_templates = {}
+        
         # Asegurar que el directorio existe
         self.output_dir.mkdir(parents=True, exist_ok=True)
     
-    def generate_component_html(self, component: Component) -> str:
-        """Genera HTML para un componente específico"""
+    def generate_component_html(self, component: Component, images: Dict[str, Dict] = None) -> str:
+        """Genera HTML para un componente específico, usando la cache de fragmentos"""
         component_type = component.type
         content = component.content
         styles = component.styles or {}
         
-        # Convertir estilos a CSS
-        css_styles = self._dict_to_css(styles)
-        
-        if component_type == "hero":
-            return self._generate_hero(content, css_styles)
-        elif component_type == "text":
-            return self._generate_text(content, css_styles)
-        elif component_type == "image":
-            return self._generate_image(content, css_styles)
-        elif component_type == "button":
-            return self._generate_button(content, css_styles)
-        elif component_type == "header":
-            return self._generate_header(content, css_styles)
-        elif component_type == "footer":
-            return self._generate_footer(content, css_styles)
-        else:
+        # Solo las imágenes del componente forman parte de su clave
+        images = {
+            src: images[src] for src in self._component_image_sources(component_type, content)
+            if src in images
+        } if images else {}
+        
+        # Un solo hash por componente: serializar cada parte por separado triplicaba el costo
+        cache_key = (component_type, hash_payload([content, styles, images]), GENERATOR_VERSION)
+        html = self.fragment_cache.get(cache_key)
+        if html is None:
+            html = self._render_component(component_type, content, styles, images)
+            self.fragment_cache.put(cache_key, html)
+        return html
+    
+    def _component_image_sources(self, component_type: str, content: Dict) -> List[str]:
+        """URLs de imágenes del contenido de un componente"""
+        if not isinstance(content, dict):
+            return []
+        return [
+            content[field] for field in COMPONENT_IMAGE_FIELDS.get(component_type, ())
+            if isinstance(content.get(field), str) and content[field]
+        ]
+    
+    def _image_sources(self, components: List[Component], db: Session) -> Tuple[Set[str], Dict[str, Path]]:
+        """Imágenes de la página y el archivo local de las que se subieron como Asset"""
+        if not self.images.enabled:
+            return set(), {}
+        sources = {
+            src for component in components
+            for src in self._component_image_sources(component.type, component.content)
+        }
+        if not sources:
+            return sources, {}
+        
+        # Imágenes subidas como Asset: se procesan desde su archivo local
+        assets = db.query(Asset).filter(Asset.url.in_(sources)).all()
+        return sources, {asset.url: IMAGE_SOURCE_ROOT / asset.filename for asset in assets if asset.filename}
+    
+    def _process_images(self, components: List[Component], db: Session) -> Dict[str, Dict]:
+        """Genera (o reutiliza) las variantes de las imágenes de la página"""
+        sources, asset_paths = self._image_sources(components, db)
+        if not sources:
+            return {}
+        return self.images.process(sources, asset_paths)
+    
+    def _render_component(self, component_type: str, content: Dict, styles: Dict[str, Any],
+                          images: Dict[str, Dict] = None) -> str:
+        # Convertir estilos a CSS inline y clases de Tailwind en una sola pasada
+        css_styles, tailwind_classes = translate_styles(styles)
+        
+        renderer = COMPONENT_RENDERERS.get(component_type)
+        if renderer is not None:
+            return renderer(content or {}, tailwind_classes, images or {})
+        template_name = COMPONENT_TEMPLATES.get(component_type)
+        if template_name is None:
             return f'<div class="component-{component_type}" style="{css_styles}">Componente no implementado: {component_type}</div>'
+        return self._render_component_template(template_name, content, css_styles, tailwind_classes, images)
+    
+    def _render_component_template(self, template_name: str, content: Dict, styles: str,
+                                   tailwind_classes: str = None, images: Dict[str, Dict] = None) -> str:
+        """Renderiza un componente con su template precompilado"""
+        template = self._component_templates.get(template_name)
+        if template is None:
+            template = self.component_env.get_template(template_name)
+            self._component_templates[template_name] = template
+        
+        if tailwind_classes is None:
+            tailwind_classes = self._convert_styles_to_tailwind(styles)
+        return template.render(
+            content=content or {},
+            styles=styles,
+            tailwind_classes=tailwind_classes,
+            images=images or {},
+        )
     
     def _dict_to_css(self, styles: Dict[str, Any]) -> str:
         """Convierte un diccionario de estilos a CSS"""
-        css_rules = []
-        for key, value in styles.items():
-            # Saltar claves None o vacías
-            if key is None or key == "":
-                continue
-            # Convertir camelCase a kebab-case
-            css_key = ''.join(['-' + c.lower() if c.isupper() else c for c in str(key)]).lstrip('-')
-            css_rules.append(f"{css_key}: {value}")
-        return "; ".join(css_rules)
+        return translate_styles(styles)[0]
     
     def _convert_styles_to_tailwind(self, styles: str) -> str:
         """Convierte estilos CSS a clases de Tailwind"""
         if not styles:
             return ""
-        
-        # Mapeo básico de estilos CSS a clases de Tailwind
-        style_mappings = {
-            "background-color: #007bff": "bg-primary",
-            "background-color: #6c757d": "bg-secondary",
-            "background-color: #28a745": "bg-success",
-            "background-color: #dc3545": "bg-danger",
-            "color: white": "text-white",
-            "color: #333": "text-gray-900",
-            "color: #666": "text-gray-600",
-            "text-align: center": "text-center",
-            "text-align: left": "text-left",
-            "text-align: right": "text-right",
-            "padding: 20px": "p-5",
-            "padding: 40px 20px": "py-10 px-5",
-            "margin-bottom: 20px": "mb-5",
-            "margin-top: 20px": "mt-5",
-            "font-weight: bold": "font-bold",
-            "font-size: 1.5rem": "text-2xl",
-            "font-size: 3rem": "text-5xl",
-            "font-size: 1.2rem": "text-xl",
-            "border-radius: 5px": "rounded",
-            "border-radius: 8px": "rounded-lg",
-            "display: flex": "flex",
-            "justify-content: space-between": "justify-between",
-            "align-items: center": "items-center",
-        }
-        
-        tailwind_classes = []
-        for css_style in styles.split(";"):
-            css_style = css_style.strip()
-            if css_style in style_mappings:
-                tailwind_classes.append(style_mappings[css_style])
-        
-        return " ".join(tailwind_classes)
+        return css_to_tailwind(styles)
     
     def _generate_hero(self, content: Dict, styles: str) -> str:
-        title = content.get("title", "")
-        subtitle = content.get("subtitle", "")
-        image = content.get("image", "")
-        cta_text = content.get("cta_text", "")
-        cta_link = content.get("cta_link", "#")
-        
-        # Convertir estilos a clases de Tailwind
-        tailwind_classes = self._convert_styles_to_tailwind(styles)
-        
-        html = f'''
-        <section class="hero text-center py-20 px-4 {tailwind_classes}">
-            {f'<img src="{image}" alt="Hero" class="max-w-full h-auto mb-8 rounded-lg">' if image else ''}
-            <h1 class="text-5xl font-bold mb-6 text-gray-900 dark:text-white">{title}</h1>
-            <p class="text-xl mb-8 text-gray-600 dark:text-gray-300">{subtitle}</p>
-            {f'<a href="{cta_link}" class="bg-primary hover:bg-primary/90 text-white px-8 py-4 rounded-lg font-semibold inline-block transition-all duration-300 hover:transform hover:-translate-y-1 hover:shadow-lg">{cta_text}</a>' if cta_text else ''}
-        </section>
-        '''
-        return html
+        return COMPONENT_RENDERERS["hero"](content, self._convert_styles_to_tailwind(styles), {})
     
     def _generate_text(self, content: Dict, styles: str) -> str:
-        text = content.get("text", "")
-        alignment = content.get("alignment", "left")
-        
-        # Convertir estilos a clases de Tailwind
-        tailwind_classes = self._convert_styles_to_tailwind(styles)
-        alignment_class = "text-center" if alignment == "center" else "text-left" if alignment == "left" else "text-right"
-        
-        html = f'''
-        <section class="text-section py-10 px-5 {alignment_class} {tailwind_classes}">
-            <div class="max-w-4xl mx-auto">
-                {text}
-            </div>
-        </section>
-        '''
-        return html
+        return COMPONENT_RENDERERS["text"](content, self._convert_styles_to_tailwind(styles), {})
     
     def _generate_image(self, content: Dict, styles: str) -> str:
-        src = content.get("src", "")
-        alt = content.get("alt", "")
-        caption = content.get("caption", "")
-        
-        # Convertir estilos a clases de Tailwind
-        tailwind_classes = self._convert_styles_to_tailwind(styles)
-        
-        html = f'''
-        <section class="image-section py-10 px-5 text-center {tailwind_classes}">
-            <img src="{src}" alt="{alt}" class="max-w-full h-auto rounded-lg shadow-lg">
-            {f'<p class="mt-4 italic text-gray-600 dark:text-gray-400">{caption}</p>' if caption else ''}
-        </section>
-        '''
-        return html
+        return COMPONENT_RENDERERS["image"](content, self._convert_styles_to_tailwind(styles), {})
     
     def _generate_button(self, content: Dict, styles: str) -> str:
-        text = content.get("text", "Click me")
-        link = content.get("link", "#")
-        variant = content.get("variant", "primary")
-        
-        # Convertir estilos a clases de Tailwind
-        tailwind_classes = self._convert_styles_to_tailwind(styles)
-        
-        # Clases de botón según variante
-        button_classes = {
-            "primary": "bg-primary hover:bg-primary/90 text-white",
-            "secondary": "bg-secondary hover:bg-secondary/90 text-white",
-            "outline": "bg-transparent text-primary border-2 border-primary hover:bg-primary hover:text-white"
-        }
-        
-        html = f'''
-        <section class="button-section p-5 text-center {tailwind_classes}">
-            <a href="{link}" class="{button_classes.get(variant, button_classes['primary'])} px-8 py-4 rounded-lg font-semibold inline-block transition-all duration-300 hover:transform hover:-translate-y-1 hover:shadow-lg">
-                {text}
-            </a>
-        </section>
-        '''
-        return html
+        return COMPONENT_RENDERERS["button"](content, self._convert_styles_to_tailwind(styles), {})
     
     def _generate_header(self, content: Dict, styles: str) -> str:
-        title = content.get("title", "")
-        logo = content.get("logo", "")
-        menu_items = content.get("menu_items", [])
-        
-        # Convertir estilos a clases de Tailwind
-        tailwind_classes = self._convert_styles_to_tailwind(styles)
-        
-        menu_html = ""
-        if menu_items:
-            menu_html = '<nav class="inline-block">'
-            for item in menu_items:
-                menu_html += f'<a href="{item.get("link", "#")}" class="ml-5 text-gray-900 dark:text-white hover:text-primary transition-colors duration-200">{item.get("text", "")}</a>'
-            menu_html += "</nav>"
-        
-        html = f'''
-        <header class="p-5 border-b border-gray-200 dark:border-gray-700 flex justify-between items-center {tailwind_classes}">
-            <div class="flex items-center">
-                {f'<img src="{logo}" alt="Logo" class="h-10 mr-4">' if logo else ''}
-                <h1 class="m-0 text-2xl font-bold text-gray-900 dark:text-white">{title}</h1>
-            </div>
-            {menu_html}
-        </header>
-        '''
-        return html
+        return COMPONENT_RENDERERS["header"](content, self._convert_styles_to_tailwind(styles), {})
     
     def _generate_footer(self, content: Dict, styles: str) -> str:
-        text = content.get("text", "")
-        links = content.get("links", [])
-        
-        # Convertir estilos a clases de Tailwind
-        tailwind_classes = self._convert_styles_to_tailwind(styles)
-        
-        links_html = ""
-        if links:
-            links_html = '<div class="mt-5">'
-            for link in links:
-                links_html += f'<a href="{link.get("url", "#")}" class="mr-5 text-gray-600 dark:text-gray-400 hover:text-primary transition-colors duration-200">{link.get("text", "")}</a>'
-            links_html += "</div>"
-        
-        html = f'''
-        <footer class="py-10 px-5 text-center border-t border-gray-200 dark:border-gray-700 mt-10 {tailwind_classes}">
-            <p class="m-0 text-gray-600 dark:text-gray-400">{text}</p>
-            {links_html}
-        </footer>
-        '''
-        return html
+        return COMPONENT_RENDERERS["footer"](content, self._convert_styles_to_tailwind(styles), {})
+    
+    def _toolchain_fingerprint(self) -> str:
+        """Huella del generador y sus templates para las claves de cache"""
+        if self._fingerprint is None:
+            self._fingerprint = (
+                f"jinja2-{GENERATOR_VERSION}-tw{TAILWIND_BUILDER_VERSION}-{self.images.fingerprint()}-"
+                f"{hash_tree(self.templates_dir)}"
+            )
+        return self._fingerprint
+    
+    def _prepare_page_data(self, page: Page, components: List[Component]) -> Dict[str, Any]:
+        """Convierte la página y sus componentes a un diccionario serializable"""
+        return {
+            "id": page.id,
+            "title": page.title,
+            "description": page.description or "",
+            "slug": page.slug,
+            "subdomain": page.subdomain,
+            "config": page.config or {},
+            "components": [
+                {
+                    "id": component.id,
+                    "type": component.type,
+                    "content": component.content or {},
+                    "styles": component.styles or {},
+                    "position": component.position,
+                }
+                for component in components
+            ]
+        }
     
     def generate_page(self, page: Page, db: Session) -> str:
         """Genera una página completa"""
-        # Obtener componentes ordenados por posición
-        components = db.query(Component).filter(
+        html, _ = self._render_page(page, db)
+        return html
+    
+    def _page_components(self, page: Page, db: Session) -> List[Component]:
+        """Componentes visibles de la página ordenados por posición"""
+        return db.query(Component).filter(
             Component.page_id == page.id,
             Component.is_visible == True
         ).order_by(Component.position).all()
-        
-        # Generar HTML de componentes
-        components_html = ""
-        for component in components:
-            components_html += self.generate_component_html(component)
-        
+    
+    def _page_cache_key(self, page: Page, components: List[Component], db: Session = None) -> str:
+        """Clave de la cache de render.
+        
+        Con db incluye el hash del contenido de cada imagen: reemplazar el
+        archivo detrás de una URL cambia las variantes y por lo tanto el HTML.
+        El preview no la necesita porque conserva las URLs originales.
+        """
+        page_data = self._prepare_page_data(page, components)
+        if db is not None:
+            image_keys = self.images.source_keys(*self._image_sources(components, db))
+            if image_keys:
+                page_data = dict(page_data, image_sources=image_keys)
+        return self.render_cache.make_key(page_data, self._toolchain_fingerprint())
+    
+    def _page_context(self, page: Page, asset_manifest: Dict[str, str]) -> Dict[str, Any]:
+        """Variables de base.html, sin los componentes"""
         # Obtener configuración de la página
         config = page.config or {}
-        theme = config.get("theme", "default")
+        
+        return {
+            "title": page.title,
+            "description": page.description,
+            "theme": config.get("theme", "default"),
+            "slug": page.slug,
+            "tailwind_stylesheet": STYLESHEET_PLACEHOLDER,
+            # Los assets se referencian por su nombre con hash (cache immutable en nginx)
+            "asset_stylesheet": asset_manifest.get("assets/style.css"),
+        }
+    
+    def _render_page(self, page: Page, db: Session) -> Tuple[str, bool]:
+        """Genera la página usando la cache; retorna (html, si vino de cache)"""
+        components = self._page_components(page, db)
+        
+        cache_key = self._page_cache_key(page, components, db)
+        cached_html = self.render_cache.get(cache_key)
+        if cached_html is not None:
+            return cached_html, True
+        
+        # Variantes responsivas de las imágenes (solo se procesan las que cambiaron)
+        images = self._process_images(components, db)
+        
+        # Generar HTML de componentes (mayormente fragmentos ya cacheados)
+        fragments = [self.generate_component_html(component, images) for component in components]
         
         # Usar template base
         template = self.env.get_template("base.html")
+        _, asset_manifest = self._fingerprinted_assets()
+        context = self._page_context(page, asset_manifest)
+        
+        html = template.render(fragments=fragments, content="".join(fragments), **context)
+        html = rewrite_asset_urls(html, asset_manifest)
+        # Enlazar la hoja con las clases que realmente usa el HTML
+        html = self.tailwind.link(html)
+        self.render_cache.put(cache_key, html)
+        return html, False
+    
+    def _stream_page(self, page: Page, components: List[Component], db: Session) -> Iterator[str]:
+        """Genera la página por partes con el mismo resultado que _render_page.
         
-        return template.render(
-            title=page.title,
-            description=page.description,
-            content=components_html,
-            theme=theme,
-            slug=page.slug
+        base.html se recorre con ``generate()`` y los componentes se renderizan
+        de a uno a medida que el template los pide, así que nunca se arma el
+        documento completo. El href de Tailwind queda con el marcador.
+        """
+        images = self._process_images(components, db)
+        fragments = (self.generate_component_html(component, images) for component in components)
+        
+        template = self.env.get_template("base.html")
+        _, asset_manifest = self._fingerprinted_assets()
+        context = self._page_context(page, asset_manifest)
+        
+        # generate() entrega algunas partes como Markup: concatenarlas escaparía el resto
+        chunks = (str(chunk) for chunk in template.generate(fragments=fragments, **context))
+        return rewrite_asset_urls_stream(chunks, asset_manifest)
+    
+    def preview_page(self, page: Page, db: Session) -> Tuple[str, str]:
+        """Renderiza la página en memoria para el preview del editor; retorna (clave, html).
+        
+        La clave es el hash del contenido (la misma de la cache de render). No
+        lee ni escribe la cache en disco ni el directorio de sitios: las imágenes
+        conservan su URL original y las hojas de estilo van inline.
+        """
+        components = self._page_components(page, db)
+        key = self._page_cache_key(page, components)
+        html = self.preview_cache.get(page.id, key)
+        if html is None:
+            html = self._render_preview(page, components)
+            self.preview_cache.put(page.id, key, html)
+        return key, html
+    
+    def _render_preview(self, page: Page, components: List[Component]) -> str:
+        fragments = [self.generate_component_html(component) for component in components]
+        template = self.env.get_template("base.html")
+        context = self._page_context(page, {})
+        context.update(
+            tailwind_stylesheet=None,
+            asset_stylesheet=None,
+            inline_styles=INLINE_STYLES_PLACEHOLDER + self._inline_asset_css()
         )
+        html = template.render(fragments=fragments, content="".join(fragments), **context)
+        return self.tailwind.inline(html)
     
-    def deploy_page(self, page: Page, db: Session) -> str:
-        """Genera y deploya una página"""
-        # Generar HTML
-        html_content = self.generate_page(page, db)
-        
+    def _inline_asset_css(self) -> str:
+        """assets/style.css para el preview, leído una sola vez por proceso"""
+        if self._asset_css is None:
+            try:
+                self._asset_css = (self.templates_dir / "assets" / "style.css").read_text(encoding="utf-8")
+            except OSError:
+                self._asset_css = ""
+        return self._asset_css
+    
+    def _page_dir(self, page: Page) -> Path:
         # Crear directorio para el subdominio si no existe
         subdomain_dir = self.output_dir / page.subdomain
         subdomain_dir.mkdir(parents=True, exist_ok=True)
@@ -271,26 +524,114 @@ class SiteGenerator:
             page_dir.mkdir(parents=True, exist_ok=True)
         else:
             page_dir = subdomain_dir
+        return page_dir
+    
+    def deploy_page(self, page: Page, db: Session) -> str:
+        """Genera y deploya una página"""
+        components = self._page_components(page, db)
+        cache_key = self._page_cache_key(page, components, db)
+        cached = self.render_cache.contains(cache_key)
         
-        # Escribir archivo HTML
-        html_file = page_dir / "index.html"
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        # Copiar assets si existen
-        self._copy_assets(page_dir)
+        page_dir = self._page_dir(page)
         
+        # Si el HTML viene de cache y el index.html deployado es justo esa entrada
+        # (según el manifest) no hay nada que escribir. Un hit solo no alcanza: tras
+        # deployar v2 y volver a v1, la entrada de v1 existe pero en disco está v2.
+        html_file = page_dir / "index.html"
+        if cached and self.render_cache.is_deployed(cache_key, page_dir):
+            # La hoja de Tailwind compartida se genera una sola vez por conjunto de clases
+            self.tailwind.ensure_file(html_file)
+            self.site_index.record_deploy(page)
+            return str(page_dir)
+        
+        # Escribir solo los archivos que cambiaron respecto al manifest del deploy anterior.
+        # Los assets van primero para que el HTML nuevo nunca apunte a un archivo que aún no existe.
+        assets = self._asset_files()
+        sync_files(page_dir, assets, scope="assets/")
+        written = self._write_page_file(page, components, db, cache_key, cached, page_dir)
+        self.render_cache.record_deployed_digest(cache_key, load_manifest(page_dir).get("index.html"))
+        
+        # Variantes .gz/.br para gzip_static/brotli_static (solo de archivos modificados)
+        if PRECOMPRESS_ENABLED:
+            precompress_files(page_dir / relative_path for relative_path in assets)
+            if written:
+                precompress_files([html_file])
+        
+        self.site_index.record_deploy(page)
         return str(page_dir)
     
+    def _write_page_file(self, page: Page, components: List[Component], db: Session,
+                         cache_key: str, cached: bool, page_dir: Path) -> bool:
+        """Escribe index.html en streaming; retorna si cambió.
+        
+        Las partes de la página (o de la entrada de cache, si ya estaba
+        renderizada) pasan por el minificador directo a un archivo temporal que
+        reemplaza a index.html de forma atómica, así que la memoria no depende
+        del tamaño de la página. El HTML sin minificar se guarda a la vez en la
+        cache de render. El href de Tailwind se corrige en ambos archivos al
+        final, cuando ya se conocen todas las clases.
+        """
+        chunks = self.render_cache.iter_chunks(cache_key) if cached else None
+        collector = ClassCollector()
+        
+        with ExitStack() as stack:
+            cache_writer = None
+            if chunks is None:
+                chunks = self._stream_page(page, components, db)
+                cache_writer = stack.enter_context(self.render_cache.writer(cache_key, [STYLESHEET_PLACEHOLDER]))
+            
+            def tee(chunks: Iterable[str]) -> Iterator[str]:
+                for chunk in chunks:
+                    collector.feed(chunk)
+                    if cache_writer is not None:
+                        cache_writer.write(chunk)
+                    yield chunk
+            
+            # Minificar en el camino (el contenido de <pre>, <script>, <style> y <textarea> no se toca)
+            writer = stack.enter_context(AtomicStreamWriter(page_dir / "index.html", [STYLESHEET_PLACEHOLDER]))
+            for chunk in self.minifier.minify_stream(tee(chunks), f"{page.subdomain}/{page.slug}"):
+                writer.write(chunk)
+            
+            # Enlazar la hoja con las clases que realmente usa el HTML (y generarla antes de publicarlo)
+            classes = collector.classes()
+            self.tailwind.ensure_classes(classes)
+            href = self.tailwind.href(classes)
+            writer.patch(STYLESHEET_PLACEHOLDER, href)
+            if cache_writer is not None:
+                cache_writer.patch(STYLESHEET_PLACEHOLDER, href)
+                cache_writer.commit()
+            
+            return sync_stream(page_dir, "index.html", writer)
+    
+    def _asset_files(self) -> Dict[str, Any]:
+        """Assets comunes (CSS, JS, imágenes) por ruta relativa al directorio de la página.
+        
+        Incluye una copia de cada uno con el hash del contenido en el nombre; el
+        nombre original se mantiene para HTML deployado antes del fingerprinting.
+        """
+        files, _ = self._fingerprinted_assets()
+        return dict(files)
+    
+    def _fingerprinted_assets(self) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Retorna (archivos de assets, manifest ruta lógica -> ruta con hash)"""
+        assets_dir = self.templates_dir / "assets"
+        if not assets_dir.exists():
+            return {}, {}
+        paths = [path for path in sorted(assets_dir.rglob("*")) if path.is_file()]
+        signature = tuple((str(path), path.stat().st_size, path.stat().st_mtime_ns) for path in paths)
+        if self._assets_memo is None or self._assets_memo[0] != signature:
+            files, manifest = fingerprint_files({
+                f"assets/{path.relative_to(assets_dir).as_posix()}": path for path in paths
+            })
+            self._assets_memo = (signature, files, manifest)
+        return self._assets_memo[1], self._assets_memo[2]
+    
     def _copy_assets(self, target_dir: Path):
         """Copia assets comunes (CSS, JS, imágenes)"""
-        assets_dir = self.templates_dir / "assets"
-        if assets_dir.exists():
-            import shutil
-            target_assets = target_dir / "assets"
-            if target_assets.exists():
-                shutil.rmtree(target_assets)
-            shutil.copytree(assets_dir, target_assets)
+        assets = self._asset_files()
+        sync_files(target_dir, assets, scope="assets/")
+        if PRECOMPRESS_ENABLED:
+            precompress_files(target_dir / relative_path for relative_path in assets)
     
     def delete_page(self, slug: str, subdomain: str = None):
         """Elimina una página deployada"""
@@ -304,6 +645,8 @@ class SiteGenerator:
                 index_file = page_dir / "index.html"
                 if index_file.exists():
                     index_file.unlink()
+                    remove_precompressed(index_file)
+                    self.site_index.record_undeploy(subdomain, slug)
                     return True
                 return False
         else:
@@ -321,10 +664,13 @@ class SiteGenerator:
                         index_file = subdomain_dir / "index.html"
                         if index_file.exists():
                             index_file.unlink()
+                            remove_precompressed(index_file)
+                            self.site_index.record_undeploy(subdomain_dir.name, slug)
                             return True
-            
-            if page_dir and page_dir.exists():
-                import shutil
-                shutil.rmtree(page_dir)
-                return True
-            return False 
\ No newline at end of file
+        
+        if page_dir and page_dir.exists():
+            import shutil
+            shutil.rmtree(page_dir)
+            self.site_index.record_undeploy(page_dir.parent.name, slug)
+            return True
+        return False 
\ No newline at end of file
@@ -0,0 +1,248 @@
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+MINIFY_HTML = os.getenv("MINIFY_HTML", "false").lower() == "true"
+
+# Their content is emitted verbatim
+RAW_TEXT_TAGS = frozenset(("pre", "script", "style", "textarea"))
+
+# Whitespace next to these tags never renders, so it can be dropped entirely
+BLOCK_TAGS = frozenset((
+    "html", "head", "body", "title", "meta", "link", "base", "main", "section", "article", "aside",
+    "header", "footer", "nav", "div", "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li",
+    "dl", "dt", "dd", "table", "thead", "tbody", "tfoot", "tr", "th", "td", "form", "fieldset",
+    "figure", "figcaption", "blockquote", "hr", "br", "details", "summary", "noscript", "template",
+    "script", "style",
+))
+
+BOOLEAN_ATTRIBUTES = (
+    "allowfullscreen", "async", "autofocus", "autoplay", "checked", "controls", "default", "defer",
+    "disabled", "formnovalidate", "hidden", "inert", "itemscope", "loop", "multiple", "muted",
+    "nomodule", "novalidate", "open", "playsinline", "readonly", "required", "reversed", "selected",
+)
+
+_WHITESPACE_RE = re.compile(r'[ \t\n\r\f]+')
+_TAG_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9:-]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>')
+_TAG_START_RE = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9:-]*)')
+_QUOTED_RE = re.compile(r'("[^"]*"|\'[^\']*\')')
+_BOOLEAN_RE = re.compile(
+    r' (' + "|".join(BOOLEAN_ATTRIBUTES) + r')=(?:""|\'\'|"\1"|\'\1\')(?=[ />])', re.IGNORECASE
+)
+# Comments that must survive: IE conditionals and React's hydration markers in Next.js output
+_KEPT_COMMENT_RE = re.compile(r'^<!--(\[if|<!\[endif|\$|/\$| -->)')
+
+
+def _minify_tag(tag: str) -> str:
+    """Collapse whitespace between attributes and shorten boolean attributes"""
+    parts = _QUOTED_RE.split(tag)
+    for i in range(0, len(parts), 2):
+        part = _WHITESPACE_RE.sub(" ", parts[i])
+        parts[i] = part.replace(" =", "=").replace("= ", "=")
+    tag = "".join(parts).replace(" >", ">").replace(" />", "/>")
+    return _BOOLEAN_RE.sub(r' \1', tag)
+
+
+class _Minifier:
+    """Incremental minifier: feed chunks, get back the output that is final"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.prev_block = True
+        self.raw_tag: Optional[str] = None
+
+    def _next_is_block(self, pos: int) -> Optional[bool]:
+        """Whether the tag starting at pos is a block tag; None if more input is needed"""
+        start = _TAG_START_RE.match(self.buffer, pos)
+        if start and start.end() < len(self.buffer):
+            return start.group(2).lower() in BLOCK_TAGS
+        if len(self.buffer) - pos < 12:
+            return None
+        return False
+
+    def run(self, final: bool) -> str:
+        out = []
+        buffer = self.buffer
+        while self.pos < len(buffer):
+            pos = self.pos
+
+            if self.raw_tag is not None:
+                match = re.compile(r'</' + self.raw_tag + r'\s*>', re.IGNORECASE).search(buffer, pos)
+                if not match:
+                    if final:
+                        out.append(buffer[pos:])
+                        self.pos = len(buffer)
+                    break
+                out.append(buffer[pos:match.end()])
+                self.pos = match.end()
+                self.raw_tag = None
+                self.prev_block = True
+                continue
+
+            if buffer[pos] != "<":
+                end = buffer.find("<", pos)
+                if end == -1:
+                    if not final:
+                        break
+                    end = len(buffer)
+                    next_block = True
+                else:
+                    next_block = self._next_is_block(end)
+                    if next_block is None:
+                        if not final:
+                            break
+                        next_block = False
+                text = _WHITESPACE_RE.sub(" ", buffer[pos:end])
+                if self.prev_block:
+                    text = text.lstrip(" ")
+                if next_block:
+                    text = text.rstrip(" ")
+                out.append(text)
+                if text:
+                    self.prev_block = False
+                self.pos = end
+                continue
+
+            if buffer.startswith("<!--", pos):
+                end = buffer.find("-->", pos + 4)
+                if end == -1:
+                    if not final:
+                        break
+                    end = len(buffer) - 3
+                comment = buffer[pos:end + 3]
+                if _KEPT_COMMENT_RE.match(comment):
+                    out.append(comment)
+                self.pos = end + 3
+                continue
+
+            if buffer.startswith("<!", pos) or buffer.startswith("<?", pos):
+                end = buffer.find(">", pos)
+                if end == -1:
+                    if not final:
+                        break
+                    end = len(buffer) - 1
+                out.append(_WHITESPACE_RE.sub(" ", buffer[pos:end + 1]))
+                self.pos = end + 1
+                self.prev_block = True
+                continue
+
+            match = _TAG_RE.match(buffer, pos)
+            if not match:
+                if _TAG_START_RE.match(buffer, pos) and not final:
+                    # Probably a tag split across chunks
+                    break
+                # A literal "<" in text
+                out.append("<")
+                self.prev_block = False
+                self.pos = pos + 1
+                continue
+
+            name = match.group(2).lower()
+            out.append(_minify_tag(match.group(0)))
+            self.pos = match.end()
+            self.prev_block = name in BLOCK_TAGS
+            if not match.group(1) and name in RAW_TEXT_TAGS and not match.group(3).rstrip().endswith("/"):
+                self.raw_tag = name
+
+        # Drop consumed input
+        self.buffer = buffer[self.pos:]
+        self.pos = 0
+        return "".join(out)
+
+
+def minify_stream(chunks: Iterable[str]) -> Iterator[str]:
+    """Minify HTML given as a stream of chunks.
+
+    Collapses whitespace, drops whitespace next to block tags, removes
+    comments (except IE conditionals and React hydration markers) and
+    shortens boolean attributes. The content of <pre>, <script>, <style>
+    and <textarea> is left untouched.
+    """
+    minifier = _Minifier()
+    for chunk in chunks:
+        minifier.buffer += chunk
+        output = minifier.run(final=False)
+        if output:
+            yield output
+    output = minifier.run(final=True)
+    if output:
+        yield output
+
+
+def minify_html(html: str) -> str:
+    return "".join(minify_stream([html]))
+
+
+class HtmlMinifier:
+    """Minification stage for deployed HTML that tracks the bytes it saves"""
+
+    def __init__(self, enabled: bool = None):
+        self.enabled = MINIFY_HTML if enabled is None else enabled
+        self.pages = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def minify(self, html: str, label: str = "") -> str:
+        """Minify html if enabled, logging the savings of this deploy"""
+        if not self.enabled:
+            return html
+        minified = minify_html(html)
+        self._record(len(html.encode("utf-8")), len(minified.encode("utf-8")), label)
+        return minified
+
+    def minify_stream(self, chunks: Iterable[str], label: str = "") -> Iterator[str]:
+        """Streaming version of ``minify``: same output and metrics, chunk by chunk"""
+        if not self.enabled:
+            yield from chunks
+            return
+        counted = _CountingStream(chunks)
+        bytes_out = 0
+        for output in minify_stream(counted):
+            bytes_out += len(output.encode("utf-8"))
+            yield output
+        self._record(counted.bytes, bytes_out, label)
+
+    def _record(self, bytes_in: int, bytes_out: int, label: str):
+        with self._lock:
+            self.pages += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+        logger.info(
+            f"Minified {label or 'page'}: {bytes_in} -> {bytes_out} bytes "
+            f"({_percent(bytes_in - bytes_out, bytes_in)}% saved)"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            saved = self.bytes_in - self.bytes_out
+            return {
+                "enabled": self.enabled,
+                "pages": self.pages,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": saved,
+                "percent_saved": _percent(saved, self.bytes_in),
+            }
+
+
+def _percent(part: int, total: int) -> float:
+    return round(100 * part / total, 1) if total else 0.0
+
+
+class _CountingStream:
+    """Iterable over chunks that counts their UTF-8 size as they are consumed"""
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = chunks
+        self.bytes = 0
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self._chunks:
+            self.bytes += len(chunk.encode("utf-8"))
+            yield chunk
@@ -0,0 +1,410 @@
+import hashlib
+import http.client
+import io
+import ipaddress
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from deploy_manifest import atomic_write_bytes
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow is optional; without it images keep their original src
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Bump when the variants produced for the same source change
+PIPELINE_VERSION = "1"
+
+IMAGE_PIPELINE_ENABLED = os.getenv("IMAGE_PIPELINE", "true").lower() == "true"
+IMAGE_WIDTHS = tuple(int(width) for width in os.getenv("IMAGE_WIDTHS", "320,640,960,1280,1920").split(","))
+# Modern formats offered through <source>; the <img> fallback is always JPEG (or PNG with alpha)
+IMAGE_FORMATS = tuple(os.getenv("IMAGE_FORMATS", "avif,webp").split(","))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "75"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Local images (and Asset files) are resolved against this directory
+IMAGE_SOURCE_ROOT = Path(os.getenv("IMAGE_SOURCE_ROOT", Path(__file__).parent / "uploads"))
+# Remote images are downloaded only when enabled
+IMAGE_FETCH_REMOTE = os.getenv("IMAGE_FETCH_REMOTE", "false").lower() == "true"
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+# Seconds a download is used before it is revalidated (ETag / Last-Modified) with its origin
+IMAGE_REMOTE_TTL = int(os.getenv("IMAGE_REMOTE_TTL", "3600"))
+# Comma separated hosts remote images may come from; empty allows any public host
+IMAGE_FETCH_HOSTS = tuple(host.strip() for host in os.getenv("IMAGE_FETCH_HOSTS", "").split(",") if host.strip())
+# Downloads are kept out of the public store_dir: only their variants are served
+IMAGE_REMOTE_DIR = Path(os.getenv(
+    "IMAGE_REMOTE_DIR", os.path.join(tempfile.gettempdir(), "page-builder-remote-images")
+))
+MAX_REMOTE_BYTES = 20 * 1024 * 1024
+
+IMAGE_URL_PREFIX = "/_img/"
+
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg", "png": "png"}
+SAVE_OPTIONS = {
+    "avif": {"speed": 6},
+    "webp": {"method": 4},
+    "jpeg": {"optimize": True, "progressive": True},
+    "png": {"optimize": True},
+}
+
+
+def _supported(fmt: str) -> bool:
+    if Image is None or fmt not in MIME_TYPES:
+        return False
+    if fmt in ("avif", "webp"):
+        return features.check(fmt)
+    return True
+
+
+def render_variants(source: str, out_dir: str, widths: Sequence[int], formats: Sequence[str],
+                    quality: int) -> Optional[Dict[str, Any]]:
+    """Write the resized variants of one image and its manifest.
+
+    Runs in pool processes. Variants already on disk are not re-encoded.
+    Returns None for images that must be served as they are (animations).
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with Image.open(source) as original:
+        if getattr(original, "n_frames", 1) > 1:
+            return None
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    fallback = "png" if has_alpha else "jpeg"
+    width, height = image.size
+    targets = sorted({target for target in widths if target < width} | {min(width, max(widths))})
+
+    variants = {fmt: [] for fmt in (*formats, fallback)}
+    for target in targets:
+        resized = None
+        for fmt in variants:
+            name = f"{target}.{EXTENSIONS[fmt]}"
+            variants[fmt].append([target, name])
+            if (out_dir / name).exists():
+                continue
+            if resized is None:
+                resized = image if target == width else image.resize(
+                    (target, max(1, round(height * target / width))), Image.LANCZOS
+                )
+            buffer = io.BytesIO()
+            options = dict(SAVE_OPTIONS[fmt])
+            if fmt != "png":
+                options["quality"] = quality
+            resized.save(buffer, fmt.upper(), **options)
+            atomic_write_bytes(out_dir / name, buffer.getvalue())
+
+    manifest = {
+        "width": width,
+        "height": height,
+        "fallback": fallback,
+        "widths": list(widths),
+        "formats": list(formats),
+        "variants": variants,
+    }
+    atomic_write_bytes(out_dir / "manifest.json", json.dumps(manifest).encode("utf-8"))
+    return manifest
+
+
+class RemoteFetchError(Exception):
+    """A remote image URL that must not be fetched"""
+
+
+def _check_public_address(address: str):
+    ip = ipaddress.ip_address(address.split("%")[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    if not ip.is_global or ip.is_multicast:
+        raise RemoteFetchError(f"{ip} is not a public address")
+
+
+def _check_url(url: str, allowed_hosts: Iterable[str]):
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise RemoteFetchError(f"unsupported URL {url}")
+    if allowed_hosts and parts.hostname.lower() not in allowed_hosts:
+        raise RemoteFetchError(f"host {parts.hostname} is not allowed")
+
+
+class _PublicPeerMixin:
+    # The peer is checked once connected (not when the URL is parsed), so DNS
+    # answers that change between checks cannot reach an internal address
+    def connect(self):
+        super().connect()
+        try:
+            _check_public_address(self.sock.getpeername()[0])
+        except RemoteFetchError:
+            self.close()
+            raise
+
+
+class _PublicHTTPConnection(_PublicPeerMixin, http.client.HTTPConnection):
+    pass
+
+
+class _PublicHTTPSConnection(_PublicPeerMixin, http.client.HTTPSConnection):
+    pass
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+
+class _CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    def __init__(self, allowed_hosts: Iterable[str]):
+        self.allowed_hosts = allowed_hosts
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_url(newurl, self.allowed_hosts)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _build_opener(allowed_hosts: Iterable[str]) -> urllib.request.OpenerDirector:
+    """Opener for remote images: http(s) only, no proxies, public peers only"""
+    opener = urllib.request.OpenerDirector()
+    for handler in (
+        urllib.request.ProxyHandler({}), _PublicHTTPHandler(), _PublicHTTPSHandler(),
+        _CheckedRedirectHandler(allowed_hosts), urllib.request.HTTPDefaultErrorHandler(),
+        urllib.request.HTTPErrorProcessor(),
+    ):
+        opener.add_handler(handler)
+    return opener
+
+
+class ImagePipeline:
+    """Responsive variants of the images used by pages.
+
+    Variants live in store_dir/<source hash>/<width>.<ext>, next to a
+    manifest.json describing them, and are served under url_prefix. An image
+    whose bytes did not change is never processed again. Remote images are
+    downloaded to remote_dir, outside the public store, and only from public
+    addresses (and fetch_hosts, when given). A download older than
+    remote_ttl is revalidated with a conditional request; if the origin cannot
+    be reached the previous copy keeps being used.
+    """
+
+    def __init__(self, store_dir: Path, url_prefix: str = IMAGE_URL_PREFIX,
+                 widths: Sequence[int] = IMAGE_WIDTHS, formats: Sequence[str] = IMAGE_FORMATS,
+                 quality: int = IMAGE_QUALITY, workers: int = IMAGE_WORKERS,
+                 source_root: Path = IMAGE_SOURCE_ROOT, fetch_remote: bool = IMAGE_FETCH_REMOTE,
+                 enabled: bool = IMAGE_PIPELINE_ENABLED, remote_dir: Path = IMAGE_REMOTE_DIR,
+                 fetch_hosts: Iterable[str] = IMAGE_FETCH_HOSTS, remote_ttl: int = IMAGE_REMOTE_TTL):
+        self.store_dir = Path(store_dir)
+        self.url_prefix = url_prefix
+        self.widths = tuple(sorted(widths))
+        self.formats = tuple(fmt for fmt in formats if fmt not in ("jpeg", "png") and _supported(fmt))
+        self.quality = quality
+        self.workers = workers
+        self.source_root = Path(source_root)
+        self.fetch_remote = fetch_remote
+        self.remote_dir = Path(remote_dir)
+        self.fetch_hosts = frozenset(host.lower() for host in fetch_hosts)
+        self.remote_ttl = remote_ttl
+        self._opener = _build_opener(self.fetch_hosts)
+        self.enabled = enabled and Image is not None
+        # (path, mtime, size) -> source hash, to avoid re-reading unchanged files
+        self._source_keys: Dict[tuple, str] = {}
+
+    def fingerprint(self) -> str:
+        """Settings that change the generated markup, for render cache keys"""
+        if not self.enabled:
+            return "img-off"
+        settings = f"{PIPELINE_VERSION}-{self.widths}-{self.formats}-{self.quality}"
+        return "img-" + hashlib.sha256(settings.encode("utf-8")).hexdigest()[:8]
+
+    def resolve(self, src: str, asset_paths: Dict[str, Path] = None) -> Optional[Path]:
+        """Local file holding the image behind src, or None if it is not available"""
+        if not src or src.startswith("data:"):
+            return None
+        if asset_paths and src in asset_paths:
+            path = Path(asset_paths[src])
+        elif src.startswith(("http://", "https://")):
+            path = self._fetch(src) if self.fetch_remote else None
+        else:
+            root = self.source_root.resolve()
+            path = (root / src.split("?")[0].lstrip("/")).resolve()
+            if not path.is_relative_to(root):
+                return None
+        if path is None or not path.is_file() or path.suffix.lower() == ".svg":
+            return None
+        return path
+
+    def source_keys(self, sources: Iterable[str], asset_paths: Dict[str, Path] = None) -> Dict[str, str]:
+        """Content hash of each available source, for render cache keys.
+
+        Cheap for unchanged files (memoised on mtime and size), so pages can be
+        keyed on the images they show before deciding to render.
+        """
+        if not self.enabled:
+            return {}
+        keys = {}
+        for src in set(sources):
+            path = self.resolve(src, asset_paths)
+            if path is not None:
+                keys[src] = self._source_key(path)
+        return keys
+
+    def _fetch(self, url: str) -> Optional[Path]:
+        path = self.remote_dir / hashlib.sha256(url.encode("utf-8")).hexdigest()[:24]
+        # Validators of the download; its mtime is when the origin was last checked
+        meta_path = path.with_name(path.name + ".json")
+        if path.exists():
+            checked = meta_path if meta_path.exists() else path
+            if time.time() - checked.stat().st_mtime < self.remote_ttl:
+                return path
+            meta = self._load_validators(meta_path)
+        else:
+            meta = {}
+
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        try:
+            _check_url(url, self.fetch_hosts)
+            request = urllib.request.Request(url, headers=headers)
+            with self._opener.open(request, timeout=IMAGE_FETCH_TIMEOUT) as response:
+                data = response.read(MAX_REMOTE_BYTES + 1)
+                validators = {"etag": response.headers.get("ETag"),
+                              "last_modified": response.headers.get("Last-Modified")}
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and path.exists():
+                os.utime(meta_path if meta_path.exists() else path)
+                return path
+            return self._fetch_failed(url, path, meta_path, e)
+        except Exception as e:
+            return self._fetch_failed(url, path, meta_path, e)
+        if len(data) > MAX_REMOTE_BYTES:
+            logger.warning(f"Image {url} is larger than {MAX_REMOTE_BYTES} bytes, serving it as is")
+            return None
+        atomic_write_bytes(path, data)
+        atomic_write_bytes(meta_path, json.dumps(validators).encode("utf-8"))
+        return path
+
+    @staticmethod
+    def _load_validators(meta_path: Path) -> Dict[str, Optional[str]]:
+        try:
+            return json.loads(meta_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    @staticmethod
+    def _fetch_failed(url: str, path: Path, meta_path: Path, error: Exception) -> Optional[Path]:
+        if path.exists():
+            # Checked again after another TTL, not on every render while the origin is down
+            os.utime(meta_path if meta_path.exists() else path)
+            logger.warning(f"Could not revalidate image {url}, using the previous download: {error}")
+            return path
+        logger.warning(f"Could not fetch image {url}: {error}")
+        return None
+
+    def _source_key(self, path: Path) -> str:
+        stat = path.stat()
+        memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        key = self._source_keys.get(memo_key)
+        if key is None:
+            digest = hashlib.sha256(f"{PIPELINE_VERSION}-{self.quality}-".encode("utf-8"))
+            digest.update(path.read_bytes())
+            key = digest.hexdigest()[:20]
+            self._source_keys[memo_key] = key
+        return key
+
+    def _load_manifest(self, out_dir: Path) -> Optional[Dict[str, Any]]:
+        try:
+            manifest = json.loads((out_dir / "manifest.json").read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+        if tuple(manifest.get("widths", ())) != self.widths or tuple(manifest.get("formats", ())) != self.formats:
+            return None
+        return manifest
+
+    def process(self, sources: Iterable[str], asset_paths: Dict[str, Path] = None) -> Dict[str, Dict[str, Any]]:
+        """Responsive image descriptions by src, for the sources that could be processed"""
+        if not self.enabled:
+            return {}
+
+        results = {}
+        pending = {}
+        for src in set(sources):
+            path = self.resolve(src, asset_paths)
+            if path is None:
+                continue
+            key = self._source_key(path)
+            manifest = self._load_manifest(self.store_dir / key)
+            if manifest is not None:
+                results[src] = self._describe(key, manifest)
+            else:
+                pending.setdefault(key, (path, []))[1].append(src)
+        if not pending:
+            return results
+
+        args = [
+            (str(path), str(self.store_dir / key), self.widths, self.formats, self.quality)
+            for key, (path, _) in pending.items()
+        ]
+        if len(args) > 1 and self.workers > 1:
+            # Encoding is CPU bound and Pillow holds the GIL for part of it
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(args)), mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                futures = [pool.submit(render_variants, *arg) for arg in args]
+                outcomes = [_outcome(future.result) for future in futures]
+        else:
+            outcomes = [_outcome(lambda arg=arg: render_variants(*arg)) for arg in args]
+
+        for (key, (path, srcs)), manifest in zip(pending.items(), outcomes):
+            if manifest is None:
+                continue
+            logger.info(f"Processed image {path.name} into {self.store_dir / key}")
+            for src in srcs:
+                results[src] = self._describe(key, manifest)
+        return results
+
+    def _describe(self, key: str, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        def url(name: str) -> str:
+            return f"{self.url_prefix}{key}/{name}"
+
+        def srcset(fmt: str) -> str:
+            return ", ".join(f"{url(name)} {width}w" for width, name in manifest["variants"][fmt])
+
+        fallback = manifest["fallback"]
+        return {
+            "src": url(manifest["variants"][fallback][-1][1]),
+            "srcset": srcset(fallback),
+            "sources": [
+                {"type": MIME_TYPES[fmt], "srcset": srcset(fmt)}
+                for fmt in self.formats if fmt in manifest["variants"]
+            ],
+            "width": manifest["width"],
+            "height": manifest["height"],
+        }
+
+
+def _outcome(result) -> Optional[Dict[str, Any]]:
+    """Result of a processing call; images that fail keep their original src"""
+    try:
+        return result()
+    except Exception as e:
+        logger.warning(f"Image processing failed: {e}")
+        return None
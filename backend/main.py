@@ -1,14 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, get_db
-from models import Base
+from database import get_db
+from pagination import NEXT_CURSOR_HEADER
 from routers import pages, components, deployment, auth, subscription
 from subscription_manager import setup_subscription_manager
 import uvicorn
-from stripe_module.infrastructure.models.subscription_models import Base as StripeBase
 
-Base.metadata.create_all(bind=engine)
-StripeBase.metadata.create_all(bind=engine)
+# El esquema lo administra Alembic (`alembic upgrade head` al arrancar el contenedor);
+# los tests crean sus tablas en sus propias bases
 
 # Inicializar el sistema de gestión de suscripciones
 try:
@@ -27,6 +26,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(auth.router)
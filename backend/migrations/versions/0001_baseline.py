@@ -0,0 +1,261 @@
+"""Esquema base: tablas existentes de la app y de Stripe
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+
+Adopta bases en cualquier estado previo: una base vacía, una creada con
+Base.metadata.create_all o una migrada a mano con los scripts viejos
+(add_subscription_fields.py, add_subdomain_column.sql, remove_slug_unique_index.py).
+Solo crea lo que falta.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+SUBSCRIPTION_STATUS = sa.Enum(
+    "ACTIVE", "INCOMPLETE", "INCOMPLETE_EXPIRED", "TRIALING", "PAST_DUE", "CANCELED", "UNPAID",
+    name="stripesubscriptionstatus",
+)
+EVENT_TYPE = sa.Enum(
+    "CUSTOMER_CREATED", "CUSTOMER_UPDATED", "CUSTOMER_DELETED", "SUBSCRIPTION_CREATED",
+    "SUBSCRIPTION_UPDATED", "SUBSCRIPTION_DELETED", "INVOICE_PAYMENT_SUCCEEDED",
+    "INVOICE_PAYMENT_FAILED", "PAYMENT_METHOD_ATTACHED",
+    name="stripeeventtype",
+)
+
+
+def _tables():
+    return {
+        "users": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String()),
+            sa.Column("username", sa.String()),
+            sa.Column("hashed_password", sa.String()),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column("subscription_active", sa.Boolean()),
+            sa.Column("stripe_customer_id", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime()),
+        ], [
+            ("ix_users_id", ["id"], False),
+            ("ix_users_email", ["email"], True),
+            ("ix_users_username", ["username"], True),
+        ]),
+        "pages": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String()),
+            sa.Column("slug", sa.String()),
+            sa.Column("subdomain", sa.String()),
+            sa.Column("description", sa.Text()),
+            sa.Column("config", sa.JSON()),
+            sa.Column("is_published", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+            sa.UniqueConstraint("subdomain", "slug", name="uq_subdomain_slug"),
+        ], [
+            ("ix_pages_id", ["id"], False),
+            ("ix_pages_title", ["title"], False),
+            ("ix_pages_slug", ["slug"], False),
+            ("ix_pages_subdomain", ["subdomain"], False),
+        ]),
+        "components": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("type", sa.String()),
+            sa.Column("content", sa.JSON()),
+            sa.Column("styles", sa.JSON()),
+            sa.Column("position", sa.Float()),
+            sa.Column("is_visible", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("page_id", sa.Integer(), sa.ForeignKey("pages.id")),
+        ], [
+            ("ix_components_id", ["id"], False),
+        ]),
+        "templates": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String()),
+            sa.Column("description", sa.Text()),
+            sa.Column("thumbnail", sa.String()),
+            sa.Column("config", sa.JSON()),
+            sa.Column("is_premium", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+        ], [
+            ("ix_templates_id", ["id"], False),
+            ("ix_templates_name", ["name"], False),
+        ]),
+        "assets": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("filename", sa.String()),
+            sa.Column("original_name", sa.String()),
+            sa.Column("file_type", sa.String()),
+            sa.Column("file_size", sa.Integer()),
+            sa.Column("url", sa.String()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        ], [
+            ("ix_assets_id", ["id"], False),
+        ]),
+        "deploy_jobs": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("action", sa.String()),
+            sa.Column("status", sa.String()),
+            sa.Column("attempts", sa.Integer()),
+            sa.Column("max_attempts", sa.Integer()),
+            sa.Column("run_after", sa.DateTime()),
+            sa.Column("locked_by", sa.String(), nullable=True),
+            sa.Column("locked_at", sa.DateTime(), nullable=True),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("result_path", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+            sa.Column("page_id", sa.Integer(), sa.ForeignKey("pages.id", ondelete="CASCADE")),
+        ], [
+            ("ix_deploy_jobs_id", ["id"], False),
+            ("ix_deploy_jobs_status", ["status"], False),
+            ("ix_deploy_jobs_run_after", ["run_after"], False),
+            ("ix_deploy_jobs_page_id", ["page_id"], False),
+        ]),
+        "stripe_customers": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("stripe_customer_id", sa.String()),
+            sa.Column("email", sa.String()),
+            sa.Column("name", sa.String()),
+            sa.Column("phone", sa.String()),
+            sa.Column("stripe_metadata", sa.JSON()),
+            sa.Column("created_at", sa.DateTime()),
+        ], [
+            ("ix_stripe_customers_id", ["id"], False),
+            ("ix_stripe_customers_stripe_customer_id", ["stripe_customer_id"], True),
+            ("ix_stripe_customers_email", ["email"], False),
+        ]),
+        "stripe_subscriptions": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("stripe_subscription_id", sa.String()),
+            sa.Column("stripe_customer_id", sa.String(), sa.ForeignKey("stripe_customers.stripe_customer_id")),
+            sa.Column("stripe_price_id", sa.String()),
+            sa.Column("status", SUBSCRIPTION_STATUS),
+            sa.Column("current_period_start", sa.DateTime()),
+            sa.Column("current_period_end", sa.DateTime()),
+            sa.Column("cancel_at_period_end", sa.Boolean()),
+            sa.Column("canceled_at", sa.DateTime()),
+            sa.Column("trial_start", sa.DateTime()),
+            sa.Column("trial_end", sa.DateTime()),
+            sa.Column("stripe_metadata", sa.JSON()),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        ], [
+            ("ix_stripe_subscriptions_id", ["id"], False),
+            ("ix_stripe_subscriptions_stripe_subscription_id", ["stripe_subscription_id"], True),
+            ("ix_stripe_subscriptions_stripe_price_id", ["stripe_price_id"], False),
+        ]),
+        "stripe_payment_methods": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("stripe_payment_method_id", sa.String()),
+            sa.Column("stripe_customer_id", sa.String(), sa.ForeignKey("stripe_customers.stripe_customer_id")),
+            sa.Column("type", sa.String()),
+            sa.Column("card_last4", sa.String()),
+            sa.Column("card_brand", sa.String()),
+            sa.Column("card_exp_month", sa.Integer()),
+            sa.Column("card_exp_year", sa.Integer()),
+            sa.Column("is_default", sa.Boolean()),
+            sa.Column("created_at", sa.DateTime()),
+        ], [
+            ("ix_stripe_payment_methods_id", ["id"], False),
+            ("ix_stripe_payment_methods_stripe_payment_method_id", ["stripe_payment_method_id"], True),
+        ]),
+        "stripe_transactions": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("stripe_event_id", sa.String()),
+            sa.Column("event_type", EVENT_TYPE),
+            sa.Column("object_id", sa.String()),
+            sa.Column("amount", sa.Integer()),
+            sa.Column("currency", sa.String()),
+            sa.Column("status", sa.String()),
+            sa.Column("stripe_metadata", sa.JSON()),
+            sa.Column("processed_at", sa.DateTime()),
+            sa.Column("created_at", sa.DateTime()),
+        ], [
+            ("ix_stripe_transactions_id", ["id"], False),
+            ("ix_stripe_transactions_stripe_event_id", ["stripe_event_id"], True),
+            ("ix_stripe_transactions_object_id", ["object_id"], False),
+        ]),
+        "stripe_prices": ([
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("stripe_price_id", sa.String()),
+            sa.Column("stripe_product_id", sa.String()),
+            sa.Column("amount", sa.Integer()),
+            sa.Column("currency", sa.String()),
+            sa.Column("interval", sa.String()),
+            sa.Column("interval_count", sa.Integer()),
+            sa.Column("active", sa.Boolean()),
+            sa.Column("nickname", sa.String()),
+            sa.Column("stripe_metadata", sa.JSON()),
+            sa.Column("created_at", sa.DateTime()),
+        ], [
+            ("ix_stripe_prices_id", ["id"], False),
+            ("ix_stripe_prices_stripe_price_id", ["stripe_price_id"], True),
+            ("ix_stripe_prices_stripe_product_id", ["stripe_product_id"], False),
+        ]),
+    }
+
+
+def _reconcile_legacy(inspector, existing):
+    """Lleva tablas creadas antes de las migraciones al esquema base"""
+    if "users" in existing:
+        columns = {column["name"] for column in inspector.get_columns("users")}
+        if "subscription_active" not in columns:
+            op.add_column("users", sa.Column("subscription_active", sa.Boolean(), nullable=False,
+                                             server_default=sa.false()))
+        if "stripe_customer_id" not in columns:
+            op.add_column("users", sa.Column("stripe_customer_id", sa.String(), nullable=True))
+
+    if "pages" in existing:
+        columns = {column["name"] for column in inspector.get_columns("pages")}
+        if "subdomain" not in columns:
+            op.add_column("pages", sa.Column("subdomain", sa.String()))
+        # slug y subdomain fueron únicos por separado: solo la combinación lo es
+        indexes = {index["name"]: index for index in inspector.get_indexes("pages")}
+        for name in ("ix_pages_slug", "ix_pages_subdomain"):
+            if name in indexes and indexes[name]["unique"]:
+                op.drop_index(name, table_name="pages")
+                del indexes[name]
+        unique_names = {constraint["name"] for constraint in inspector.get_unique_constraints("pages")}
+        if "uq_subdomain_slug" not in unique_names and "uq_subdomain_slug" not in indexes:
+            op.create_index("uq_subdomain_slug", "pages", ["subdomain", "slug"], unique=True)
+
+    if "components" in existing and op.get_bind().dialect.name == "postgresql":
+        position = next(column for column in inspector.get_columns("components") if column["name"] == "position")
+        if isinstance(position["type"], sa.Integer):
+            op.alter_column("components", "position", type_=sa.Float(), existing_type=sa.Integer(),
+                            postgresql_using="position::double precision")
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing = set(inspector.get_table_names())
+    _reconcile_legacy(inspector, existing)
+
+    # El inspector cachea la reflexión: uno nuevo ve los índices recién borrados
+    inspector = sa.inspect(op.get_bind())
+    for table, (columns, indexes) in _tables().items():
+        if table not in existing:
+            op.create_table(table, *columns)
+            present = set()
+        else:
+            present = {index["name"] for index in inspector.get_indexes(table)}
+        for name, index_columns, unique in indexes:
+            if name not in present:
+                op.create_index(name, table, index_columns, unique=unique)
+
+
+def downgrade():
+    for table in reversed(list(_tables())):
+        op.drop_table(table)
+    bind = op.get_bind()
+    SUBSCRIPTION_STATUS.drop(bind, checkfirst=True)
+    EVENT_TYPE.drop(bind, checkfirst=True)
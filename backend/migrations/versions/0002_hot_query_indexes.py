@@ -0,0 +1,57 @@
+"""Índices para las consultas frecuentes y las claves foráneas
+
+Revision ID: 0002_hot_query_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17
+
+- pages (owner_id, updated_at, id) y components (page_id, position, id): paginación por
+  cursor de los listados
+- components (page_id, is_visible, position): componentes visibles en orden (generadores)
+- users.stripe_customer_id: cada evento de Stripe busca al usuario por customer
+- assets.owner_id, stripe_subscriptions/stripe_payment_methods.stripe_customer_id:
+  claves foráneas sin índice
+
+pages.owner_id y components.page_id quedan cubiertos por los índices compuestos de
+la paginación, que empiezan por esas columnas.
+
+En PostgreSQL se crean con CREATE INDEX CONCURRENTLY (fuera de la transacción) para
+no bloquear escrituras en tablas grandes.
+"""
+from alembic import op
+
+
+revision = "0002_hot_query_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_pages_owner_updated_id", "pages", ["owner_id", "updated_at", "id"]),
+    ("ix_components_page_position_id", "components", ["page_id", "position", "id"]),
+    ("ix_components_page_visible_position", "components", ["page_id", "is_visible", "position"]),
+    ("ix_users_stripe_customer_id", "users", ["stripe_customer_id"]),
+    ("ix_assets_owner_id", "assets", ["owner_id"]),
+    ("ix_stripe_subscriptions_stripe_customer_id", "stripe_subscriptions", ["stripe_customer_id"]),
+    ("ix_stripe_payment_methods_stripe_customer_id", "stripe_payment_methods", ["stripe_customer_id"]),
+]
+
+
+def upgrade():
+    if op.get_context().dialect.name == "postgresql":
+        # CONCURRENTLY no puede correr dentro de una transacción
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade():
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True)
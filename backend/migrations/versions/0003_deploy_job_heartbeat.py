@@ -0,0 +1,31 @@
+"""Latido de los jobs de deploy
+
+Revision ID: 0003_deploy_job_heartbeat
+Revises: 0002_hot_query_indexes
+Create Date: 2026-10-17
+
+deploy_jobs.heartbeat_at: el worker lo actualiza mientras corre un job; un job
+sin latido reciente es de un worker caído y vuelve a la cola.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_deploy_job_heartbeat"
+down_revision = "0002_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las bases creadas con create_all ya tienen la columna (en modo --sql no se puede consultar)
+    if not op.get_context().as_sql:
+        columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("deploy_jobs")}
+        if "heartbeat_at" in columns:
+            return
+    op.add_column("deploy_jobs", sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("deploy_jobs") as batch_op:
+        batch_op.drop_column("heartbeat_at")
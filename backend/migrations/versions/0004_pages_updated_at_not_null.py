@@ -0,0 +1,29 @@
+"""pages.updated_at obligatorio
+
+Revision ID: 0004_pages_updated_at_not_null
+Revises: 0003_deploy_job_heartbeat
+Create Date: 2026-10-17
+
+El listado de páginas pagina por cursor sobre (updated_at, id): una fila sin
+updated_at daba un cursor que no se podía volver a leer. Las filas viejas toman
+created_at (o la fecha actual) y la columna pasa a NOT NULL.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_pages_updated_at_not_null"
+down_revision = "0003_deploy_job_heartbeat"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE pages SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL")
+    with op.batch_alter_table("pages") as batch_op:
+        batch_op.alter_column("updated_at", existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table("pages") as batch_op:
+        batch_op.alter_column("updated_at", existing_type=sa.DateTime(), nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, UniqueConstraint
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, Boolean, ForeignKey, JSON, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -14,7 +14,7 @@ class User(Base):
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     subscription_active = Column(Boolean, default=False)
-    stripe_customer_id = Column(String, nullable=True)
+    stripe_customer_id = Column(String, nullable=True, index=True)  # Búsqueda en cada evento de Stripe
     created_at = Column(DateTime, default=datetime.now)
     
     pages = relationship("Page", back_populates="owner")
@@ -34,15 +34,19 @@ class Page(Base):
     config = Column(JSON)  # Configuración completa de la página
     is_published = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Nunca NULL: es la clave del cursor del listado de páginas
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     owner = relationship("User", back_populates="pages")
-    components = relationship("Component", back_populates="page")
+    # Orden determinístico (posición y luego id) tanto en carga lazy como eager
+    components = relationship("Component", back_populates="page", order_by="[Component.position, Component.id]")
 
     __table_args__ = (
         # Índice único compuesto
         UniqueConstraint('subdomain', 'slug', name='uq_subdomain_slug'),
+        # Paginación por cursor del listado de páginas de un usuario
+        Index('ix_pages_owner_updated_id', 'owner_id', 'updated_at', 'id'),
     )
 
 class Component(Base):
@@ -52,13 +56,20 @@ class Component(Base):
     type = Column(String)  # header, hero, text, image, button, etc.
     content = Column(JSON)  # Contenido específico del componente
     styles = Column(JSON)  # Estilos CSS
-    position = Column(Integer)  # Orden en la página
+    position = Column(Float)  # Orden en la página (fraccionaria: mover un componente escribe una sola fila)
     is_visible = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     page_id = Column(Integer, ForeignKey("pages.id"))
     page = relationship("Page", back_populates="components")
 
+    __table_args__ = (
+        # Componentes de una página en orden y paginación por cursor
+        Index('ix_components_page_position_id', 'page_id', 'position', 'id'),
+        # Componentes visibles en orden (generadores)
+        Index('ix_components_page_visible_position', 'page_id', 'is_visible', 'position'),
+    )
+
 class Template(Base):
     __tablename__ = "templates"
     
@@ -81,5 +92,25 @@ class Asset(Base):
     url = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    owner = relationship("User")
\ No newline at end of file
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    owner = relationship("User")
+
+class DeployJob(Base):
+    __tablename__ = "deploy_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    action = Column(String, default="deploy")  # deploy, undeploy
+    status = Column(String, default="queued", index=True)  # queued, running, succeeded, failed, cancelled
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime, default=datetime.utcnow, index=True)  # Próximo intento (backoff)
+    locked_by = Column(String, nullable=True)  # Worker que ejecuta el job
+    locked_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # Último latido del worker mientras corre el job
+    last_error = Column(Text, nullable=True)
+    result_path = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    page_id = Column(Integer, ForeignKey("pages.id", ondelete="CASCADE"), index=True)
+    page = relationship("Page")
@@ -0,0 +1,51 @@
+import { existsSync, readdirSync, readFileSync } from "fs";
+import { join } from "path";
+import { ComponentRenderer } from "@shared/index";
+import { PageData } from "@/types";
+
+// Written by NextJSSSGGenerator.deploy_pages, one <page id>.json per page
+const BATCH_DIR = join(process.cwd(), "data", "pages");
+
+// Static export needs at least one param, even when no batch is pending
+const PLACEHOLDER_ID = "_placeholder";
+
+export const dynamicParams = false;
+
+export function generateStaticParams() {
+  const pageIds = existsSync(BATCH_DIR)
+    ? readdirSync(BATCH_DIR)
+        .filter((file) => file.endsWith(".json"))
+        .map((file) => file.replace(/\.json$/, ""))
+    : [];
+
+  if (pageIds.length === 0) {
+    return [{ pageId: PLACEHOLDER_ID }];
+  }
+  return pageIds.map((pageId) => ({ pageId }));
+}
+
+function getPageData(pageId: string): PageData {
+  if (pageId === PLACEHOLDER_ID) {
+    return {
+      id: 0,
+      title: "Landing Page",
+      description: "Generated landing page",
+      slug: "home",
+      subdomain: "demo",
+      config: { theme: "default" },
+      components: [],
+    };
+  }
+  return JSON.parse(readFileSync(join(BATCH_DIR, `${pageId}.json`), "utf8"));
+}
+
+export default async function SitePage({ params }: { params: Promise<{ pageId: string }> }) {
+  const { pageId } = await params;
+  const pageData = getPageData(pageId);
+
+  return (
+    <main>
+      {pageData.components.map((component, index) => <ComponentRenderer key={index} component={component} theme="dark" />)}
+    </main>
+  );
+}
@@ -0,0 +1,65 @@
+/**
+ * Long-lived render worker used by NextJSSSGGenerator in "worker" mode.
+ *
+ * Reads one JSON request per line from stdin and writes one JSON response per
+ * line to stdout, so the backend can keep a warm process instead of running
+ * `next build` for every deploy.
+ *
+ *   -> {"id": 1, "type": "ping"}
+ *   <- {"id": 1, "ok": true}
+ *   -> {"id": 2, "type": "render", "page": {...PageData}}
+ *   <- {"id": 2, "ok": true, "html": "<main>...</main>"}
+ */
+import { createInterface } from "readline";
+import { renderToStaticMarkup } from "react-dom/server";
+import { ComponentRenderer } from "@shared/index";
+import { PageData } from "@/types";
+
+// stdout is reserved for the protocol; anything logged by components goes to stderr
+console.log = console.error;
+console.warn = console.error;
+
+function renderPage(pageData: PageData): string {
+  return renderToStaticMarkup(
+    <main>
+      {pageData.components.map((component, index) => (
+        <ComponentRenderer key={index} component={component} theme="dark" />
+      ))}
+    </main>
+  );
+}
+
+function respond(payload: Record<string, unknown>) {
+  process.stdout.write(JSON.stringify(payload) + "\n");
+}
+
+const rl = createInterface({ input: process.stdin });
+
+rl.on("line", (line) => {
+  if (!line.trim()) return;
+
+  let request: { id?: number; type?: string; page?: PageData };
+  try {
+    request = JSON.parse(line);
+  } catch (error) {
+    respond({ id: null, ok: false, error: `Invalid request: ${error}` });
+    return;
+  }
+
+  try {
+    switch (request.type) {
+      case "ping":
+        respond({ id: request.id, ok: true });
+        break;
+      case "render":
+        respond({ id: request.id, ok: true, html: renderPage(request.page as PageData) });
+        break;
+      default:
+        respond({ id: request.id, ok: false, error: `Unknown request type: ${request.type}` });
+    }
+  } catch (error) {
+    respond({ id: request.id, ok: false, error: error instanceof Error ? error.stack : String(error) });
+  }
+});
+
+rl.on("close", () => process.exit(0));
@@ -1,16 +1,64 @@
+import atexit
+import base64
+import fcntl
 import json
+import mimetypes
+import os
+import re
+import shutil
 import subprocess
 import tempfile
+import threading
+import time
 import logging
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from models import Page, Component
 from sqlalchemy.orm import Session
+from render_worker import NodeRenderWorker
+from render_cache import PreviewCache, RenderCache, hash_files, hash_tree
+from asset_store import AssetStore
+from deploy_manifest import load_manifest, sync_files
+from html_minifier import HtmlMinifier
+from site_index import SiteIndex
+from precompress import PRECOMPRESS_ENABLED, precompress_files, remove_precompressed
 
 logger = logging.getLogger(__name__)
 
+RENDER_MODE_BUILD = "build"
+RENDER_MODE_WORKER = "worker"
+
+# Seconds between background collections of unreferenced asset store entries (0 disables)
+ASSET_GC_INTERVAL = float(os.getenv("ASSET_GC_INTERVAL", "3600"))
+
+# Superseded webpack cache generations are kept this long: builds may still be copying them
+BUILD_CACHE_KEEP_SECONDS = float(os.getenv("NEXTJS_BUILD_CACHE_KEEP_SECONDS", "600"))
+
+_BUILD_CACHE_GENERATION_RE = re.compile(r"^\d{20}-")
+
+_SCRIPT_TAG_RE = re.compile(r"<script\b[^>]*>.*?</script>", re.DOTALL | re.IGNORECASE)
+_MAIN_TAG_RE = re.compile(r"<main\b[^>]*>.*</main>", re.DOTALL | re.IGNORECASE)
+_NEXT_LINK_RE = re.compile(r"""<link\b[^>]*\bhref=["'](/_next/[^"']+)["'][^>]*>""", re.IGNORECASE)
+_STYLESHEET_REL_RE = re.compile(r"""\brel=["']stylesheet["']""", re.IGNORECASE)
+_CSS_NEXT_URL_RE = re.compile(r"""url\((["']?)(/_next/[^)"']+)\1\)""")
+
+# Types mimetypes may not know about, for assets inlined as data: URIs
+ASSET_MIME_TYPES = {".woff2": "font/woff2", ".woff": "font/woff", ".ttf": "font/ttf", ".otf": "font/otf"}
+
+# Project files copied into every build workspace; node_modules is symlinked
+WORKSPACE_ENTRIES = [
+    "src",
+    "public",
+    "package.json",
+    "next.config.js",
+    "next.config.ts",
+    "tsconfig.json",
+    "postcss.config.mjs",
+]
+
 class NextJSSSGGenerator:
-    def __init__(self, output_dir: str = None):
+    def __init__(self, output_dir: str = None, render_mode: str = None, cache_dir: str = None):
         if output_dir is None:
             self.output_dir = Path("/var/www/sites")
         else:
@@ -20,16 +68,67 @@ class NextJSSSGGenerator:
         self.data_dir = self.nextjs_dir / "data"
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Every build runs in its own workspace so several can run at once
+        self.workspaces_dir = Path(os.getenv(
+            "NEXTJS_WORKSPACES_DIR", Path(tempfile.gettempdir()) / "nextjs-ssg-workspaces"
+        ))
+        self.build_cache_dir = self.workspaces_dir / "_build-cache"
+        self.build_concurrency = int(os.getenv(
+            "NEXTJS_BUILD_CONCURRENCY", max(1, (os.cpu_count() or 2) // 2)
+        ))
+        self._build_slots = threading.BoundedSemaphore(self.build_concurrency)
+        self._nextjs_build_lock = threading.Lock()
+        
+        # "build" runs `next build` per page; "worker" renders through a warm Node process
+        self.render_mode = render_mode or os.getenv("NEXTJS_RENDER_MODE", RENDER_MODE_BUILD)
+        self.render_timeout = float(os.getenv("RENDER_WORKER_TIMEOUT", "10"))
+        self._render_worker: Optional[NodeRenderWorker] = None
+        self._render_worker_lock = threading.Lock()
+        self._page_shell = None
+        self._preview_shell = None
+        
+        # Content-addressed cache of rendered HTML
+        self.render_cache = RenderCache(Path(cache_dir) if cache_dir else self.output_dir / ".render-cache")
+        self._fingerprint = None
+        
+        # Build assets are published once and symlinked into every page
+        self.asset_store = AssetStore(self.output_dir / "_assets")
+        self._project_store = None
+        self._gc_lock = threading.Lock()
+        self._gc_running = False
+        self._last_gc = time.monotonic()
+        
+        # Per-subdomain page index and sitemap.xml, updated incrementally
+        self.site_index = SiteIndex(self.output_dir)
+        
+        # Optional minification of deployed HTML (MINIFY_HTML); keeps React's hydration markers
+        self.minifier = HtmlMinifier()
+        
+        # Editor previews kept in memory (per-page LRU checked against the content key)
+        self.preview_cache = PreviewCache()
     
     def _ensure_nextjs_built(self):
-        """Ensure the Next.js system is built"""
-        dist_dir = self.nextjs_dir / "dist"
-        if not dist_dir.exists() or not self._verify_build():
-            logger.info("Building Next.js SSG system...")
-            subprocess.run(["npm", "run", "build"], cwd=self.nextjs_dir, check=True)
-            
-            if not self._verify_build():
-                raise RuntimeError("Next.js build verification failed after build")
+        """Ensure the Next.js system is built.
+        
+        The build runs in the shared nextjs_dir, so it is serialized across
+        threads and across processes (API and deploy workers).
+        """
+        if self._verify_build():
+            return
+        with self._nextjs_build_lock, open(self.nextjs_dir / ".build.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Someone else may have built it while we waited
+                if self._verify_build():
+                    return
+                logger.info("Building Next.js SSG system...")
+                subprocess.run(["npm", "run", "build"], cwd=self.nextjs_dir, check=True)
+                
+                if not self._verify_build():
+                    raise RuntimeError("Next.js build verification failed after build")
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
     
     def _verify_build(self):
         """Verify that the Next.js build completed successfully"""
@@ -65,69 +164,451 @@ class NextJSSSGGenerator:
             "components": components_data
         }
     
-    def _generate_with_nextjs(self, page_data: Dict[str, Any]) -> str:
-        """Use Next.js to generate the static page"""
-        self._ensure_nextjs_built()
+    @contextmanager
+    def _build_workspace(self):
+        """Reserve a build slot and yield a private copy of the Next.js project"""
+        with self._build_slots:
+            workspace = self._create_workspace()
+            try:
+                yield workspace
+            finally:
+                shutil.rmtree(workspace, ignore_errors=True)
+    
+    def _create_workspace(self) -> Path:
+        """Create a workspace with its own data/ and dist/ directories"""
+        self.workspaces_dir.mkdir(parents=True, exist_ok=True)
+        workspace = Path(tempfile.mkdtemp(prefix="job-", dir=self.workspaces_dir))
+        
+        for name in WORKSPACE_ENTRIES:
+            source = self.nextjs_dir / name
+            if source.is_dir():
+                shutil.copytree(source, workspace / name)
+            elif source.exists():
+                shutil.copy2(source, workspace / name)
+        
+        # shared/ is a symlink in the project; copy its sources, not its dependencies
+        shared_dir = self.nextjs_dir / "shared"
+        if shared_dir.exists():
+            shutil.copytree(shared_dir, workspace / "shared", ignore=shutil.ignore_patterns("node_modules"))
         
-        # Write page data to JSON file
-        data_file = self.data_dir / "page.json"
-        with open(data_file, 'w', encoding='utf-8') as f:
-            json.dump(page_data, f, indent=2)
+        node_modules = self.nextjs_dir / "node_modules"
+        if node_modules.exists():
+            (workspace / "node_modules").symlink_to(node_modules, target_is_directory=True)
         
-        # Build the page with Next.js
+        (workspace / "data").mkdir()
+        
+        # Seed the webpack cache from the last successful build. Promoted generations
+        # are never modified, so the copy needs no lock
+        generations = self._build_cache_generations()
+        if generations:
+            try:
+                shutil.copytree(generations[-1], workspace / "dist" / "cache")
+            except OSError as e:
+                # Pruned while copying (a very slow copy): build with a cold cache
+                logger.warning(f"Could not seed the webpack cache from {generations[-1].name}: {e}")
+                shutil.rmtree(workspace / "dist" / "cache", ignore_errors=True)
+        
+        return workspace
+    
+    def _build_cache_generations(self) -> List[Path]:
+        """Promoted webpack caches, oldest first (their names start with the promotion time)"""
         try:
-            result = subprocess.run(
-                ["npm", "run", "build"],
-                cwd=self.nextjs_dir,
-                capture_output=True,
-                text=True,
-                check=True
+            return sorted(
+                path for path in self.build_cache_dir.iterdir()
+                if _BUILD_CACHE_GENERATION_RE.match(path.name)
             )
-            logger.info(f"Next.js build completed successfully")
+        except OSError:
+            return []
+    
+    def _run_build(self, workspace: Path) -> Optional[Path]:
+        """Run `next build` inside a workspace and publish what it produced.
+        
+        Returns the asset store entry holding the build's _next/ files.
+        """
+        subprocess.run(
+            ["npm", "run", "build"],
+            cwd=workspace,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        store_dir = self._publish_build_assets(workspace)
+        self._promote_build_cache(workspace)
+        return store_dir
+    
+    def _publish_build_assets(self, workspace: Path) -> Optional[Path]:
+        """Publish the workspace's own _next/ to the asset store.
+        
+        Every build has a unique build id, so its HTML only works with its own
+        _next/ files: each build gets its entry, and entries no page links to
+        any more are collected in the background.
+        """
+        source_root = workspace / "dist" / "_next"
+        if not source_root.exists():
+            return None
+        store_dir = self.asset_store.publish(source_root)
+        self._schedule_asset_gc()
+        return store_dir
+    
+    def _schedule_asset_gc(self):
+        """Collect unreferenced store entries in a background thread, at most once per ASSET_GC_INTERVAL"""
+        if ASSET_GC_INTERVAL <= 0:
+            return
+        with self._gc_lock:
+            if self._gc_running or time.monotonic() - self._last_gc < ASSET_GC_INTERVAL:
+                return
+            self._gc_running = True
+        threading.Thread(target=self._collect_assets, daemon=True).start()
+    
+    def _collect_assets(self):
+        try:
+            self.asset_store.collect_garbage(self.output_dir)
+        except OSError as e:
+            logger.warning(f"Asset garbage collection failed: {e}")
+        finally:
+            with self._gc_lock:
+                self._gc_running = False
+                self._last_gc = time.monotonic()
+    
+    def _project_assets(self) -> Optional[Path]:
+        """Store entry of the project's own build (the worker's page shell).
+        
+        Published once per build instead of hashing dist/_next on every deploy.
+        """
+        assets_dir = self.nextjs_dir / "dist" / "_next"
+        if not assets_dir.exists():
+            return None
+        try:
+            build_mtime = (self.nextjs_dir / "dist" / "index.html").stat().st_mtime_ns
+        except OSError:
+            build_mtime = None
+        if (self._project_store is None or self._project_store[0] != build_mtime
+                or self.asset_store.entry(self._project_store[1].name) is None):
+            self._project_store = (build_mtime, self.asset_store.publish(assets_dir))
+        return self._project_store[1]
+    
+    def _promote_build_cache(self, workspace: Path):
+        """Make the workspace's webpack cache the seed for the next builds.
+        
+        It becomes a new generation instead of replacing the current one, so
+        builds still copying an older generation keep reading a whole tree.
+        """
+        cache = workspace / "dist" / "cache"
+        if not cache.exists():
+            return
+        
+        self.build_cache_dir.mkdir(parents=True, exist_ok=True)
+        os.rename(cache, self.build_cache_dir / f"{time.time_ns():020d}-{workspace.name}")
+        self._prune_build_cache()
+    
+    def _prune_build_cache(self):
+        """Delete generations superseded more than BUILD_CACHE_KEEP_SECONDS ago"""
+        generations = self._build_cache_generations()
+        now = time.time_ns()
+        for generation, successor in zip(generations, generations[1:]):
+            superseded_at = int(successor.name.split("-", 1)[0])
+            if now - superseded_at < BUILD_CACHE_KEEP_SECONDS * 1e9:
+                break
+            # Renamed first (hidden names are not generations), so no build starts copying it
+            doomed = generation.with_name(f".{generation.name}.old")
+            try:
+                os.rename(generation, doomed)
+            except OSError:
+                continue
+            shutil.rmtree(doomed, ignore_errors=True)
+    
+    def _export_page(self, page_data: Dict[str, Any]) -> Tuple[str, Optional[Path]]:
+        """Export a page with `next build`, returning (html, asset store entry)"""
+        self._ensure_nextjs_built()
+        
+        with self._build_workspace() as workspace:
+            # Write page data to JSON file
+            data_file = workspace / "data" / "page.json"
+            with open(data_file, 'w', encoding='utf-8') as f:
+                json.dump(page_data, f, indent=2)
             
-            # Read the generated HTML
-            html_file = self.nextjs_dir / "dist" / "index.html"
-            with open(html_file, 'r', encoding='utf-8') as f:
-                return f.read()
+            # Build the page with Next.js
+            try:
+                store_dir = self._run_build(workspace)
+                logger.info(f"Next.js build completed successfully")
                 
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Next.js build failed: {e.stderr}")
-            raise RuntimeError(f"Next.js build failed: {e.stderr}")
+                # Read the generated HTML
+                html_file = workspace / "dist" / "index.html"
+                with open(html_file, 'r', encoding='utf-8') as f:
+                    return f.read(), store_dir
+                    
+            except subprocess.CalledProcessError as e:
+                logger.error(f"Next.js build failed: {e.stderr}")
+                raise RuntimeError(f"Next.js build failed: {e.stderr}")
+    
+    def _generate_with_nextjs(self, page_data: Dict[str, Any]) -> str:
+        """Use Next.js to generate the static page"""
+        html, _ = self._export_page(page_data)
+        return html
+    
+    def _get_render_worker(self) -> NodeRenderWorker:
+        """Return the render worker, creating it on first use"""
+        # Renders concurrentes (threadpool de la API) no deben arrancar dos procesos Node
+        with self._render_worker_lock:
+            if self._render_worker is None:
+                self._render_worker = NodeRenderWorker(
+                    command=["node", "--preserve-symlinks", "--import", "tsx", "worker/render-worker.tsx"],
+                    cwd=self.nextjs_dir,
+                    render_timeout=self.render_timeout,
+                    env={"TSX_TSCONFIG_PATH": "worker/tsconfig.json"},
+                )
+                atexit.register(self._render_worker.stop)
+            return self._render_worker
+    
+    def render_worker_health(self) -> Dict[str, Any]:
+        """Report the state of the render worker"""
+        worker = self._render_worker
+        return {
+            "mode": self.render_mode,
+            "running": worker.is_running if worker else False,
+            "healthy": worker.health_check() if worker else False,
+            "restarts": worker.restarts if worker else 0,
+        }
+    
+    def _load_page_shell(self) -> Tuple[str, str]:
+        """Split the built index.html into the markup around <main>.
+        
+        Scripts are dropped: the exported RSC payload belongs to the page that
+        was built, and hydrating it would replace the worker's markup.
+        """
+        html_file = self.nextjs_dir / "dist" / "index.html"
+        mtime = html_file.stat().st_mtime
+        if self._page_shell is None or self._page_shell[0] != mtime:
+            html = _SCRIPT_TAG_RE.sub("", html_file.read_text(encoding="utf-8"))
+            match = _MAIN_TAG_RE.search(html)
+            if not match:
+                raise RuntimeError(f"No <main> element found in {html_file}")
+            self._page_shell = (mtime, html[:match.start()], html[match.end():])
+        return self._page_shell[1], self._page_shell[2]
+    
+    def _load_preview_shell(self) -> Tuple[str, str]:
+        """The page shell with its /_next/ stylesheets and fonts inlined.
+        
+        Previews are served by the builder API, not from a deployed page
+        directory, so nothing under /_next/ resolves there.
+        """
+        head, tail = self._load_page_shell()
+        mtime = self._page_shell[0]
+        if self._preview_shell is None or self._preview_shell[0] != mtime:
+            self._preview_shell = (mtime, self._inline_next_assets(head), self._inline_next_assets(tail))
+        return self._preview_shell[1], self._preview_shell[2]
+    
+    def _inline_next_assets(self, html: str) -> str:
+        """Replace /_next/ stylesheet links with <style> blocks and drop the other /_next/ links"""
+        dist_dir = self.nextjs_dir / "dist"
+        
+        def data_uri(match: re.Match) -> str:
+            path = dist_dir / match.group(2).lstrip("/")
+            try:
+                data = path.read_bytes()
+            except OSError:
+                return match.group(0)
+            mime = ASSET_MIME_TYPES.get(path.suffix) or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            return f"url(data:{mime};base64,{base64.b64encode(data).decode('ascii')})"
+        
+        def inline(match: re.Match) -> str:
+            if not _STYLESHEET_REL_RE.search(match.group(0)):
+                return ""
+            try:
+                css = (dist_dir / match.group(1).lstrip("/")).read_text(encoding="utf-8")
+            except OSError:
+                logger.warning(f"Preview stylesheet {match.group(1)} not found in {dist_dir}")
+                return ""
+            return f"<style>{_CSS_NEXT_URL_RE.sub(data_uri, css)}</style>"
+        
+        return _NEXT_LINK_RE.sub(inline, html)
+    
+    def _generate_with_worker(self, page_data: Dict[str, Any], inline_assets: bool = False) -> str:
+        """Render the page through the warm Node worker.
+        
+        With inline_assets the shell's /_next/ CSS and fonts are embedded, so
+        the HTML does not depend on a deployed _next/ directory.
+        """
+        # The build still provides the CSS and fonts referenced by the shell
+        self._ensure_nextjs_built()
+        
+        try:
+            body = self._get_render_worker().render(page_data)
+        except RuntimeError as e:
+            logger.error(f"Render worker failed: {e}")
+            raise RuntimeError(f"Render worker failed: {e}")
+        
+        head, tail = self._load_preview_shell() if inline_assets else self._load_page_shell()
+        return head + body + tail
+    
+    def _build_stamp(self) -> Optional[float]:
+        """mtime of the shared build's index.html, None before the first build"""
+        try:
+            return (self.nextjs_dir / "dist" / "index.html").stat().st_mtime
+        except OSError:
+            return None
+    
+    def _toolchain_fingerprint(self) -> str:
+        """Fingerprint of the renderer sources and dependencies used in cache keys.
+        
+        Recomputed whenever the shared build is refreshed, like the page shell.
+        """
+        stamp = self._build_stamp()
+        if self._fingerprint is None or self._fingerprint[0] != stamp:
+            self._fingerprint = (stamp, "-".join([
+                "nextjs",
+                self.render_mode,
+                hash_tree(self.nextjs_dir / "src"),
+                hash_tree(self.nextjs_dir / "shared", suffixes=(".ts", ".tsx", ".css")),
+                # The worker renders the pages in worker mode
+                hash_tree(self.nextjs_dir / "worker"),
+                hash_files([
+                    self.nextjs_dir / "package-lock.json",
+                    self.nextjs_dir / "next.config.js",
+                ]),
+            ]))
+        return self._fingerprint[1]
+    
+    def _cache_key(self, page_data: Dict[str, Any]) -> str:
+        return self.render_cache.make_key(page_data, self._toolchain_fingerprint())
+    
+    def _cached_render(self, cache_key: str) -> Optional[Tuple[str, Path]]:
+        """Cached (html, asset store entry) of a render, if both are still available"""
+        html = self.render_cache.get(cache_key)
+        if html is None:
+            return None
+        name = self.render_cache.assets(cache_key)
+        store_dir = self.asset_store.entry(name) if name else None
+        if store_dir is None:
+            # The build's assets were collected (or the entry predates them): render again
+            return None
+        return html, store_dir
+    
+    def _render(self, page_data: Dict[str, Any], cache_key: str) -> Tuple[str, Optional[Path]]:
+        """Render a page with the configured mode and store it in the cache"""
+        if self.render_mode == RENDER_MODE_WORKER:
+            html, store_dir = self._generate_with_worker(page_data), self._project_assets()
+        else:
+            html, store_dir = self._export_page(page_data)
+        self.render_cache.put(cache_key, html)
+        if store_dir is not None:
+            self.render_cache.record_assets(cache_key, store_dir.name)
+        return html, store_dir
+    
+    def _render_page(self, page: Page, db: Session) -> Tuple[str, str, bool, Optional[Path]]:
+        """Render a page through the cache.
+        
+        Returns (html, cache key, cache hit, asset store entry of its build).
+        """
+        page_data = self._prepare_page_data(page, db)
+        cache_key = self._cache_key(page_data)
+        cached = self._cached_render(cache_key)
+        if cached is not None:
+            return cached[0], cache_key, True, cached[1]
+        
+        html, store_dir = self._render(page_data, cache_key)
+        return html, cache_key, False, store_dir
     
     def generate_page(self, page: Page, db: Session) -> str:
         """Generate a complete page using Next.js SSG"""
+        html, _, _, _ = self._render_page(page, db)
+        return html
+    
+    def preview_page(self, page: Page, db: Session) -> Tuple[str, str]:
+        """Render a page for the editor preview, returning (content key, html).
+        
+        Skips the on-disk render cache and writes nothing under output_dir.
+        Previews always go through the render worker, even in build mode: a
+        `next build` per edit is far too slow for the editor. The shell's
+        /_next/ assets are inlined since the API does not serve them.
+        """
         page_data = self._prepare_page_data(page, db)
-        return self._generate_with_nextjs(page_data)
+        key = self._cache_key(page_data)
+        html = self.preview_cache.get(page.id, key)
+        if html is None:
+            html = self._generate_with_worker(page_data, inline_assets=True)
+            self.preview_cache.put(page.id, key, html)
+        return key, html
+    
+    def _generate_batch_with_nextjs(
+        self, pages_data: List[Dict[str, Any]]
+    ) -> Tuple[Dict[int, str], Optional[Path]]:
+        """Render several pages with a single Next.js build.
+        
+        Every page is written to data/pages/<id>.json and emitted by the
+        sites/[pageId] route through generateStaticParams. Returns the HTML
+        by page id and the asset store entry of the build.
+        """
+        with self._build_workspace() as workspace:
+            batch_data_dir = workspace / "data" / "pages"
+            batch_data_dir.mkdir(parents=True)
+            for page_data in pages_data:
+                with open(batch_data_dir / f"{page_data['id']}.json", 'w', encoding='utf-8') as f:
+                    json.dump(page_data, f)
+            
+            try:
+                store_dir = self._run_build(workspace)
+                logger.info(f"Next.js batch build completed for {len(pages_data)} pages")
+            except subprocess.CalledProcessError as e:
+                logger.error(f"Next.js batch build failed: {e.stderr}")
+                raise RuntimeError(f"Next.js batch build failed: {e.stderr}")
+            
+            results = {}
+            for page_data in pages_data:
+                html_file = workspace / "dist" / "sites" / str(page_data["id"]) / "index.html"
+                with open(html_file, 'r', encoding='utf-8') as f:
+                    results[page_data["id"]] = f.read()
+            return results, store_dir
+    
+    def _write_page(self, page: Page, html_content: str, cache_key: str, store_dir: Optional[Path],
+                    cached: bool = False) -> Path:
+        """Write the page HTML and link the Next.js assets of its build.
+        
+        Cached renders whose output is what the directory's manifest says is
+        deployed are left untouched.
+        """
+        # Create directory for the subdomain if not exists
+        subdomain_dir = self.output_dir / page.subdomain
+        subdomain_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Create directory for the page within the subdomain directory
+        if page.slug and page.slug != "root":
+            page_dir = subdomain_dir / page.slug
+            page_dir.mkdir(parents=True, exist_ok=True)
+        else:
+            page_dir = subdomain_dir
+        
+        if cached and self.render_cache.is_deployed(cache_key, page_dir):
+            logger.info(f"Page {page.slug} unchanged, skipping write")
+            self.site_index.record_deploy(page)
+            return page_dir
+        
+        html_content = self.minifier.minify(html_content, f"{page.subdomain}/{page.slug}")
+        
+        # Only rewrite index.html if it differs from the last deploy's manifest
+        sync_files(page_dir, {"index.html": html_content})
+        self.render_cache.record_deployed_digest(cache_key, load_manifest(page_dir).get("index.html"))
+        if PRECOMPRESS_ENABLED:
+            precompress_files([page_dir / "index.html"])
+        
+        # Copy Next.js assets
+        self._copy_nextjs_assets(page_dir, store_dir)
+        
+        if not self._verify_assets_copied(page_dir):
+            raise RuntimeError("Asset copy verification failed")
+        
+        self.site_index.record_deploy(page)
+        return page_dir
     
     def deploy_page(self, page: Page, db: Session) -> str:
         """Generate and deploy a page using Next.js SSG"""
         try:
             print(f"Deploying page {page.slug} to {self.output_dir}")
             # Generate HTML
-            html_content = self.generate_page(page, db)
+            html_content, cache_key, cached, store_dir = self._render_page(page, db)
             print(f"Generated HTML for page {page.slug}")
             
-            # Create directory for the subdomain if not exists
-            subdomain_dir = self.output_dir / page.subdomain
-            subdomain_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Create directory for the page within the subdomain directory
-            if page.slug and page.slug != "root":
-                page_dir = subdomain_dir / page.slug
-                page_dir.mkdir(parents=True, exist_ok=True)
-            else:
-                page_dir = subdomain_dir
-            
-            # Write HTML file
-            html_file = page_dir / "index.html"
-            with open(html_file, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            
-            # Copy Next.js assets
-            self._copy_nextjs_assets(page_dir)
-            
-            if not self._verify_assets_copied(page_dir):
-                raise RuntimeError("Asset copy verification failed")
+            page_dir = self._write_page(page, html_content, cache_key, store_dir, cached)
                 
             logger.info(f"Successfully deployed page {page.slug} to {page_dir}")
             return str(page_dir)
@@ -136,27 +617,63 @@ class NextJSSSGGenerator:
             logger.error(f"Deployment failed for page {page.slug}: {e}")
             raise RuntimeError(f"Deployment failed: {e}")
     
-    def _copy_nextjs_assets(self, target_dir: Path):
-        """Copy assets from the Next.js build"""
-        nextjs_assets = self.nextjs_dir / "dist" / "_next"
-        if not nextjs_assets.exists():
-            raise FileNotFoundError(f"Next.js assets not found at {nextjs_assets}")
+    def deploy_pages(self, pages: List[Page], db: Session) -> Dict[int, str]:
+        """Generate and deploy several pages with a single Next.js export"""
+        if not pages:
+            return {}
+        
+        # Only pages missing from the render cache go through the build
+        cache_keys = {}
+        html_by_id = {}
+        stores = {}
+        pending = []
+        for page in pages:
+            page_data = self._prepare_page_data(page, db)
+            cache_keys[page.id] = self._cache_key(page_data)
+            cached = self._cached_render(cache_keys[page.id])
+            if cached is not None:
+                html_by_id[page.id], stores[page.id] = cached
+            else:
+                pending.append(page_data)
+        
+        if pending:
+            results, store_dir = self._generate_batch_with_nextjs(pending)
+            for page_id, html in results.items():
+                self.render_cache.put(cache_keys[page_id], html)
+                if store_dir is not None:
+                    self.render_cache.record_assets(cache_keys[page_id], store_dir.name)
+                html_by_id[page_id] = html
+                stores[page_id] = store_dir
+        
+        rendered_ids = {page_data["id"] for page_data in pending}
+        deployed = {}
+        for page in pages:
+            try:
+                cached = page.id not in rendered_ids
+                page_dir = self._write_page(page, html_by_id[page.id], cache_keys[page.id], stores[page.id], cached)
+                deployed[page.id] = str(page_dir)
+            except Exception as e:
+                logger.error(f"Deployment failed for page {page.slug}: {e}")
+        
+        logger.info(f"Batch deployed {len(deployed)}/{len(pages)} pages")
+        return deployed
+    
+    def _copy_nextjs_assets(self, target_dir: Path, store_dir: Optional[Path]):
+        """Link the page's _next/ to its build's entry in the shared asset store"""
+        if store_dir is None:
+            raise FileNotFoundError("Next.js assets not found for the page's build")
         
-        import shutil
         target_assets = target_dir / "_next"
         try:
-            if target_assets.exists():
-                shutil.rmtree(target_assets)
-            shutil.copytree(nextjs_assets, target_assets)
-            logger.info(f"Next.js assets copied from {nextjs_assets} to {target_assets}")
+            self.asset_store.link(store_dir, target_assets)
+            logger.info(f"Next.js assets linked from {store_dir} to {target_assets}")
             
         except Exception as e:
             raise RuntimeError(f"Failed to copy Next.js assets: {e}")
     
     def _verify_assets_copied(self, target_dir: Path):
-        """Verify Next.js assets were copied correctly"""
-        target_assets = target_dir / "_next"
-        return target_assets.exists() and any(target_assets.iterdir())
+        """Verify the page's _next/ points at a published asset manifest"""
+        return self.asset_store.verify(target_dir / "_next")
     
     def delete_page(self, slug: str, subdomain: str = None):
         """Delete a deployed page"""
@@ -168,6 +685,8 @@ class NextJSSSGGenerator:
                 index_file = page_dir / "index.html"
                 if index_file.exists():
                     index_file.unlink()
+                    remove_precompressed(index_file)
+                    self.site_index.record_undeploy(subdomain, slug)
                     return True
                 return False
         else:
@@ -184,10 +703,13 @@ class NextJSSSGGenerator:
                         index_file = subdomain_dir / "index.html"
                         if index_file.exists():
                             index_file.unlink()
+                            remove_precompressed(index_file)
+                            self.site_index.record_undeploy(subdomain_dir.name, slug)
                             return True
-            
-            if page_dir and page_dir.exists():
-                import shutil
-                shutil.rmtree(page_dir)
-                return True
-            return False
\ No newline at end of file
+        
+        if page_dir and page_dir.exists():
+            import shutil
+            shutil.rmtree(page_dir)
+            self.site_index.record_undeploy(page_dir.parent.name, slug)
+            return True
+        return False
\ No newline at end of file
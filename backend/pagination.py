@@ -0,0 +1,53 @@
+"""Opaque cursors for keyset pagination.
+
+A cursor encodes the sort key of the last row of a page, so the next page is
+fetched with ``WHERE (key) > (cursor)`` on an index instead of ``OFFSET``,
+which keeps every page constant-time no matter how deep the client goes.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode a sort key as a URL-safe opaque token."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> Tuple[Any, ...]:
+    """Decode a cursor produced by ``encode_cursor``.
+
+    ``types`` gives the expected type of each key column. Raises ValueError
+    for anything that was not produced by ``encode_cursor`` with those types.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("malformed cursor") from exc
+    if not isinstance(payload, list) or len(payload) != len(types):
+        raise ValueError("malformed cursor")
+
+    values = []
+    for value, expected in zip(payload, types):
+        if expected is datetime and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        elif type(value) is not expected:
+            raise ValueError("malformed cursor")
+        values.append(value)
+    return tuple(values)
+
+
+def next_page_headers(url: Any, next_cursor: Optional[str]) -> dict:
+    """Response headers pointing at the next page (none on the last page)."""
+    if next_cursor is None:
+        return {}
+    next_url = url.include_query_params(cursor=next_cursor)
+    return {NEXT_CURSOR_HEADER: next_cursor, "Link": f'<{next_url}>; rel="next"'}
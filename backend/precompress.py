@@ -0,0 +1,118 @@
+import logging
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Tuple
+
+from deploy_manifest import AtomicStreamWriter, remove_precompressed
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only .gz variants are written
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+PRECOMPRESS_ENABLED = os.getenv("PRECOMPRESS_ASSETS", "true").lower() == "true"
+PRECOMPRESS_WORKERS = int(os.getenv("PRECOMPRESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Text files worth serving compressed
+TEXT_SUFFIXES = (".html", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".map", ".webmanifest")
+# Below this size compression does not pay off (like nginx's gzip_min_length)
+MIN_SIZE = 256
+
+
+# Files are compressed in blocks of this size, so memory does not grow with the file
+BLOCK_SIZE = 64 * 1024
+
+Compressor = Tuple[Callable[[bytes], bytes], Callable[[], bytes]]
+
+
+def _gzip_compressor() -> Compressor:
+    # wbits=31 writes a gzip container (with mtime 0, so output is reproducible)
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def _brotli_compressor() -> Compressor:
+    compressor = brotli.Compressor(quality=11)
+    return compressor.process, compressor.finish
+
+
+def _compressors() -> Dict[str, Callable[[], Compressor]]:
+    """Factories of streaming (compress, flush) pairs by sibling suffix"""
+    compressors = {".gz": _gzip_compressor}
+    if brotli is not None:
+        compressors[".br"] = _brotli_compressor
+    return compressors
+
+
+def is_compressible(path: Path) -> bool:
+    return path.name.endswith(TEXT_SUFFIXES)
+
+
+def precompress_file(path: Path) -> int:
+    """Write .gz/.br siblings of a file whose content changed.
+
+    Siblings carry the source's mtime, so a sibling with the same mtime is
+    up to date and is left alone. Returns the number of variants written.
+    """
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return 0
+    if stat.st_size < MIN_SIZE:
+        remove_precompressed(path)
+        return 0
+
+    pending = {}
+    for suffix, factory in _compressors().items():
+        sibling = path.with_name(path.name + suffix)
+        try:
+            if sibling.stat().st_mtime_ns == stat.st_mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        pending[sibling] = factory()
+    if not pending:
+        return 0
+
+    # One pass over the source feeds every stale variant
+    with ExitStack() as stack:
+        writers = {sibling: stack.enter_context(AtomicStreamWriter(sibling)) for sibling in pending}
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+                for sibling, (compress, _) in pending.items():
+                    writers[sibling].write_bytes(compress(block))
+        for sibling, (_, flush) in pending.items():
+            writers[sibling].write_bytes(flush())
+            writers[sibling].commit()
+            os.utime(sibling, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return len(pending)
+
+
+def precompress_files(paths: Iterable[Path], workers: int = None) -> Dict[str, int]:
+    """Precompress the text files among paths in parallel"""
+    paths = [Path(path) for path in paths if is_compressible(Path(path))]
+    workers = workers or PRECOMPRESS_WORKERS
+    if len(paths) > 1 and workers > 1:
+        # zlib and brotli release the GIL while compressing
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(precompress_file, paths))
+    else:
+        results = [precompress_file(path) for path in paths]
+
+    stats = {"compressed": sum(1 for written in results if written), "unchanged": results.count(0)}
+    logger.debug(f"Precompressed {stats}")
+    return stats
+
+
+def precompress_tree(root: Path, workers: int = None) -> Dict[str, int]:
+    """Precompress every text file under root"""
+    return precompress_files(
+        (path for path in Path(root).rglob("*") if path.is_file() and not path.is_symlink()),
+        workers
+    )
@@ -0,0 +1,407 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, Iterator, Optional, TextIO
+
+from deploy_manifest import AtomicStreamWriter, load_manifest
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of pages whose preview HTML is kept in memory
+PREVIEW_CACHE_SIZE = int(os.getenv("PREVIEW_CACHE_SIZE", "128"))
+
+# On-disk render cache limits enforced by RenderCache.prune (0 disables a limit)
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+RENDER_CACHE_MAX_AGE = float(os.getenv("RENDER_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+
+# Temporary files younger than this may belong to a write in progress
+TMP_MIN_AGE = 3600
+
+ENTRY_SUFFIXES = (".html", ".deployed", ".assets")
+
+
+def hash_payload(payload: Any) -> str:
+    """Stable SHA-256 of a JSON serializable payload"""
+    serialized = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def hash_payload_stream(payload: Any) -> str:
+    """Same digest as ``hash_payload``, hashing the JSON in pieces.
+
+    Slower on small payloads, but never holds the whole serialization in
+    memory, which matters for page payloads of arbitrary size.
+    """
+    encoder = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256()
+    pieces, size = [], 0
+    for piece in encoder.iterencode(payload):
+        pieces.append(piece)
+        size += len(piece)
+        if size >= 64 * 1024:
+            digest.update("".join(pieces).encode("utf-8"))
+            pieces, size = [], 0
+    digest.update("".join(pieces).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def hash_files(paths: Iterable[Path]) -> str:
+    """SHA-256 over the relative names and contents of a set of files"""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(str(path).encode("utf-8"))
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def hash_tree(root: Path, suffixes: Iterable[str] = None) -> str:
+    """SHA-256 of every file under root (following symlinks), optionally filtered by suffix"""
+    suffixes = tuple(suffixes) if suffixes else None
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root, followlinks=True):
+        dirnames[:] = [d for d in dirnames if d not in ("node_modules", "dist", ".next")]
+        for filename in filenames:
+            if suffixes is None or filename.endswith(suffixes):
+                files.append(Path(dirpath) / filename)
+    return hash_files(files)
+
+
+class RenderCache:
+    """Content-addressed cache of rendered HTML.
+
+    Keys combine the hash of the page payload with a fingerprint of the
+    generator and its toolchain, so a change to either produces a miss.
+    Entries are stored as ``<cache_dir>/<key[:2]>/<key>.html``, next to
+    their ``.deployed`` and ``.assets`` sidecars; ``prune`` keeps the
+    directory bounded.
+    """
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, page_data: Dict[str, Any], fingerprint: str) -> str:
+        return hash_payload_stream({"page": page_data, "fingerprint": fingerprint})
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.html"
+
+    def _touch(self, key: str):
+        """Mark an entry as recently used, so prune evicts it last"""
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached HTML for a key, counting the hit or miss"""
+        try:
+            html = self._path(key).read_text(encoding="utf-8")
+        except (FileNotFoundError, OSError):
+            html = None
+        else:
+            self._touch(key)
+
+        with self._lock:
+            if html is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return html
+
+    def contains(self, key: str) -> bool:
+        """Like ``get`` without reading the entry"""
+        found = self._path(key).is_file()
+        if found:
+            self._touch(key)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found
+
+    def iter_chunks(self, key: str, chunk_size: int = 64 * 1024) -> Optional[Iterator[str]]:
+        """Stream a cached entry in chunks (without counting a hit); None if it is missing"""
+        try:
+            f = open(self._path(key), encoding="utf-8")
+        except OSError:
+            return None
+        return _read_chunks(f, chunk_size)
+
+    def writer(self, key: str, markers: Iterable[str] = ()) -> "CacheEntryWriter":
+        """Streaming writer for an entry, committed by the caller"""
+        return CacheEntryWriter(self._path(key), markers)
+
+    def put(self, key: str, html: str):
+        """Store rendered HTML; write errors are logged, never raised"""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(html, encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write render cache entry {key}: {e}")
+
+    def _read_sidecar(self, key: str, suffix: str) -> Optional[str]:
+        try:
+            return self._path(key).with_suffix(suffix).read_text(encoding="utf-8").strip() or None
+        except OSError:
+            return None
+
+    def _write_sidecar(self, key: str, suffix: str, value: str):
+        path = self._path(key).with_suffix(suffix)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp_path.write_text(value, encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write {suffix} sidecar for render cache entry {key}: {e}")
+
+    def deployed_digest(self, key: str) -> Optional[str]:
+        """SHA-256 of the file last deployed from an entry (minified, as it is on disk).
+
+        A cache hit alone does not mean a page directory holds that content
+        (e.g. after deploying v2 and reverting to v1): deployers compare this
+        digest with the directory's manifest before skipping a write.
+        """
+        return self._read_sidecar(key, ".deployed")
+
+    def record_deployed_digest(self, key: str, digest: Optional[str]):
+        """Remember the digest deployed from an entry; write errors are logged, never raised"""
+        if digest and self.deployed_digest(key) != digest:
+            self._write_sidecar(key, ".deployed", digest)
+
+    def assets(self, key: str) -> Optional[str]:
+        """Name of the asset store entry an entry's HTML was built against"""
+        return self._read_sidecar(key, ".assets")
+
+    def record_assets(self, key: str, name: str):
+        """Remember the asset store entry of an entry; write errors are logged, never raised"""
+        if self.assets(key) != name:
+            self._write_sidecar(key, ".assets", name)
+
+    def is_deployed(self, key: str, target_dir: Path, relative_path: str = "index.html") -> bool:
+        """Whether target_dir already serves the content deployed from an entry"""
+        digest = load_manifest(Path(target_dir)).get(relative_path)
+        return (
+            digest is not None
+            and digest == self.deployed_digest(key)
+            and (Path(target_dir) / relative_path).is_file()
+        )
+
+    def prune(self, max_bytes: int = RENDER_CACHE_MAX_BYTES, max_age: float = RENDER_CACHE_MAX_AGE) -> int:
+        """Delete entries unused for max_age seconds, then the least recently used
+        ones until the cache fits in max_bytes; returns how many were removed.
+
+        An entry goes together with its sidecars. Sidecars left without their
+        entry and temporary files of crashed writers are removed too.
+        """
+        now = time.time()
+        entries: Dict[str, Dict[str, Any]] = {}
+        for path in self.cache_dir.glob("*/*"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            name = path.name
+            if name.startswith(".") or not name.endswith(ENTRY_SUFFIXES):
+                if name.endswith(".tmp") and now - stat.st_mtime > TMP_MIN_AGE:
+                    _unlink(path)
+                continue
+            entry = entries.setdefault(name.split(".", 1)[0], {"paths": [], "size": 0, "used": None, "mtime": 0})
+            entry["paths"].append(path)
+            entry["size"] += stat.st_size
+            entry["mtime"] = max(entry["mtime"], stat.st_mtime)
+            if name.endswith(".html"):
+                entry["used"] = stat.st_mtime
+
+        doomed = []
+        kept = []
+        for entry in entries.values():
+            if entry["used"] is None:
+                # Sidecars whose entry is gone (a sidecar is written right after its entry)
+                if now - entry["mtime"] > TMP_MIN_AGE:
+                    doomed.append(entry)
+            elif max_age > 0 and now - entry["used"] > max_age:
+                doomed.append(entry)
+            else:
+                kept.append(entry)
+
+        if max_bytes > 0:
+            total = sum(entry["size"] for entry in kept)
+            for entry in sorted(kept, key=lambda entry: entry["used"]):
+                if total <= max_bytes:
+                    break
+                doomed.append(entry)
+                total -= entry["size"]
+
+        for entry in doomed:
+            # The entry itself first: a reader never sees sidecars it could act on without it
+            for path in sorted(entry["paths"], key=lambda path: path.suffix != ".html"):
+                _unlink(path)
+        removed = sum(1 for entry in doomed if entry["used"] is not None)
+        if removed:
+            logger.info(f"Pruned {removed} render cache entries from {self.cache_dir}")
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+def _unlink(path: Path):
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def _read_chunks(f: TextIO, chunk_size: int) -> Iterator[str]:
+    with f:
+        for chunk in iter(lambda: f.read(chunk_size), ""):
+            yield chunk
+
+
+class CacheEntryWriter:
+    """AtomicStreamWriter for a render cache entry whose write errors are logged, never raised.
+
+    After an error the entry is dropped and further calls are no-ops.
+    """
+
+    def __init__(self, path: Path, markers: Iterable[str] = ()):
+        self.path = path
+        try:
+            self._writer = AtomicStreamWriter(path, markers)
+        except OSError as e:
+            self._failed(e)
+
+    def _failed(self, error: OSError):
+        logger.warning(f"Could not write render cache entry {self.path.stem}: {error}")
+        writer, self._writer = getattr(self, "_writer", None), None
+        if writer is not None:
+            writer.discard()
+
+    def _call(self, method: str, *args):
+        if self._writer is None:
+            return
+        try:
+            getattr(self._writer, method)(*args)
+        except OSError as e:
+            self._failed(e)
+
+    def write(self, text: str):
+        self._call("write", text)
+
+    def patch(self, marker: str, value: str):
+        self._call("patch", marker, value)
+
+    def commit(self):
+        self._call("commit")
+
+    def __enter__(self) -> "CacheEntryWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._writer is not None:
+            self._writer.__exit__(exc_type, exc, tb)
+
+
+class FragmentCache:
+    """Bounded in-memory LRU cache of rendered HTML fragments.
+
+    Used for per-component HTML, which repeats across the pages of a
+    tenant (headers, footers). The least recently used entry is evicted
+    once ``max_entries`` is reached.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            html = self._entries.get(key)
+            if html is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return html
+
+    def put(self, key: Hashable, html: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class PreviewCache:
+    """Bounded in-memory LRU cache of editor previews, one entry per page.
+
+    Each entry remembers the content key it was rendered from, so a lookup
+    with a different key (the page or its components changed) is a miss and
+    drops the stale HTML. ``invalidate`` frees an entry as soon as an edit is
+    known, without waiting for the next lookup.
+    """
+
+    def __init__(self, max_entries: int = PREVIEW_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, page_id: int, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(page_id)
+            if entry is None or entry[0] != key:
+                self._entries.pop(page_id, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(page_id)
+            return entry[1]
+
+    def put(self, page_id: int, key: str, html: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[page_id] = (key, html)
+            self._entries.move_to_end(page_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, page_id: int):
+        with self._lock:
+            self._entries.pop(page_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+import queue
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RenderWorkerError(RuntimeError):
+    """Error raised when the render worker cannot produce a page"""
+
+
+class PageRenderError(RenderWorkerError):
+    """Error reported by a healthy worker while rendering a page"""
+
+
+class NodeRenderWorker:
+    """Supervises a long-lived Node process that renders pages to HTML.
+
+    The worker speaks a line-delimited JSON protocol over stdin/stdout:
+    every request is ``{"id": n, "type": "render" | "ping", ...}`` and every
+    response echoes the ``id`` together with ``ok`` and either ``html`` or
+    ``error``. The process is started lazily, restarted when it crashes and
+    killed when a render exceeds ``render_timeout`` seconds. It gives up after
+    ``max_restarts`` restarts within ``restart_window`` seconds; ``restarts``
+    counts every restart for health reporting.
+    """
+
+    def __init__(
+        self,
+        command: List[str],
+        cwd: Optional[Path] = None,
+        render_timeout: float = 10.0,
+        startup_timeout: float = 30.0,
+        max_restarts: int = 5,
+        restart_window: float = 300.0,
+        env: Optional[Dict[str, str]] = None,
+    ):
+        self.command = command
+        self.cwd = cwd
+        self.render_timeout = render_timeout
+        self.startup_timeout = startup_timeout
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.env = env
+
+        self.restarts = 0
+        self._recent_restarts: Deque[float] = deque()
+        self._started = False
+        self._process: Optional[subprocess.Popen] = None
+        self._responses: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        """Start the Node process and wait until it answers a ping"""
+        with self._lock:
+            self._start()
+
+    def stop(self):
+        """Stop the Node process if it is running"""
+        with self._lock:
+            self._stop()
+
+    def health_check(self) -> bool:
+        """Return True if the worker answers a ping within the render timeout"""
+        if not self.is_running:
+            return False
+        try:
+            with self._lock:
+                self._request({"type": "ping"}, self.render_timeout)
+            return True
+        except RenderWorkerError:
+            return False
+
+    def render(self, page_data: Dict[str, Any]) -> str:
+        """Render a page payload to HTML, restarting the worker if needed"""
+        with self._lock:
+            if not self.is_running:
+                if self._started:
+                    logger.warning("Render worker is not running, restarting")
+                    self._restart()
+                else:
+                    self._start()
+
+            try:
+                response = self._request({"type": "render", "page": page_data}, self.render_timeout)
+            except PageRenderError:
+                raise
+            except RenderWorkerError:
+                # Timeout o crash: el proceso queda en un estado desconocido
+                self._restart(allow_failure=True)
+                raise
+
+        return response["html"]
+
+    def _start(self):
+        logger.info(f"Starting render worker: {' '.join(self.command)}")
+        env = dict(os.environ, **self.env) if self.env else None
+        self._responses = queue.Queue()
+        self._process = subprocess.Popen(
+            self.command,
+            cwd=self.cwd,
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        threading.Thread(
+            target=self._read_stdout, args=(self._process, self._responses), daemon=True
+        ).start()
+        threading.Thread(target=self._read_stderr, args=(self._process,), daemon=True).start()
+
+        try:
+            self._request({"type": "ping"}, self.startup_timeout)
+        except RenderWorkerError as e:
+            self._stop()
+            raise RenderWorkerError(f"Render worker failed to start: {e}")
+        self._started = True
+
+    def _stop(self):
+        process = self._process
+        if process is None:
+            return
+        self._process = None
+        if process.poll() is None:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+    def _restart(self, allow_failure: bool = False):
+        self._stop()
+        # Solo cuentan los reinicios recientes: crashes aislados a lo largo de
+        # días no deben dejar al worker sin reinicios
+        now = time.monotonic()
+        while self._recent_restarts and now - self._recent_restarts[0] > self.restart_window:
+            self._recent_restarts.popleft()
+        if len(self._recent_restarts) >= self.max_restarts:
+            message = (
+                f"Render worker restarted {len(self._recent_restarts)} times "
+                f"in {self.restart_window:g}s, giving up"
+            )
+            if allow_failure:
+                logger.error(message)
+                return
+            raise RenderWorkerError(message)
+        self._recent_restarts.append(now)
+        self.restarts += 1
+        try:
+            self._start()
+        except RenderWorkerError:
+            if not allow_failure:
+                raise
+            logger.exception("Render worker restart failed")
+
+    def _request(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        if self._process is None:
+            raise RenderWorkerError("Render worker is not running")
+
+        self._next_id += 1
+        request_id = self._next_id
+        try:
+            self._process.stdin.write(json.dumps({"id": request_id, **payload}) + "\n")
+            self._process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise RenderWorkerError(f"Render worker pipe closed: {e}")
+
+        while True:
+            try:
+                response = self._responses.get(timeout=timeout)
+            except queue.Empty:
+                raise RenderWorkerError(f"Render worker timed out after {timeout}s")
+            if response is None:
+                raise RenderWorkerError("Render worker exited unexpectedly")
+            if response.get("id") != request_id:
+                # Respuesta tardía de una petición que ya expiró
+                continue
+            if not response.get("ok"):
+                raise PageRenderError(response.get("error", "Unknown render error"))
+            return response
+
+    @staticmethod
+    def _read_stdout(process: subprocess.Popen, responses: queue.Queue):
+        for line in process.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                responses.put(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Render worker emitted non-JSON output: {line[:200]}")
+        responses.put(None)
+
+    @staticmethod
+    def _read_stderr(process: subprocess.Popen):
+        for line in process.stderr:
+            logger.warning(f"[render-worker] {line.rstrip()}")
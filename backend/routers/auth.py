@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from typing import Optional
 
-from database import get_db
+from database import get_async_db
 from models import User
 from schemas import UserCreate, User as UserSchema
 from auth import auth_manager, get_current_user, get_current_active_user
@@ -39,11 +40,11 @@ class UserProfile(BaseModel):
         from_attributes = True
 
 @router.post("/register", response_model=UserProfile)
-def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register_user(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """Registrar un nuevo usuario"""
     
     # Verificar que el email no exista
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = (await db.execute(select(User).where(User.email == user_data.email))).scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -51,7 +52,7 @@ def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Verificar que el username no exista
-    existing_username = db.query(User).filter(User.username == user_data.username).first()
+    existing_username = (await db.execute(select(User).where(User.username == user_data.username))).scalars().first()
     if existing_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -59,7 +60,7 @@ def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Crear nuevo usuario
-    hashed_password = auth_manager.get_password_hash(user_data.password)
+    hashed_password = await auth_manager.get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -68,8 +69,8 @@ def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return UserProfile(
         id=db_user.id,
@@ -80,10 +81,10 @@ def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=Token)
-def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Iniciar sesión de usuario"""
     
-    user = auth_manager.authenticate_user(db, user_credentials.email, user_credentials.password)
+    user = await auth_manager.authenticate_user_async(db, user_credentials.email, user_credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -111,7 +112,7 @@ def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
     )
 
 @router.get("/me", response_model=UserProfile)
-def get_current_user_profile(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_profile(current_user: User = Depends(get_current_active_user)):
     """Obtener perfil del usuario actual"""
     return UserProfile(
         id=current_user.id,
@@ -122,19 +123,19 @@ def get_current_user_profile(current_user: User = Depends(get_current_active_use
     )
 
 @router.put("/me", response_model=UserProfile)
-def update_user_profile(
+async def update_user_profile(
     username: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Actualizar perfil del usuario actual"""
     
     if username:
         # Verificar que el username no esté tomado por otro usuario
-        existing_user = db.query(User).filter(
+        existing_user = (await db.execute(select(User).where(
             User.username == username,
             User.id != current_user.id
-        ).first()
+        ))).scalars().first()
         
         if existing_user:
             raise HTTPException(
@@ -144,8 +145,8 @@ def update_user_profile(
         
         current_user.username = username
     
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
     
     return UserProfile(
         id=current_user.id,
@@ -156,29 +157,29 @@ def update_user_profile(
     )
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     current_password: str,
     new_password: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cambiar contraseña del usuario"""
     
     # Verificar contraseña actual
-    if not auth_manager.verify_password(current_password, current_user.hashed_password):
+    if not await auth_manager.verify_password_async(current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
         )
     
     # Actualizar contraseña
-    current_user.hashed_password = auth_manager.get_password_hash(new_password)
-    db.commit()
+    current_user.hashed_password = await auth_manager.get_password_hash_async(new_password)
+    await db.commit()
     
     return {"message": "Password updated successfully"}
 
 @router.post("/refresh-token", response_model=Token)
-def refresh_access_token(current_user: User = Depends(get_current_user)):
+async def refresh_access_token(current_user: User = Depends(get_current_user)):
     """Renovar token de acceso"""
     
     if not current_user.is_active:
@@ -201,15 +202,15 @@ def refresh_access_token(current_user: User = Depends(get_current_user)):
     )
 
 @router.delete("/me")
-def delete_user_account(
+async def delete_user_account(
     password: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Eliminar cuenta del usuario (requiere confirmación de contraseña)"""
     
     # Verificar contraseña
-    if not auth_manager.verify_password(password, current_user.hashed_password):
+    if not await auth_manager.verify_password_async(password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect password"
@@ -217,6 +218,6 @@ def delete_user_account(
     
     # Marcar como inactivo en lugar de eliminar (soft delete)
     current_user.is_active = False
-    db.commit()
+    await db.commit()
     
     return {"message": "Account deactivated successfully"}
\ No newline at end of file
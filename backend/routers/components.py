@@ -1,58 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, case, delete, func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
 
-from database import get_db
+from database import SessionLocal, get_async_db
 from models import Component, Page, User
-from schemas import Component as ComponentSchema, ComponentCreate, ComponentUpdate, ComponentReorder
+from schemas import Component as ComponentSchema, ComponentCreate, ComponentUpdate, ComponentReorder, ComponentBatch
 from auth import get_current_active_user
+from pagination import decode_cursor, encode_cursor, next_page_headers
+from routers.deployment import invalidate_preview
 
 router = APIRouter(prefix="/api/components", tags=["components"])
 
-def verify_page_ownership(page_id: int, current_user: User, db: Session):
+MAX_COMPONENT_LIMIT = 1000
+# Hueco mínimo entre posiciones vecinas antes de renumerar la página
+REBALANCE_GAP = 1e-6
+
+async def verify_page_ownership(page_id: int, current_user: User, db: AsyncSession):
     """Verifica que el usuario sea propietario de la página"""
-    page = db.query(Page).filter(Page.id == page_id).first()
+    page = (await db.execute(select(Page).where(Page.id == page_id))).scalars().first()
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     if page.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to access this page")
     return page
 
+async def get_owned_component(component_id: int, current_user: User, db: AsyncSession) -> Component:
+    """Obtiene un componente y su página en una sola consulta, verificando que el usuario sea propietario"""
+    component = (await db.execute(
+        select(Component).options(joinedload(Component.page)).where(Component.id == component_id)
+    )).scalars().first()
+    if not component:
+        raise HTTPException(status_code=404, detail="Component not found")
+    if component.page is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+    if component.page.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this page")
+    return component
+
 @router.get("/page/{page_id}", response_model=List[ComponentSchema])
-def get_page_components(
+async def get_page_components(
     page_id: int, 
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(200, ge=1, le=MAX_COMPONENT_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Obtener componentes de una página (solo el propietario)"""
-    verify_page_ownership(page_id, current_user, db)
-    components = db.query(Component).filter(Component.page_id == page_id).order_by(Component.position).all()
+    """Obtener componentes de una página (solo el propietario).
+    
+    Paginados por cursor sobre (position, id): si hay más resultados la
+    respuesta trae X-Next-Cursor y un Link rel="next".
+    """
+    join_on = Component.page_id == Page.id
+    if cursor:
+        try:
+            position, component_id = decode_cursor(cursor, (float, int))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        join_on = and_(join_on, tuple_(Component.position, Component.id) > (position, component_id))
+    
+    # Propietario y componentes en una sola consulta: una página sin componentes
+    # (o sin más componentes tras el cursor) devuelve una fila con componente None
+    rows = (await db.execute(
+        select(Page.owner_id, Component).outerjoin(Component, join_on).where(
+            Page.id == page_id
+        ).order_by(Component.position, Component.id).limit(limit + 1)
+    )).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Page not found")
+    if rows[0][0] != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this page")
+    
+    components = [component for _, component in rows if component is not None]
+    if len(components) > limit:
+        components = components[:limit]
+        next_cursor = encode_cursor((float(components[-1].position), components[-1].id))
+        response.headers.update(next_page_headers(request.url, next_cursor))
     return components
 
 @router.get("/{component_id}", response_model=ComponentSchema)
-def get_component(
+async def get_component(
     component_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Obtener un componente específico (solo el propietario de la página)"""
-    component = db.query(Component).filter(Component.id == component_id).first()
-    if not component:
-        raise HTTPException(status_code=404, detail="Component not found")
-    
-    # Verificar que el usuario sea propietario de la página
-    verify_page_ownership(component.page_id, current_user, db)
+    # El componente y la verificación de propietario salen de una sola consulta
+    component = await get_owned_component(component_id, current_user, db)
     return component
 
 @router.post("/", response_model=ComponentSchema)
-def create_component(
+async def create_component(
     component: ComponentCreate, 
     page_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Crear un componente (solo el propietario de la página)"""
-    verify_page_ownership(page_id, current_user, db)
+    await verify_page_ownership(page_id, current_user, db)
     
     db_component = Component(
         type=component.type,
@@ -63,113 +111,219 @@ def create_component(
         page_id=page_id
     )
     db.add(db_component)
-    db.commit()
-    db.refresh(db_component)
+    await db.commit()
+    invalidate_preview(page_id)
     return db_component
 
+@router.post("/batch", response_model=List[ComponentSchema])
+async def batch_components(
+    batch: ComponentBatch,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Crear, actualizar y eliminar componentes de una página en una sola petición.
+    
+    La propiedad se verifica una vez y los cambios se aplican con sentencias
+    masivas (DELETE, UPDATE, INSERT, en ese orden) en una sola transacción: si
+    algo falla no se aplica nada. Devuelve los componentes resultantes en orden.
+    """
+    await verify_page_ownership(batch.page_id, current_user, db)
+    
+    update_ids = [item.id for item in batch.update]
+    if len(set(update_ids)) != len(update_ids) or len(set(batch.delete)) != len(batch.delete):
+        raise HTTPException(status_code=400, detail="Duplicate component ids in batch")
+    if set(update_ids) & set(batch.delete):
+        raise HTTPException(status_code=400, detail="A component cannot be updated and deleted in the same batch")
+    
+    # Verificar que todos los componentes pertenezcan a la página (una sola consulta)
+    target_ids = set(update_ids) | set(batch.delete)
+    if target_ids:
+        found = (await db.execute(select(Component.id).where(
+            Component.id.in_(target_ids),
+            Component.page_id == batch.page_id
+        ))).all()
+        if len(found) != len(target_ids):
+            raise HTTPException(status_code=400, detail="Some components not found or don't belong to this page")
+    
+    if batch.delete:
+        await db.execute(delete(Component).where(
+            Component.id.in_(batch.delete),
+            Component.page_id == batch.page_id
+        ).execution_options(synchronize_session=False))
+    
+    # Solo los campos enviados; SQLAlchemy agrupa las filas con las mismas columnas
+    # (UPDATE masivo por clave primaria, executemany)
+    updates = [item.dict(exclude_unset=True) for item in batch.update]
+    updates = [values for values in updates if len(values) > 1]
+    if updates:
+        await db.execute(update(Component), updates)
+    
+    if batch.create:
+        await db.execute(insert(Component), [
+            {**item.dict(), "page_id": batch.page_id} for item in batch.create
+        ])
+    
+    await db.commit()
+    invalidate_preview(batch.page_id)
+    return (await db.execute(select(Component).where(
+        Component.page_id == batch.page_id
+    ).order_by(Component.position, Component.id))).scalars().all()
+
 @router.put("/{component_id}", response_model=ComponentSchema)
-def update_component(
+async def update_component(
     component_id: int, 
     component_update: ComponentUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Actualizar un componente (solo el propietario de la página)"""
-    component = db.query(Component).filter(Component.id == component_id).first()
-    if not component:
-        raise HTTPException(status_code=404, detail="Component not found")
-    
-    # Verificar que el usuario sea propietario de la página
-    verify_page_ownership(component.page_id, current_user, db)
+    # El componente y la verificación de propietario salen de una sola consulta
+    component = await get_owned_component(component_id, current_user, db)
     
     # Solo actualizar campos que no sean None
     update_data = component_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(component, field, value)
     
-    db.commit()
-    db.refresh(component)
+    await db.commit()
+    invalidate_preview(component.page_id)
     return component
 
 @router.delete("/{component_id}")
-def delete_component(
+async def delete_component(
     component_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Eliminar un componente (solo el propietario de la página)"""
-    component = db.query(Component).filter(Component.id == component_id).first()
-    if not component:
-        raise HTTPException(status_code=404, detail="Component not found")
-    
-    # Verificar que el usuario sea propietario de la página
-    verify_page_ownership(component.page_id, current_user, db)
+    # El componente y la verificación de propietario salen de una sola consulta
+    component = await get_owned_component(component_id, current_user, db)
     
-    db.delete(component)
-    db.commit()
+    page_id = component.page_id
+    await db.delete(component)
+    await db.commit()
+    invalidate_preview(page_id)
     return {"message": "Component deleted successfully"}
 
 @router.post("/reorder")
-def reorder_components(
+async def reorder_components(
     reorder_data: ComponentReorder,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Reordenar componentes de una página (solo el propietario)"""
-    verify_page_ownership(reorder_data.page_id, current_user, db)
+    await verify_page_ownership(reorder_data.page_id, current_user, db)
     
     # Verificar que todos los componentes pertenezcan a la página
-    components = db.query(Component).filter(
+    found = (await db.execute(select(Component.id).where(
         Component.id.in_(reorder_data.component_ids),
         Component.page_id == reorder_data.page_id
-    ).all()
+    ))).all()
     
-    if len(components) != len(reorder_data.component_ids):
+    if len(found) != len(reorder_data.component_ids):
         raise HTTPException(status_code=400, detail="Some components not found or don't belong to this page")
     
-    # Actualizar posiciones
-    for i, component_id in enumerate(reorder_data.component_ids):
-        component = next(c for c in components if c.id == component_id)
-        component.position = i
-    
-    db.commit()
-    return components
+    # Todas las posiciones en un solo UPDATE ... CASE
+    await db.run_sync(_set_positions, reorder_data.page_id, reorder_data.component_ids)
+    await db.commit()
+    invalidate_preview(reorder_data.page_id)
+    return (await db.execute(select(Component).where(
+        Component.id.in_(reorder_data.component_ids)
+    ).order_by(Component.position, Component.id).execution_options(populate_existing=True))).scalars().all()
 
 @router.post("/{component_id}/reorder")
-def reorder_component(
+async def reorder_component(
     component_id: int, 
     new_position: int, 
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Reordenar un componente específico (solo el propietario de la página)"""
-    component = db.query(Component).filter(Component.id == component_id).first()
-    if not component:
-        raise HTTPException(status_code=404, detail="Component not found")
-    
-    # Verificar que el usuario sea propietario de la página
-    verify_page_ownership(component.page_id, current_user, db)
+    """Mover un componente al índice new_position de su página (solo el propietario).
     
-    old_position = component.position
+    Las posiciones son fraccionarias: el componente toma un valor entre sus
+    nuevos vecinos y es la única fila que se escribe. Cuando el hueco entre
+    vecinos se achica demasiado la página se renumera en segundo plano.
+    """
+    # El componente y la verificación de propietario salen de una sola consulta
+    component = await get_owned_component(component_id, current_user, db)
     page_id = component.page_id
     
-    # Actualizar posiciones de otros componentes
-    if new_position > old_position:
-        # Mover hacia abajo
-        db.query(Component).filter(
-            Component.page_id == page_id,
-            Component.position > old_position,
-            Component.position <= new_position
-        ).update({Component.position: Component.position - 1})
+    position, gap = await _position_at(db, component, new_position)
+    if gap == 0:
+        # Posiciones repetidas (datos viejos): renumerar ahora y volver a calcular
+        await db.run_sync(rebalance_positions, page_id)
+        position, gap = await _position_at(db, component, new_position)
+    elif gap is not None and gap < REBALANCE_GAP:
+        background_tasks.add_task(rebalance_page, page_id)
+    
+    component.position = position
+    await db.commit()
+    invalidate_preview(page_id)
+    return component
+
+async def _position_at(db: AsyncSession, component: Component, index: int):
+    """Posición fraccionaria para dejar el componente en el índice dado.
+    
+    Lee solo los dos vecinos (consulta sobre el índice (page_id, position, id)).
+    Devuelve la posición y el hueco entre los vecinos (None si está en un extremo).
+    """
+    index = max(index, 0)
+    others = (
+        Component.page_id == component.page_id,
+        Component.id != component.id
+    )
+    neighbors = (await db.execute(select(Component.position).where(*others).order_by(
+        Component.position, Component.id
+    ).offset(max(index - 1, 0)).limit(2 if index else 1))).scalars().all()
+    
+    if index == 0:
+        before, after = None, neighbors[0] if neighbors else None
+    elif neighbors:
+        before = neighbors[0]
+        after = neighbors[1] if len(neighbors) > 1 else None
     else:
-        # Mover hacia arriba
-        db.query(Component).filter(
-            Component.page_id == page_id,
-            Component.position >= new_position,
-            Component.position < old_position
-        ).update({Component.position: Component.position + 1})
-    
-    component.position = new_position
-    db.commit()
-    db.refresh(component)
-    return component
\ No newline at end of file
+        # Índice más allá del final: va después del último
+        before, after = (await db.execute(select(func.max(Component.position)).where(*others))).scalar(), None
+    
+    if before is None and after is None:
+        return component.position, None
+    if before is None:
+        return after - 1, None
+    if after is None:
+        return before + 1, None
+    return (before + after) / 2, after - before
+
+def _set_positions(db: Session, page_id: int, component_ids: List[int]):
+    """Asigna posiciones 0..n-1 según el orden de component_ids con un solo UPDATE.
+    
+    Sync: desde los routers async se llama con AsyncSession.run_sync.
+    """
+    if not component_ids:
+        return
+    db.execute(
+        update(Component)
+        .where(Component.page_id == page_id, Component.id.in_(component_ids))
+        .values(position=case({component_id: float(i) for i, component_id in enumerate(component_ids)},
+                              value=Component.id))
+        .execution_options(synchronize_session=False)
+    )
+
+def rebalance_positions(db: Session, page_id: int):
+    """Renumera las posiciones de una página a enteros consecutivos, conservando el orden"""
+    ordered = db.query(Component.id).filter(
+        Component.page_id == page_id
+    ).order_by(Component.position, Component.id).with_for_update().all()
+    _set_positions(db, page_id, [component_id for (component_id,) in ordered])
+
+def rebalance_page(page_id: int):
+    """Tarea en segundo plano: renumera la página en su propia sesión"""
+    db = SessionLocal()
+    try:
+        rebalance_positions(db, page_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error renumerando componentes de la página {page_id}: {e}")
+    finally:
+        db.close()
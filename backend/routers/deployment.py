@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
-from typing import Dict
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
-from models import Page, User
+from database import get_async_db
+from models import DeployJob, Page, User
+from deploy_queue import (
+    ACTION_DEPLOY, SUCCEEDED,
+    enqueue_deploy, enqueue_undeploy, generator_stats, job_to_dict, latest_job, load_worker_stats,
+    merge_worker_stats, worker_stats_dir,
+)
 from generator import SiteGenerator
 from nextjs_ssg_generator import NextJSSSGGenerator
 from auth import get_current_active_user
@@ -18,15 +23,23 @@ if USE_REACT_SSG:
 else:
     generator = SiteGenerator()
 
+def invalidate_preview(page_id: int):
+    """Descarta el preview en memoria de una página al editarla o borrarla"""
+    preview_cache = getattr(generator, "preview_cache", None)
+    if preview_cache is not None:
+        preview_cache.invalidate(page_id)
+
+async def _get_page(db: AsyncSession, *criteria):
+    return (await db.execute(select(Page).where(*criteria))).scalars().first()
+
 @router.post("/{page_id}")
-def deploy_page(
+async def deploy_page(
     page_id: int, 
-    background_tasks: BackgroundTasks, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Deploya una página específica (solo el propietario)"""
-    page = db.query(Page).filter(Page.id == page_id).first()
+    page = await _get_page(db, Page.id == page_id)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     
@@ -38,12 +51,14 @@ def deploy_page(
         raise HTTPException(status_code=400, detail="Page must be published before deployment")
     
     try:
-        # Ejecutar deployment en background
-        background_tasks.add_task(deploy_page_task, page, db)
+        # Encolar el deployment; lo ejecuta deploy_worker.py
+        # (las funciones de la cola son sync y comparten la conexión con run_sync)
+        job = await db.run_sync(enqueue_deploy, page.id)
         
         return {
             "message": "Deployment started",
             "page_id": page_id,
+            "job_id": job.id,
             "slug": page.slug,
             "url": f"http://{page.subdomain}.localhost{('/' + page.slug) if page.slug and page.slug != 'root' else ''}"
         }
@@ -51,9 +66,9 @@ def deploy_page(
         raise HTTPException(status_code=500, detail=f"Deployment failed: {str(e)}")
 
 @router.post("/slug/{slug}")
-def deploy_page_by_slug(slug: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def deploy_page_by_slug(slug: str, db: AsyncSession = Depends(get_async_db)):
     """Deploya una página por slug"""
-    page = db.query(Page).filter(Page.slug == slug).first()
+    page = await _get_page(db, Page.slug == slug)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     
@@ -61,41 +76,40 @@ def deploy_page_by_slug(slug: str, background_tasks: BackgroundTasks, db: Sessio
         raise HTTPException(status_code=400, detail="Page must be published before deployment")
     
     try:
-        background_tasks.add_task(deploy_page_task, page, db)
+        job = await db.run_sync(enqueue_deploy, page.id)
         
         return {
             "message": "Deployment started",
             "slug": slug,
+            "job_id": job.id,
             "url": f"http://{page.subdomain}.localhost{('/' + slug) if slug and slug != 'root' else ''}"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Deployment failed: {str(e)}")
 
 @router.delete("/{page_id}")
-def undeploy_page(page_id: int, db: Session = Depends(get_db)):
+async def undeploy_page(page_id: int, db: AsyncSession = Depends(get_async_db)):
     """Elimina el deployment de una página"""
-    page = db.query(Page).filter(Page.id == page_id).first()
+    page = await _get_page(db, Page.id == page_id)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     
     try:
-        success = generator.delete_page(page.slug, page.subdomain)
-        if success:
-            return {"message": "Page undeployed successfully", "slug": page.slug}
-        else:
-            return {"message": "Page was not deployed", "slug": page.slug}
+        # Lo ejecuta deploy_worker.py, nunca a la vez que un deploy de la misma página
+        job = await db.run_sync(enqueue_undeploy, page.id)
+        return {"message": "Undeployment started", "slug": page.slug, "job_id": job.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Undeployment failed: {str(e)}")
 
 @router.delete("/slug/{slug}")
-def undeploy_page_by_slug(
+async def undeploy_page_by_slug(
     slug: str, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Elimina el deployment de una página por slug (solo el propietario)"""
     # Verificar que la página existe y pertenece al usuario
-    page = db.query(Page).filter(Page.slug == slug).first()
+    page = await _get_page(db, Page.slug == slug)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     
@@ -104,136 +118,116 @@ def undeploy_page_by_slug(
         raise HTTPException(status_code=403, detail="Not authorized to undeploy this page")
     
     try:
-        success = generator.delete_page(slug, page.subdomain)
-        if success:
-            return {"message": "Page undeployed successfully", "slug": slug}
-        else:
-            return {"message": "Page was not deployed", "slug": slug}
+        job = await db.run_sync(enqueue_undeploy, page.id)
+        return {"message": "Undeployment started", "slug": slug, "job_id": job.id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Undeployment failed: {str(e)}")
 
 @router.get("/status/{slug}")
-def deployment_status(slug: str, db: Session = Depends(get_db)):
-    """Verifica el estado del deployment de una página"""
-    import os
-    
-    # Buscar la página para obtener el subdominio
-    page = db.query(Page).filter(Page.slug == slug).first()
+async def deployment_status(slug: str, db: AsyncSession = Depends(get_async_db)):
+    """Estado del deployment de una página según su último job"""
+    page = await _get_page(db, Page.slug == slug)
     if not page:
         return {
             "deployed": False,
             "slug": slug
         }
     
-    # Para páginas root, verificar en el directorio del subdominio
-    if slug:
-        page_dir = f"/var/www/sites/{page.subdomain}/{slug}"
-        index_path = f"{page_dir}/index.html"
-    else:
-        page_dir = f"/var/www/sites/{page.subdomain}"
-        index_path = f"{page_dir}/index.html"
+    job = await db.run_sync(latest_job, page.id)
+    if job is None:
+        return {
+            "deployed": False,
+            "slug": slug
+        }
+    
+    # Mientras un deploy está pendiente o si falla, sigue publicado el último que terminó bien
+    finished = job
+    if job.status != SUCCEEDED:
+        finished = (await db.execute(select(DeployJob).where(
+            DeployJob.page_id == page.id,
+            DeployJob.status == SUCCEEDED,
+        ).order_by(DeployJob.id.desc()).limit(1))).scalars().first()
     
-    if os.path.exists(page_dir) and os.path.exists(index_path):
+    if finished is not None and finished.action == ACTION_DEPLOY and finished.status == SUCCEEDED:
         return {
             "deployed": True,
             "slug": slug,
-            "url": f"http://{page.subdomain}.localhost{('/' + slug) if slug else ''}",
-            "path": page_dir
-        }
-    else:
-        return {
-            "deployed": False,
-            "slug": slug
+            "url": f"http://{page.subdomain}.localhost{('/' + slug) if slug and slug != 'root' else ''}",
+            "path": finished.result_path,
+            "job": job_to_dict(job)
         }
+    return {
+        "deployed": False,
+        "slug": slug,
+        "job": job_to_dict(job)
+    }
+
+@router.get("/jobs/{job_id}")
+async def deployment_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Estado de un job de deployment"""
+    job = await db.get(DeployJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
 
 @router.post("/rebuild-all")
-def rebuild_all_sites(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def rebuild_all_sites(db: AsyncSession = Depends(get_async_db)):
     """Rebuilds todos los sitios publicados"""
-    published_pages = db.query(Page).filter(Page.is_published == True).all()
+    published_pages = (await db.execute(select(Page).where(Page.is_published == True))).scalars().all()
     
     if not published_pages:
         return {"message": "No published pages found"}
     
-    # Agregar tareas de rebuild para todas las páginas
-    for page in published_pages:
-        background_tasks.add_task(deploy_page_task, page, db)
+    # Un job por página; el worker despliega los jobs que reclama juntos en un solo build
+    jobs = await db.run_sync(lambda session: [enqueue_deploy(session, page.id) for page in published_pages])
     
     return {
         "message": f"Rebuild started for {len(published_pages)} pages",
-        "pages": [{"id": p.id, "slug": p.slug} for p in published_pages]
+        "pages": [{"id": p.id, "slug": p.slug, "job_id": job.id} for p, job in zip(published_pages, jobs)]
     }
 
 @router.get("/list")
-def list_deployed_sites(
-    db: Session = Depends(get_db),
+async def list_deployed_sites(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Lista solo los sitios deployados del usuario actual"""
-    import os
-    sites_dir = "/var/www/sites"
-    
-    if not os.path.exists(sites_dir):
-        return {"deployed_sites": []}
-    
     deployed_sites = []
     
     # Obtener todas las páginas del usuario
-    user_pages = db.query(Page).filter(Page.owner_id == current_user.id).all()
+    user_pages = (await db.execute(select(Page).where(Page.owner_id == current_user.id))).scalars().all()
     
+    # El índice de cada subdominio (mantenido en cada deploy/undeploy) evita recorrer /var/www/sites
     for page in user_pages:
-        # Buscar el directorio del subdominio
-        subdomain_dir = os.path.join(sites_dir, page.subdomain)
-        if os.path.exists(subdomain_dir):
-            if page.slug and page.slug != "root":
-                # Para páginas con slug, buscar en subdirectorio
-                site_path = os.path.join(subdomain_dir, page.slug)
-                if os.path.isdir(site_path) and os.path.exists(os.path.join(site_path, "index.html")):
-                    deployed_sites.append({
-                        "slug": page.slug,
-                        "url": f"http://{page.subdomain}.localhost/{page.slug}",
-                        "path": site_path,
-                        "is_owner": True,
-                        "page_id": page.id,
-                        "title": page.title
-                    })
-            else:
-                # Para páginas root, buscar index.html en el directorio del subdominio
-                index_path = os.path.join(subdomain_dir, "index.html")
-                if os.path.exists(index_path):
-                    deployed_sites.append({
-                        "slug": page.slug,
-                        "url": f"http://{page.subdomain}.localhost",
-                        "path": subdomain_dir,
-                        "is_owner": True,
-                        "page_id": page.id,
-                        "title": page.title
-                    })
+        if generator.site_index.get(page.subdomain, page.slug) is None:
+            continue
+        is_root = not page.slug or page.slug == "root"
+        deployed_sites.append({
+            "slug": page.slug,
+            "url": f"http://{page.subdomain}.localhost" + ("" if is_root else f"/{page.slug}"),
+            "path": str(generator.site_index.page_path(page.subdomain, page.slug)),
+            "is_owner": True,
+            "page_id": page.id,
+            "title": page.title
+        })
     
     return {"deployed_sites": deployed_sites}
 
 @router.get("/generator-info")
 def get_generator_info():
     """Obtiene información sobre el generador actual"""
-    return {
+    info = {
         "current_generator": "Next.js SSG" if USE_REACT_SSG else "Classic Jinja2",
         "use_react_ssg": USE_REACT_SSG,
         "generator_class": generator.__class__.__name__
     }
-
-def deploy_page_task(page: Page, db: Session):
-    """Tarea background para deployar una página"""
-    try:
-        # Crear una nueva sesión de DB para el background task
-        from database import SessionLocal
-        db_session = SessionLocal()
-        
-        # Re-fetch la página en la nueva sesión
-        page_fresh = db_session.query(Page).filter(Page.id == page.id).first()
-        if page_fresh:
-            result_path = generator.deploy_page(page_fresh, db_session)
-            print(f"Page deployed successfully started: {page_fresh.slug} -> {result_path}")
-        
-        db_session.close()
-    except Exception as e:
-        print(f"Error deploying page {page.slug}: {str(e)}")
-        raise
\ No newline at end of file
+    # Los deploys corren en deploy_worker.py: sus caches y el minificador publican
+    # contadores por worker, que aquí se suman a los de la API. El preview sí corre en la API.
+    workers = load_worker_stats(worker_stats_dir(generator))
+    info.update(merge_worker_stats({"api": generator_stats(generator), **workers}))
+    info["deploy_workers"] = sorted(workers)
+    if hasattr(generator, "preview_cache"):
+        info["preview_cache"] = generator.preview_cache.stats()
+    if hasattr(generator, "render_worker_health"):
+        info["render_worker"] = generator.render_worker_health()
+    return info
@@ -1,48 +1,136 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+from datetime import datetime
 
-from database import get_db
+from database import get_async_db, get_db
 from models import Page, Component, User
 from schemas import Page as PageSchema, PageCreate, PageUpdate, Component as ComponentSchema
 from auth import get_current_active_user, get_current_user_optional
+from pagination import decode_cursor, encode_cursor, next_page_headers
+from routers import deployment
 
 router = APIRouter(prefix="/api/pages", tags=["pages"])
 
+MAX_PAGE_LIMIT = 500
+
+async def _get_page_with_components(db: AsyncSession, *criteria) -> Optional[Page]:
+    """Página con sus componentes ya cargados (en async no hay lazy loading al serializar)"""
+    result = await db.execute(select(Page).options(selectinload(Page.components)).where(*criteria))
+    return result.scalars().first()
+
 @router.get("/", response_model=List[PageSchema])
-def get_pages(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db),
+async def get_pages(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_LIMIT),
+    skip: Optional[int] = Query(None, ge=0, deprecated=True, description="Obsoleto: usar cursor"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Obtener solo las páginas del usuario autenticado"""
-    pages = db.query(Page).filter(Page.owner_id == current_user.id).offset(skip).limit(limit).all()
+    """Obtener solo las páginas del usuario autenticado.
+    
+    Las más recientes primero, paginadas por cursor sobre (updated_at, id):
+    si hay más resultados la respuesta trae X-Next-Cursor y un Link rel="next".
+    `skip` (OFFSET) se mantiene para los clientes viejos y responde con Deprecation.
+    """
+    # Los componentes se cargan en una sola consulta para todas las páginas (no una por página)
+    query = select(Page).options(selectinload(Page.components)).where(Page.owner_id == current_user.id)
+    if skip is not None:
+        if cursor:
+            raise HTTPException(status_code=400, detail="Use either cursor or skip")
+        response.headers["Deprecation"] = "true"
+        query = query.offset(skip)
+    if cursor:
+        try:
+            updated_at, page_id = decode_cursor(cursor, (datetime, int))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(Page.updated_at, Page.id) < (updated_at, page_id))
+    
+    # Se pide una fila de más para saber si hay página siguiente sin contar
+    query = query.order_by(Page.updated_at.desc(), Page.id.desc()).limit(limit + 1)
+    pages = (await db.execute(query)).scalars().all()
+    if len(pages) > limit:
+        pages = pages[:limit]
+        next_cursor = encode_cursor((pages[-1].updated_at, pages[-1].id))
+        # El siguiente enlace ya es por cursor, aunque esta página se pidiera con skip
+        response.headers.update(next_page_headers(request.url.remove_query_params("skip"), next_cursor))
     return pages
 
 @router.get("/{page_id}", response_model=PageSchema)
-def get_page(page_id: int, db: Session = Depends(get_db)):
-    page = db.query(Page).filter(Page.id == page_id).first()
+async def get_page(page_id: int, db: AsyncSession = Depends(get_async_db)):
+    page = await _get_page_with_components(db, Page.id == page_id)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     return page
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara If-None-Match con el ETag (comparación débil, como indica el RFC 9110)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate in ("*", etag):
+            return True
+    return False
+
+# Sync a propósito: el render es CPU y corre en el threadpool, con la sesión sync del generador
+@router.get("/{page_id}/preview", response_class=HTMLResponse)
+def preview_page(
+    page_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Preview de la página renderizada en memoria (solo el propietario).
+    
+    No deploya ni escribe archivos. El ETag es el hash del contenido, así que
+    el editor puede revalidar con If-None-Match y recibir 304 si nada cambió.
+    """
+    page = db.query(Page).filter(Page.id == page_id).first()
+    if not page:
+        raise HTTPException(status_code=404, detail="Page not found")
+    
+    # Verificar que el usuario sea el propietario
+    if page.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to preview this page")
+    
+    try:
+        content_key, html = deployment.generator.preview_page(page, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Preview failed: {str(e)}")
+    
+    etag = f'"{content_key}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=html, headers=headers)
+
 @router.get("/slug/{slug}", response_model=PageSchema)
-def get_page_by_slug(slug: str, db: Session = Depends(get_db)):
-    page = db.query(Page).filter(Page.slug == slug).first()
+async def get_page_by_slug(slug: str, db: AsyncSession = Depends(get_async_db)):
+    page = await _get_page_with_components(db, Page.slug == slug)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     return page
 
 @router.post("/", response_model=PageSchema)
-def create_page(
+async def create_page(
     page: PageCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Crear una nueva página (requiere autenticación)"""
     # Verificar que la combinación subdomain+slug no exista
-    existing_page = db.query(Page).filter(Page.subdomain == page.subdomain, Page.slug == page.slug).first()
+    existing_page = (await db.execute(
+        select(Page.id).where(Page.subdomain == page.subdomain, Page.slug == page.slug)
+    )).first()
     if existing_page:
         raise HTTPException(status_code=400, detail="Ya existe una página con ese subdominio y slug")
     
@@ -53,22 +141,23 @@ def create_page(
         description=page.description,
         config=page.config,
         is_published=page.is_published,
-        owner_id=current_user.id
+        owner_id=current_user.id,
+        # Página nueva: sin componentes, así la respuesta no intenta cargarlos
+        components=[]
     )
     db.add(db_page)
-    db.commit()
-    db.refresh(db_page)
+    await db.commit()
     return db_page
 
 @router.put("/{page_id}", response_model=PageSchema)
-def update_page(
+async def update_page(
     page_id: int, 
     page_update: PageUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Actualizar página (solo el propietario)"""
-    page = db.query(Page).filter(Page.id == page_id).first()
+    page = await _get_page_with_components(db, Page.id == page_id)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     
@@ -80,25 +169,27 @@ def update_page(
     new_slug = page_update.slug if page_update.slug else page.slug
     new_subdomain = page_update.subdomain if page_update.subdomain else page.subdomain
     if (new_slug != page.slug or new_subdomain != page.subdomain):
-        existing_page = db.query(Page).filter(Page.subdomain == new_subdomain, Page.slug == new_slug).first()
+        existing_page = (await db.execute(
+            select(Page.id).where(Page.subdomain == new_subdomain, Page.slug == new_slug)
+        )).first()
         if existing_page and existing_page.id != page.id:
             raise HTTPException(status_code=400, detail="Ya existe una página con ese subdominio y slug")
     
     for field, value in page_update.dict(exclude_unset=True).items():
         setattr(page, field, value)
     
-    db.commit()
-    db.refresh(page)
+    await db.commit()
+    deployment.invalidate_preview(page.id)
     return page
 
 @router.delete("/{page_id}")
-def delete_page(
+async def delete_page(
     page_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Eliminar página (solo el propietario)"""
-    page = db.query(Page).filter(Page.id == page_id).first()
+    page = await _get_page_with_components(db, Page.id == page_id)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     
@@ -106,18 +197,19 @@ def delete_page(
     if page.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this page")
     
-    db.delete(page)
-    db.commit()
+    await db.delete(page)
+    await db.commit()
+    deployment.invalidate_preview(page_id)
     return {"message": "Page deleted successfully"}
 
 @router.post("/{page_id}/publish", response_model=PageSchema)
-def publish_page(
+async def publish_page(
     page_id: int, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Publicar página (solo el propietario)"""
-    page = db.query(Page).filter(Page.id == page_id).first()
+    page = await _get_page_with_components(db, Page.id == page_id)
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
     
@@ -126,6 +218,5 @@ def publish_page(
         raise HTTPException(status_code=403, detail="Not authorized to publish this page")
     
     page.is_published = True
-    db.commit()
-    db.refresh(page)
-    return page
\ No newline at end of file
+    await db.commit()
+    return page
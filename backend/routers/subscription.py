@@ -190,9 +190,11 @@ async def verify_payment(
         logger.info(f"Estado de la sesión: payment_status={session.payment_status}, status={session.status}")
         
         if session.payment_status == 'paid' and session.status == 'complete':
-            # Actualizar usuario
-            current_user.subscription_active = True
-            current_user.stripe_customer_id = session.customer
+            # Actualizar usuario (current_user viene de la sesión async de auth;
+            # se modifica la fila desde esta sesión)
+            user = db.query(User).filter(User.id == current_user.id).first()
+            user.subscription_active = True
+            user.stripe_customer_id = session.customer
             db.commit()
             
             logger.info(f"Usuario {current_user.email} suscripción activada exitosamente")
@@ -21,7 +21,7 @@ class ComponentBase(BaseModel):
     type: str
     content: Dict[str, Any]
     styles: Optional[Dict[str, Any]] = {}
-    position: int
+    position: float
     is_visible: bool = True
 
 class ComponentCreate(ComponentBase):
@@ -31,7 +31,7 @@ class ComponentUpdate(BaseModel):
     type: Optional[str] = None
     content: Optional[Dict[str, Any]] = None
     styles: Optional[Dict[str, Any]] = None
-    position: Optional[int] = None
+    position: Optional[float] = None
     is_visible: Optional[bool] = None
 
 class Component(ComponentBase):
@@ -102,4 +102,14 @@ class Asset(AssetBase):
 
 class ComponentReorder(BaseModel):
     page_id: int
-    component_ids: List[int]
\ No newline at end of file
+    component_ids: List[int]
+
+class ComponentBatchUpdate(ComponentUpdate):
+    id: int
+
+class ComponentBatch(BaseModel):
+    """Cambios de componentes de una página aplicados en una sola transacción"""
+    page_id: int
+    create: List[ComponentCreate] = []
+    update: List[ComponentBatchUpdate] = []
+    delete: List[int] = []
\ No newline at end of file
@@ -0,0 +1,171 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from xml.sax.saxutils import escape
+
+from deploy_manifest import atomic_write_bytes
+from precompress import PRECOMPRESS_ENABLED, precompress_files
+
+logger = logging.getLogger(__name__)
+
+# Public URL of a subdomain, used for sitemap <loc> entries
+SITE_URL_TEMPLATE = os.getenv("SITE_URL_TEMPLATE", "http://{subdomain}.localhost")
+
+INDEX_NAME = ".pages.json"
+LOCK_NAME = ".pages.lock"
+SITEMAP_NAME = "sitemap.xml"
+
+
+def page_key(slug: Optional[str]) -> str:
+    """Index key of a page: root pages (empty slug or "root") live at the subdomain root"""
+    return "" if not slug or slug == "root" else slug
+
+
+class SiteIndex:
+    """Per-subdomain index of deployed pages and the sitemap.xml built from it.
+
+    Every subdomain directory holds a compact ``.pages.json`` (hidden from
+    nginx) mapping page keys to their metadata. Deploys and undeploys update
+    a single entry under a file lock, so concurrent deploy workers never lose
+    updates, and lookups never walk the sites tree.
+    """
+
+    def __init__(self, output_dir: Path, url_template: str = SITE_URL_TEMPLATE):
+        self.output_dir = Path(output_dir)
+        self.url_template = url_template
+        self._lock = threading.Lock()
+        # subdomain -> (index mtime, pages), refreshed when the file changes
+        self._cache: Dict[str, tuple] = {}
+
+    def _index_path(self, subdomain: str) -> Path:
+        return self.output_dir / subdomain / INDEX_NAME
+
+    @contextmanager
+    def _locked(self, subdomain: str) -> Iterator[Dict[str, Any]]:
+        """Load a subdomain's pages under an exclusive lock and save them on exit"""
+        subdomain_dir = self.output_dir / subdomain
+        subdomain_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(subdomain_dir / LOCK_NAME, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                pages = self._read(subdomain)
+                original = None
+                if pages is None:
+                    pages = self._scan(subdomain)
+                else:
+                    original = json.dumps(pages, sort_keys=True)
+                yield pages
+                if json.dumps(pages, sort_keys=True) != original:
+                    self._write(subdomain, pages)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self, subdomain: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._index_path(subdomain), encoding="utf-8") as f:
+                return json.load(f)["pages"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _scan(self, subdomain: str) -> Dict[str, Any]:
+        """Build the index of a subdomain deployed before indexes existed (once)"""
+        subdomain_dir = self.output_dir / subdomain
+        pages = {}
+        index_files = {"": subdomain_dir / "index.html"}
+        for page_dir in subdomain_dir.iterdir():
+            if page_dir.is_dir() and not page_dir.name.startswith(("_", ".")):
+                index_files[page_dir.name] = page_dir / "index.html"
+        for key, index_file in index_files.items():
+            if index_file.exists():
+                lastmod = datetime.utcfromtimestamp(index_file.stat().st_mtime)
+                pages[key] = _entry(None, None, lastmod)
+        return pages
+
+    def _write(self, subdomain: str, pages: Dict[str, Any]):
+        payload = json.dumps({"pages": pages}, sort_keys=True, separators=(",", ":"))
+        atomic_write_bytes(self._index_path(subdomain), payload.encode("utf-8"))
+
+        sitemap_path = self.output_dir / subdomain / SITEMAP_NAME
+        if pages:
+            atomic_write_bytes(sitemap_path, self._sitemap(subdomain, pages).encode("utf-8"))
+            if PRECOMPRESS_ENABLED:
+                precompress_files([sitemap_path])
+        else:
+            sitemap_path.unlink(missing_ok=True)
+
+    def _sitemap(self, subdomain: str, pages: Dict[str, Any]) -> str:
+        base_url = self.url_template.format(subdomain=subdomain).rstrip("/")
+        urls = []
+        for key in sorted(pages):
+            loc = f"{base_url}/{key}" if key else f"{base_url}/"
+            urls.append(
+                f"<url><loc>{escape(loc)}</loc><lastmod>{pages[key]['lastmod']}</lastmod></url>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+            + "\n".join(urls)
+            + "\n</urlset>\n"
+        )
+
+    def record_deploy(self, page, lastmod: datetime = None):
+        """Add or refresh the entry of a deployed page"""
+        key = page_key(page.slug)
+        if lastmod is None:
+            updated_at = getattr(page, "updated_at", None)
+            lastmod = updated_at if isinstance(updated_at, datetime) else datetime.utcnow()
+        # The index is derived data: failing to update it must not fail the deploy
+        try:
+            entry = _entry(page.id, page.title, lastmod)
+            with self._locked(page.subdomain) as pages:
+                pages[key] = entry
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not index page {page.subdomain}/{key}: {e}")
+
+    def record_undeploy(self, subdomain: str, slug: Optional[str]):
+        """Drop the entry of an undeployed page"""
+        if not (self.output_dir / subdomain).is_dir():
+            return
+        try:
+            with self._locked(subdomain) as pages:
+                pages.pop(page_key(slug), None)
+        except OSError as e:
+            logger.warning(f"Could not unindex page {subdomain}/{page_key(slug)}: {e}")
+
+    def pages(self, subdomain: str) -> Dict[str, Any]:
+        """Deployed pages of a subdomain by key, read from the index"""
+        path = self._index_path(subdomain)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            if not (self.output_dir / subdomain).is_dir():
+                return {}
+            # Subdomain deployed before the index existed: build it once
+            with self._locked(subdomain) as pages:
+                pass
+            mtime = path.stat().st_mtime_ns
+
+        cached = self._cache.get(subdomain)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        pages = self._read(subdomain) or {}
+        self._cache[subdomain] = (mtime, pages)
+        return pages
+
+    def get(self, subdomain: str, slug: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Index entry of a page, or None if it is not deployed"""
+        return self.pages(subdomain).get(page_key(slug))
+
+    def page_path(self, subdomain: str, slug: Optional[str]) -> Path:
+        key = page_key(slug)
+        return self.output_dir / subdomain / key if key else self.output_dir / subdomain
+
+
+def _entry(page_id: Optional[int], title: Optional[str], lastmod: datetime) -> Dict[str, Any]:
+    return {"page_id": page_id, "title": title, "lastmod": lastmod.strftime("%Y-%m-%dT%H:%M:%SZ")}
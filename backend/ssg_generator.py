@@ -3,14 +3,21 @@ import subprocess
 import tempfile
 import logging
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from models import Page, Component
 from sqlalchemy.orm import Session
+from render_cache import PreviewCache, RenderCache, hash_files
+from asset_store import AssetStore
+from asset_fingerprint import rewrite_asset_urls
+from html_minifier import HtmlMinifier
+from site_index import SiteIndex
+from deploy_manifest import load_manifest, sync_files
+from precompress import PRECOMPRESS_ENABLED, precompress_files, remove_precompressed
 
 logger = logging.getLogger(__name__)
 
 class ReactSSGGenerator:
-    def __init__(self, output_dir: str = None):
+    def __init__(self, output_dir: str = None, cache_dir: str = None):
         if output_dir is None:
             self.output_dir = Path("/var/www/sites")
         else:
@@ -18,6 +25,21 @@ class ReactSSGGenerator:
         
         self.ssg_dir = Path(__file__).parent / "ssg"
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Content-addressed cache of rendered HTML
+        self.render_cache = RenderCache(Path(cache_dir) if cache_dir else self.output_dir / ".render-cache")
+        
+        # Optional minification of deployed HTML (MINIFY_HTML)
+        self.minifier = HtmlMinifier()
+        
+        # Build assets are published once and symlinked into every page
+        self.asset_store = AssetStore(self.output_dir / "_assets")
+        
+        # Per-subdomain page index and sitemap.xml, updated incrementally
+        self.site_index = SiteIndex(self.output_dir)
+        
+        # Editor previews kept in memory (per-page LRU checked against the content key)
+        self.preview_cache = PreviewCache()
     
     def _ensure_ssg_built(self):
         """Ensure the SSG system is built"""
@@ -121,10 +143,42 @@ console.log(html);
             Path(temp_file).unlink(missing_ok=True)
             Path(script_path).unlink(missing_ok=True)
     
+    def _toolchain_fingerprint(self) -> str:
+        """Fingerprint of the built renderer bundle used in cache keys"""
+        # The bundle is rebuilt in place, so it is hashed on every call. The stylesheet is
+        # included because pages reference it by its fingerprinted name.
+        dist_assets = self.ssg_dir / "dist" / "assets"
+        return "react-ssg-" + hash_files([dist_assets / "main.js", dist_assets / "style.css"])
+    
+    def _render_page(self, page: Page, db: Session) -> Tuple[str, str, bool]:
+        """Render a page through the cache, returning (html, cache key, cache hit)"""
+        page_data = self._prepare_page_data(page, db)
+        cache_key = self.render_cache.make_key(page_data, self._toolchain_fingerprint())
+        cached_html = self.render_cache.get(cache_key)
+        if cached_html is not None:
+            return cached_html, cache_key, True
+        
+        html = self._render_with_node(page_data)
+        self.render_cache.put(cache_key, html)
+        return html, cache_key, False
+    
     def generate_page(self, page: Page, db: Session) -> str:
         """Generate a complete page using React SSG"""
+        html, _, _ = self._render_page(page, db)
+        return html
+    
+    def preview_page(self, page: Page, db: Session) -> Tuple[str, str]:
+        """Render a page for the editor preview, returning (content key, html).
+        
+        Skips the on-disk render cache and writes nothing under output_dir.
+        """
         page_data = self._prepare_page_data(page, db)
-        return self._render_with_node(page_data)
+        key = self.render_cache.make_key(page_data, self._toolchain_fingerprint())
+        html = self.preview_cache.get(page.id, key)
+        if html is None:
+            html = self._render_with_node(page_data)
+            self.preview_cache.put(page.id, key, html)
+        return key, html
     
     def deploy_page(self, page: Page, db: Session) -> str:
         """Generate and deploy a page using React SSG"""
@@ -133,7 +187,7 @@ console.log(html);
             self._ensure_ssg_built()
             
             # Generate HTML
-            html_content = self.generate_page(page, db)
+            html_content, cache_key, cached = self._render_page(page, db)
             
             # Create directory for the subdomain if not exists
             subdomain_dir = self.output_dir / page.subdomain
@@ -146,17 +200,35 @@ console.log(html);
             else:
                 page_dir = subdomain_dir
             
-            # Write HTML file
+            # Skip only if the manifest says index.html is what this entry deployed:
+            # a cache hit alone may be an older version (deploy v2, revert to v1)
             html_file = page_dir / "index.html"
-            with open(html_file, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            if cached and self.render_cache.is_deployed(cache_key, page_dir):
+                logger.info(f"Page {page.slug} unchanged, skipping write")
+                self.site_index.record_deploy(page)
+                return str(page_dir)
             
-            # Copy assets and verify
-            self._copy_assets(page_dir)
+            # Publish assets first so the HTML can reference their fingerprinted names
+            store_dir = self._publish_assets()
+            html_content = rewrite_asset_urls(html_content, {
+                f"assets/{name}": f"assets/{hashed}"
+                for name, hashed in self.asset_store.fingerprints(store_dir).items()
+            })
+            
+            # Write HTML file
+            html_content = self.minifier.minify(html_content, f"{page.subdomain}/{page.slug}")
+            sync_files(page_dir, {"index.html": html_content}, scope="index.html")
+            self.render_cache.record_deployed_digest(cache_key, load_manifest(page_dir).get("index.html"))
+            if PRECOMPRESS_ENABLED:
+                precompress_files([html_file])
+            
+            # Link assets and verify
+            self._copy_assets(page_dir, store_dir)
             
             if not self._verify_assets_copied(page_dir):
                 raise RuntimeError("Asset copy verification failed")
-                
+            
+            self.site_index.record_deploy(page)
             logger.info(f"Successfully deployed page {page.slug} to {page_dir}")
             return str(page_dir)
             
@@ -164,38 +236,35 @@ console.log(html);
             logger.error(f"Deployment failed for page {page.slug}: {e}")
             raise RuntimeError(f"Deployment failed: {e}")
     
-    def _copy_assets(self, target_dir: Path):
-        """Copy assets from the SSG build"""
+    def _publish_assets(self) -> Path:
+        """Publish the SSG assets (with fingerprinted names) to the shared store"""
         ssg_assets = self.ssg_dir / "dist" / "assets"
         if not ssg_assets.exists():
             raise FileNotFoundError(f"SSG assets not found at {ssg_assets}")
+        try:
+            return self.asset_store.publish(ssg_assets, fingerprint=True)
+        except Exception as e:
+            raise RuntimeError(f"Failed to copy assets: {e}")
+    
+    def _copy_assets(self, target_dir: Path, store_dir: Path = None):
+        """Link the page's assets/ to the shared, content-addressed asset store"""
+        if store_dir is None:
+            store_dir = self._publish_assets()
         
-        import shutil
         target_assets = target_dir / "assets"
         try:
-            if target_assets.exists():
-                shutil.rmtree(target_assets)
-            shutil.copytree(ssg_assets, target_assets)
-            logger.info(f"Assets copied from {ssg_assets} to {target_assets}")
+            self.asset_store.link(store_dir, target_assets)
+            logger.info(f"Assets linked from {store_dir} to {target_assets}")
             
         except Exception as e:
             raise RuntimeError(f"Failed to copy assets: {e}")
     
     def _verify_assets_copied(self, target_dir: Path):
-        """Verify assets were copied correctly"""
+        """Verify the page's assets/ points at a published asset manifest"""
         target_assets = target_dir / "assets"
-        source_assets = self.ssg_dir / "dist" / "assets"
-        
-        for asset in ["style.css", "main.js"]:
-            source_file = source_assets / asset
-            target_file = target_assets / asset
-            
-            if not target_file.exists():
-                logger.error(f"Asset {asset} not found at {target_file}")
-                return False
-            if source_file.stat().st_size != target_file.stat().st_size:
-                logger.error(f"Asset {asset} size mismatch: source={source_file.stat().st_size}, target={target_file.stat().st_size}")
-                return False
+        if not self.asset_store.verify(target_assets):
+            logger.error(f"Assets at {target_assets} do not point at a published manifest")
+            return False
         return True
     
     def delete_page(self, slug: str, subdomain: str = None):
@@ -208,6 +277,8 @@ console.log(html);
                 index_file = page_dir / "index.html"
                 if index_file.exists():
                     index_file.unlink()
+                    remove_precompressed(index_file)
+                    self.site_index.record_undeploy(subdomain, slug)
                     return True
                 return False
         else:
@@ -224,10 +295,13 @@ console.log(html);
                         index_file = subdomain_dir / "index.html"
                         if index_file.exists():
                             index_file.unlink()
+                            remove_precompressed(index_file)
+                            self.site_index.record_undeploy(subdomain_dir.name, slug)
                             return True
-            
-            if page_dir and page_dir.exists():
-                import shutil
-                shutil.rmtree(page_dir)
-                return True
-            return False
\ No newline at end of file
+        
+        if page_dir and page_dir.exists():
+            import shutil
+            shutil.rmtree(page_dir)
+            self.site_index.record_undeploy(page_dir.parent.name, slug)
+            return True
+        return False
\ No newline at end of file
@@ -30,7 +30,7 @@ class StripeSubscriptionModel(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     stripe_subscription_id = Column(String, unique=True, index=True)
-    stripe_customer_id = Column(String, ForeignKey("stripe_customers.stripe_customer_id"))
+    stripe_customer_id = Column(String, ForeignKey("stripe_customers.stripe_customer_id"), index=True)
     stripe_price_id = Column(String, index=True)
     status = Column(Enum(StripeSubscriptionStatus))
     current_period_start = Column(DateTime)
@@ -52,7 +52,7 @@ class StripePaymentMethodModel(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     stripe_payment_method_id = Column(String, unique=True, index=True)
-    stripe_customer_id = Column(String, ForeignKey("stripe_customers.stripe_customer_id"))
+    stripe_customer_id = Column(String, ForeignKey("stripe_customers.stripe_customer_id"), index=True)
     type = Column(String)
     card_last4 = Column(String)
     card_brand = Column(String)
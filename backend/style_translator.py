@@ -0,0 +1,88 @@
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+# Estilos CSS (propiedad, valor) con equivalente directo en Tailwind
+TAILWIND_CLASSES: Dict[Tuple[str, str], str] = {
+    ("background-color", "#007bff"): "bg-primary",
+    ("background-color", "#6c757d"): "bg-secondary",
+    ("background-color", "#28a745"): "bg-success",
+    ("background-color", "#dc3545"): "bg-danger",
+    ("color", "white"): "text-white",
+    ("color", "#333"): "text-gray-900",
+    ("color", "#666"): "text-gray-600",
+    ("text-align", "center"): "text-center",
+    ("text-align", "left"): "text-left",
+    ("text-align", "right"): "text-right",
+    ("padding", "20px"): "p-5",
+    ("padding", "40px 20px"): "py-10 px-5",
+    ("margin-bottom", "20px"): "mb-5",
+    ("margin-top", "20px"): "mt-5",
+    ("font-weight", "bold"): "font-bold",
+    ("font-size", "1.5rem"): "text-2xl",
+    ("font-size", "3rem"): "text-5xl",
+    ("font-size", "1.2rem"): "text-xl",
+    ("border-radius", "5px"): "rounded",
+    ("border-radius", "8px"): "rounded-lg",
+    ("display", "flex"): "flex",
+    ("justify-content", "space-between"): "justify-between",
+    ("align-items", "center"): "items-center",
+}
+
+
+@lru_cache(maxsize=4096)
+def css_property(key: str) -> str:
+    """Nombre CSS (kebab-case) de una clave de estilo camelCase"""
+    return ''.join(['-' + c.lower() if c.isupper() else c for c in key]).lstrip('-')
+
+
+def _translate(items: Tuple[Tuple[Any, Any], ...]) -> Tuple[str, str]:
+    css_rules = []
+    classes = []
+    for key, value in items:
+        # Saltar claves None o vacías
+        if key is None or key == "":
+            continue
+        name = css_property(str(key))
+        value = str(value)
+        css_rules.append(f"{name}: {value}")
+        tailwind_class = TAILWIND_CLASSES.get((name, value.strip()))
+        if tailwind_class:
+            classes.append(tailwind_class)
+    return "; ".join(css_rules), " ".join(classes)
+
+
+# Tipos que se memoizan; otros valores (listas, objetos) se traducen sin cache
+SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+@lru_cache(maxsize=4096)
+def _translate_cached(typed_items: Tuple[Tuple[type, Any, type, Any], ...]) -> Tuple[str, str]:
+    return _translate(tuple((key, value) for _, key, _, value in typed_items))
+
+
+def translate_styles(styles: Dict[str, Any]) -> Tuple[str, str]:
+    """Convierte un diccionario de estilos en (CSS inline, clases Tailwind) en una pasada.
+
+    El resultado se memoiza por el contenido del diccionario, con el tipo de
+    cada clave y valor en la clave de la cache: 1, 1.0 y True son iguales
+    para un dict pero se traducen distinto. Estilos con valores que no son
+    escalares se traducen sin cache.
+    """
+    if not styles:
+        return "", ""
+    items = tuple(styles.items())
+    if not all(type(key) in SCALAR_TYPES and type(value) in SCALAR_TYPES for key, value in items):
+        return _translate(items)
+    return _translate_cached(tuple((type(key), key, type(value), value) for key, value in items))
+
+
+@lru_cache(maxsize=4096)
+def css_to_tailwind(css: str) -> str:
+    """Clases Tailwind de un string CSS ya generado ("prop: valor; ...")"""
+    classes = []
+    for rule in css.split(";"):
+        name, _, value = rule.strip().partition(": ")
+        tailwind_class = TAILWIND_CLASSES.get((name, value))
+        if tailwind_class:
+            classes.append(tailwind_class)
+    return " ".join(classes)
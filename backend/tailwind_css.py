@@ -0,0 +1,910 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from deploy_manifest import atomic_write_bytes
+from precompress import PRECOMPRESS_ENABLED, precompress_files
+
+logger = logging.getLogger(__name__)
+
+# Incrementar cuando cambien las reglas generadas (invalida los nombres de archivo)
+TAILWIND_BUILDER_VERSION = "3"
+
+# Las hojas se sirven para todos los subdominios desde <output_dir>/_assets/css (ver nginx.conf)
+STYLESHEET_URL_PREFIX = "/_tw/"
+# Marcador que base.html recibe en lugar del href, reemplazado tras conocer las clases.
+# Mide lo mismo que el href final, así que también se puede corregir en un archivo ya escrito.
+STYLESHEET_PLACEHOLDER = STYLESHEET_URL_PREFIX + "tw-" + "x" * 16 + ".css"
+# Marcador del bloque <style> del preview, que lleva la hoja inline en lugar de un archivo
+INLINE_STYLES_PLACEHOLDER = "/*__TAILWIND_INLINE__*/"
+# Hoja completa de Tailwind que se importa cuando la página usa utilidades que el builder no
+# genera, en lugar de descartarlas (vacío para desactivarla). Las reglas generadas van después
+# y tienen prioridad. Se puede apuntar a una build propia servida desde el mismo dominio.
+FALLBACK_STYLESHEET_URL = os.getenv(
+    "TAILWIND_FALLBACK_STYLESHEET", "https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css"
+)
+
+_CLASS_ATTR_RE = re.compile(r'\bclass=(?:"([^"]*)"|\'([^\']*)\')')
+_STYLESHEET_HREF_RE = re.compile(re.escape(STYLESHEET_URL_PREFIX) + r'(tw-[0-9a-f]+\.css)')
+
+# Subconjunto del preflight de Tailwind del que dependen las utilidades
+PREFLIGHT = (
+    "*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb}\n"
+    "h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}\n"
+    "img,svg,video{display:block;vertical-align:middle}\n"
+    "img,video{max-width:100%;height:auto}\n"
+)
+
+# Colores del tema (mismos valores que la configuración que usaba el CDN en base.html)
+THEME_COLORS = {
+    "primary": "#007bff",
+    "secondary": "#6c757d",
+    "success": "#28a745",
+    "danger": "#dc3545",
+    "warning": "#ffc107",
+    "info": "#17a2b8",
+    "white": "#ffffff",
+    "black": "#000000",
+}
+
+# Paleta por defecto de Tailwind v3 (la que traía el CDN), tonos 50..950
+COLOR_SHADES = (50, 100, 200, 300, 400, 500, 600, 700, 800, 900, 950)
+PALETTE = {
+    "slate": "f8fafc f1f5f9 e2e8f0 cbd5e1 94a3b8 64748b 475569 334155 1e293b 0f172a 020617",
+    "gray": "f9fafb f3f4f6 e5e7eb d1d5db 9ca3af 6b7280 4b5563 374151 1f2937 111827 030712",
+    "zinc": "fafafa f4f4f5 e4e4e7 d4d4d8 a1a1aa 71717a 52525b 3f3f46 27272a 18181b 09090b",
+    "neutral": "fafafa f5f5f5 e5e5e5 d4d4d4 a3a3a3 737373 525252 404040 262626 171717 0a0a0a",
+    "stone": "fafaf9 f5f5f4 e7e5e4 d6d3d1 a8a29e 78716c 57534e 44403c 292524 1c1917 0c0a09",
+    "red": "fef2f2 fee2e2 fecaca fca5a5 f87171 ef4444 dc2626 b91c1c 991b1b 7f1d1d 450a0a",
+    "orange": "fff7ed ffedd5 fed7aa fdba74 fb923c f97316 ea580c c2410c 9a3412 7c2d12 431407",
+    "amber": "fffbeb fef3c7 fde68a fcd34d fbbf24 f59e0b d97706 b45309 92400e 78350f 451a03",
+    "yellow": "fefce8 fef9c3 fef08a fde047 facc15 eab308 ca8a04 a16207 854d0e 713f12 422006",
+    "lime": "f7fee7 ecfccb d9f99d bef264 a3e635 84cc16 65a30d 4d7c0f 3f6212 365314 1a2e05",
+    "green": "f0fdf4 dcfce7 bbf7d0 86efac 4ade80 22c55e 16a34a 15803d 166534 14532d 052e16",
+    "emerald": "ecfdf5 d1fae5 a7f3d0 6ee7b7 34d399 10b981 059669 047857 065f46 064e3b 022c22",
+    "teal": "f0fdfa ccfbf1 99f6e4 5eead4 2dd4bf 14b8a6 0d9488 0f766e 115e59 134e4a 042f2e",
+    "cyan": "ecfeff cffafe a5f3fc 67e8f9 22d3ee 06b6d4 0891b2 0e7490 155e75 164e63 083344",
+    "sky": "f0f9ff e0f2fe bae6fd 7dd3fc 38bdf8 0ea5e9 0284c7 0369a1 075985 0c4a6e 082f49",
+    "blue": "eff6ff dbeafe bfdbfe 93c5fd 60a5fa 3b82f6 2563eb 1d4ed8 1e40af 1e3a8a 172554",
+    "indigo": "eef2ff e0e7ff c7d2fe a5b4fc 818cf8 6366f1 4f46e5 4338ca 3730a3 312e81 1e1b4b",
+    "violet": "f5f3ff ede9fe ddd6fe c4b5fd a78bfa 8b5cf6 7c3aed 6d28d9 5b21b6 4c1d95 2e1065",
+    "purple": "faf5ff f3e8ff e9d5ff d8b4fe c084fc a855f7 9333ea 7e22ce 6b21a8 581c87 3b0764",
+    "fuchsia": "fdf4ff fae8ff f5d0fe f0abfc e879f9 d946ef c026d3 a21caf 86198f 701a75 4a044e",
+    "pink": "fdf2f8 fce7f3 fbcfe8 f9a8d4 f472b6 ec4899 db2777 be185d 9d174d 831843 500724",
+    "rose": "fff1f2 ffe4e6 fecdd3 fda4af fb7185 f43f5e e11d48 be123c 9f1239 881337 4c0519",
+}
+
+COLORS = {
+    **THEME_COLORS,
+    **{
+        f"{name}-{shade}": f"#{value}"
+        for name, values in PALETTE.items()
+        for shade, value in zip(COLOR_SHADES, values.split())
+    },
+}
+
+# Colores sin valor hexadecimal (no admiten modificador de opacidad)
+KEYWORD_COLORS = {"transparent": "transparent", "current": "currentColor", "inherit": "inherit"}
+
+FONT_SIZES = {
+    "xs": ("0.75rem", "1rem"),
+    "sm": ("0.875rem", "1.25rem"),
+    "base": ("1rem", "1.5rem"),
+    "lg": ("1.125rem", "1.75rem"),
+    "xl": ("1.25rem", "1.75rem"),
+    "2xl": ("1.5rem", "2rem"),
+    "3xl": ("1.875rem", "2.25rem"),
+    "4xl": ("2.25rem", "2.5rem"),
+    "5xl": ("3rem", "1"),
+    "6xl": ("3.75rem", "1"),
+    "7xl": ("4.5rem", "1"),
+    "8xl": ("6rem", "1"),
+    "9xl": ("8rem", "1"),
+}
+
+MAX_WIDTHS = {
+    "xs": "20rem", "sm": "24rem", "md": "28rem", "lg": "32rem", "xl": "36rem", "2xl": "42rem", "3xl": "48rem",
+    "4xl": "56rem", "5xl": "64rem", "6xl": "72rem", "7xl": "80rem", "full": "100%", "none": "none",
+    "min": "min-content", "max": "max-content", "fit": "fit-content", "prose": "65ch",
+    "screen-sm": "640px", "screen-md": "768px", "screen-lg": "1024px", "screen-xl": "1280px",
+    "screen-2xl": "1536px",
+}
+
+RADII = {"": "0.25rem", "-sm": "0.125rem", "-md": "0.375rem", "-lg": "0.5rem", "-xl": "0.75rem",
+         "-2xl": "1rem", "-3xl": "1.5rem", "-full": "9999px", "-none": "0px"}
+
+RADIUS_CORNERS = {
+    None: ("border-radius",),
+    "t": ("border-top-left-radius", "border-top-right-radius"),
+    "b": ("border-bottom-left-radius", "border-bottom-right-radius"),
+    "l": ("border-top-left-radius", "border-bottom-left-radius"),
+    "r": ("border-top-right-radius", "border-bottom-right-radius"),
+    "tl": ("border-top-left-radius",), "tr": ("border-top-right-radius",),
+    "bl": ("border-bottom-left-radius",), "br": ("border-bottom-right-radius",),
+}
+
+BORDER_SIDES = {
+    None: ("border-width",), "x": ("border-left-width", "border-right-width"),
+    "y": ("border-top-width", "border-bottom-width"), "t": ("border-top-width",),
+    "b": ("border-bottom-width",), "l": ("border-left-width",), "r": ("border-right-width",),
+}
+
+SHADOWS = {
+    "shadow-sm": "0 1px 2px 0 rgb(0 0 0 / 0.05)",
+    "shadow": "0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)",
+    "shadow-md": "0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1)",
+    "shadow-lg": "0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)",
+    "shadow-xl": "0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)",
+    "shadow-2xl": "0 25px 50px -12px rgb(0 0 0 / 0.25)",
+    "shadow-inner": "inset 0 2px 4px 0 rgb(0 0 0 / 0.05)",
+    "shadow-none": "0 0 #0000",
+}
+
+FONT_WEIGHTS = {"thin": 100, "extralight": 200, "light": 300, "normal": 400, "medium": 500,
+                "semibold": 600, "bold": 700, "extrabold": 800, "black": 900}
+
+TRACKING = {"tighter": "-0.05em", "tight": "-0.025em", "normal": "0em", "wide": "0.025em",
+            "wider": "0.05em", "widest": "0.1em"}
+
+LEADING = {"none": "1", "tight": "1.25", "snug": "1.375", "normal": "1.5", "relaxed": "1.625", "loose": "2"}
+
+EASINGS = {"linear": "linear", "in": "cubic-bezier(0.4,0,1,1)", "out": "cubic-bezier(0,0,0.2,1)",
+           "in-out": "cubic-bezier(0.4,0,0.2,1)"}
+
+GRADIENT_DIRECTIONS = {"t": "top", "tr": "top right", "r": "right", "br": "bottom right",
+                       "b": "bottom", "bl": "bottom left", "l": "left", "tl": "top left"}
+
+TRANSITION_TIMING = "transition-timing-function:cubic-bezier(0.4,0,0.2,1);transition-duration:150ms"
+
+# Utilidades sin parámetros
+STATIC_UTILITIES = {
+    "block": "display:block",
+    "inline-block": "display:inline-block",
+    "inline": "display:inline",
+    "flex": "display:flex",
+    "inline-flex": "display:inline-flex",
+    "grid": "display:grid",
+    "inline-grid": "display:inline-grid",
+    "table": "display:table",
+    "table-cell": "display:table-cell",
+    "table-row": "display:table-row",
+    "flow-root": "display:flow-root",
+    "contents": "display:contents",
+    "list-item": "display:list-item",
+    "hidden": "display:none",
+    "static": "position:static",
+    "relative": "position:relative",
+    "absolute": "position:absolute",
+    "fixed": "position:fixed",
+    "sticky": "position:sticky",
+    "visible": "visibility:visible",
+    "invisible": "visibility:hidden",
+    "overflow-hidden": "overflow:hidden",
+    "overflow-auto": "overflow:auto",
+    "overflow-visible": "overflow:visible",
+    "overflow-scroll": "overflow:scroll",
+    "overflow-x-auto": "overflow-x:auto",
+    "overflow-y-auto": "overflow-y:auto",
+    "overflow-x-hidden": "overflow-x:hidden",
+    "overflow-y-hidden": "overflow-y:hidden",
+    "overflow-x-scroll": "overflow-x:scroll",
+    "overflow-y-scroll": "overflow-y:scroll",
+    "pointer-events-none": "pointer-events:none",
+    "pointer-events-auto": "pointer-events:auto",
+    "object-cover": "object-fit:cover",
+    "object-contain": "object-fit:contain",
+    "object-fill": "object-fit:fill",
+    "object-none": "object-fit:none",
+    "object-scale-down": "object-fit:scale-down",
+    "object-center": "object-position:center",
+    "object-top": "object-position:top",
+    "object-bottom": "object-position:bottom",
+    "object-left": "object-position:left",
+    "object-right": "object-position:right",
+    "flex-row": "flex-direction:row",
+    "flex-row-reverse": "flex-direction:row-reverse",
+    "flex-col": "flex-direction:column",
+    "flex-col-reverse": "flex-direction:column-reverse",
+    "flex-wrap": "flex-wrap:wrap",
+    "flex-wrap-reverse": "flex-wrap:wrap-reverse",
+    "flex-nowrap": "flex-wrap:nowrap",
+    "flex-1": "flex:1 1 0%",
+    "flex-auto": "flex:1 1 auto",
+    "flex-initial": "flex:0 1 auto",
+    "flex-none": "flex:none",
+    "grow": "flex-grow:1",
+    "grow-0": "flex-grow:0",
+    "shrink": "flex-shrink:1",
+    "shrink-0": "flex-shrink:0",
+    "order-first": "order:-9999",
+    "order-last": "order:9999",
+    "order-none": "order:0",
+    "grid-flow-row": "grid-auto-flow:row",
+    "grid-flow-col": "grid-auto-flow:column",
+    "grid-flow-dense": "grid-auto-flow:dense",
+    "grid-cols-none": "grid-template-columns:none",
+    "grid-rows-none": "grid-template-rows:none",
+    "col-auto": "grid-column:auto",
+    "col-span-full": "grid-column:1 / -1",
+    "row-auto": "grid-row:auto",
+    "row-span-full": "grid-row:1 / -1",
+    "items-start": "align-items:flex-start",
+    "items-center": "align-items:center",
+    "items-end": "align-items:flex-end",
+    "items-baseline": "align-items:baseline",
+    "items-stretch": "align-items:stretch",
+    "justify-start": "justify-content:flex-start",
+    "justify-center": "justify-content:center",
+    "justify-end": "justify-content:flex-end",
+    "justify-between": "justify-content:space-between",
+    "justify-around": "justify-content:space-around",
+    "justify-evenly": "justify-content:space-evenly",
+    "justify-items-start": "justify-items:start",
+    "justify-items-center": "justify-items:center",
+    "justify-items-end": "justify-items:end",
+    "justify-items-stretch": "justify-items:stretch",
+    "content-start": "align-content:flex-start",
+    "content-center": "align-content:center",
+    "content-end": "align-content:flex-end",
+    "content-between": "align-content:space-between",
+    "content-around": "align-content:space-around",
+    "self-auto": "align-self:auto",
+    "self-start": "align-self:flex-start",
+    "self-center": "align-self:center",
+    "self-end": "align-self:flex-end",
+    "self-stretch": "align-self:stretch",
+    "place-items-center": "place-items:center",
+    "place-content-center": "place-content:center",
+    "place-self-center": "place-self:center",
+    "text-left": "text-align:left",
+    "text-center": "text-align:center",
+    "text-right": "text-align:right",
+    "text-justify": "text-align:justify",
+    "italic": "font-style:italic",
+    "not-italic": "font-style:normal",
+    "underline": "text-decoration-line:underline",
+    "line-through": "text-decoration-line:line-through",
+    "no-underline": "text-decoration-line:none",
+    "uppercase": "text-transform:uppercase",
+    "lowercase": "text-transform:lowercase",
+    "capitalize": "text-transform:capitalize",
+    "normal-case": "text-transform:none",
+    "truncate": "overflow:hidden;text-overflow:ellipsis;white-space:nowrap",
+    "whitespace-normal": "white-space:normal",
+    "whitespace-nowrap": "white-space:nowrap",
+    "whitespace-pre": "white-space:pre",
+    "whitespace-pre-line": "white-space:pre-line",
+    "whitespace-pre-wrap": "white-space:pre-wrap",
+    "break-words": "overflow-wrap:break-word",
+    "break-all": "word-break:break-all",
+    "antialiased": "-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale",
+    "font-sans": "font-family:ui-sans-serif,system-ui,sans-serif,\"Apple Color Emoji\",\"Segoe UI Emoji\"",
+    "font-serif": "font-family:ui-serif,Georgia,Cambria,\"Times New Roman\",Times,serif",
+    "font-mono": "font-family:ui-monospace,SFMono-Regular,Menlo,Monaco,Consolas,monospace",
+    "list-none": "list-style-type:none",
+    "list-disc": "list-style-type:disc",
+    "list-decimal": "list-style-type:decimal",
+    "list-inside": "list-style-position:inside",
+    "list-outside": "list-style-position:outside",
+    "w-auto": "width:auto",
+    "w-screen": "width:100vw",
+    "w-min": "width:min-content",
+    "w-max": "width:max-content",
+    "w-fit": "width:fit-content",
+    "h-auto": "height:auto",
+    "h-screen": "height:100vh",
+    "h-min": "height:min-content",
+    "h-max": "height:max-content",
+    "h-fit": "height:fit-content",
+    "min-h-screen": "min-height:100vh",
+    "min-w-min": "min-width:min-content",
+    "min-w-max": "min-width:max-content",
+    "max-h-screen": "max-height:100vh",
+    "max-h-none": "max-height:none",
+    "mx-auto": "margin-left:auto;margin-right:auto",
+    "inset-0": "inset:0px",
+    "top-0": "top:0px",
+    "left-0": "left:0px",
+    "right-0": "right:0px",
+    "bottom-0": "bottom:0px",
+    "z-auto": "z-index:auto",
+    "aspect-auto": "aspect-ratio:auto",
+    "aspect-square": "aspect-ratio:1 / 1",
+    "aspect-video": "aspect-ratio:16 / 9",
+    "bg-cover": "background-size:cover",
+    "bg-contain": "background-size:contain",
+    "bg-center": "background-position:center",
+    "bg-top": "background-position:top",
+    "bg-bottom": "background-position:bottom",
+    "bg-fixed": "background-attachment:fixed",
+    "bg-no-repeat": "background-repeat:no-repeat",
+    "bg-repeat": "background-repeat:repeat",
+    "bg-none": "background-image:none",
+    "cursor-pointer": "cursor:pointer",
+    "cursor-default": "cursor:default",
+    "cursor-not-allowed": "cursor:not-allowed",
+    "cursor-text": "cursor:text",
+    "cursor-move": "cursor:move",
+    "select-none": "user-select:none",
+    "select-text": "user-select:text",
+    "select-all": "user-select:all",
+    "select-auto": "user-select:auto",
+    "appearance-none": "appearance:none",
+    "outline-none": "outline:2px solid transparent;outline-offset:2px",
+    "sr-only": "position:absolute;width:1px;height:1px;padding:0;margin:-1px;overflow:hidden;"
+               "clip:rect(0,0,0,0);white-space:nowrap;border-width:0",
+    "not-sr-only": "position:static;width:auto;height:auto;padding:0;margin:0;overflow:visible;"
+                   "clip:auto;white-space:normal",
+    "transition": "transition-property:color,background-color,border-color,text-decoration-color,fill,stroke,"
+                  "opacity,box-shadow,transform,filter,backdrop-filter;" + TRANSITION_TIMING,
+    "transition-all": "transition-property:all;" + TRANSITION_TIMING,
+    "transition-colors": "transition-property:color,background-color,border-color,text-decoration-color,"
+                         "fill,stroke;" + TRANSITION_TIMING,
+    "transition-opacity": "transition-property:opacity;" + TRANSITION_TIMING,
+    "transition-shadow": "transition-property:box-shadow;" + TRANSITION_TIMING,
+    "transition-transform": "transition-property:transform;" + TRANSITION_TIMING,
+    "transition-none": "transition-property:none",
+    "border-solid": "border-style:solid",
+    "border-dashed": "border-style:dashed",
+    "border-dotted": "border-style:dotted",
+    "border-double": "border-style:double",
+    "border-none": "border-style:none",
+}
+
+# Utilidades que el CDN aceptaba y que aquí no hacen falta: cada transform se emite completo
+# (translate, scale y rotate no se combinan entre sí)
+NOOP_UTILITIES = {"transform", "transform-gpu", "transform-none", "filter", "group", "peer"}
+# Clases propias de los componentes que empiezan como una familia de utilidades
+TEMPLATE_CLASSES = {"text-section"}
+
+SPACING_PROPERTIES = {
+    "p": ("padding",), "px": ("padding-left", "padding-right"), "py": ("padding-top", "padding-bottom"),
+    "pt": ("padding-top",), "pb": ("padding-bottom",), "pl": ("padding-left",), "pr": ("padding-right",),
+    "m": ("margin",), "mx": ("margin-left", "margin-right"), "my": ("margin-top", "margin-bottom"),
+    "mt": ("margin-top",), "mb": ("margin-bottom",), "ml": ("margin-left",), "mr": ("margin-right",),
+    "gap": ("gap",), "gap-x": ("column-gap",), "gap-y": ("row-gap",),
+    "w": ("width",), "h": ("height",), "size": ("width", "height"),
+    "min-w": ("min-width",), "min-h": ("min-height",), "max-h": ("max-height",),
+    "top": ("top",), "left": ("left",), "right": ("right",), "bottom": ("bottom",),
+    "inset": ("inset",), "inset-x": ("left", "right"), "inset-y": ("top", "bottom"),
+    "basis": ("flex-basis",),
+}
+_SPACING_AXIS = {"px", "py", "mx", "my", "gap-x", "gap-y", "inset-x", "inset-y"}
+_SPACING_SIDE = {"pt", "pb", "pl", "pr", "mt", "mb", "ml", "mr"}
+# Prefijos que aceptan auto / full (el padding y el gap no)
+_SPACING_AUTO = {"m", "mx", "my", "mt", "mb", "ml", "mr", "w", "h", "size", "top", "left", "right", "bottom",
+                 "inset", "inset-x", "inset-y", "basis"}
+_SPACING_FULL = _SPACING_AUTO - {"m", "mx", "my", "mt", "mb", "ml", "mr"} | {"min-w", "min-h", "max-h"}
+
+# space-x/y y divide-x/y se aplican a los hijos, salvo al primero
+SIBLINGS_SELECTOR = ">:not([hidden])~:not([hidden])"
+
+# Orden de salida: las utilidades más generales antes que las específicas, como en Tailwind.
+# Los extremos de un degradado van últimos: via-* y from-* reinician el color final.
+_ORDER_STATIC, _ORDER_SPACING, _ORDER_SPACING_AXIS, _ORDER_SPACING_SIDE, _ORDER_VISUAL, _ORDER_GRADIENT_END = range(6)
+
+_SPACING_RE = re.compile(r'^([a-z]+(?:-[a-z])?)-(\d+(?:\.5)?|px|auto|full|\d+/\d+|\[[^\]]+\])$')
+_FRACTION_RE = re.compile(r'^(\d+)/(\d+)$')
+_ARBITRARY_RE = re.compile(r'^\[([^\]]+)\]$')
+_LENGTH_RE = re.compile(r'^-?[\d.]+(px|rem|em|vh|vw|%)?$')
+
+BREAKPOINTS = {"sm": "640px", "md": "768px", "lg": "1024px", "xl": "1280px", "2xl": "1536px"}
+# Variantes de estado en el orden en que Tailwind las emite
+PSEUDO_VARIANTS = {
+    "first": ":first-child", "last": ":last-child", "odd": ":nth-child(odd)", "even": ":nth-child(even)",
+    "visited": ":visited", "focus-within": ":focus-within", "hover": ":hover", "focus": ":focus",
+    "focus-visible": ":focus-visible", "active": ":active", "disabled": ":disabled",
+    "placeholder": "::placeholder",
+}
+# Variantes que dependen de un ancestro .group
+GROUP_VARIANTS = {"group-hover": ".group:hover ", "group-focus": ".group:focus "}
+_PSEUDO_RANK = {name: rank for rank, name in enumerate(list(PSEUDO_VARIANTS) + list(GROUP_VARIANTS), 1)}
+_SCREEN_RANK = {name: rank for rank, name in enumerate(BREAKPOINTS, 1)}
+
+# Familias de utilidades de Tailwind: una clase con estos prefijos que no se puede generar
+# se reporta en el log en lugar de descartarse en silencio
+UTILITY_FAMILIES = {
+    "p", "px", "py", "pt", "pb", "pl", "pr", "ps", "pe", "m", "mx", "my", "mt", "mb", "ml", "mr", "ms", "me",
+    "w", "h", "size", "min", "max", "gap", "space", "divide", "inset", "top", "left", "right", "bottom",
+    "text", "bg", "border", "rounded", "shadow", "ring", "outline", "font", "leading", "tracking",
+    "flex", "grid", "col", "row", "justify", "items", "content", "self", "place", "order", "basis",
+    "grow", "shrink", "overflow", "object", "z", "opacity", "transition", "duration", "delay", "ease",
+    "translate", "scale", "rotate", "skew", "origin", "from", "via", "to", "decoration", "underline",
+    "list", "cursor", "select", "whitespace", "break", "aspect", "columns", "float", "clear", "blur",
+    "backdrop", "brightness", "contrast", "grayscale", "invert", "saturate", "sepia", "drop", "fill",
+    "stroke", "line", "truncate", "uppercase", "lowercase", "capitalize", "container", "animate",
+}
+
+
+def _hex_rgb(hex_color: str) -> Optional[Tuple[int, int, int]]:
+    if len(hex_color) == 4:
+        hex_color = "#" + "".join(c * 2 for c in hex_color[1:])
+    if len(hex_color) != 7:
+        return None
+    try:
+        return tuple(int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
+    except ValueError:
+        return None
+
+
+def _color(value: str) -> Optional[str]:
+    """Color de Tailwind con modificador de opacidad opcional (bg-black/50)"""
+    name, _, opacity = value.partition("/")
+    if name in KEYWORD_COLORS and not opacity:
+        return KEYWORD_COLORS[name]
+    hex_color = COLORS.get(name)
+    if hex_color is None:
+        arbitrary = _ARBITRARY_RE.match(name)
+        if not arbitrary or not arbitrary.group(1).startswith("#"):
+            return None
+        hex_color = arbitrary.group(1)
+    if not opacity:
+        return hex_color
+    rgb = _hex_rgb(hex_color)
+    if not opacity.isdigit() or rgb is None:
+        return None
+    r, g, b = rgb
+    return f"rgb({r} {g} {b} / {int(opacity) / 100:g})"
+
+
+def _transparent(color: str) -> str:
+    """El mismo color con opacidad 0 (extremo de un degradado)"""
+    rgb = _hex_rgb(color) if color.startswith("#") else None
+    if rgb is None:
+        return "rgb(255 255 255 / 0)"
+    return "rgb({} {} {} / 0)".format(*rgb)
+
+
+def _fraction(value: str) -> Optional[str]:
+    match = _FRACTION_RE.match(value)
+    if not match:
+        return None
+    numerator, denominator = (int(group) for group in match.groups())
+    if not denominator:
+        return None
+    return f"{numerator / denominator * 100:.6f}".rstrip("0").rstrip(".") + "%"
+
+
+def _spacing(value: str) -> Optional[str]:
+    if value == "px":
+        return "1px"
+    if value == "auto":
+        return "auto"
+    if value == "full":
+        return "100%"
+    fraction = _fraction(value)
+    if fraction:
+        return fraction
+    arbitrary = _ARBITRARY_RE.match(value)
+    if arbitrary:
+        return arbitrary.group(1).replace("_", " ")
+    return f"{float(value) * 0.25:g}rem" if float(value) else "0px"
+
+
+def _spacing_utility(prefix: str, value: str, negative: bool):
+    """(orden, declaraciones, selector de hijos) de una utilidad de espaciado/tamaño"""
+    if prefix in ("space-x", "space-y"):
+        if value in ("auto", "full") or _FRACTION_RE.match(value):
+            return None
+        length = _spacing(value)
+        side = "margin-left" if prefix == "space-x" else "margin-top"
+        return _ORDER_SPACING_AXIS, f"{side}:{'-' if negative else ''}{length}", SIBLINGS_SELECTOR
+    if prefix not in SPACING_PROPERTIES:
+        return None
+    if value == "auto" and prefix not in _SPACING_AUTO:
+        return None
+    if (value == "full" or _FRACTION_RE.match(value)) and prefix not in _SPACING_FULL:
+        return None
+    length = _spacing(value)
+    if negative:
+        if value in ("auto", "full"):
+            return None
+        length = f"-{length}"
+    if prefix in _SPACING_AXIS:
+        order = _ORDER_SPACING_AXIS
+    elif prefix in _SPACING_SIDE:
+        order = _ORDER_SPACING_SIDE
+    else:
+        order = _ORDER_SPACING
+    return order, ";".join(f"{prop}:{length}" for prop in SPACING_PROPERTIES[prefix])
+
+
+def _utility(name: str):
+    """Declaraciones CSS de una utilidad sin variantes, con su orden de salida.
+
+    Retorna (orden, declaraciones) o (orden, declaraciones, selector de hijos),
+    o None si la utilidad no se conoce.
+    """
+    if name in STATIC_UTILITIES:
+        return _ORDER_STATIC, STATIC_UTILITIES[name]
+
+    negative = name.startswith("-")
+    base = name[1:] if negative else name
+
+    match = _SPACING_RE.match(base)
+    if match:
+        resolved = _spacing_utility(*match.groups(), negative)
+        if resolved:
+            return resolved
+
+    if base.startswith("translate-") and base[10:12] in ("x-", "y-"):
+        axis, value = base[10].upper(), base[12:]
+        if re.match(r'^\d+(\.5)?$', value) or value == "px":
+            length = _spacing(value)
+        elif value == "full" or _FRACTION_RE.match(value):
+            length = _spacing(value)
+        else:
+            return None
+        return _ORDER_VISUAL, f"transform:translate{axis}({'-' if negative else ''}{length})"
+
+    if base.startswith("rotate-") and base[7:].isdigit():
+        return _ORDER_VISUAL, f"transform:rotate({'-' if negative else ''}{base[7:]}deg)"
+
+    if base.startswith("scale-"):
+        axis, _, value = base[6:].rpartition("-")
+        if not value.isdigit() or axis not in ("", "x", "y"):
+            return None
+        return _ORDER_VISUAL, f"transform:scale{axis.upper()}({'-' if negative else ''}{int(value) / 100:g})"
+
+    if negative:
+        return None
+
+    if name == "container":
+        # width:100% y el ancho máximo de cada breakpoint
+        rules = "".join(
+            f"@media (min-width:{width}){{.container{{max-width:{width}}}}}" for width in BREAKPOINTS.values()
+        )
+        return _ORDER_STATIC, "width:100%", "", rules
+
+    if name.startswith("text-"):
+        value = name[5:]
+        if value in FONT_SIZES:
+            size, line_height = FONT_SIZES[value]
+            return _ORDER_VISUAL, f"font-size:{size};line-height:{line_height}"
+        arbitrary = _ARBITRARY_RE.match(value)
+        if arbitrary and _LENGTH_RE.match(arbitrary.group(1)):
+            return _ORDER_VISUAL, f"font-size:{arbitrary.group(1)}"
+        color = _color(value)
+        return (_ORDER_VISUAL, f"color:{color}") if color else None
+
+    if name.startswith("font-") and name[5:] in FONT_WEIGHTS:
+        return _ORDER_VISUAL, f"font-weight:{FONT_WEIGHTS[name[5:]]}"
+
+    if name.startswith("tracking-"):
+        spacing = TRACKING.get(name[9:])
+        arbitrary = _ARBITRARY_RE.match(name[9:])
+        if arbitrary:
+            spacing = arbitrary.group(1)
+        return (_ORDER_VISUAL, f"letter-spacing:{spacing}") if spacing else None
+
+    if name.startswith("bg-gradient-to-"):
+        direction = GRADIENT_DIRECTIONS.get(name[15:])
+        if not direction:
+            return None
+        return _ORDER_VISUAL, f"background-image:linear-gradient(to {direction},var(--tw-gradient-stops))"
+
+    if name.startswith("bg-"):
+        color = _color(name[3:])
+        return (_ORDER_VISUAL, f"background-color:{color}") if color else None
+
+    if name.startswith(("from-", "via-", "to-")):
+        stop, _, value = name.partition("-")
+        color = _color(value)
+        if not color:
+            return None
+        if stop == "from":
+            return _ORDER_VISUAL, (f"--tw-gradient-from:{color};--tw-gradient-to:{_transparent(color)};"
+                                   "--tw-gradient-stops:var(--tw-gradient-from),var(--tw-gradient-to)")
+        if stop == "via":
+            return _ORDER_VISUAL, (f"--tw-gradient-to:{_transparent(color)};"
+                                   f"--tw-gradient-stops:var(--tw-gradient-from),{color},var(--tw-gradient-to)")
+        return _ORDER_GRADIENT_END, f"--tw-gradient-to:{color}"
+
+    if name.startswith("border"):
+        match = re.match(r'^border(?:-([xytblr]))?(?:-(\d+))?$', name)
+        if match and (match.group(1) or match.group(2)):
+            side, width = match.groups()
+            return _ORDER_STATIC, ";".join(f"{prop}:{width or 1}px" for prop in BORDER_SIDES[side])
+        color = _color(name[7:])
+        return (_ORDER_VISUAL, f"border-color:{color}") if color else None
+
+    if name.startswith(("divide-x", "divide-y")):
+        value = name[9:]
+        if value and not value.isdigit():
+            return None
+        side = "border-left-width" if name[7] == "x" else "border-top-width"
+        return _ORDER_STATIC, f"{side}:{value or 1}px", SIBLINGS_SELECTOR
+
+    if name.startswith("divide-"):
+        color = _color(name[7:])
+        return (_ORDER_VISUAL, f"border-color:{color}", SIBLINGS_SELECTOR) if color else None
+
+    if name.startswith("leading-"):
+        value = name[8:]
+        if value in LEADING:
+            return _ORDER_VISUAL, f"line-height:{LEADING[value]}"
+        if value.isdigit():
+            return _ORDER_VISUAL, f"line-height:{int(value) * 0.25:g}rem"
+        arbitrary = _ARBITRARY_RE.match(value)
+        return (_ORDER_VISUAL, f"line-height:{arbitrary.group(1)}") if arbitrary else None
+
+    if name.startswith("max-w-"):
+        width = MAX_WIDTHS.get(name[6:])
+        arbitrary = _ARBITRARY_RE.match(name[6:])
+        if arbitrary:
+            width = arbitrary.group(1).replace("_", " ")
+        return (_ORDER_STATIC, f"max-width:{width}") if width else None
+
+    if name.startswith("rounded"):
+        match = re.match(r'^rounded(?:-(t|b|l|r|tl|tr|bl|br))?(-[a-z0-9]+)?$', name)
+        radius = RADII.get(match.group(2) or "") if match else None
+        if not radius:
+            return None
+        return _ORDER_VISUAL, ";".join(f"{prop}:{radius}" for prop in RADIUS_CORNERS[match.group(1)])
+
+    if name in SHADOWS:
+        return _ORDER_VISUAL, f"box-shadow:{SHADOWS[name]}"
+
+    if name.startswith(("grid-cols-", "grid-rows-")):
+        value = name[10:]
+        prop = "grid-template-columns" if name.startswith("grid-cols-") else "grid-template-rows"
+        if value.isdigit() and int(value) > 0:
+            return _ORDER_STATIC, f"{prop}:repeat({value},minmax(0,1fr))"
+        arbitrary = _ARBITRARY_RE.match(value)
+        return (_ORDER_STATIC, f"{prop}:{arbitrary.group(1).replace('_', ' ')}") if arbitrary else None
+
+    match = re.match(r'^(col|row)-(span|start|end)-(\d+)$', name)
+    if match:
+        axis, kind, value = match.groups()
+        prop = "grid-column" if axis == "col" else "grid-row"
+        if kind == "span":
+            return _ORDER_STATIC, f"{prop}:span {value} / span {value}"
+        return _ORDER_STATIC, f"{prop}-{kind}:{value}"
+
+    if name.startswith("order-") and name[6:].isdigit():
+        return _ORDER_STATIC, f"order:{name[6:]}"
+
+    if name.startswith("z-") and name[2:].isdigit():
+        return _ORDER_STATIC, f"z-index:{name[2:]}"
+
+    if name.startswith("duration-") and name[9:].isdigit():
+        return _ORDER_VISUAL, f"transition-duration:{name[9:]}ms"
+
+    if name.startswith("delay-") and name[6:].isdigit():
+        return _ORDER_VISUAL, f"transition-delay:{name[6:]}ms"
+
+    if name.startswith("ease-") and name[5:] in EASINGS:
+        return _ORDER_VISUAL, f"transition-timing-function:{EASINGS[name[5:]]}"
+
+    if name.startswith("opacity-") and name[8:].isdigit():
+        return _ORDER_VISUAL, f"opacity:{int(name[8:]) / 100:g}"
+
+    return None
+
+
+def _escape(class_name: str) -> str:
+    return re.sub(r'([^a-zA-Z0-9_-])', r'\\\1', class_name)
+
+
+def build_rule(class_name: str) -> Optional[Tuple[Tuple, str]]:
+    """(clave de orden, regla CSS) de una clase, o None si no es una utilidad conocida.
+
+    Admite variantes encadenadas (md:hover:bg-blue-600): como mucho un
+    breakpoint, dark y cualquier combinación de estados.
+    """
+    *variants, utility = class_name.split(":")
+    if len(set(variants)) != len(variants):
+        return None
+    screens = [variant for variant in variants if variant in BREAKPOINTS]
+    states = [variant for variant in variants if variant in _PSEUDO_RANK]
+    dark = "dark" in variants
+    if len(screens) > 1 or len(screens) + len(states) + dark != len(variants):
+        return None
+    try:
+        resolved = _utility(utility)
+    except ValueError:
+        return None
+    if resolved is None:
+        return None
+
+    order, declarations, *extra = resolved
+    children = extra[0] if extra else ""
+    selector = "." + _escape(class_name)
+    for state in states:
+        if state in GROUP_VARIANTS:
+            selector = GROUP_VARIANTS[state] + selector
+        else:
+            selector += PSEUDO_VARIANTS[state]
+    rule = f"{selector}{children}{{{declarations}}}"
+    if len(extra) > 1 and not variants:
+        # Reglas adicionales propias de la utilidad (container)
+        rule += extra[1]
+    if dark:
+        rule = f"@media (prefers-color-scheme:dark){{{rule}}}"
+    if screens:
+        rule = f"@media (min-width:{BREAKPOINTS[screens[0]]}){{{rule}}}"
+    key = (
+        _SCREEN_RANK[screens[0]] if screens else 0,
+        dark,
+        max((_PSEUDO_RANK[state] for state in states), default=0),
+        order,
+        class_name,
+    )
+    return key, rule
+
+
+def is_tailwind_like(class_name: str) -> bool:
+    """Si una clase parece una utilidad de Tailwind (las clases propias de los templates no)"""
+    utility = class_name.rsplit(":", 1)[-1].lstrip("-")
+    if utility in NOOP_UTILITIES or class_name in TEMPLATE_CLASSES:
+        return False
+    return ":" in class_name or utility.split("-", 1)[0] in UTILITY_FAMILIES
+
+
+_reported_unknown = set()
+_reported_lock = threading.Lock()
+# Límite de clases distintas que se reportan (el HTML de los usuarios es arbitrario)
+MAX_REPORTED_UNKNOWN = 1000
+
+
+def report_unknown(class_names: Iterable[str]):
+    """Avisa una vez por clase de las utilidades que no se pueden generar"""
+    unknown = [name for name in class_names if is_tailwind_like(name) and build_rule(name) is None]
+    with _reported_lock:
+        new = [name for name in unknown if name not in _reported_unknown]
+        if len(_reported_unknown) < MAX_REPORTED_UNKNOWN:
+            _reported_unknown.update(new)
+        else:
+            new = []
+    if new:
+        action = "importing the full stylesheet" if FALLBACK_STYLESHEET_URL else "dropped"
+        logger.warning(f"Tailwind classes not supported by the stylesheet builder ({action}): {', '.join(sorted(new))}")
+
+
+def _needs_fallback(class_name: str) -> bool:
+    return bool(FALLBACK_STYLESHEET_URL) and is_tailwind_like(class_name) and build_rule(class_name) is None
+
+
+def extract_classes(html: str) -> List[str]:
+    """Utilidades usadas en los atributos class del HTML, ordenadas.
+
+    Incluye las que parecen de Tailwind pero no se pueden generar si hay hoja de
+    respaldo, así el nombre de la hoja depende también de ellas.
+    """
+    collector = ClassCollector()
+    collector.feed(html)
+    return collector.classes()
+
+
+class ClassCollector:
+    """Junta las clases de un HTML que llega por partes (render en streaming).
+
+    Un atributo class cortado entre dos partes se conserva hasta la siguiente,
+    así el resultado es el mismo que con ``extract_classes`` sobre el HTML entero.
+    """
+
+    # Límite de lo que se retiene de una parte (un atributo class sin cerrar no crece sin fin)
+    MAX_PENDING = 64 * 1024
+
+    def __init__(self):
+        self._names = set()
+        self._pending = ""
+
+    def feed(self, html: str):
+        text = self._pending + html
+        end = 0
+        for match in _CLASS_ATTR_RE.finditer(text):
+            self._names.update((match.group(1) or match.group(2) or "").split())
+            end = match.end()
+        rest = text[end:]
+        # Se retiene desde el último "class=" sin cerrar (con el carácter previo, por el \b
+        # de la expresión), o los últimos caracteres por si termina con el comienzo de uno
+        start = rest.rfind("class=")
+        start = max(start - 1 if start >= 0 else len(rest) - len("class="), 0)
+        self._pending = rest[start:] if len(rest) - start <= self.MAX_PENDING else ""
+
+    def classes(self) -> List[str]:
+        report_unknown(self._names)
+        return sorted(
+            class_name for class_name in self._names
+            if build_rule(class_name) is not None or _needs_fallback(class_name)
+        )
+
+
+def render_css(classes: Iterable[str]) -> str:
+    classes = list(classes)
+    rules = sorted(rule for rule in (build_rule(class_name) for class_name in classes) if rule)
+    css = PREFLIGHT + "\n".join(rule for _, rule in rules) + "\n"
+    if any(_needs_fallback(class_name) for class_name in classes):
+        # @import tiene que ir antes que cualquier regla
+        css = f'@import url("{FALLBACK_STYLESHEET_URL}");\n' + css
+    return css
+
+
+class TailwindBuilder:
+    """Genera la hoja de estilos con solo las utilidades que usa una página.
+
+    El nombre del archivo es el hash del conjunto de clases, así que las
+    páginas (de cualquier tenant) con las mismas clases comparten un único
+    archivo en ``store_dir``.
+    """
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+        self._written = set()
+        self._lock = threading.Lock()
+
+    def stylesheet_name(self, classes: List[str]) -> str:
+        payload = TAILWIND_BUILDER_VERSION + "\n" + "\n".join(classes)
+        return f"tw-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]}.css"
+
+    def href(self, classes: List[str]) -> str:
+        return STYLESHEET_URL_PREFIX + self.stylesheet_name(classes)
+
+    def link(self, html: str) -> str:
+        """Reemplaza el marcador de base.html por el href de la hoja de la página"""
+        if STYLESHEET_PLACEHOLDER not in html:
+            return html
+        return html.replace(STYLESHEET_PLACEHOLDER, self.href(extract_classes(html)))
+
+    def inline(self, html: str) -> str:
+        """Reemplaza el marcador de estilos inline por las reglas que usa la página (no escribe archivos)"""
+        if INLINE_STYLES_PLACEHOLDER not in html:
+            return html
+        return html.replace(INLINE_STYLES_PLACEHOLDER, render_css(extract_classes(html)))
+
+    def ensure(self, html: str) -> Optional[Path]:
+        """Escribe (una sola vez) la hoja enlazada por una página ya renderizada"""
+        match = _STYLESHEET_HREF_RE.search(html)
+        if not match:
+            return None
+        name = match.group(1)
+        if self._is_written(name):
+            return self.store_dir / name
+        classes = extract_classes(html)
+        if self.stylesheet_name(classes) != name:
+            logger.warning(f"Stylesheet {name} does not match the page classes")
+        return self._write(name, classes)
+
+    def ensure_classes(self, classes: List[str]) -> Path:
+        """Escribe (una sola vez) la hoja de un conjunto de clases ya extraído"""
+        name = self.stylesheet_name(classes)
+        if self._is_written(name):
+            return self.store_dir / name
+        return self._write(name, classes)
+
+    def ensure_file(self, html_file: Path, head_bytes: int = 64 * 1024) -> Optional[Path]:
+        """Como ``ensure`` para una página ya deployada; solo lee el archivo entero si falta la hoja"""
+        with open(html_file, "rb") as f:
+            head = f.read(head_bytes).decode("utf-8", errors="ignore")
+        match = _STYLESHEET_HREF_RE.search(head)
+        if match and self._is_written(match.group(1)):
+            return self.store_dir / match.group(1)
+        return self.ensure(Path(html_file).read_text(encoding="utf-8"))
+
+    def _is_written(self, name: str) -> bool:
+        path = self.store_dir / name
+        with self._lock:
+            if name in self._written and path.exists():
+                return True
+        if path.exists():
+            with self._lock:
+                self._written.add(name)
+            return True
+        return False
+
+    def _write(self, name: str, classes: List[str]) -> Path:
+        path = self.store_dir / name
+        if not path.exists():
+            atomic_write_bytes(path, render_css(classes).encode("utf-8"))
+            if PRECOMPRESS_ENABLED:
+                precompress_files([path])
+            logger.info(f"Generated Tailwind stylesheet {path} ({len(classes)} classes)")
+
+        with self._lock:
+            self._written.add(name)
+        return path
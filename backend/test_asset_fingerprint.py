@@ -0,0 +1,95 @@
+import hashlib
+import json
+from pathlib import Path
+
+from asset_fingerprint import fingerprint_files, fingerprinted_name, rewrite_asset_urls
+from asset_store import AssetStore
+from generator import SiteGenerator
+
+CSS = b".card { padding: 20px; }"
+CSS_HASH = hashlib.sha256(CSS).hexdigest()[:12]
+
+
+class TestAssetFingerprint:
+
+    def test_fingerprinted_name(self):
+        """Test nombre con el hash del contenido antes de la extensión"""
+        assert fingerprinted_name("assets/style.css", "abcdef0123456789") == "assets/style.abcdef012345.css"
+        assert fingerprinted_name("main.min.js", "0" * 64) == "main.min.000000000000.js"
+
+    def test_fingerprint_files(self, tmp_path):
+        """Test copias con hash junto a los nombres originales"""
+        (tmp_path / "app.js").write_text("console.log(1)")
+
+        files, manifest = fingerprint_files({
+            "assets/style.css": CSS, "assets/app.js": tmp_path / "app.js", "index.html": "<html></html>"
+        })
+
+        assert manifest["assets/style.css"] == f"assets/style.{CSS_HASH}.css"
+        assert files[manifest["assets/style.css"]] == CSS
+        assert files[manifest["assets/app.js"]] == b"console.log(1)"
+        assert "index.html" not in manifest
+        assert set(files) >= {"assets/style.css", "assets/app.js", "index.html"}
+
+    def test_rewrite_asset_urls(self):
+        """Test reescritura de src/href relativos y absolutos"""
+        manifest = {"assets/style.css": "assets/style.1.css", "assets/main.js": "assets/main.2.js"}
+        html = (
+            '<link href="assets/style.css"><link href=\'/assets/style.css?v=3\'>'
+            '<script src="./assets/main.js"></script><a href="assets/other.css">x</a>'
+        )
+
+        assert rewrite_asset_urls(html, manifest) == (
+            '<link href="assets/style.1.css"><link href=\'/assets/style.1.css?v=3\'>'
+            '<script src="./assets/main.2.js"></script><a href="assets/other.css">x</a>'
+        )
+
+
+class TestFingerprintedDeploy:
+
+    def test_jinja_page_references_hashed_stylesheet(self, tmp_path, make_page, make_db):
+        """Test que la página enlaza la hoja con hash y se deployan ambos nombres"""
+        templates_dir = tmp_path / "templates"
+        (templates_dir / "assets").mkdir(parents=True)
+        (templates_dir / "assets" / "style.css").write_bytes(CSS)
+        generator = SiteGenerator(output_dir=str(tmp_path / "sites"), cache_dir=str(tmp_path / "cache"))
+        generator.templates_dir = templates_dir
+
+        page_dir = Path(generator.deploy_page(make_page(), make_db()))
+
+        html = (page_dir / "index.html").read_text()
+        assert f'href="assets/style.{CSS_HASH}.css"' in html
+        assert (page_dir / "assets" / f"style.{CSS_HASH}.css").read_bytes() == CSS
+        assert (page_dir / "assets" / "style.css").exists()
+
+    def test_stale_hashed_assets_are_removed(self, tmp_path, make_page, make_db):
+        """Test que al cambiar un asset se elimina su versión anterior"""
+        templates_dir = tmp_path / "templates"
+        (templates_dir / "assets").mkdir(parents=True)
+        (templates_dir / "assets" / "style.css").write_bytes(CSS)
+        generator = SiteGenerator(output_dir=str(tmp_path / "sites"), cache_dir=str(tmp_path / "cache"))
+        generator.templates_dir = templates_dir
+        page_dir = Path(generator.deploy_page(make_page(), make_db()))
+
+        (templates_dir / "assets" / "style.css").write_bytes(CSS + b"\n.grid { gap: 4px; }")
+        generator._fingerprint = None
+        generator.deploy_page(make_page(), make_db())
+
+        hashed = sorted(p.name for p in (page_dir / "assets").glob("style.*.css"))
+        assert len(hashed) == 1 and hashed[0] != f"style.{CSS_HASH}.css"
+
+    def test_asset_store_fingerprints(self, tmp_path):
+        """Test que el store publica nombres con hash y los registra en el manifest"""
+        source = tmp_path / "dist"
+        source.mkdir()
+        (source / "style.css").write_bytes(CSS)
+        store = AssetStore(tmp_path / "_assets", precompress=False)
+
+        plain_dir = store.publish(source)
+        store_dir = store.publish(source, fingerprint=True)
+
+        assert store_dir != plain_dir
+        assert store.fingerprints(plain_dir) == {}
+        assert store.fingerprints(store_dir) == {"style.css": f"style.{CSS_HASH}.css"}
+        assert (store_dir / f"style.{CSS_HASH}.css").read_bytes() == CSS
+        assert list(json.loads((store_dir / "manifest.json").read_text())["files"]) == ["style.css"]
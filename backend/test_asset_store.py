@@ -0,0 +1,112 @@
+import pytest
+import os
+import tempfile
+import shutil
+from pathlib import Path
+
+from asset_store import AssetStore, MANIFEST_NAME
+
+
+class TestAssetStore:
+
+    @pytest.fixture
+    def temp_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield Path(temp_dir)
+        shutil.rmtree(temp_dir)
+
+    @pytest.fixture
+    def source_dir(self, temp_dir):
+        source = temp_dir / "dist" / "_next"
+        (source / "static" / "chunks").mkdir(parents=True)
+        (source / "static" / "chunks" / "main.js").write_text("console.log('main')")
+        (source / "static" / "app.css").write_text("body { color: red; }")
+        return source
+
+    @pytest.fixture
+    def store(self, temp_dir):
+        return AssetStore(temp_dir / "sites" / "_assets")
+
+    def test_publish_is_content_addressed(self, store, source_dir):
+        """Test que el mismo contenido se publica una sola vez"""
+        first = store.publish(source_dir)
+        second = store.publish(source_dir)
+
+        assert first == second
+        assert (first / "static" / "chunks" / "main.js").read_text() == "console.log('main')"
+        assert (first / MANIFEST_NAME).exists()
+        assert [p.name for p in store.root.iterdir()] == [first.name]
+
+    def test_changed_content_gets_new_entry(self, store, source_dir):
+        """Test que un cambio en los assets produce otra entrada"""
+        first = store.publish(source_dir)
+        (source_dir / "static" / "app.css").write_text("body { color: blue; }")
+        second = store.publish(source_dir)
+
+        assert first != second
+        assert (first / "static" / "app.css").read_text() == "body { color: red; }"
+
+    def test_link_pages_to_store(self, store, source_dir, temp_dir):
+        """Test que las páginas usan un symlink relativo al store"""
+        store_dir = store.publish(source_dir)
+        page_dir = temp_dir / "sites" / "tenant" / "landing"
+        page_dir.mkdir(parents=True)
+
+        store.link(store_dir, page_dir / "_next")
+
+        assert (page_dir / "_next").is_symlink()
+        assert not os.path.isabs(os.readlink(page_dir / "_next"))
+        assert (page_dir / "_next" / "static" / "app.css").read_text() == "body { color: red; }"
+        assert store.verify(page_dir / "_next")
+
+    def test_link_replaces_copied_directory(self, store, source_dir, temp_dir):
+        """Test que un deploy antiguo con copia real se migra a symlink"""
+        page_dir = temp_dir / "sites" / "tenant"
+        (page_dir / "_next" / "old").mkdir(parents=True)
+
+        store.link(store.publish(source_dir), page_dir / "_next")
+
+        assert (page_dir / "_next").is_symlink()
+        assert not (page_dir / "_next" / "old").exists()
+
+    def test_relink_to_new_build(self, store, source_dir, temp_dir):
+        """Test que un nuevo build reapunta el symlink"""
+        page_dir = temp_dir / "sites" / "tenant"
+        page_dir.mkdir(parents=True)
+        store.link(store.publish(source_dir), page_dir / "_next")
+
+        (source_dir / "static" / "app.css").write_text("body { color: blue; }")
+        new_store_dir = store.publish(source_dir)
+        store.link(new_store_dir, page_dir / "_next")
+
+        assert (page_dir / "_next").resolve() == new_store_dir.resolve()
+        assert [p.name for p in page_dir.iterdir()] == ["_next"]
+
+    def test_verify_rejects_plain_directory(self, store, temp_dir):
+        """Test que una copia sin manifest no pasa la verificación"""
+        plain = temp_dir / "plain" / "_next"
+        plain.mkdir(parents=True)
+        (plain / "file.js").write_text("x")
+
+        assert not store.verify(plain)
+        assert not store.verify(temp_dir / "missing")
+
+    def test_collect_garbage_keeps_linked_entries(self, store, source_dir, temp_dir):
+        """Test que la recolección borra solo entradas sin páginas que las enlacen"""
+        page_dir = temp_dir / "sites" / "tenant"
+        page_dir.mkdir(parents=True)
+        old_store_dir = store.publish(source_dir)
+        (source_dir / "static" / "app.css").write_text("body { color: blue; }")
+        new_store_dir = store.publish(source_dir)
+        store.link(new_store_dir, page_dir / "_next")
+
+        assert store.collect_garbage(temp_dir / "sites", min_age=0) == [old_store_dir.name]
+        assert not old_store_dir.exists()
+        assert store.verify(page_dir / "_next")
+
+    def test_collect_garbage_keeps_recent_entries(self, store, source_dir, temp_dir):
+        """Test que una entrada recién publicada (aún sin enlazar) no se borra"""
+        store_dir = store.publish(source_dir)
+
+        assert store.collect_garbage(temp_dir / "sites") == []
+        assert store.entry(store_dir.name) == store_dir
@@ -1,12 +1,13 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 from unittest.mock import Mock, patch
 
 from main import app
-from database import get_db
+from database import get_async_db, get_db
 from models import Base, User
 from auth import auth_manager
 
@@ -29,7 +30,16 @@ def override_get_db():
     finally:
         db.close()
 
+# Los routers async usan la misma base con aiosqlite (NullPool: TestClient abre un event loop por request)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_auth.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_async_db] = override_get_async_db
 
 client = TestClient(app)
 
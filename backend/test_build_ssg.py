@@ -0,0 +1,108 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+import build_ssg
+from build_ssg import ROLLOUT_CHECKPOINT, update_deployed_sites
+
+
+@pytest.fixture
+def sites(tmp_path):
+    """Sitios deployados con copias viejas de _next/ y un build nuevo"""
+    assets_dir = tmp_path / "dist" / "_next"
+    (assets_dir / "static").mkdir(parents=True)
+    (assets_dir / "static" / "main.js").write_text("console.log('v2')")
+
+    sites_dir = tmp_path / "sites"
+    for page_dir in (sites_dir / "demo", sites_dir / "demo" / "precios", sites_dir / "otro" / "landing"):
+        (page_dir / "_next" / "static").mkdir(parents=True)
+        (page_dir / "_next" / "static" / "main.js").write_text("console.log('v1')")
+        (page_dir / "index.html").write_text("<html></html>")
+    (sites_dir / "otro" / "sin-next").mkdir()
+    (sites_dir / "otro" / "sin-next" / "index.html").write_text("<html></html>")
+    return sites_dir, assets_dir
+
+
+def _main_js(page_dir):
+    return (page_dir / "_next" / "static" / "main.js").read_text()
+
+
+class TestUpdateDeployedSites:
+
+    def test_sites_point_to_new_build(self, sites):
+        """Test que todos los sitios con _next/ apuntan al build publicado"""
+        sites_dir, assets_dir = sites
+
+        assert update_deployed_sites(sites_dir, workers=4, assets_dir=assets_dir) is True
+
+        for page_dir in (sites_dir / "demo", sites_dir / "demo" / "precios", sites_dir / "otro" / "landing"):
+            assert (page_dir / "_next").is_symlink()
+            assert _main_js(page_dir) == "console.log('v2')"
+        assert not os.path.lexists(sites_dir / "otro" / "sin-next" / "_next")
+        assert not (sites_dir / ROLLOUT_CHECKPOINT).exists()
+
+    def test_up_to_date_sites_are_skipped(self, sites, capsys):
+        """Test que los sitios que ya apuntan al build nuevo no se tocan"""
+        sites_dir, assets_dir = sites
+        update_deployed_sites(sites_dir, assets_dir=assets_dir)
+        capsys.readouterr()
+
+        with patch("asset_store.AssetStore.link") as link:
+            assert update_deployed_sites(sites_dir, assets_dir=assets_dir) is True
+            link.assert_not_called()
+
+        output = capsys.readouterr().out
+        assert "0 sitios actualizados, 3 ya estaban al día" in output
+        assert "3/3 sitios" in output and "ETA" in output
+
+    def test_interrupted_rollout_resumes(self, sites):
+        """Test que una actualización interrumpida continúa donde quedó"""
+        sites_dir, assets_dir = sites
+        real_update = build_ssg.update_site
+        calls = []
+
+        def interrupted(asset_store, store_dir, page_dir):
+            calls.append(page_dir)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return real_update(asset_store, store_dir, page_dir)
+
+        with patch("build_ssg.update_site", side_effect=interrupted), pytest.raises(KeyboardInterrupt):
+            update_deployed_sites(sites_dir, workers=1, assets_dir=assets_dir)
+
+        checkpoint = json.loads((sites_dir / ROLLOUT_CHECKPOINT).read_text())
+        assert checkpoint["done"] == [str(calls[0].relative_to(sites_dir))]
+
+        with patch("build_ssg.update_site", wraps=real_update) as update:
+            assert update_deployed_sites(sites_dir, workers=1, assets_dir=assets_dir) is True
+            resumed = {call.args[2] for call in update.call_args_list}
+
+        assert calls[0] not in resumed and len(resumed) == 2
+        assert not (sites_dir / ROLLOUT_CHECKPOINT).exists()
+
+    def test_checkpoint_of_another_build_is_ignored(self, sites):
+        """Test que el progreso de otro build no saltea sitios"""
+        sites_dir, assets_dir = sites
+        (sites_dir / ROLLOUT_CHECKPOINT).write_text(json.dumps({"store": "otro", "done": ["demo"]}))
+
+        assert update_deployed_sites(sites_dir, assets_dir=assets_dir) is True
+
+        assert _main_js(sites_dir / "demo") == "console.log('v2')"
+
+    def test_failed_sites_keep_checkpoint(self, sites):
+        """Test que con errores se conserva el progreso para reintentar"""
+        sites_dir, assets_dir = sites
+        real_update = build_ssg.update_site
+
+        def failing(asset_store, store_dir, page_dir):
+            if page_dir.name == "landing":
+                raise OSError("disco lleno")
+            return real_update(asset_store, store_dir, page_dir)
+
+        with patch("build_ssg.update_site", side_effect=failing):
+            assert update_deployed_sites(sites_dir, assets_dir=assets_dir) is False
+
+        checkpoint = json.loads((sites_dir / ROLLOUT_CHECKPOINT).read_text())
+        assert sorted(checkpoint["done"]) == ["demo", "demo/precios"]
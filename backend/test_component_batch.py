@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from models import Component, Page, User
+
+
+@pytest.fixture
+def session(database):
+    session = sessionmaker(bind=database[0])()
+    session.add_all([User(id=1, email="a@example.com", username="a"),
+                     User(id=2, email="b@example.com", username="b")])
+    for page_id, owner_id in ((1, 1), (2, 2)):
+        page = Page(id=page_id, title="Página", slug=f"p{page_id}", subdomain="demo", config={}, owner_id=owner_id)
+        page.components = [
+            Component(id=page_id * 10 + i, type="text", content={"text": f"t{i}"}, styles={}, position=i)
+            for i in range(3)
+        ]
+        session.add(page)
+    session.commit()
+    yield session
+    session.close()
+
+
+def _new(position, text="nuevo"):
+    return {"type": "text", "content": {"text": text}, "position": position}
+
+
+class TestComponentBatch:
+
+    def test_create_update_delete(self, async_client, session):
+        """Test que el batch aplica altas, cambios y bajas y devuelve la lista final"""
+        response = async_client.post("/api/components/batch", json={
+            "page_id": 1,
+            "create": [_new(5, "a"), _new(4, "b")],
+            "update": [{"id": 10, "content": {"text": "editado"}}, {"id": 12, "position": 9}],
+            "delete": [11],
+        })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert [c["content"]["text"] for c in data] == ["editado", "b", "a", "t2"]
+        assert [c["position"] for c in data] == [0, 4, 5, 9]
+        assert all(c["page_id"] == 1 and c["created_at"] for c in data)
+        assert session.query(Component).filter(Component.id == 11).first() is None
+
+    def test_forty_components_in_one_round_trip(self, async_client, engine):
+        """Test que guardar 40 componentes usa un número fijo de sentencias"""
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            response = async_client.post("/api/components/batch", json={
+                "page_id": 1,
+                "create": [_new(i) for i in range(10, 50)],
+                "update": [{"id": 10, "position": 1}, {"id": 11, "position": 0}],
+                "delete": [12],
+            })
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert response.status_code == 200
+        assert len(response.json()) == 42
+        # propiedad, ids, DELETE, UPDATE, INSERT y la lista final
+        assert len(statements) <= 6
+
+    def test_invalid_batch_changes_nothing(self, async_client, session):
+        """Test que un componente de otra página rechaza todo el batch"""
+        response = async_client.post("/api/components/batch", json={
+            "page_id": 1,
+            "create": [_new(3)],
+            "delete": [10, 20],
+        })
+
+        assert response.status_code == 400
+        assert session.query(Component).filter(Component.page_id == 1).count() == 3
+
+    def test_update_and_delete_same_component(self, async_client):
+        """Test que no se puede actualizar y eliminar el mismo componente"""
+        response = async_client.post("/api/components/batch", json={
+            "page_id": 1, "update": [{"id": 10, "position": 3}], "delete": [10],
+        })
+        duplicated = async_client.post("/api/components/batch", json={
+            "page_id": 1, "update": [{"id": 10, "position": 3}, {"id": 10, "position": 4}],
+        })
+
+        assert response.status_code == 400
+        assert duplicated.status_code == 400
+
+    def test_requires_owner(self, async_client, session):
+        """Test que solo el propietario de la página puede usar el batch"""
+        assert async_client.post("/api/components/batch", json={"page_id": 2, "delete": [20]}).status_code == 403
+        assert async_client.post("/api/components/batch", json={"page_id": 99}).status_code == 404
+        assert session.query(Component).filter(Component.id == 20).first() is not None
+
+    def test_invalidates_preview_once(self, async_client):
+        """Test que el preview de la página se invalida una sola vez"""
+        with patch("routers.components.invalidate_preview") as invalidate:
+            async_client.post("/api/components/batch", json={
+                "page_id": 1, "create": [_new(3)], "update": [{"id": 10, "position": 7}],
+            })
+
+        invalidate.assert_called_once_with(1)
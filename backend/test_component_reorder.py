@@ -0,0 +1,134 @@
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from models import Component, Page, User
+
+
+@pytest.fixture
+def session_factory(database):
+    factory = sessionmaker(bind=database[0])
+    session = factory()
+    session.add_all([User(id=1, email="a@example.com", username="a"),
+                     User(id=2, email="b@example.com", username="b")])
+    for page_id, owner_id in ((1, 1), (2, 2)):
+        page = Page(id=page_id, title="Página", slug=f"p{page_id}", subdomain="demo", config={}, owner_id=owner_id)
+        page.components = [
+            Component(id=page_id * 10 + i, type="text", content={}, styles={}, position=i) for i in range(5)
+        ]
+        session.add(page)
+    session.commit()
+    session.close()
+    return factory
+
+
+@pytest.fixture
+def session(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def background_session(session_factory):
+    # La renumeración en segundo plano abre su propia sesión sync
+    with patch("routers.components.SessionLocal", session_factory):
+        yield
+
+
+@pytest.fixture
+def writes(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def _order(client, page_id=1):
+    return [component["id"] for component in client.get(f"/api/components/page/{page_id}").json()]
+
+
+def _move(client, component_id, index):
+    response = client.post(f"/api/components/{component_id}/reorder", params={"new_position": index})
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestMoveComponent:
+
+    @pytest.mark.parametrize("component_id, index, expected", [
+        (14, 0, [14, 10, 11, 12, 13]),
+        (10, 2, [11, 12, 10, 13, 14]),
+        (13, 1, [10, 13, 11, 12, 14]),
+        (10, 4, [11, 12, 13, 14, 10]),
+        (11, 99, [10, 12, 13, 14, 11]),
+    ])
+    def test_move_lands_at_index(self, async_client, component_id, index, expected):
+        """Test que el componente queda en el índice pedido"""
+        _move(async_client, component_id, index)
+
+        assert _order(async_client) == expected
+
+    def test_move_writes_one_row(self, async_client, writes):
+        """Test que mover un componente escribe una sola fila"""
+        moved = _move(async_client, 14, 1)
+
+        assert moved["position"] == 0.5
+        assert len(writes) == 1
+        assert "WHERE components.id = ?" in writes[0][0] and writes[0][1][-1] == 14
+
+    def test_narrow_gap_is_rebalanced_in_background(self, async_client, session_factory):
+        """Test que al achicarse el hueco la página se renumera sin perder el orden"""
+        expected = _order(async_client)
+        for _ in range(25):
+            # Siempre se inserta en el mismo hueco, que se reduce a la mitad cada vez
+            moved = expected.pop()
+            expected.insert(1, moved)
+            _move(async_client, moved, 1)
+
+        assert _order(async_client) == expected
+        check = session_factory()
+        positions = [c.position for c in check.query(Component).filter(Component.page_id == 1)]
+        check.close()
+        assert all(gap >= 1e-6 for gap in
+                   (b - a for a, b in zip(sorted(positions), sorted(positions)[1:])))
+
+    def test_duplicate_positions_are_fixed_first(self, async_client, session):
+        """Test que con posiciones repetidas se renumera antes de mover"""
+        session.query(Component).filter(Component.page_id == 1).update({Component.position: 3})
+        session.commit()
+
+        _move(async_client, 12, 1)
+
+        assert _order(async_client) == [10, 12, 11, 13, 14]
+
+    def test_requires_owner(self, async_client):
+        """Test que no se puede mover un componente de otra página"""
+        assert async_client.post("/api/components/20/reorder", params={"new_position": 0}).status_code == 403
+
+
+class TestReorderComponents:
+
+    def test_single_update_statement(self, async_client, writes):
+        """Test que el reordenamiento completo es un solo UPDATE ... CASE"""
+        response = async_client.post("/api/components/reorder", json={"page_id": 1, "component_ids": [13, 11, 14, 10, 12]})
+
+        assert response.status_code == 200
+        assert [c["id"] for c in response.json()] == [13, 11, 14, 10, 12]
+        assert [c["position"] for c in response.json()] == [0, 1, 2, 3, 4]
+        assert len(writes) == 1 and "CASE" in writes[0][0]
+        assert _order(async_client) == [13, 11, 14, 10, 12]
+
+    def test_foreign_component_rejected(self, async_client):
+        """Test que componentes de otra página rechazan el reordenamiento"""
+        response = async_client.post("/api/components/reorder", json={"page_id": 1, "component_ids": [10, 20]})
+
+        assert response.status_code == 400
+        assert _order(async_client) == [10, 11, 12, 13, 14]
@@ -0,0 +1,146 @@
+import pytest
+import json
+import tempfile
+import shutil
+from pathlib import Path
+
+from deploy_manifest import (
+    AtomicStreamWriter, sync_files, sync_stream, load_manifest, atomic_write_bytes, MANIFEST_NAME,
+)
+from generator import SiteGenerator
+
+
+class TestSyncFiles:
+
+    @pytest.fixture
+    def target_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield Path(temp_dir) / "site"
+        shutil.rmtree(temp_dir)
+
+    def test_first_sync_writes_everything(self, target_dir):
+        """Test que el primer deploy escribe todo y crea el manifest"""
+        stats = sync_files(target_dir, {"index.html": "<html></html>", "assets/style.css": b"body{}"})
+
+        assert stats == {"written": 2, "unchanged": 0, "deleted": 0}
+        assert (target_dir / "index.html").read_text() == "<html></html>"
+        assert set(load_manifest(target_dir)) == {"index.html", "assets/style.css"}
+
+    def test_unchanged_files_are_not_rewritten(self, target_dir):
+        """Test que un deploy idéntico no toca los archivos"""
+        files = {"index.html": "<html></html>", "assets/style.css": b"body{}"}
+        sync_files(target_dir, files)
+        inode = (target_dir / "index.html").stat().st_ino
+        manifest_mtime = (target_dir / MANIFEST_NAME).stat().st_mtime_ns
+
+        stats = sync_files(target_dir, files)
+
+        assert stats == {"written": 0, "unchanged": 2, "deleted": 0}
+        assert (target_dir / "index.html").stat().st_ino == inode
+        assert (target_dir / MANIFEST_NAME).stat().st_mtime_ns == manifest_mtime
+
+    def test_only_changed_file_is_replaced(self, target_dir):
+        """Test que solo se reemplaza el archivo modificado"""
+        sync_files(target_dir, {"index.html": "v1", "assets/style.css": b"body{}"})
+        css_inode = (target_dir / "assets" / "style.css").stat().st_ino
+
+        stats = sync_files(target_dir, {"index.html": "v2", "assets/style.css": b"body{}"})
+
+        assert stats["written"] == 1
+        assert (target_dir / "index.html").read_text() == "v2"
+        assert (target_dir / "assets" / "style.css").stat().st_ino == css_inode
+        assert not list(target_dir.glob(".*.tmp"))
+
+    def test_removed_files_are_deleted(self, target_dir):
+        """Test que los archivos que ya no existen se eliminan"""
+        sync_files(target_dir, {"index.html": "v1", "assets/old.css": b"x"})
+
+        stats = sync_files(target_dir, {"index.html": "v1"})
+
+        assert stats["deleted"] == 1
+        assert not (target_dir / "assets" / "old.css").exists()
+        assert set(load_manifest(target_dir)) == {"index.html"}
+
+    def test_scope_limits_deletions(self, target_dir):
+        """Test que scope solo elimina entradas bajo ese prefijo"""
+        sync_files(target_dir, {"index.html": "v1", "assets/a.css": b"a"})
+
+        sync_files(target_dir, {"assets/b.css": b"b"}, scope="assets/")
+
+        assert (target_dir / "index.html").exists()
+        assert not (target_dir / "assets" / "a.css").exists()
+        assert set(load_manifest(target_dir)) == {"index.html", "assets/b.css"}
+
+    def test_missing_file_is_restored(self, target_dir):
+        """Test que un archivo borrado a mano se vuelve a escribir"""
+        sync_files(target_dir, {"index.html": "v1"})
+        (target_dir / "index.html").unlink()
+
+        stats = sync_files(target_dir, {"index.html": "v1"})
+
+        assert stats["written"] == 1
+        assert (target_dir / "index.html").read_text() == "v1"
+
+    def test_other_pages_are_not_touched(self, target_dir):
+        """Test que el deploy de una página root no toca subpáginas"""
+        (target_dir / "otra-pagina").mkdir(parents=True)
+        (target_dir / "otra-pagina" / "index.html").write_text("otra")
+
+        sync_files(target_dir, {"index.html": "root"})
+        sync_files(target_dir, {"index.html": "root v2"})
+
+        assert (target_dir / "otra-pagina" / "index.html").read_text() == "otra"
+
+    def test_replaced_file_drops_stale_compressed_variants(self, target_dir):
+        """Test que reemplazar un archivo borra sus .gz/.br viejos"""
+        sync_files(target_dir, {"index.html": "v1", "about.html": "a"})
+        for name in ("index.html.gz", "index.html.br", "about.html.gz"):
+            (target_dir / name).write_bytes(b"old")
+
+        sync_files(target_dir, {"index.html": "v2", "about.html": "a"})
+
+        assert not (target_dir / "index.html.gz").exists()
+        assert not (target_dir / "index.html.br").exists()
+        assert (target_dir / "about.html.gz").exists()
+
+    def test_streamed_file_drops_stale_compressed_variants(self, target_dir):
+        """Test que sync_stream también borra los .gz/.br del archivo que reemplaza"""
+        sync_files(target_dir, {"index.html": "v1"})
+        (target_dir / "index.html.gz").write_bytes(b"old")
+
+        with AtomicStreamWriter(target_dir / "index.html") as writer:
+            writer.write("v2")
+            assert sync_stream(target_dir, "index.html", writer) is True
+
+        assert (target_dir / "index.html").read_text() == "v2"
+        assert not (target_dir / "index.html.gz").exists()
+
+    def test_atomic_write_bytes(self, target_dir):
+        """Test escritura atómica sin archivos temporales residuales"""
+        atomic_write_bytes(target_dir / "nested" / "file.txt", b"data")
+
+        assert (target_dir / "nested" / "file.txt").read_bytes() == b"data"
+        assert [p.name for p in (target_dir / "nested").iterdir()] == ["file.txt"]
+
+
+class TestSiteGeneratorIncrementalDeploy:
+
+    @pytest.fixture
+    def temp_output_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield temp_dir
+        shutil.rmtree(temp_dir)
+
+    def test_redeploy_only_rewrites_html(self, temp_output_dir, make_page, make_db):
+        """Test que un cambio de contenido no vuelve a copiar los assets"""
+        generator = SiteGenerator(output_dir=temp_output_dir)
+        generator.deploy_page(make_page(subdomain="test", title="v1"), make_db())
+        page_dir = Path(temp_output_dir) / "test" / "landing"
+        asset_inodes = {p: p.stat().st_ino for p in (page_dir / "assets").rglob("*") if p.is_file()}
+
+        generator.deploy_page(make_page(subdomain="test", title="v2"), make_db())
+
+        assert "v2" in (page_dir / "index.html").read_text()
+        assert asset_inodes
+        assert {p: p.stat().st_ino for p in asset_inodes} == asset_inodes
+        assert "index.html" in json.loads((page_dir / MANIFEST_NAME).read_text())["files"]
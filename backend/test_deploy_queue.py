@@ -0,0 +1,262 @@
+import os
+import time
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from models import Base, DeployJob, Page, User
+import deploy_queue
+from deploy_queue import (
+    claim_jobs, complete_job, enqueue_deploy, enqueue_undeploy, fail_job, generator_stats, keep_alive,
+    latest_job, load_worker_stats, merge_worker_stats, requeue_stale_jobs, retry_delay, run_jobs,
+    save_worker_stats,
+)
+from html_minifier import HtmlMinifier
+from render_cache import FragmentCache
+
+
+class TestDeployQueue:
+
+    @pytest.fixture
+    def db(self):
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+        Base.metadata.create_all(bind=engine)
+        session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        yield session
+        session.close()
+        engine.dispose()
+
+    @pytest.fixture
+    def pages(self, db):
+        user = User(email="queue@example.com", username="queue", hashed_password="x")
+        db.add(user)
+        db.commit()
+        pages = [
+            Page(title=f"Page {i}", slug=f"page-{i}", subdomain="test", owner_id=user.id, is_published=True)
+            for i in range(3)
+        ]
+        db.add_all(pages)
+        db.commit()
+        return pages
+
+    def test_enqueue_reuses_queued_job(self, db, pages):
+        """Test que un deploy pendiente no se duplica"""
+        first = enqueue_deploy(db, pages[0].id)
+        second = enqueue_deploy(db, pages[0].id)
+
+        assert first.id == second.id
+        assert first.status == "queued"
+        assert db.query(DeployJob).count() == 1
+
+    def test_claim_marks_jobs_running(self, db, pages):
+        """Test que claim reclama jobs en orden y no los entrega dos veces"""
+        jobs = [enqueue_deploy(db, page.id) for page in pages]
+
+        claimed = claim_jobs(db, "worker-1", limit=2)
+
+        assert [job.id for job in claimed] == [jobs[0].id, jobs[1].id]
+        assert all(job.status == "running" and job.attempts == 1 for job in claimed)
+        assert claimed[0].locked_by == "worker-1"
+        assert [job.id for job in claim_jobs(db, "worker-2", limit=5)] == [jobs[2].id]
+        assert claim_jobs(db, "worker-3") == []
+
+    def test_failed_job_is_retried_with_backoff(self, db, pages):
+        """Test que un fallo reencola el job con backoff hasta max_attempts"""
+        job = enqueue_deploy(db, pages[0].id)
+        job.max_attempts = 2
+        db.commit()
+
+        [job] = claim_jobs(db, "worker-1")
+        fail_job(db, job, "boom")
+        assert job.status == "queued"
+        assert job.run_after > datetime.utcnow()
+        assert claim_jobs(db, "worker-1") == []
+
+        job.run_after = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        [job] = claim_jobs(db, "worker-1")
+        fail_job(db, job, "boom again")
+        assert job.status == "failed"
+        assert job.attempts == 2
+        assert job.last_error == "boom again"
+
+    def test_retry_delay_grows_and_is_capped(self, monkeypatch):
+        """Test backoff exponencial con límite"""
+        monkeypatch.setattr(deploy_queue, "RETRY_BASE_SECONDS", 10)
+        monkeypatch.setattr(deploy_queue, "RETRY_MAX_SECONDS", 60)
+
+        assert [retry_delay(n).total_seconds() for n in (1, 2, 3, 4)] == [10, 20, 40, 60]
+
+    def test_requeue_stale_jobs(self, db, pages):
+        """Test que jobs de un worker caído vuelven a la cola"""
+        enqueue_deploy(db, pages[0].id)
+        [job] = claim_jobs(db, "dead-worker")
+        job.locked_at = datetime.utcnow() - timedelta(hours=2)
+        job.heartbeat_at = datetime.utcnow() - timedelta(hours=2)
+        db.commit()
+
+        assert requeue_stale_jobs(db, stale_after=60) == 1
+        assert job.status == "queued"
+        assert "dead-worker" in job.last_error
+
+    def test_long_job_with_heartbeat_is_not_requeued(self, db, pages):
+        """Test que un job largo con latido reciente no vuelve a la cola"""
+        enqueue_deploy(db, pages[0].id)
+        [job] = claim_jobs(db, "busy-worker")
+        job.locked_at = datetime.utcnow() - timedelta(hours=2)
+        job.heartbeat_at = datetime.utcnow() - timedelta(hours=2)
+        db.commit()
+
+        with keep_alive(sessionmaker(bind=db.get_bind()), "busy-worker", [job.id], interval=0.05):
+            time.sleep(0.3)
+
+        db.refresh(job)
+        assert job.heartbeat_at > datetime.utcnow() - timedelta(seconds=60)
+        assert requeue_stale_jobs(db, stale_after=60) == 0
+        assert job.status == "running"
+
+    def test_run_jobs_single_page(self, db, pages):
+        """Test ejecución de un job con deploy_page"""
+        generator = Mock(spec=["deploy_page"])
+        generator.deploy_page.return_value = "/var/www/sites/test/page-0"
+        enqueue_deploy(db, pages[0].id)
+
+        run_jobs(db, claim_jobs(db, "worker-1"), generator)
+
+        job = latest_job(db, pages[0].id)
+        assert job.status == "succeeded"
+        assert job.result_path == "/var/www/sites/test/page-0"
+        generator.deploy_page.assert_called_once()
+
+    def test_run_jobs_uses_batch_deploy(self, db, pages):
+        """Test que varios jobs reclamados se despliegan en un solo batch"""
+        generator = Mock(spec=["deploy_page", "deploy_pages"])
+        generator.deploy_pages.return_value = {pages[0].id: "/a", pages[1].id: "/b"}
+        for page in pages:
+            enqueue_deploy(db, page.id)
+
+        run_jobs(db, claim_jobs(db, "worker-1", limit=3), generator)
+
+        generator.deploy_pages.assert_called_once()
+        generator.deploy_page.assert_not_called()
+        assert latest_job(db, pages[0].id).status == "succeeded"
+        assert latest_job(db, pages[1].id).result_path == "/b"
+        # La página que no salió del build se reintenta
+        assert latest_job(db, pages[2].id).status == "queued"
+
+    def test_run_jobs_unpublished_page_fails_without_retry(self, db, pages):
+        """Test que una página despublicada no se reintenta"""
+        generator = Mock(spec=["deploy_page"])
+        enqueue_deploy(db, pages[0].id)
+        pages[0].is_published = False
+        db.commit()
+
+        run_jobs(db, claim_jobs(db, "worker-1"), generator)
+
+        job = latest_job(db, pages[0].id)
+        assert job.status == "failed"
+        assert job.last_error == "Page is not published"
+        generator.deploy_page.assert_not_called()
+
+    def test_undeploy_cancels_pending_deploys(self, db, pages):
+        """Test que undeploy cancela deploys pendientes y queda encolado como último job"""
+        queued = enqueue_deploy(db, pages[0].id)
+
+        undeploy = enqueue_undeploy(db, pages[0].id)
+
+        db.refresh(queued)
+        assert queued.status == "cancelled"
+        assert undeploy.status == "queued"
+        assert enqueue_undeploy(db, pages[0].id).id == undeploy.id
+        assert latest_job(db, pages[0].id).id == undeploy.id
+        assert [job.id for job in claim_jobs(db, "worker-1")] == [undeploy.id]
+
+    def test_undeploy_waits_for_running_deploy(self, db, pages):
+        """Test que un undeploy no corre a la vez que un deploy de la misma página"""
+        deploy = enqueue_deploy(db, pages[0].id)
+        other = enqueue_deploy(db, pages[1].id)
+        assert [job.id for job in claim_jobs(db, "worker-1")] == [deploy.id]
+
+        undeploy = enqueue_undeploy(db, pages[0].id)
+
+        assert [job.id for job in claim_jobs(db, "worker-2", limit=5)] == [other.id]
+        complete_job(db, deploy, "/var/www/sites/test/page-0")
+        assert [job.id for job in claim_jobs(db, "worker-2", limit=5)] == [undeploy.id]
+
+    def test_jobs_of_a_page_run_in_order(self, db, pages):
+        """Test que un deploy reintentado con backoff bloquea los jobs posteriores de su página"""
+        enqueue_deploy(db, pages[0].id)
+        [deploy] = claim_jobs(db, "worker-1")
+        undeploy = enqueue_undeploy(db, pages[0].id)
+
+        fail_job(db, deploy, "boom")
+
+        assert deploy.status == "queued"
+        assert claim_jobs(db, "worker-1") == []
+        deploy.run_after = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        assert [job.id for job in claim_jobs(db, "worker-1", limit=5)] == [deploy.id]
+        complete_job(db, deploy, "/var/www/sites/test/page-0")
+        assert [job.id for job in claim_jobs(db, "worker-1", limit=5)] == [undeploy.id]
+
+    def test_run_jobs_undeploy(self, db, pages):
+        """Test que el worker ejecuta el undeploy aunque la página esté despublicada"""
+        generator = Mock(spec=["deploy_page", "delete_page"])
+        generator.delete_page.return_value = True
+        pages[0].is_published = False
+        db.commit()
+        enqueue_undeploy(db, pages[0].id)
+
+        run_jobs(db, claim_jobs(db, "worker-1"), generator)
+
+        job = latest_job(db, pages[0].id)
+        assert job.action == "undeploy"
+        assert job.status == "succeeded"
+        generator.delete_page.assert_called_once_with("page-0", "test")
+        generator.deploy_page.assert_not_called()
+
+    def test_complete_job_clears_error(self, db, pages):
+        """Test que un reintento exitoso limpia el último error"""
+        enqueue_deploy(db, pages[0].id)
+        [job] = claim_jobs(db, "worker-1")
+        job.last_error = "previous failure"
+
+        complete_job(db, job, "/var/www/sites/test/page-0")
+
+        assert job.status == "succeeded"
+        assert job.last_error is None
+        assert job.finished_at is not None
+
+
+class TestWorkerStats:
+
+    def test_workers_publish_their_counters(self, tmp_path):
+        """Test que los contadores de cada worker se suman y los de workers caídos se ignoran"""
+        generator = Mock(spec=["fragment_cache", "minifier"])
+        generator.fragment_cache = FragmentCache(8)
+        generator.fragment_cache.get("a")
+        generator.fragment_cache.put("a", "<p>a</p>")
+        generator.fragment_cache.get("a")
+        generator.minifier = HtmlMinifier(enabled=True)
+        generator.minifier.minify("<p>  a  </p>", "demo/a")
+
+        save_worker_stats(tmp_path, "host-1-0", generator_stats(generator))
+        save_worker_stats(tmp_path, "host-1-1", generator_stats(generator))
+        save_worker_stats(tmp_path, "host-0-0", generator_stats(generator))
+        os.utime(tmp_path / "host-0-0.json", (0, 0))
+
+        workers = load_worker_stats(tmp_path, max_age=60)
+        merged = merge_worker_stats(workers)
+
+        assert sorted(workers) == ["host-1-0", "host-1-1"]
+        assert merged["fragment_cache"] == {"hits": 2, "misses": 2, "size": 2}
+        assert merged["html_minifier"]["pages"] == 2
+        assert merged["html_minifier"]["percent_saved"] == workers["host-1-0"]["html_minifier"]["percent_saved"]
+        assert "render_cache" not in merged
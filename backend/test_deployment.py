@@ -8,10 +8,9 @@ from fastapi.testclient import TestClient
 from fastapi import BackgroundTasks
 
 from main import app
-from routers.deployment import deploy_page_task
-from models import Page, Component
+from models import Page, Component, DeployJob
 from generator import SiteGenerator
-from database import get_db
+from database import get_async_db, get_db
 
 
 class TestDeploymentEndpoints:
@@ -22,7 +21,16 @@ class TestDeploymentEndpoints:
         def override_get_db():
             return Mock()
         
+        # Sesión async simulada: execute devuelve resultados Mock y run_sync
+        # llama a la función de la cola con una sesión sync Mock
+        def override_get_async_db():
+            db = AsyncMock()
+            db.execute.return_value = Mock()
+            db.run_sync.side_effect = lambda fn, *args: fn(Mock(), *args)
+            return db
+
         app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_async_db] = override_get_async_db
         client = TestClient(app)
         yield client
         app.dependency_overrides.clear()
@@ -156,8 +164,10 @@ class TestDeploymentEndpoints:
             
             assert response.status_code == 200
             data = response.json()
-            assert data["message"] == "Page undeployed successfully"
+            assert data["message"] == "Undeployment started"
             assert data["slug"] == "test-page"
+            # El worker borra los archivos, no la API
+            mock_delete.assert_not_called()
     
     def test_undeploy_page_not_deployed(self, client):
         """Test undeploy de página no deployada"""
@@ -181,7 +191,8 @@ class TestDeploymentEndpoints:
             
             assert response.status_code == 200
             data = response.json()
-            assert data["message"] == "Page was not deployed"
+            assert data["message"] == "Undeployment started"
+            mock_delete.assert_not_called()
     
     def test_undeploy_by_slug(self, client):
         """Test undeploy por slug"""
@@ -192,14 +203,25 @@ class TestDeploymentEndpoints:
             
             assert response.status_code == 200
             data = response.json()
-            assert data["message"] == "Page undeployed successfully"
+            assert data["message"] == "Undeployment started"
             assert data["slug"] == "test-slug"
     
-    @patch('os.path.exists')
-    def test_deployment_status_deployed(self, mock_exists, client):
+    @patch('routers.deployment.latest_job')
+    def test_deployment_status_deployed(self, mock_latest_job, client):
         """Test status de página deployada"""
-        # Mock que existe el directorio y archivo
-        mock_exists.side_effect = lambda path: True
+        # Mock del último job terminado con éxito
+        job = Mock(spec=DeployJob)
+        job.id = 7
+        job.page_id = 1
+        job.action = "deploy"
+        job.status = "succeeded"
+        job.attempts = 1
+        job.max_attempts = 3
+        job.last_error = None
+        job.result_path = "/var/www/sites/test/test-page"
+        job.created_at = None
+        job.finished_at = None
+        mock_latest_job.return_value = job
         
         response = client.get("/api/deploy/status/test-page")
         
@@ -207,14 +229,14 @@ class TestDeploymentEndpoints:
         data = response.json()
         assert data["deployed"] is True
         assert data["slug"] == "test-page"
-        assert data["url"] == "http://test-page.localhost"
-        assert data["path"] == "/var/www/sites/test-page"
+        assert data["path"] == "/var/www/sites/test/test-page"
+        assert data["job"]["status"] == "succeeded"
     
-    @patch('os.path.exists')
-    def test_deployment_status_not_deployed(self, mock_exists, client):
+    @patch('routers.deployment.latest_job')
+    def test_deployment_status_not_deployed(self, mock_latest_job, client):
         """Test status de página no deployada"""
-        # Mock que no existe
-        mock_exists.return_value = False
+        # Mock sin jobs de deployment
+        mock_latest_job.return_value = None
         
         response = client.get("/api/deploy/status/test-page")
         
@@ -294,95 +316,6 @@ class TestDeploymentEndpoints:
         assert data["deployed_sites"] == []
 
 
-class TestBackgroundDeploymentTask:
-    """Tests para la tarea background de deployment"""
-    
-    @pytest.fixture
-    def temp_output_dir(self):
-        temp_dir = tempfile.mkdtemp()
-        yield temp_dir
-        shutil.rmtree(temp_dir)
-    
-    @pytest.fixture
-    def mock_page_with_components(self):
-        """Mock de página con componentes"""
-        page = Mock(spec=Page)
-        page.id = 1
-        page.title = "Test Page"
-        page.slug = "test-page"
-        page.description = "Test description"
-        page.config = {"theme": "default"}
-        page.subdomain = "test"
-        
-        # Mock components
-        component = Mock(spec=Component)
-        component.id = 1
-        component.type = "hero"
-        component.content = {"title": "Welcome"}
-        component.styles = {}
-        component.position = 1
-        component.is_visible = True
-        component.page_id = 1
-        
-        return page, [component]
-    
-    @patch('routers.deployment.SessionLocal')
-    @patch('routers.deployment.generator')
-    def test_deploy_page_task_success(self, mock_generator, mock_session_local, mock_page_with_components):
-        """Test tarea background exitosa"""
-        page, components = mock_page_with_components
-        
-        # Mock database session
-        mock_db = Mock()
-        mock_session_local.return_value = mock_db
-        mock_db.query.return_value.filter.return_value.first.return_value = page
-        
-        # Mock generator
-        mock_generator.deploy_page.return_value = "/var/www/sites/test-page"
-        
-        # Execute task
-        deploy_page_task(page, mock_db)
-        
-        # Verify calls
-        mock_generator.deploy_page.assert_called_once_with(page, mock_db)
-        mock_db.close.assert_called_once()
-    
-    @patch('routers.deployment.SessionLocal')
-    def test_deploy_page_task_page_not_found(self, mock_session_local, mock_page_with_components):
-        """Test tarea cuando la página no existe"""
-        page, components = mock_page_with_components
-        
-        # Mock database session
-        mock_db = Mock()
-        mock_session_local.return_value = mock_db
-        mock_db.query.return_value.filter.return_value.first.return_value = None
-        
-        # Should not raise exception
-        deploy_page_task(page, mock_db)
-        
-        mock_db.close.assert_called_once()
-    
-    @patch('routers.deployment.SessionLocal')
-    @patch('routers.deployment.generator')
-    def test_deploy_page_task_generator_error(self, mock_generator, mock_session_local, mock_page_with_components):
-        """Test tarea cuando el generador falla"""
-        page, components = mock_page_with_components
-        
-        # Mock database session
-        mock_db = Mock()
-        mock_session_local.return_value = mock_db
-        mock_db.query.return_value.filter.return_value.first.return_value = page
-        
-        # Mock generator to raise exception
-        mock_generator.deploy_page.side_effect = Exception("Generator error")
-        
-        # Should raise exception
-        with pytest.raises(Exception, match="Generator error"):
-            deploy_page_task(page, mock_db)
-        
-        mock_db.close.assert_called_once()
-
-
 class TestDeploymentIntegration:
     """Tests de integración para deployment"""
     
@@ -420,7 +353,10 @@ class TestDeploymentIntegration:
             assert response.status_code == 200
             
             # 2. Check status (mock as deployed)
-            with patch('os.path.exists', return_value=True):
+            deployed_job = Mock(spec=DeployJob, id=1, page_id=1, action="deploy", status="succeeded",
+                                attempts=1, max_attempts=3, last_error=None, result_path=temp_output_dir,
+                                created_at=None, finished_at=None)
+            with patch('routers.deployment.latest_job', return_value=deployed_job):
                 response = client.get("/api/deploy/status/test-page")
                 assert response.status_code == 200
                 assert response.json()["deployed"] is True
@@ -430,7 +366,7 @@ class TestDeploymentIntegration:
             assert response.status_code == 200
             
             # 4. Check status (mock as not deployed)
-            with patch('os.path.exists', return_value=False):
+            with patch('routers.deployment.latest_job', return_value=None):
                 response = client.get("/api/deploy/status/test-page")
                 assert response.status_code == 200
                 assert response.json()["deployed"] is False
@@ -0,0 +1,124 @@
+from unittest.mock import Mock
+
+from html_minifier import HtmlMinifier, minify_html, minify_stream
+from generator import SiteGenerator
+
+HTML = """<!DOCTYPE html>
+<html lang="es">
+  <head>
+    <meta charset="UTF-8">
+    <!-- estilos -->
+    <script   defer=""  src="/js/main.js"></script>
+    <style>
+      body {  margin: 0; }
+    </style>
+  </head>
+  <body>
+    <nav class="flex   gap-2">
+      <a href="/">Inicio</a>
+      <a href="/contacto">Contacto</a>
+    </nav>
+    <p>Hola   <strong>mundo</strong>&nbsp;&nbsp;feliz</p>
+    <pre>  dos
+   espacios  </pre>
+    <textarea>  sin   tocar  </textarea>
+    <input type="checkbox" checked="checked" disabled="">
+  </body>
+</html>
+"""
+
+
+class TestMinifyHtml:
+
+    def test_collapses_whitespace_between_blocks(self):
+        """Test que se elimina el espacio junto a etiquetas de bloque"""
+        html = minify_html(HTML)
+
+        assert html.startswith('<!DOCTYPE html><html lang="es"><head><meta charset="UTF-8">')
+        assert html.endswith("</body></html>")
+        assert "\n" not in html.split("</style>")[1].split("<pre>")[0]
+
+    def test_keeps_inline_spacing(self):
+        """Test que el espacio entre elementos en línea se reduce a uno"""
+        html = minify_html(HTML)
+
+        assert '<a href="/">Inicio</a> <a href="/contacto">Contacto</a>' in html
+        assert "<p>Hola <strong>mundo</strong>&nbsp;&nbsp;feliz</p>" in html
+
+    def test_raw_text_elements_are_untouched(self):
+        """Test que pre, textarea, script y style se copian tal cual"""
+        html = minify_html(HTML)
+
+        assert "<pre>  dos\n   espacios  </pre>" in html
+        assert "<textarea>  sin   tocar  </textarea>" in html
+        assert "<style>\n      body {  margin: 0; }\n    </style>" in html
+        assert minify_html("<script>if (a < b) {\n  x();\n}</script>") == "<script>if (a < b) {\n  x();\n}</script>"
+
+    def test_drops_comments_but_keeps_markers(self):
+        """Test que se eliminan comentarios salvo condicionales y marcadores de React"""
+        html = minify_html("<div><!-- nota --><!--$--><span>a</span><!--/$--><!-- --></div>")
+
+        assert html == "<div><!--$--><span>a</span><!--/$--><!-- --></div>"
+
+    def test_shortens_boolean_attributes(self):
+        """Test atributos booleanos y espacios dentro de etiquetas"""
+        html = minify_html(HTML)
+
+        assert '<script defer src="/js/main.js"></script>' in html
+        assert '<input type="checkbox" checked disabled>' in html
+        assert 'class="flex   gap-2"' in html
+
+    def test_streaming_matches_whole_document(self):
+        """Test que el resultado no depende de cómo se parte la entrada"""
+        expected = minify_html(HTML)
+
+        for size in (1, 3, 16, 100):
+            chunks = [HTML[i:i + size] for i in range(0, len(HTML), size)]
+            assert "".join(minify_stream(chunks)) == expected
+
+    def test_literal_less_than_in_text(self):
+        """Test que un '<' que no abre etiqueta se conserva"""
+        assert minify_html("<p>1 < 2   y   3 > 2</p>") == "<p>1 < 2 y 3 > 2</p>"
+
+
+class TestHtmlMinifier:
+
+    def test_records_savings(self):
+        """Test métricas de bytes ahorrados"""
+        minifier = HtmlMinifier(enabled=True)
+        html = minifier.minify(HTML, "demo/inicio")
+        stats = minifier.stats()
+
+        assert stats["pages"] == 1
+        assert stats["bytes_in"] == len(HTML.encode("utf-8"))
+        assert stats["bytes_out"] == len(html.encode("utf-8"))
+        assert stats["bytes_saved"] > 0
+        assert 0 < stats["percent_saved"] < 100
+
+    def test_disabled_is_a_no_op(self):
+        """Test que con el switch apagado el HTML no cambia"""
+        minifier = HtmlMinifier(enabled=False)
+
+        assert minifier.minify(HTML) is HTML
+        assert minifier.stats()["pages"] == 0
+
+    def test_disabled_by_default(self, tmp_path):
+        """Test que sin MINIFY_HTML el generador no minifica"""
+        generator = SiteGenerator(output_dir=str(tmp_path / "sites"), cache_dir=str(tmp_path / "cache"))
+
+        assert generator.minifier.enabled is False
+
+    def test_deploy_writes_minified_html(self, tmp_path):
+        """Test que deploy_page escribe el HTML minificado"""
+        generator = SiteGenerator(output_dir=str(tmp_path / "sites"), cache_dir=str(tmp_path / "cache"))
+        generator.minifier = HtmlMinifier(enabled=True)
+        page = Mock(id=1, title="Inicio", description="", slug="inicio", subdomain="demo", config={})
+        db = Mock()
+        db.query.return_value.filter.return_value.order_by.return_value.all.return_value = []
+
+        page_dir = generator.deploy_page(page, db)
+
+        written = (tmp_path / "sites" / "demo" / "inicio" / "index.html").read_text()
+        assert page_dir.endswith("inicio")
+        assert written == minify_html(generator.generate_page(page, db))
+        assert generator.minifier.stats()["bytes_saved"] > 0
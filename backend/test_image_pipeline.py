@@ -0,0 +1,276 @@
+import functools
+import json
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+
+from image_pipeline import ImagePipeline, render_variants
+from generator import SiteGenerator
+
+
+@pytest.fixture
+def source_root(tmp_path):
+    root = tmp_path / "uploads"
+    root.mkdir()
+    Image.new("RGB", (1500, 1000), (200, 30, 30)).save(root / "photo.jpg")
+    Image.new("RGBA", (400, 200), (0, 0, 0, 0)).save(root / "logo.png")
+    return root
+
+
+@pytest.fixture
+def pipeline(tmp_path, source_root):
+    return ImagePipeline(tmp_path / "img", widths=(320, 640, 960), formats=("webp",),
+                         workers=1, source_root=source_root, fetch_remote=False)
+
+
+@pytest.fixture
+def image_server(source_root):
+    """Servidor HTTP local con las imágenes de source_root; registra las rutas pedidas y los status"""
+    requests = []
+    statuses = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            super().do_GET()
+
+        def send_response(self, code, message=None):
+            statuses.append(code)
+            super().send_response(code, message)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(source_root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.requests = requests
+    server.statuses = statuses
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestImagePipeline:
+
+    def test_variants_at_standard_widths(self, pipeline):
+        """Test variantes redimensionadas sin agrandar la imagen"""
+        image = pipeline.process(["/photo.jpg"])["/photo.jpg"]
+
+        assert (image["width"], image["height"]) == (1500, 1000)
+        assert image["srcset"].endswith("960.jpg 960w")
+        assert image["src"].startswith("/_img/") and image["src"].endswith("/960.jpg")
+        assert image["sources"][0]["type"] == "image/webp"
+        assert "320.webp 320w, " in image["sources"][0]["srcset"]
+        key = image["src"].split("/")[2]
+        with Image.open(pipeline.store_dir / key / "640.webp") as variant:
+            assert variant.size == (640, 427)
+
+    def test_small_images_and_alpha(self, pipeline):
+        """Test imágenes más chicas que los anchos y con transparencia"""
+        image = pipeline.process(["/logo.png"])["/logo.png"]
+
+        assert image["srcset"].split(", ")[-1].endswith("400.png 400w")
+        assert image["src"].endswith("/400.png")
+
+    def test_unchanged_images_are_not_reprocessed(self, pipeline):
+        """Test que una imagen sin cambios se toma del disco"""
+        first = pipeline.process(["/photo.jpg"])
+
+        with patch("image_pipeline.render_variants") as render:
+            assert pipeline.process(["/photo.jpg", "/photo.jpg"]) == first
+            render.assert_not_called()
+
+    def test_existing_variants_are_not_encoded_again(self, pipeline, source_root, tmp_path):
+        """Test que solo se generan los anchos que faltan"""
+        out_dir = tmp_path / "variants"
+        render_variants(str(source_root / "photo.jpg"), str(out_dir), (320,), ("webp",), 75)
+        mtime = (out_dir / "320.webp").stat().st_mtime_ns
+
+        manifest = render_variants(str(source_root / "photo.jpg"), str(out_dir), (320, 640), ("webp",), 75)
+
+        assert (out_dir / "320.webp").stat().st_mtime_ns == mtime
+        assert manifest["variants"]["webp"] == [[320, "320.webp"], [640, "640.webp"]]
+        assert json.loads((out_dir / "manifest.json").read_text()) == manifest
+
+    def test_unresolvable_sources_are_skipped(self, pipeline, tmp_path):
+        """Test fuentes remotas, inexistentes o fuera del directorio de origen"""
+        (tmp_path / "secret.jpg").write_bytes(b"x")
+
+        assert pipeline.process([
+            "https://example.com/a.jpg", "/missing.jpg", "/../secret.jpg", "data:image/png;base64,AA", ""
+        ]) == {}
+
+    def test_asset_paths(self, pipeline, source_root):
+        """Test imágenes de Asset resueltas a su archivo local"""
+        url = "http://minio:9000/assets/photo.jpg"
+
+        images = pipeline.process([url], {url: source_root / "photo.jpg"})
+
+        assert images[url]["width"] == 1500
+
+    def test_parallel_processing(self, tmp_path, source_root):
+        """Test procesamiento en un pool de procesos"""
+        pipeline = ImagePipeline(tmp_path / "img", widths=(320,), formats=(), workers=2,
+                                 source_root=source_root)
+
+        images = pipeline.process(["/photo.jpg", "/logo.png"])
+
+        assert set(images) == {"/photo.jpg", "/logo.png"}
+
+    def test_disabled_pipeline(self, tmp_path, source_root):
+        """Test que sin pipeline no se procesa nada"""
+        pipeline = ImagePipeline(tmp_path / "img", source_root=source_root, enabled=False)
+
+        assert pipeline.process(["/photo.jpg"]) == {}
+        assert pipeline.fingerprint() == "img-off"
+
+
+class TestRemoteImages:
+
+    @pytest.fixture
+    def remote_pipeline(self, tmp_path, source_root):
+        return ImagePipeline(tmp_path / "img", widths=(320,), formats=(), workers=1, source_root=source_root,
+                             fetch_remote=True, remote_dir=tmp_path / "remote")
+
+    def test_private_addresses_are_not_fetched(self, remote_pipeline, image_server, tmp_path):
+        """Test que no se descargan imágenes de direcciones internas"""
+        url = f"{image_server.base_url}/photo.jpg"
+
+        assert remote_pipeline.resolve(url) is None
+        assert remote_pipeline.resolve(url.replace("127.0.0.1", "localhost")) is None
+        assert image_server.requests == []
+        assert not (tmp_path / "remote").exists()
+
+    def test_only_allowed_hosts(self, tmp_path, source_root):
+        """Test que con IMAGE_FETCH_HOSTS solo se descargan esos hosts"""
+        pipeline = ImagePipeline(tmp_path / "img", source_root=source_root, fetch_remote=True,
+                                 remote_dir=tmp_path / "remote", fetch_hosts=("cdn.example.com",))
+
+        with patch.object(pipeline._opener, "open") as fetch:
+            assert pipeline.resolve("https://evil.example.com/a.jpg") is None
+            assert pipeline.resolve("file:///etc/passwd") is None
+            fetch.assert_not_called()
+
+    def test_downloads_stay_out_of_the_public_store(self, remote_pipeline, image_server, tmp_path):
+        """Test que la descarga se guarda fuera de store_dir y solo se publican las variantes"""
+        url = f"{image_server.base_url}/photo.jpg"
+
+        with patch("image_pipeline._check_public_address"):
+            images = remote_pipeline.process([url])
+
+        assert images[url]["width"] == 1500
+        # La descarga y sus validadores (ETag / Last-Modified)
+        [download, validators] = sorted((tmp_path / "remote").iterdir())
+        assert validators.name == download.name + ".json"
+        assert json.loads(validators.read_text())["last_modified"]
+        assert not any(path.name == "_remote" for path in remote_pipeline.store_dir.rglob("*"))
+        assert image_server.requests == ["/photo.jpg"]
+
+
+    def test_fresh_download_is_reused(self, remote_pipeline, image_server):
+        """Test que dentro del TTL no se vuelve a pedir la imagen"""
+        url = f"{image_server.base_url}/photo.jpg"
+
+        with patch("image_pipeline._check_public_address"):
+            assert remote_pipeline.resolve(url) == remote_pipeline.resolve(url)
+
+        assert image_server.requests == ["/photo.jpg"]
+
+    def test_expired_download_is_revalidated(self, tmp_path, source_root, image_server):
+        """Test que pasado el TTL se revalida con Last-Modified y se reusa si no cambió"""
+        pipeline = ImagePipeline(tmp_path / "img", source_root=source_root, fetch_remote=True,
+                                 remote_dir=tmp_path / "remote", remote_ttl=0)
+        url = f"{image_server.base_url}/photo.jpg"
+
+        with patch("image_pipeline._check_public_address"):
+            path = pipeline.resolve(url)
+            first = path.read_bytes()
+            assert pipeline.resolve(url) == path
+
+            Image.new("RGB", (800, 600), (30, 200, 30)).save(source_root / "photo.jpg")
+            os.utime(source_root / "photo.jpg", (time.time() + 10, time.time() + 10))
+            assert pipeline.resolve(url) == path
+
+        assert image_server.statuses == [200, 304, 200]
+        assert path.read_bytes() != first
+        assert Image.open(path).size == (800, 600)
+
+    def test_unreachable_origin_keeps_previous_download(self, tmp_path, source_root, image_server):
+        """Test que si el origen no responde al revalidar se sigue usando la descarga anterior"""
+        pipeline = ImagePipeline(tmp_path / "img", source_root=source_root, fetch_remote=True,
+                                 remote_dir=tmp_path / "remote", remote_ttl=0)
+        url = f"{image_server.base_url}/photo.jpg"
+        with patch("image_pipeline._check_public_address"):
+            path = pipeline.resolve(url)
+
+        with patch.object(pipeline._opener, "open", side_effect=OSError("connection refused")):
+            assert pipeline.resolve(url) == path
+        (source_root / "photo.jpg").unlink()
+        with patch("image_pipeline._check_public_address"):
+            assert pipeline.resolve(url) == path
+
+        assert image_server.statuses == [200, 404]
+
+
+class TestResponsiveComponents:
+
+    def test_image_component_markup(self, tmp_path, pipeline):
+        """Test que el componente imagen emite picture, srcset, sizes y dimensiones"""
+        generator = SiteGenerator(output_dir=str(tmp_path / "sites"), cache_dir=str(tmp_path / "cache"))
+        generator.images = pipeline
+        component = Mock(type="image", content={"src": "/photo.jpg", "alt": "Foto"}, styles={})
+        page = Mock(id=1, title="Inicio", description="", slug="inicio", subdomain="demo", config={})
+        db = Mock()
+        db.query.return_value.filter.return_value.order_by.return_value.all.return_value = [component]
+        db.query.return_value.filter.return_value.all.return_value = []
+
+        html = generator.generate_page(page, db)
+
+        assert '<source type="image/webp" srcset="/_img/' in html
+        assert 'sizes="100vw" width="1500" height="1000" alt="Foto"' in html
+        assert 'loading="lazy"' in html
+        assert 'src="/photo.jpg"' not in html
+
+    def test_fallback_to_original_src(self, tmp_path):
+        """Test que sin variantes se conserva la etiqueta img original"""
+        generator = SiteGenerator(output_dir=str(tmp_path))
+
+        html = generator._generate_hero({"title": "Hola", "image": "https://example.com/a.jpg"}, "")
+
+        assert '<img src="https://example.com/a.jpg" alt="Hero" class="max-w-full h-auto mb-8 rounded-lg">' in html
+
+    def test_component_cache_key_includes_images(self, tmp_path, pipeline):
+        """Test que el fragmento cacheado depende de las variantes"""
+        generator = SiteGenerator(output_dir=str(tmp_path / "sites"))
+        component = Mock(type="hero", content={"title": "Hola", "image": "/photo.jpg"}, styles={})
+
+        plain = generator.generate_component_html(component)
+        responsive = generator.generate_component_html(component, pipeline.process(["/photo.jpg"]))
+
+        assert "<picture>" not in plain
+        assert "<picture>" in responsive and 'loading="eager"' in responsive
+
+    def test_replaced_image_changes_page_cache_key(self, tmp_path, pipeline, source_root):
+        """Test que reemplazar el archivo de una imagen invalida el HTML cacheado"""
+        generator = SiteGenerator(output_dir=str(tmp_path / "sites"), cache_dir=str(tmp_path / "cache"))
+        generator.images = pipeline
+        component = Mock(type="image", content={"src": "/photo.jpg", "alt": "Foto"}, styles={})
+        page = Mock(id=1, title="Inicio", description="", slug="inicio", subdomain="demo", config={})
+        db = Mock()
+        db.query.return_value.filter.return_value.all.return_value = []
+
+        key = generator._page_cache_key(page, [component], db)
+        assert generator._page_cache_key(page, [component], db) == key
+
+        Image.new("RGB", (800, 600), (30, 30, 200)).save(source_root / "photo.jpg")
+
+        assert generator._page_cache_key(page, [component], db) != key
@@ -0,0 +1,156 @@
+import os
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, inspect, text
+
+from models import Base
+from stripe_module.infrastructure.models.subscription_models import Base as StripeBase
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _config(url):
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+@pytest.fixture
+def database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrations.db'}"
+    engine = create_engine(url)
+    yield url, engine
+    engine.dispose()
+
+
+def _indexes(engine, table):
+    return {index["name"]: index for index in inspect(engine).get_indexes(table)}
+
+
+def _schema_diff(engine):
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection)
+        return compare_metadata(context, [Base.metadata, StripeBase.metadata])
+
+
+class TestMigrations:
+
+    def test_upgrade_matches_models(self, database):
+        """Test que upgrade head en una base vacía deja el mismo esquema que los modelos"""
+        url, engine = database
+
+        command.upgrade(_config(url), "head")
+
+        assert _schema_diff(engine) == []
+        head = ScriptDirectory.from_config(_config(url)).get_current_head()
+        with engine.connect() as connection:
+            assert MigrationContext.configure(connection).get_current_revision() == head
+
+    def test_hot_query_indexes(self, database):
+        """Test que existen los índices de las consultas frecuentes"""
+        url, engine = database
+
+        command.upgrade(_config(url), "head")
+
+        assert _indexes(engine, "components")["ix_components_page_visible_position"]["column_names"] == [
+            "page_id", "is_visible", "position"
+        ]
+        assert _indexes(engine, "pages")["ix_pages_owner_updated_id"]["column_names"] == [
+            "owner_id", "updated_at", "id"
+        ]
+        assert "ix_components_page_position_id" in _indexes(engine, "components")
+        assert "ix_users_stripe_customer_id" in _indexes(engine, "users")
+        assert "ix_assets_owner_id" in _indexes(engine, "assets")
+        assert "ix_stripe_subscriptions_stripe_customer_id" in _indexes(engine, "stripe_subscriptions")
+
+    def test_adopts_create_all_database(self, database):
+        """Test que una base creada con create_all se migra sin recrear tablas ni perder datos"""
+        url, engine = database
+        Base.metadata.create_all(bind=engine)
+        StripeBase.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (id, email, username) VALUES (1, 'a@example.com', 'a')"))
+
+        command.upgrade(_config(url), "head")
+
+        assert _schema_diff(engine) == []
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT count(*) FROM users")).scalar() == 1
+
+    def test_reconciles_legacy_schema(self, database):
+        """Test que una base de antes de los scripts de migración llega al esquema actual"""
+        url, engine = database
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR, username VARCHAR, "
+                "hashed_password VARCHAR, is_active BOOLEAN, created_at DATETIME)"
+            ))
+            connection.execute(text(
+                "CREATE TABLE pages (id INTEGER PRIMARY KEY, title VARCHAR, slug VARCHAR, description TEXT, "
+                "config JSON, is_published BOOLEAN, created_at DATETIME, updated_at DATETIME, "
+                "owner_id INTEGER REFERENCES users(id))"
+            ))
+            connection.execute(text("CREATE UNIQUE INDEX ix_pages_slug ON pages (slug)"))
+            connection.execute(text("INSERT INTO users (id, email, username) VALUES (1, 'a@example.com', 'a')"))
+
+        command.upgrade(_config(url), "head")
+
+        columns = {column["name"] for column in inspect(engine).get_columns("users")}
+        assert {"subscription_active", "stripe_customer_id"} <= columns
+        assert "subdomain" in {column["name"] for column in inspect(engine).get_columns("pages")}
+        pages_indexes = _indexes(engine, "pages")
+        assert pages_indexes["ix_pages_slug"]["unique"] == 0
+        assert pages_indexes["uq_subdomain_slug"]["unique"] == 1
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT subscription_active FROM users")).scalar() == 0
+
+    def test_downgrade_and_upgrade_again(self, database):
+        """Test que la cadena de migraciones se puede deshacer y volver a aplicar"""
+        url, engine = database
+        config = _config(url)
+
+        command.upgrade(config, "head")
+        command.downgrade(config, "0001_baseline")
+        assert "ix_components_page_visible_position" not in _indexes(engine, "components")
+        # Los índices de tablas con datos van en 0002, con CONCURRENTLY en PostgreSQL
+        assert "ix_components_page_position_id" not in _indexes(engine, "components")
+        assert "ix_pages_owner_updated_id" not in _indexes(engine, "pages")
+        command.downgrade(config, "base")
+        assert set(inspect(engine).get_table_names()) == {"alembic_version"}
+
+        command.upgrade(config, "head")
+        assert _schema_diff(engine) == []
+
+    def test_backfills_null_updated_at(self, database):
+        """Test que las páginas sin updated_at toman created_at antes de volver la columna NOT NULL"""
+        url, engine = database
+        config = _config(url)
+        command.upgrade(config, "0003_deploy_job_heartbeat")
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (id, email, username) VALUES (1, 'a@example.com', 'a')"))
+            connection.execute(text(
+                "INSERT INTO pages (id, title, slug, subdomain, owner_id, created_at, updated_at) "
+                "VALUES (1, 'a', 'a', 'demo', 1, '2024-05-01 10:00:00', NULL)"
+            ))
+
+        command.upgrade(config, "head")
+
+        with engine.connect() as connection:
+            assert connection.execute(text("SELECT updated_at FROM pages")).scalar() == "2024-05-01 10:00:00"
+        assert not {column["name"]: column for column in inspect(engine).get_columns("pages")}["updated_at"]["nullable"]
+        assert _schema_diff(engine) == []
+
+    def test_postgres_indexes_are_concurrent(self, capsys):
+        """Test que en PostgreSQL los índices se crean con CONCURRENTLY fuera de la transacción"""
+        command.upgrade(_config("postgresql://user@localhost/db"), "0001_baseline:head", sql=True)
+
+        sql = capsys.readouterr().out
+        assert "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_components_page_visible_position" in sql
+        assert "COMMIT" in sql
@@ -0,0 +1,315 @@
+import pytest
+import json
+import os
+import tempfile
+import shutil
+import threading
+import time
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from nextjs_ssg_generator import NextJSSSGGenerator
+
+
+class TestNextJSBatchDeploy:
+
+    @pytest.fixture
+    def temp_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield Path(temp_dir)
+        shutil.rmtree(temp_dir)
+
+    @pytest.fixture
+    def generator(self, temp_dir):
+        generator = NextJSSSGGenerator(output_dir=str(temp_dir / "sites"))
+        generator.nextjs_dir = temp_dir / "nextjs-ssg"
+        generator.data_dir = generator.nextjs_dir / "data"
+        generator.workspaces_dir = temp_dir / "workspaces"
+        generator.build_cache_dir = generator.workspaces_dir / "_build-cache"
+        (generator.nextjs_dir / "src").mkdir(parents=True)
+        (generator.nextjs_dir / "package.json").write_text("{}")
+        return generator
+
+    def _make_page(self, page_id, slug, subdomain="tenant"):
+        page = Mock()
+        page.id = page_id
+        page.slug = slug
+        page.subdomain = subdomain
+        return page
+
+    def _fake_next_build(self, generator, builds):
+        """Simula `next build`: exporta un HTML por cada JSON del batch"""
+        def run(cmd, cwd, **kwargs):
+            builds.append(cwd)
+            for data_file in (cwd / "data" / "pages").glob("*.json"):
+                page_data = json.loads(data_file.read_text())
+                out_dir = cwd / "dist" / "sites" / data_file.stem
+                out_dir.mkdir(parents=True, exist_ok=True)
+                (out_dir / "index.html").write_text(f"<html>{page_data['title']}</html>")
+            (cwd / "dist" / "_next" / "static").mkdir(parents=True, exist_ok=True)
+            (cwd / "dist" / "_next" / "static" / "app.js").write_text("console.log(1)")
+            return Mock(stdout="", stderr="")
+        return run
+
+    def test_deploy_pages_runs_a_single_build(self, generator, temp_dir):
+        """Test que varias páginas se exportan con un solo build"""
+        pages = [self._make_page(1, "uno"), self._make_page(2, "root"), self._make_page(3, "tres", "otro")]
+        generator._prepare_page_data = lambda page, db: {"id": page.id, "title": f"Page {page.id}"}
+
+        builds = []
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=self._fake_next_build(generator, builds)):
+            deployed = generator.deploy_pages(pages, Mock())
+
+        assert len(builds) == 1
+        sites = temp_dir / "sites"
+        assert deployed == {
+            1: str(sites / "tenant" / "uno"),
+            2: str(sites / "tenant"),
+            3: str(sites / "otro" / "tres"),
+        }
+        assert (sites / "tenant" / "uno" / "index.html").read_text() == "<html>Page 1</html>"
+        assert (sites / "tenant" / "index.html").read_text() == "<html>Page 2</html>"
+        assert (sites / "otro" / "tres" / "_next" / "static" / "app.js").exists()
+
+    def test_batch_runs_in_a_workspace(self, generator):
+        """Test que el batch no toca el proyecto y su workspace se elimina"""
+        generator._prepare_page_data = lambda page, db: {"id": page.id, "title": "x"}
+
+        builds = []
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=self._fake_next_build(generator, builds)):
+            generator.deploy_pages([self._make_page(1, "uno")], Mock())
+
+        assert builds[0].parent == generator.workspaces_dir
+        assert not builds[0].exists()
+        assert not (generator.nextjs_dir / "data" / "pages").exists()
+        assert not (generator.nextjs_dir / "dist" / "_next").exists()
+        assert (generator.output_dir / "tenant" / "uno" / "_next" / "static" / "app.js").exists()
+
+    def test_pages_link_their_own_build(self, generator):
+        """Test que cada build publica su _next/ y las páginas en cache siguen en el suyo"""
+        generator._prepare_page_data = lambda page, db: {"id": page.id, "title": f"Page {page.id}"}
+        builds = []
+        fake_build = self._fake_next_build(generator, builds)
+
+        def run(cmd, cwd, **kwargs):
+            result = fake_build(cmd, cwd, **kwargs)
+            (cwd / "dist" / "_next" / "static" / "app.js").write_text(f"console.log({len(builds)})")
+            return result
+
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=run):
+            generator.deploy_pages([self._make_page(1, "uno")], Mock())
+            generator.deploy_pages([self._make_page(1, "uno"), self._make_page(2, "dos")], Mock())
+
+        sites = generator.output_dir / "tenant"
+        assert len(builds) == 2
+        assert (sites / "uno" / "_next" / "static" / "app.js").read_text() == "console.log(1)"
+        assert (sites / "dos" / "_next" / "static" / "app.js").read_text() == "console.log(2)"
+
+    def test_collected_assets_force_a_new_build(self, generator):
+        """Test que una página en cache cuyos assets se recolectaron se vuelve a exportar"""
+        generator._prepare_page_data = lambda page, db: {"id": page.id, "title": f"Page {page.id}"}
+        builds = []
+
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=self._fake_next_build(generator, builds)):
+            generator.deploy_pages([self._make_page(1, "uno")], Mock())
+            (generator.output_dir / "tenant" / "uno" / "_next").unlink()
+            assert len(generator.asset_store.collect_garbage(generator.output_dir, min_age=0)) == 1
+            generator.deploy_pages([self._make_page(1, "uno")], Mock())
+
+        assert len(builds) == 2
+        assert generator.asset_store.verify(generator.output_dir / "tenant" / "uno" / "_next")
+
+    def test_batch_build_failure(self, generator):
+        """Test error cuando falla el build del batch"""
+        import subprocess
+        generator._prepare_page_data = lambda page, db: {"id": page.id, "title": "x"}
+        error = subprocess.CalledProcessError(1, ["npm"], stderr="boom")
+
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=error):
+            with pytest.raises(RuntimeError, match="batch build failed"):
+                generator.deploy_pages([self._make_page(1, "uno")], Mock())
+        assert [p.name for p in generator.workspaces_dir.iterdir()] == []
+
+    def test_deploy_pages_empty(self, generator):
+        """Test que sin páginas no se ejecuta ningún build"""
+        with patch("nextjs_ssg_generator.subprocess.run") as mock_run:
+            assert generator.deploy_pages([], Mock()) == {}
+        mock_run.assert_not_called()
+
+    def test_unchanged_pages_skip_the_build(self, generator):
+        """Test que un segundo rebuild sin cambios no ejecuta next build"""
+        pages = [self._make_page(1, "uno"), self._make_page(2, "dos")]
+        generator._prepare_page_data = lambda page, db: {"id": page.id, "title": f"Page {page.id}"}
+
+        builds = []
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=self._fake_next_build(generator, builds)):
+            generator.deploy_pages(pages, Mock())
+            deployed = generator.deploy_pages(pages, Mock())
+
+        assert len(builds) == 1
+        assert len(deployed) == 2
+        assert generator.render_cache.stats() == {"hits": 2, "misses": 2}
+
+
+    def test_fingerprint_covers_worker_and_build_refresh(self, generator):
+        """Test que el fingerprint incluye el render worker y se recalcula al refrescar el build"""
+        worker = generator.nextjs_dir / "worker" / "render-worker.tsx"
+        worker.parent.mkdir()
+        worker.write_text("render v1")
+        (generator.nextjs_dir / "dist").mkdir()
+        index = generator.nextjs_dir / "dist" / "index.html"
+        index.write_text("<html>v1</html>")
+        before = generator._toolchain_fingerprint()
+
+        worker.write_text("render v2")
+        # Sin build nuevo el fingerprint sigue memorizado
+        assert generator._toolchain_fingerprint() == before
+        index.write_text("<html>v2</html>")
+        os.utime(index, (time.time() + 10, time.time() + 10))
+
+        assert generator._toolchain_fingerprint() != before
+
+
+class TestNextJSBuildWorkspaces:
+
+    @pytest.fixture
+    def temp_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield Path(temp_dir)
+        shutil.rmtree(temp_dir)
+
+    @pytest.fixture
+    def generator(self, temp_dir):
+        generator = NextJSSSGGenerator(output_dir=str(temp_dir / "sites"))
+        generator.nextjs_dir = temp_dir / "nextjs-ssg"
+        generator.workspaces_dir = temp_dir / "workspaces"
+        generator.build_cache_dir = generator.workspaces_dir / "_build-cache"
+        (generator.nextjs_dir / "src" / "app").mkdir(parents=True)
+        (generator.nextjs_dir / "src" / "app" / "page.tsx").write_text("export default 1")
+        (generator.nextjs_dir / "node_modules").mkdir()
+        (generator.nextjs_dir / "dist").mkdir()
+        (generator.nextjs_dir / "dist" / "index.html").write_text("<html>base</html>")
+        return generator
+
+    def _set_concurrency(self, generator, concurrency):
+        generator.build_concurrency = concurrency
+        generator._build_slots = threading.BoundedSemaphore(concurrency)
+
+    def _fake_next_build(self, state):
+        """Simula `next build` exportando data/page.json del workspace"""
+        lock = threading.Lock()
+
+        def run(cmd, cwd, **kwargs):
+            with lock:
+                state["running"] += 1
+                state["max_running"] = max(state["max_running"], state["running"])
+            time.sleep(0.05)
+            page_data = json.loads((cwd / "data" / "page.json").read_text())
+            (cwd / "dist").mkdir(exist_ok=True)
+            (cwd / "dist" / "index.html").write_text(f"<html>{page_data['title']}</html>")
+            (cwd / "dist" / "cache").mkdir(exist_ok=True)
+            (cwd / "dist" / "cache" / "webpack.pack").write_text(page_data["title"])
+            with lock:
+                state["running"] -= 1
+            return Mock(stdout="", stderr="")
+        return run
+
+    def _build_in_parallel(self, generator, titles):
+        results = {}
+
+        def build(title):
+            results[title] = generator._generate_with_nextjs({"id": 1, "title": title})
+
+        threads = [threading.Thread(target=build, args=(title,)) for title in titles]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_workspace_layout(self, generator):
+        """Test que el workspace copia el proyecto y enlaza node_modules"""
+        workspace = generator._create_workspace()
+
+        assert (workspace / "src" / "app" / "page.tsx").read_text() == "export default 1"
+        assert (workspace / "node_modules").is_symlink()
+        assert (workspace / "data").is_dir()
+        assert not (workspace / "dist").exists()
+
+    def test_parallel_builds_do_not_share_output(self, generator):
+        """Test que builds concurrentes no pisan los datos de otros"""
+        self._set_concurrency(generator, 4)
+        state = {"running": 0, "max_running": 0}
+        titles = [f"Page {i}" for i in range(4)]
+
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=self._fake_next_build(state)):
+            results = self._build_in_parallel(generator, titles)
+
+        assert results == {title: f"<html>{title}</html>" for title in titles}
+        assert state["max_running"] > 1
+        assert (generator.nextjs_dir / "dist" / "index.html").read_text() == "<html>base</html>"
+        assert [p.name for p in generator.workspaces_dir.iterdir()] == ["_build-cache"]
+
+    def test_concurrency_limit(self, generator):
+        """Test que no se ejecutan más builds que build_concurrency"""
+        self._set_concurrency(generator, 2)
+        state = {"running": 0, "max_running": 0}
+
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=self._fake_next_build(state)):
+            self._build_in_parallel(generator, [f"Page {i}" for i in range(5)])
+
+        assert state["max_running"] == 2
+
+    def test_build_cache_is_reused(self, generator):
+        """Test que la cache de webpack pasa de un build al siguiente"""
+        state = {"running": 0, "max_running": 0}
+        seeded = []
+        fake_build = self._fake_next_build(state)
+
+        def run(cmd, cwd, **kwargs):
+            seeded.append((cwd / "dist" / "cache" / "webpack.pack").exists())
+            return fake_build(cmd, cwd, **kwargs)
+
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=run):
+            generator._generate_with_nextjs({"id": 1, "title": "first"})
+            generator._generate_with_nextjs({"id": 1, "title": "second"})
+
+        assert seeded == [False, True]
+        assert (generator._build_cache_generations()[-1] / "webpack.pack").read_text() == "second"
+
+    def test_superseded_build_caches_are_pruned(self, generator):
+        """Test que las generaciones viejas de la cache se borran pasado el margen de copia"""
+        state = {"running": 0, "max_running": 0}
+
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=self._fake_next_build(state)):
+            generator._generate_with_nextjs({"id": 1, "title": "first"})
+            generator._generate_with_nextjs({"id": 1, "title": "second"})
+            # Una build que todavía copia la primera generación la sigue encontrando
+            assert len(generator._build_cache_generations()) == 2
+            with patch("nextjs_ssg_generator.BUILD_CACHE_KEEP_SECONDS", 0):
+                generator._generate_with_nextjs({"id": 1, "title": "third"})
+
+        generations = generator._build_cache_generations()
+        assert [(path / "webpack.pack").read_text() for path in generations] == ["third"]
+        assert [path.name for path in generator.build_cache_dir.iterdir()] == [generations[0].name]
+
+    def test_shared_build_runs_once(self, generator):
+        """Test que varios hilos sin build compartido ejecutan `npm run build` una sola vez"""
+        shutil.rmtree(generator.nextjs_dir / "dist")
+        builds = []
+
+        def run(cmd, cwd, **kwargs):
+            builds.append(cwd)
+            time.sleep(0.05)
+            (cwd / "dist").mkdir(exist_ok=True)
+            (cwd / "dist" / "index.html").write_text("<html>base</html>")
+            return Mock(stdout="", stderr="")
+
+        with patch("nextjs_ssg_generator.subprocess.run", side_effect=run):
+            threads = [threading.Thread(target=generator._ensure_nextjs_built) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert builds == [generator.nextjs_dir]
@@ -0,0 +1,183 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from models import Component, Page, User
+
+
+@pytest.fixture
+def session(database):
+    session = sessionmaker(bind=database[0])()
+    owner = User(id=1, email="a@example.com", username="a")
+    other = User(id=2, email="b@example.com", username="b")
+    session.add_all([owner, other])
+    for page_id in range(1, 21):
+        # Fechas repetidas de a pares para ejercitar el desempate por id
+        page = Page(id=page_id, title=f"Página {page_id}", slug=f"p{page_id}", subdomain="demo",
+                    config={}, owner_id=1 if page_id <= 15 else 2,
+                    updated_at=datetime(2024, 5, 1) + timedelta(minutes=page_id // 2))
+        # Posiciones repetidas y fuera de orden: el orden es por posición y luego id
+        page.components = [
+            Component(id=page_id * 10 + offset, type="text", content={}, styles={}, position=position)
+            for offset, position in ((3, 1), (1, 2), (2, 1))
+        ]
+        session.add(page)
+    session.commit()
+    session.expunge_all()
+    yield session
+    session.close()
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+class TestPageQueries:
+
+    def test_page_list_does_not_grow_with_pages(self, async_client, engine, session):
+        """Test que listar páginas usa las mismas consultas para 5 o 15 páginas"""
+        with count_queries(engine) as few:
+            small = async_client.get("/api/pages/?limit=5")
+        session.expunge_all()
+        with count_queries(engine) as many:
+            large = async_client.get("/api/pages/?limit=100")
+
+        assert len(small.json()) == 5 and len(large.json()) == 15
+        assert len(few) == len(many) == 2
+        assert [page["id"] for page in large.json()] == list(range(15, 0, -1))
+
+    def test_components_ordered_by_position(self, async_client):
+        """Test orden determinístico de componentes (posición y luego id)"""
+        page = async_client.get("/api/pages/").json()[0]
+
+        assert [component["id"] for component in page["components"]] == [152, 153, 151]
+
+    def test_page_components_in_one_query(self, async_client, engine):
+        """Test que los componentes y la verificación de propietario salen de una sola consulta"""
+        with count_queries(engine) as queries:
+            response = async_client.get("/api/components/page/3")
+
+        assert [component["id"] for component in response.json()] == [32, 33, 31]
+        assert len(queries) == 1
+
+    def test_page_components_ownership(self, async_client):
+        """Test 403 para páginas ajenas y 404 para inexistentes"""
+        assert async_client.get("/api/components/page/16").status_code == 403
+        assert async_client.get("/api/components/page/99").status_code == 404
+
+    def test_component_fetch_in_one_query(self, async_client, engine):
+        """Test que obtener un componente verifica el propietario en la misma consulta"""
+        with count_queries(engine) as queries:
+            response = async_client.get("/api/components/31")
+
+        assert response.json()["page_id"] == 3
+        assert len(queries) == 1
+        assert async_client.get("/api/components/161").status_code == 403
+        assert async_client.get("/api/components/999").status_code == 404
+
+
+def _walk(client, url, limit):
+    """Recorre un listado siguiendo X-Next-Cursor y devuelve los ids por página"""
+    batches, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        batches.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            assert "link" not in response.headers
+            return batches
+        assert response.headers["link"].endswith('>; rel="next"')
+
+
+class TestKeysetPagination:
+
+    def test_pages_walk_matches_full_listing(self, async_client):
+        """Test que recorrer por cursor devuelve todas las páginas una vez y en orden"""
+        batches = _walk(async_client, "/api/pages/", limit=4)
+
+        assert [len(batch) for batch in batches] == [4, 4, 4, 3]
+        assert sum(batches, []) == [page["id"] for page in async_client.get("/api/pages/").json()]
+
+    def test_exact_multiple_has_no_empty_page(self, async_client):
+        """Test que sin más resultados no se devuelve cursor"""
+        assert [len(batch) for batch in _walk(async_client, "/api/pages/", limit=5)] == [5, 5, 5]
+
+    def test_deep_page_uses_same_queries(self, async_client, engine, session):
+        """Test que una página profunda cuesta lo mismo que la primera"""
+        first = async_client.get("/api/pages/", params={"limit": 2})
+        cursor = first.headers["x-next-cursor"]
+        for _ in range(5):
+            session.expunge_all()
+            cursor = async_client.get("/api/pages/", params={"limit": 2, "cursor": cursor}).headers["x-next-cursor"]
+
+        session.expunge_all()
+        with count_queries(engine) as queries:
+            deep = async_client.get("/api/pages/", params={"limit": 2, "cursor": cursor})
+
+        assert [page["id"] for page in deep.json()] == [3, 2]
+        assert len(queries) == 2
+        assert "(pages.updated_at, pages.id) <" in queries[0]
+
+    def test_components_walk(self, async_client, engine, session):
+        """Test paginación de componentes por (position, id) con una consulta por página"""
+        page = Page(id=50, title="Larga", slug="larga", subdomain="demo", config={}, owner_id=1)
+        page.components = [
+            Component(id=500 + i, type="text", content={}, styles={}, position=i // 3) for i in range(10)
+        ]
+        session.add(page)
+        session.commit()
+
+        with count_queries(engine) as queries:
+            batches = _walk(async_client, "/api/components/page/50", limit=4)
+
+        assert batches == [[500, 501, 502, 503], [504, 505, 506, 507], [508, 509]]
+        assert len(queries) == 3
+
+    def test_cursor_past_the_end_keeps_ownership_check(self, async_client):
+        """Test que un cursor al final devuelve lista vacía y sigue verificando el propietario"""
+        cursor = async_client.get("/api/components/page/3", params={"limit": 2}).headers["x-next-cursor"]
+        last = async_client.get("/api/components/page/3", params={"cursor": cursor})
+
+        assert [component["id"] for component in last.json()] == [31]
+        empty_cursor = async_client.get("/api/components/page/3", params={"limit": 3}).headers.get("x-next-cursor")
+        assert empty_cursor is None
+        assert async_client.get("/api/components/page/16", params={"cursor": cursor}).status_code == 403
+
+    def test_invalid_cursor(self, async_client):
+        """Test que un cursor inválido devuelve 400"""
+        page_cursor = async_client.get("/api/pages/", params={"limit": 1}).headers["x-next-cursor"]
+
+        assert async_client.get("/api/pages/", params={"cursor": "no-es-un-cursor"}).status_code == 400
+        assert async_client.get("/api/components/page/3", params={"cursor": page_cursor}).status_code == 400
+        assert async_client.get("/api/pages/", params={"limit": 0}).status_code == 422
+
+    def test_deprecated_skip(self, async_client):
+        """Test que skip sigue funcionando, avisa Deprecation y enlaza la siguiente página por cursor"""
+        full = [page["id"] for page in async_client.get("/api/pages/").json()]
+
+        response = async_client.get("/api/pages/", params={"skip": 4, "limit": 4})
+
+        assert response.status_code == 200
+        assert response.headers["deprecation"] == "true"
+        assert [page["id"] for page in response.json()] == full[4:8]
+        assert "skip=" not in response.headers["link"]
+        following = async_client.get("/api/pages/", params={"limit": 4, "cursor": response.headers["x-next-cursor"]})
+        assert [page["id"] for page in following.json()] == full[8:12]
+        assert async_client.get("/api/pages/", params={"skip": 4, "cursor": response.headers["x-next-cursor"]}).status_code == 400
+
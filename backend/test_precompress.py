@@ -0,0 +1,89 @@
+import gzip
+import os
+import pytest
+from pathlib import Path
+
+import precompress
+from precompress import precompress_file, precompress_files, precompress_tree, remove_precompressed
+from deploy_manifest import sync_files
+from asset_store import AssetStore
+
+HTML = "<html><body>" + "<p>Hola mundo</p>" * 50 + "</body></html>"
+
+
+class TestPrecompress:
+
+    def test_writes_gzip_and_brotli_siblings(self, tmp_path):
+        """Test que se generan variantes .gz y .br con el mtime del original"""
+        page = tmp_path / "index.html"
+        page.write_text(HTML)
+
+        written = precompress_file(page)
+
+        assert gzip.decompress((tmp_path / "index.html.gz").read_bytes()).decode() == HTML
+        assert (tmp_path / "index.html.gz").stat().st_mtime_ns == page.stat().st_mtime_ns
+        if precompress.brotli is not None:
+            assert written == 2
+            assert precompress.brotli.decompress((tmp_path / "index.html.br").read_bytes()).decode() == HTML
+
+    def test_unchanged_files_are_skipped(self, tmp_path):
+        """Test que un archivo sin cambios no se vuelve a comprimir"""
+        page = tmp_path / "index.html"
+        page.write_text(HTML)
+        precompress_file(page)
+
+        assert precompress_file(page) == 0
+
+        page.write_text(HTML + "<!-- changed -->")
+        os.utime(page, ns=(page.stat().st_atime_ns, page.stat().st_mtime_ns + 1))
+        assert precompress_file(page) > 0
+        assert gzip.decompress((tmp_path / "index.html.gz").read_bytes()).decode().endswith("<!-- changed -->")
+
+    def test_small_and_binary_files_are_skipped(self, tmp_path):
+        """Test que no se comprimen archivos pequeños ni binarios"""
+        (tmp_path / "tiny.css").write_text("a{}")
+        (tmp_path / "logo.png").write_bytes(b"\x89PNG" * 200)
+
+        stats = precompress_tree(tmp_path)
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["logo.png", "tiny.css"]
+        assert stats == {"compressed": 0, "unchanged": 1}
+
+    def test_parallel_tree(self, tmp_path):
+        """Test compresión en paralelo de un árbol de assets"""
+        for i in range(8):
+            (tmp_path / "static" / f"chunk{i}.js").parent.mkdir(exist_ok=True)
+            (tmp_path / "static" / f"chunk{i}.js").write_text(f"console.log({i});" * 100)
+
+        stats = precompress_tree(tmp_path, workers=4)
+
+        assert stats["compressed"] == 8
+        assert all((tmp_path / "static" / f"chunk{i}.js.gz").exists() for i in range(8))
+
+    def test_deleted_files_lose_their_variants(self, tmp_path):
+        """Test que sync_files elimina las variantes de archivos borrados"""
+        sync_files(tmp_path, {"old.html": HTML})
+        precompress_files([tmp_path / "old.html"])
+
+        sync_files(tmp_path, {"new.html": HTML})
+
+        assert not list(tmp_path.glob("old.html*"))
+
+    def test_remove_precompressed(self, tmp_path):
+        """Test eliminación de variantes de un archivo"""
+        page = tmp_path / "index.html"
+        page.write_text(HTML)
+        precompress_file(page)
+        remove_precompressed(page)
+        assert [p.name for p in tmp_path.iterdir()] == ["index.html"]
+
+    def test_asset_store_entries_are_precompressed(self, tmp_path):
+        """Test que el store publica los assets con sus variantes"""
+        source = tmp_path / "dist" / "_next"
+        source.mkdir(parents=True)
+        (source / "app.js").write_text("console.log('app');" * 50)
+
+        store_dir = AssetStore(tmp_path / "_assets", precompress=True).publish(source)
+
+        assert (store_dir / "app.js.gz").exists()
+        assert "app.js.gz" not in (store_dir / "manifest.json").read_text()
@@ -0,0 +1,152 @@
+import os
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from auth import get_current_active_user
+from database import get_async_db, get_db
+from generator import SiteGenerator
+from main import app
+from render_cache import PreviewCache
+
+
+def _component(text="Hola"):
+    return Mock(id=1, type="text", position=0, styles={},
+                content={"text": f'<p class="p-4 text-center">{text}</p>'})
+
+
+@pytest.fixture
+def page(make_page):
+    return make_page(id=7, title="Inicio", slug="inicio")
+
+
+def _files(root):
+    return sorted(os.path.join(dirpath, name) for dirpath, _, names in os.walk(root) for name in names)
+
+
+class TestPreviewCache:
+
+    def test_lru_and_content_key(self):
+        """Test desalojo LRU y miss cuando cambia la clave de contenido"""
+        cache = PreviewCache(max_entries=2)
+        cache.put(1, "a", "<p>1</p>")
+        cache.put(2, "b", "<p>2</p>")
+        assert cache.get(1, "a") == "<p>1</p>"
+        cache.put(3, "c", "<p>3</p>")
+
+        assert cache.get(2, "b") is None
+        assert cache.get(1, "otra") is None
+        assert cache.get(1, "a") is None
+        assert cache.get(3, "c") == "<p>3</p>"
+
+    def test_invalidate(self):
+        """Test que invalidar descarta el preview de la página"""
+        cache = PreviewCache()
+        cache.put(1, "a", "<p>1</p>")
+
+        cache.invalidate(1)
+
+        assert cache.stats() == {"hits": 0, "misses": 0, "size": 0}
+
+
+class TestGeneratorPreview:
+
+    @pytest.fixture
+    def generator(self, tmp_path):
+        return SiteGenerator(output_dir=str(tmp_path / "sites"), cache_dir=str(tmp_path / "cache"))
+
+    def test_preview_is_rendered_in_memory(self, generator, tmp_path, make_db, page):
+        """Test que el preview no escribe archivos y lleva los estilos inline"""
+        before = _files(tmp_path)
+
+        key, html = generator.preview_page(page, make_db(page=page, components=[_component()]))
+
+        assert _files(tmp_path) == before
+        assert "Hola" in html
+        assert "/_tw/" not in html and 'href="assets/' not in html
+        assert ".p-4{" in html and ".text-center{" in html
+        assert key == generator._page_cache_key(page, [_component()])
+
+    def test_preview_is_cached_until_content_changes(self, generator, make_db, page):
+        """Test que el preview se reutiliza hasta que cambia el contenido"""
+        generator.preview_page(page, make_db(page=page, components=[_component()]))
+
+        with patch.object(generator, "_render_preview", wraps=generator._render_preview) as render:
+            generator.preview_page(page, make_db(page=page, components=[_component()]))
+            render.assert_not_called()
+            key, html = generator.preview_page(page, make_db(page=page, components=[_component("Chau")]))
+            render.assert_called_once()
+
+        assert "Chau" in html
+        assert generator.preview_cache.stats()["size"] == 1
+
+
+class TestPreviewEndpoint:
+
+    @pytest.fixture
+    def generator(self, tmp_path):
+        generator = SiteGenerator(output_dir=str(tmp_path / "sites"), cache_dir=str(tmp_path / "cache"))
+        with patch("routers.deployment.generator", generator):
+            yield generator
+
+    @pytest.fixture
+    def client(self):
+        app.dependency_overrides[get_current_active_user] = lambda: Mock(id=1)
+        yield TestClient(app)
+        app.dependency_overrides.clear()
+
+    @pytest.fixture
+    def use_db(self, make_db):
+        def use(page, components):
+            app.dependency_overrides[get_db] = lambda: make_db(page=page, components=components)
+        return use
+
+    def test_preview_with_etag(self, client, generator, make_page, page, use_db):
+        """Test preview HTML con ETag fuerte y 304 con If-None-Match"""
+        use_db(page, [_component()])
+
+        response = client.get("/api/pages/7/preview")
+        etag = response.headers["etag"]
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/html")
+        assert "Hola" in response.text
+        assert etag.startswith('"') and not etag.startswith("W/")
+
+        not_modified = client.get("/api/pages/7/preview", headers={"If-None-Match": f'"x", W/{etag}'})
+        assert not_modified.status_code == 304
+        assert not_modified.headers["etag"] == etag
+
+        use_db(make_page(id=7, slug="inicio", title="Otro título"), [_component()])
+        changed = client.get("/api/pages/7/preview", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+
+    def test_preview_requires_owner(self, client, generator, make_page, use_db):
+        """Test que solo el propietario puede ver el preview"""
+        use_db(make_page(id=7, slug="inicio", owner_id=2), [])
+
+        assert client.get("/api/pages/7/preview").status_code == 403
+
+    def test_preview_page_not_found(self, client, generator, use_db):
+        """Test preview de una página inexistente"""
+        use_db(None, [])
+
+        assert client.get("/api/pages/7/preview").status_code == 404
+
+    def test_component_update_invalidates_preview(self, client, generator, page):
+        """Test que editar un componente descarta el preview de su página"""
+        generator.preview_cache.put(7, "clave", "<p>viejo</p>")
+        component = Mock(id=1, page_id=7, type="text", content={}, styles={}, position=0, is_visible=True,
+                         created_at=datetime(2024, 5, 1), page=page)
+        # El router de componentes es async: sesión async simulada
+        db = AsyncMock()
+        db.execute.return_value = Mock(**{"scalars.return_value.first.return_value": component})
+        app.dependency_overrides[get_async_db] = lambda: db
+
+        response = client.put("/api/components/1", json={"content": {"text": "nuevo"}})
+
+        assert response.status_code == 200
+        assert generator.preview_cache.stats()["size"] == 0
@@ -0,0 +1,227 @@
+import os
+import pytest
+import tempfile
+import time
+import shutil
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from render_cache import FragmentCache, RenderCache, hash_payload
+from generator import SiteGenerator
+from models import Component
+
+
+class TestRenderCache:
+
+    @pytest.fixture
+    def cache(self):
+        temp_dir = tempfile.mkdtemp()
+        yield RenderCache(Path(temp_dir))
+        shutil.rmtree(temp_dir)
+
+    def test_hash_payload_is_stable(self):
+        """Test que el hash no depende del orden de las claves"""
+        assert hash_payload({"a": 1, "b": [1, 2]}) == hash_payload({"b": [1, 2], "a": 1})
+        assert hash_payload({"a": 1}) != hash_payload({"a": 2})
+
+    def test_key_depends_on_fingerprint(self, cache):
+        """Test que un cambio de toolchain invalida la cache"""
+        page_data = {"id": 1, "title": "Test"}
+        assert cache.make_key(page_data, "v1") == cache.make_key(page_data, "v1")
+        assert cache.make_key(page_data, "v1") != cache.make_key(page_data, "v2")
+
+    def test_get_and_put(self, cache):
+        """Test guardado, lectura y contadores"""
+        key = cache.make_key({"id": 1}, "v1")
+        assert cache.get(key) is None
+        cache.put(key, "<html>cached</html>")
+        assert cache.get(key) == "<html>cached</html>"
+        assert cache.stats() == {"hits": 1, "misses": 1}
+
+    def _entry(self, cache, n, age):
+        """Entrada con sidecars, usada por última vez hace age segundos"""
+        key = cache.make_key({"id": n}, "v1")
+        cache.put(key, "x" * 100)
+        cache.record_deployed_digest(key, "digest")
+        cache.record_assets(key, "assets")
+        used = time.time() - age
+        for suffix in (".html", ".deployed", ".assets"):
+            os.utime(cache._path(key).with_suffix(suffix), (used, used))
+        return key
+
+    def test_prune_removes_old_entries_with_sidecars(self, cache):
+        """Test que la poda por edad borra la entrada y sus sidecars"""
+        old = self._entry(cache, 1, age=3600)
+        recent = self._entry(cache, 2, age=10)
+
+        assert cache.prune(max_bytes=0, max_age=600) == 1
+
+        assert list(cache.cache_dir.glob(f"*/{old}*")) == []
+        assert cache.get(recent) is not None
+        assert cache.assets(recent) == "assets"
+
+    def test_prune_evicts_least_recently_used(self, cache):
+        """Test que la poda por tamaño conserva las entradas usadas más recientemente"""
+        keys = [self._entry(cache, n, age=100 * (3 - n)) for n in range(3)]
+        # Un hit refresca la entrada más antigua
+        assert cache.get(keys[0]) is not None
+        entry_size = sum(path.stat().st_size for path in cache.cache_dir.glob(f"*/{keys[1]}*"))
+
+        assert cache.prune(max_bytes=2 * entry_size, max_age=0) == 1
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+
+    def test_prune_removes_orphaned_files(self, cache):
+        """Test que se borran sidecars huérfanos y temporales viejos, no los recientes"""
+        key = self._entry(cache, 1, age=2 * 3600)
+        cache._path(key).unlink()
+        stale_tmp = cache._path(key).with_name("stale.1.1.tmp")
+        fresh_tmp = cache._path(key).with_name(".fresh.html.1.1.tmp")
+        for path, age in ((stale_tmp, 2 * 3600), (fresh_tmp, 0)):
+            path.write_text("partial")
+            os.utime(path, (time.time() - age, time.time() - age))
+
+        assert cache.prune() == 0
+
+        assert sorted(path.name for path in cache._path(key).parent.iterdir()) == [fresh_tmp.name]
+
+
+class TestFragmentCache:
+
+    def test_lru_eviction(self):
+        """Test que se descarta el fragmento usado hace más tiempo"""
+        cache = FragmentCache(max_entries=2)
+        cache.put("a", "<a>")
+        cache.put("b", "<b>")
+        assert cache.get("a") == "<a>"
+        cache.put("c", "<c>")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "<a>"
+        assert cache.get("c") == "<c>"
+        assert cache.stats() == {"hits": 3, "misses": 1, "size": 2}
+
+    def test_disabled_cache(self):
+        """Test que max_entries=0 desactiva la cache"""
+        cache = FragmentCache(max_entries=0)
+        cache.put("a", "<a>")
+        assert cache.get("a") is None
+
+
+class TestSiteGeneratorFragmentCache:
+
+    @pytest.fixture
+    def generator(self):
+        temp_dir = tempfile.mkdtemp()
+        yield SiteGenerator(output_dir=temp_dir)
+        shutil.rmtree(temp_dir)
+
+    def _component(self, component_type, content, styles=None):
+        component = Mock(spec=Component)
+        component.type = component_type
+        component.content = content
+        component.styles = styles or {}
+        return component
+
+    def test_identical_components_render_once(self, generator):
+        """Test que un header repetido en varias páginas se renderiza una vez"""
+        content = {"title": "Tenant", "menu_items": [{"text": "Home", "link": "/"}]}
+        with patch.object(generator, "_render_component", wraps=generator._render_component) as render:
+            first = generator.generate_component_html(self._component("header", content))
+            second = generator.generate_component_html(self._component("header", dict(content)))
+
+        assert first == second
+        render.assert_called_once()
+        assert generator.fragment_cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+    def test_key_includes_type_content_and_styles(self, generator):
+        """Test que tipo, contenido y estilos distintos no comparten fragmento"""
+        generator.generate_component_html(self._component("text", {"text": "Hola"}))
+        generator.generate_component_html(self._component("text", {"text": "Adiós"}))
+        generator.generate_component_html(self._component("text", {"text": "Hola"}, {"color": "white"}))
+        generator.generate_component_html(self._component("footer", {"text": "Hola"}))
+
+        assert generator.fragment_cache.stats() == {"hits": 0, "misses": 4, "size": 4}
+
+
+class TestSiteGeneratorRenderCache:
+
+    @pytest.fixture
+    def temp_output_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield temp_dir
+        shutil.rmtree(temp_dir)
+
+    @pytest.fixture
+    def generator(self, temp_output_dir):
+        return SiteGenerator(output_dir=temp_output_dir)
+
+    @pytest.fixture
+    def page(self, make_page):
+        return make_page(title="Cached Page", slug="cached", subdomain="test",
+                         description="A cached page", config={"theme": "default"})
+
+    @pytest.fixture
+    def component(self):
+        component = Mock(spec=Component)
+        component.id = 1
+        component.type = "text"
+        component.content = {"text": "<p>Hola</p>", "alignment": "left"}
+        component.styles = {}
+        component.position = 0
+        return component
+
+    def test_repeat_render_is_a_hit(self, generator, page, component, make_db):
+        """Test que renderizar dos veces lo mismo usa la cache"""
+        first = generator.generate_page(page, make_db([component]))
+        generator.generate_component_html = Mock(side_effect=AssertionError("should not render"))
+        second = generator.generate_page(page, make_db([component]))
+
+        assert first == second
+        assert generator.render_cache.stats() == {"hits": 1, "misses": 1}
+
+    def test_content_change_is_a_miss(self, generator, page, component, make_db):
+        """Test que un cambio en un componente invalida la cache"""
+        generator.generate_page(page, make_db([component]))
+        component.content = {"text": "<p>Adiós</p>", "alignment": "left"}
+        html = generator.generate_page(page, make_db([component]))
+
+        assert "Adiós" in html
+        assert generator.render_cache.stats() == {"hits": 0, "misses": 2}
+
+    def test_unchanged_deploy_skips_write(self, generator, page, component, temp_output_dir, make_db):
+        """Test que un deploy sin cambios no reescribe index.html"""
+        generator.deploy_page(page, make_db([component]))
+        html_file = Path(temp_output_dir) / "test" / "cached" / "index.html"
+        html_file.write_text("marker")
+
+        generator.deploy_page(page, make_db([component]))
+
+        assert html_file.read_text() == "marker"
+
+    def test_cached_deploy_rewrites_missing_file(self, generator, page, component, temp_output_dir, make_db):
+        """Test que un hit de cache vuelve a escribir una página eliminada"""
+        generator.deploy_page(page, make_db([component]))
+        html_file = Path(temp_output_dir) / "test" / "cached" / "index.html"
+        html_file.unlink()
+
+        generator.deploy_page(page, make_db([component]))
+
+        assert "Cached Page" in html_file.read_text()
+        assert generator.render_cache.stats()["hits"] == 1
+
+    def test_revert_redeploys_cached_version(self, generator, page, component, temp_output_dir, make_db):
+        """Test que volver a una versión en cache la deploya aunque sea un hit"""
+        html_file = Path(temp_output_dir) / "test" / "cached" / "index.html"
+        generator.deploy_page(page, make_db([component]))
+        component.content = {"text": "<p>Versión dos</p>", "alignment": "left"}
+        generator.deploy_page(page, make_db([component]))
+        assert "Versión dos" in html_file.read_text()
+
+        component.content = {"text": "<p>Hola</p>", "alignment": "left"}
+        generator.deploy_page(page, make_db([component]))
+
+        assert "Hola" in html_file.read_text()
+        assert "Versión dos" not in html_file.read_text()
+        assert generator.render_cache.stats()["hits"] == 1
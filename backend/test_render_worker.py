@@ -0,0 +1,239 @@
+import pytest
+import sys
+import tempfile
+import shutil
+import threading
+import time
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from render_worker import NodeRenderWorker, RenderWorkerError, PageRenderError
+from nextjs_ssg_generator import NextJSSSGGenerator, RENDER_MODE_BUILD, RENDER_MODE_WORKER
+
+
+# Proceso de prueba que habla el mismo protocolo que worker/render-worker.tsx
+FAKE_WORKER = r'''
+import json, sys, time, os
+for line in sys.stdin:
+    request = json.loads(line)
+    if request["type"] == "ping":
+        response = {"id": request["id"], "ok": True}
+    else:
+        title = request["page"]["title"]
+        if title == "crash":
+            os._exit(1)
+        if title == "slow":
+            time.sleep(5)
+        if title == "error":
+            response = {"id": request["id"], "ok": False, "error": "boom"}
+        else:
+            response = {"id": request["id"], "ok": True, "html": "<main>" + title + "</main>"}
+    sys.stdout.write(json.dumps(response) + "\n")
+    sys.stdout.flush()
+'''
+
+
+class TestNodeRenderWorker:
+
+    @pytest.fixture
+    def worker(self):
+        worker = NodeRenderWorker(
+            command=[sys.executable, "-u", "-c", FAKE_WORKER],
+            render_timeout=1,
+            startup_timeout=5,
+        )
+        yield worker
+        worker.stop()
+
+    def test_render_starts_worker_lazily(self, worker):
+        """Test que el worker se inicia en el primer render"""
+        assert not worker.is_running
+        html = worker.render({"title": "Hola"})
+        assert html == "<main>Hola</main>"
+        assert worker.is_running
+
+    def test_worker_is_reused_between_renders(self, worker):
+        """Test que varios renders usan el mismo proceso"""
+        worker.render({"title": "uno"})
+        pid = worker._process.pid
+        assert worker.render({"title": "dos"}) == "<main>dos</main>"
+        assert worker._process.pid == pid
+
+    def test_health_check(self, worker):
+        """Test health check antes y después de iniciar"""
+        assert worker.health_check() is False
+        worker.start()
+        assert worker.health_check() is True
+        worker.stop()
+        assert worker.health_check() is False
+
+    def test_render_error_is_reported(self, worker):
+        """Test que un error de render se propaga sin reiniciar el worker"""
+        worker.start()
+        pid = worker._process.pid
+        with pytest.raises(PageRenderError, match="boom"):
+            worker.render({"title": "error"})
+        assert worker.render({"title": "ok"}) == "<main>ok</main>"
+        assert worker.restarts == 0
+        assert worker._process.pid == pid
+
+    def test_restart_on_crash(self, worker):
+        """Test que el worker se reinicia si el proceso muere"""
+        with pytest.raises(RenderWorkerError):
+            worker.render({"title": "crash"})
+        assert worker.render({"title": "back"}) == "<main>back</main>"
+        assert worker.restarts == 1
+
+    def test_render_timeout(self, worker):
+        """Test que un render lento expira y el worker se reinicia"""
+        with pytest.raises(RenderWorkerError, match="timed out"):
+            worker.render({"title": "slow"})
+        assert worker.restarts == 1
+        assert worker.render({"title": "fast"}) == "<main>fast</main>"
+
+    def test_gives_up_after_max_restarts(self):
+        """Test que deja de reiniciar tras max_restarts"""
+        worker = NodeRenderWorker(
+            command=[sys.executable, "-u", "-c", FAKE_WORKER],
+            render_timeout=1,
+            max_restarts=0,
+        )
+        try:
+            with pytest.raises(RenderWorkerError):
+                worker.render({"title": "crash"})
+            with pytest.raises(RenderWorkerError, match="giving up"):
+                worker.render({"title": "again"})
+        finally:
+            worker.stop()
+
+    def test_restarts_are_limited_per_window(self):
+        """Test que los reinicios viejos no cuentan para max_restarts"""
+        worker = NodeRenderWorker(
+            command=[sys.executable, "-u", "-c", FAKE_WORKER],
+            render_timeout=1,
+            max_restarts=1,
+            restart_window=0.5,
+        )
+        try:
+            for _ in range(2):
+                with pytest.raises(RenderWorkerError):
+                    worker.render({"title": "crash"})
+            with pytest.raises(RenderWorkerError, match="giving up"):
+                worker.render({"title": "again"})
+
+            time.sleep(0.6)
+            assert worker.render({"title": "back"}) == "<main>back</main>"
+            assert worker.restarts == 2
+        finally:
+            worker.stop()
+
+    def test_startup_failure(self):
+        """Test error si el comando no responde al ping"""
+        worker = NodeRenderWorker(
+            command=[sys.executable, "-c", "import sys; sys.exit(1)"],
+            startup_timeout=2,
+        )
+        with pytest.raises(RenderWorkerError, match="failed to start"):
+            worker.start()
+        assert not worker.is_running
+
+
+class TestNextJSWorkerMode:
+
+    @pytest.fixture
+    def temp_output_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield temp_dir
+        shutil.rmtree(temp_dir)
+
+    @pytest.fixture
+    def generator(self, temp_output_dir):
+        generator = NextJSSSGGenerator(output_dir=temp_output_dir, render_mode=RENDER_MODE_WORKER)
+        generator.nextjs_dir = Path(temp_output_dir) / "nextjs-ssg"
+        dist_dir = generator.nextjs_dir / "dist"
+        dist_dir.mkdir(parents=True)
+        (dist_dir / "index.html").write_text(
+            '<!DOCTYPE html><html><head><link rel="stylesheet" href="/_next/static/css/app.css">'
+            '<script src="/_next/static/chunks/main.js" async=""></script></head>'
+            '<body><main><section>old</section></main>'
+            '<script>self.__next_f.push([1,"old"])</script></body></html>'
+        )
+        return generator
+
+    def test_worker_output_is_wrapped_in_build_shell(self, generator):
+        """Test que el HTML del worker reemplaza el <main> del build"""
+        worker = Mock()
+        worker.render.return_value = "<main><section>new</section></main>"
+        generator._render_worker = worker
+
+        html = generator._generate_with_worker({"title": "Test"})
+
+        assert "<main><section>new</section></main>" in html
+        assert "old" not in html
+        assert "<script" not in html
+        assert '/_next/static/css/app.css' in html
+        assert html.startswith("<!DOCTYPE html>")
+
+    def test_generate_page_uses_worker_mode(self, generator):
+        """Test que generate_page no ejecuta next build en modo worker"""
+        generator._prepare_page_data = Mock(return_value={"title": "Test"})
+        with patch.object(generator, "_generate_with_worker", return_value="<html></html>") as mock_worker, \
+             patch.object(generator, "_generate_with_nextjs") as mock_build:
+            assert generator.generate_page(Mock(), Mock()) == "<html></html>"
+        mock_worker.assert_called_once_with({"title": "Test"})
+        mock_build.assert_not_called()
+
+    def test_preview_uses_worker_in_build_mode(self, generator):
+        """Test que el preview no ejecuta next build aunque el modo sea build"""
+        generator.render_mode = RENDER_MODE_BUILD
+        generator._prepare_page_data = Mock(return_value={"title": "Test"})
+        worker = Mock()
+        worker.render.return_value = "<main><section>new</section></main>"
+        generator._render_worker = worker
+
+        with patch.object(generator, "_generate_with_nextjs") as mock_build:
+            _, html = generator.preview_page(Mock(id=1), Mock())
+
+        mock_build.assert_not_called()
+        assert "<section>new</section>" in html
+
+    def test_preview_inlines_next_assets(self, generator):
+        """Test que el preview lleva el CSS y las fuentes de /_next/ inline"""
+        css_dir = generator.nextjs_dir / "dist" / "_next" / "static" / "css"
+        media_dir = generator.nextjs_dir / "dist" / "_next" / "static" / "media"
+        css_dir.mkdir(parents=True)
+        media_dir.mkdir(parents=True)
+        (css_dir / "app.css").write_text("@font-face{src:url(/_next/static/media/f.woff2)}body{margin:0}")
+        (media_dir / "f.woff2").write_bytes(b"font")
+        worker = Mock()
+        worker.render.return_value = "<main>new</main>"
+        generator._render_worker = worker
+
+        html = generator._generate_with_worker({"title": "Test"}, inline_assets=True)
+
+        assert "/_next/" not in html
+        assert "<style>@font-face{src:url(data:font/woff2;base64,Zm9udA==)}body{margin:0}</style>" in html
+
+    def test_render_worker_is_created_once(self, generator):
+        """Test que renders concurrentes comparten un solo proceso worker"""
+        def slow_worker(**kwargs):
+            time.sleep(0.05)
+            return Mock()
+
+        with patch("nextjs_ssg_generator.NodeRenderWorker", side_effect=slow_worker) as worker_class, \
+             patch("nextjs_ssg_generator.atexit.register"):
+            workers = []
+            threads = [threading.Thread(target=lambda: workers.append(generator._get_render_worker()))
+                       for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        worker_class.assert_called_once()
+        assert len({id(worker) for worker in workers}) == 1
+
+    def test_render_worker_health_before_start(self, generator):
+        """Test health del worker cuando aún no se ha iniciado"""
+        health = generator.render_worker_health()
+        assert health == {"mode": "worker", "running": False, "healthy": False, "restarts": 0}
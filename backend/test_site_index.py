@@ -0,0 +1,113 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from site_index import INDEX_NAME, SiteIndex
+from generator import SiteGenerator
+
+
+def _page(slug, subdomain="demo", page_id=1, title="Inicio", updated_at=datetime(2024, 5, 1, 12, 0, 0)):
+    return Mock(id=page_id, slug=slug, subdomain=subdomain, title=title, description="", config={},
+                updated_at=updated_at)
+
+
+class TestSiteIndex:
+
+    def test_deploy_adds_entry_and_sitemap(self, tmp_path):
+        """Test que un deploy agrega la página al índice y al sitemap"""
+        index = SiteIndex(tmp_path, url_template="https://{subdomain}.example.com")
+        index.record_deploy(_page("root"))
+        index.record_deploy(_page("precios", page_id=2, title="Precios"))
+
+        assert index.get("demo", "precios") == {
+            "page_id": 2, "title": "Precios", "lastmod": "2024-05-01T12:00:00Z"
+        }
+        assert index.get("demo", "") == index.get("demo", "root")
+        sitemap = (tmp_path / "demo" / "sitemap.xml").read_text()
+        assert "<loc>https://demo.example.com/</loc>" in sitemap
+        assert "<loc>https://demo.example.com/precios</loc><lastmod>2024-05-01T12:00:00Z</lastmod>" in sitemap
+
+    def test_undeploy_removes_entry(self, tmp_path):
+        """Test que un undeploy elimina solo su entrada"""
+        index = SiteIndex(tmp_path)
+        index.record_deploy(_page("a", page_id=1))
+        index.record_deploy(_page("b", page_id=2))
+
+        index.record_undeploy("demo", "a")
+
+        assert set(index.pages("demo")) == {"b"}
+        assert "/a</loc>" not in (tmp_path / "demo" / "sitemap.xml").read_text()
+
+        index.record_undeploy("demo", "b")
+        assert not (tmp_path / "demo" / "sitemap.xml").exists()
+
+    def test_unchanged_entry_is_not_rewritten(self, tmp_path):
+        """Test que redeployar sin cambios no reescribe el índice"""
+        index = SiteIndex(tmp_path)
+        index.record_deploy(_page("a"))
+        mtime = (tmp_path / "demo" / INDEX_NAME).stat().st_mtime_ns
+
+        index.record_deploy(_page("a"))
+
+        assert (tmp_path / "demo" / INDEX_NAME).stat().st_mtime_ns == mtime
+
+    def test_existing_deployments_are_scanned_once(self, tmp_path):
+        """Test que un subdominio sin índice se indexa una sola vez"""
+        (tmp_path / "demo" / "vieja").mkdir(parents=True)
+        (tmp_path / "demo" / "vieja" / "index.html").write_text("<html></html>")
+        (tmp_path / "demo" / "index.html").write_text("<html></html>")
+        (tmp_path / "demo" / "_next").mkdir()
+        index = SiteIndex(tmp_path)
+
+        assert set(index.pages("demo")) == {"", "vieja"}
+        with patch.object(index, "_scan") as scan:
+            index.pages("demo")
+            SiteIndex(tmp_path).pages("demo")
+            scan.assert_not_called()
+
+    def test_lookups_use_cached_index(self, tmp_path):
+        """Test que las búsquedas no releen el índice si no cambió"""
+        index = SiteIndex(tmp_path)
+        index.record_deploy(_page("a"))
+        index.pages("demo")
+
+        with patch.object(index, "_read") as read:
+            assert index.get("demo", "a") is not None
+            assert index.get("otro", "a") is None
+            read.assert_not_called()
+
+    def test_index_is_compact_json(self, tmp_path):
+        """Test formato del índice"""
+        SiteIndex(tmp_path).record_deploy(_page("a"))
+
+        raw = (tmp_path / "demo" / INDEX_NAME).read_text()
+        assert " " not in raw
+        assert json.loads(raw)["pages"]["a"]["page_id"] == 1
+
+    def test_invalid_page_does_not_fail(self, tmp_path):
+        """Test que un error del índice no interrumpe el deploy"""
+        index = SiteIndex(tmp_path)
+
+        index.record_deploy(Mock(slug="a", subdomain="demo", updated_at=None))
+
+        assert index.get("demo", "a") is None
+
+
+class TestGeneratorIndex:
+
+    def test_deploy_and_delete_update_index(self, tmp_path):
+        """Test que el generador mantiene el índice en deploy y delete"""
+        generator = SiteGenerator(output_dir=str(tmp_path), cache_dir=str(tmp_path / ".cache"))
+        db = Mock()
+        db.query.return_value.filter.return_value.order_by.return_value.all.return_value = []
+
+        generator.deploy_page(_page("landing"), db)
+        generator.deploy_page(_page("root", page_id=2), db)
+        assert set(generator.site_index.pages("demo")) == {"landing", ""}
+
+        assert generator.delete_page("landing", "demo") is True
+        assert not (tmp_path / "demo" / "landing").exists()
+        assert generator.delete_page("root", "demo") is True
+        assert generator.site_index.pages("demo") == {}
+        assert not Path(tmp_path / "demo" / "sitemap.xml").exists()
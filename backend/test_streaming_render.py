@@ -0,0 +1,159 @@
+import os
+import tracemalloc
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+from asset_fingerprint import rewrite_asset_urls, rewrite_asset_urls_stream
+from deploy_manifest import AtomicStreamWriter, load_manifest, sync_stream
+from generator import SiteGenerator
+from html_minifier import HtmlMinifier, minify_html
+from render_cache import FragmentCache
+from tailwind_css import STYLESHEET_PLACEHOLDER, ClassCollector, TailwindBuilder, extract_classes
+
+
+def _components(count, size=20):
+    return [
+        Mock(id=i, type="text", position=i, styles={},
+             content={"text": f"<p class=\"p-{i % 8} mt-2\">Párrafo {i} " + "contenido " * size + "</p>"})
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def generator(tmp_path):
+    generator = SiteGenerator(output_dir=str(tmp_path / "sites"), cache_dir=str(tmp_path / "cache"))
+    # El deploy en streaming se prueba con la minificación en el camino
+    generator.minifier = HtmlMinifier(enabled=True)
+    return generator
+
+
+class TestAtomicStreamWriter:
+
+    def test_patch_marker_split_across_chunks(self, tmp_path):
+        """Test que un marcador cortado entre dos partes se corrige en el archivo"""
+        path = tmp_path / "index.html"
+        with AtomicStreamWriter(path, ["@@MARK@@"]) as writer:
+            for chunk in ["<p>ñandú</p><a href=\"@@MA", "RK@@\">", "x</a>@@MARK@@"]:
+                writer.write(chunk)
+            writer.patch("@@MARK@@", "/a/b.css")
+            assert not path.exists()
+            writer.commit()
+
+        assert path.read_text() == '<p>ñandú</p><a href="/a/b.css">x</a>/a/b.css'
+
+    def test_patch_requires_same_length(self, tmp_path):
+        """Test que el valor debe medir lo mismo que el marcador"""
+        with AtomicStreamWriter(tmp_path / "a.html", ["@@"]) as writer:
+            writer.write("@@")
+            with pytest.raises(ValueError):
+                writer.patch("@@", "largo")
+
+    def test_error_leaves_no_file(self, tmp_path):
+        """Test que un error durante el streaming no deja archivos"""
+        with pytest.raises(RuntimeError):
+            with AtomicStreamWriter(tmp_path / "a.html") as writer:
+                writer.write("<p>")
+                raise RuntimeError("render")
+
+        assert list(tmp_path.iterdir()) == []
+
+    def test_sync_stream_skips_unchanged(self, tmp_path):
+        """Test que un archivo igual al del manifest no se reemplaza"""
+        for _ in range(2):
+            with AtomicStreamWriter(tmp_path / "index.html") as writer:
+                writer.write("<p>hola</p>")
+                written = sync_stream(tmp_path, "index.html", writer)
+            inode = (tmp_path / "index.html").stat().st_ino if written else inode
+
+        assert written is False
+        assert (tmp_path / "index.html").stat().st_ino == inode
+        assert "index.html" in load_manifest(tmp_path)
+        assert sorted(p.name for p in tmp_path.iterdir()) == [".deploy-manifest.json", "index.html"]
+
+
+class TestStreamingHelpers:
+
+    def test_class_collector_matches_extract_classes(self):
+        """Test que las clases cortadas entre partes se juntan igual que sobre el HTML entero"""
+        html = '<div class="p-4 flex"><p class=\'mt-2 text-center\'>a</p><span class="hidden">b</span></div>'
+        collector = ClassCollector()
+        for i in range(0, len(html), 7):
+            collector.feed(html[i:i + 7])
+
+        assert collector.classes() == extract_classes(html)
+
+    def test_rewrite_asset_urls_stream(self):
+        """Test reescritura de URLs de assets con atributos cortados entre partes"""
+        manifest = {"assets/style.css": "assets/style.1.css"}
+        html = '<link href="assets/style.css"><p>x</p><link href="/assets/style.css">'
+        chunks = [html[i:i + 5] for i in range(0, len(html), 5)]
+
+        assert "".join(rewrite_asset_urls_stream(chunks, manifest)) == rewrite_asset_urls(html, manifest)
+
+    def test_placeholder_has_href_length(self, tmp_path):
+        """Test que el marcador mide lo mismo que el href final de la hoja"""
+        assert len(STYLESHEET_PLACEHOLDER) == len(TailwindBuilder(tmp_path).href(["p-4"]))
+
+
+class TestStreamingDeploy:
+
+    def test_streamed_page_matches_render(self, generator, tmp_path, make_page, make_db):
+        """Test que el deploy en streaming escribe lo mismo que el render completo"""
+        components = _components(30)
+
+        page_dir = Path(generator.deploy_page(make_page(slug="grande"), make_db(components)))
+
+        reference = SiteGenerator(output_dir=str(tmp_path / "ref"), cache_dir=str(tmp_path / "ref-cache"))
+        html = reference.generate_page(make_page(slug="grande"), make_db(components))
+        assert STYLESHEET_PLACEHOLDER not in html
+        assert (page_dir / "index.html").read_text() == minify_html(html)
+        assert generator.generate_page(make_page(slug="grande"), make_db(components)) == html
+        assert generator.tailwind.ensure(html).exists()
+
+    def test_deploy_does_not_render_whole_page(self, generator, make_page, make_db):
+        """Test que el deploy no arma el documento con render()"""
+        template = generator.env.get_template("base.html")
+
+        with patch.object(template, "render", side_effect=AssertionError("render completo")):
+            page_dir = Path(generator.deploy_page(make_page(slug="grande"), make_db(_components(3))))
+
+        assert "Párrafo 2" in (page_dir / "index.html").read_text()
+
+    def test_missing_file_is_streamed_from_cache(self, generator, make_page, make_db):
+        """Test que una página en cache se vuelve a escribir desde la cache sin renderizar"""
+        components = _components(5)
+        page_dir = Path(generator.deploy_page(make_page(slug="grande"), make_db(components)))
+        expected = (page_dir / "index.html").read_text()
+        (page_dir / "index.html").unlink()
+
+        with patch.object(generator, "_stream_page") as stream:
+            generator.deploy_page(make_page(slug="grande"), make_db(components))
+            stream.assert_not_called()
+
+        assert (page_dir / "index.html").read_text() == expected
+
+    def test_no_temporary_files_left(self, generator, tmp_path, make_page, make_db):
+        """Test que no quedan temporales en el directorio ni en la cache"""
+        generator.deploy_page(make_page(slug="grande"), make_db(_components(5)))
+
+        leftovers = [name for _, _, files in os.walk(tmp_path) for name in files if name.endswith(".tmp")]
+        assert leftovers == []
+
+    def test_peak_memory_does_not_grow_with_page(self, generator, make_page, make_db):
+        """Test que la memoria del deploy no depende del tamaño de la página"""
+        generator.fragment_cache = FragmentCache(0)
+        components = _components(2000, size=100)
+        generator.deploy_page(make_page(slug="calentamiento"), make_db(_components(2)))
+
+        tracemalloc.start()
+        try:
+            page_dir = Path(generator.deploy_page(make_page(slug="grande"), make_db(components)))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        page_size = (page_dir / "index.html").stat().st_size
+        assert page_size > 2_000_000
+        assert peak < page_size / 2
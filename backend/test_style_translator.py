@@ -0,0 +1,61 @@
+from style_translator import css_property, css_to_tailwind, translate_styles, _translate_cached
+from generator import SiteGenerator
+
+
+class TestStyleTranslator:
+
+    def test_css_property_names(self):
+        """Test conversión camelCase a kebab-case"""
+        assert css_property("backgroundColor") == "background-color"
+        assert css_property("WebkitTransition") == "webkit-transition"
+        assert css_property("color") == "color"
+
+    def test_css_property_cache_is_bounded(self):
+        """Test que la cache de nombres no crece sin límite (las claves vienen del contenido)"""
+        assert css_property.cache_info().maxsize == _translate_cached.cache_info().maxsize == 4096
+
+    def test_translate_in_one_pass(self):
+        """Test que se obtienen CSS inline y clases Tailwind juntos"""
+        css, classes = translate_styles({
+            "backgroundColor": "#007bff",
+            "textAlign": "center",
+            "marginLeft": "3px",
+        })
+
+        assert css == "background-color: #007bff; text-align: center; margin-left: 3px"
+        assert classes == "bg-primary text-center"
+
+    def test_skips_empty_keys(self):
+        """Test que claves vacías o None se ignoran"""
+        assert translate_styles({"": "x", None: "y", "color": "white"}) == ("color: white", "text-white")
+        assert translate_styles({}) == ("", "")
+
+    def test_repeated_styles_are_memoized(self):
+        """Test que estilos iguales se traducen una sola vez"""
+        styles = {"paddingTop": "17px", "color": "#333"}
+        translate_styles(styles)
+        hits = _translate_cached.cache_info().hits
+        translate_styles(dict(styles))
+
+        assert _translate_cached.cache_info().hits == hits + 1
+
+    def test_equal_values_of_other_types_are_not_mixed(self):
+        """Test que 1, 1.0 y True no comparten la entrada de cache"""
+        assert translate_styles({"opacity": 1}) == ("opacity: 1", "")
+        assert translate_styles({"opacity": 1.0}) == ("opacity: 1.0", "")
+        assert translate_styles({"opacity": True}) == ("opacity: True", "")
+        assert translate_styles({"opacity": 1}) == ("opacity: 1", "")
+
+    def test_unhashable_values(self):
+        """Test estilos con valores no hashables"""
+        css, classes = translate_styles({"fontFamily": ["Arial", "sans-serif"]})
+        assert css == "font-family: ['Arial', 'sans-serif']"
+        assert classes == ""
+
+    def test_css_to_tailwind_matches_generator(self, tmp_path):
+        """Test que las clases desde CSS coinciden con las del diccionario"""
+        styles = {"display": "flex", "justifyContent": "space-between", "padding": "40px 20px"}
+        css, classes = translate_styles(styles)
+
+        assert css_to_tailwind(css) == classes == "flex justify-between py-10 px-5"
+        assert SiteGenerator(output_dir=str(tmp_path))._convert_styles_to_tailwind(css) == classes
@@ -0,0 +1,216 @@
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+
+import tailwind_css
+from tailwind_css import (
+    PREFLIGHT, STYLESHEET_PLACEHOLDER, TailwindBuilder, build_rule, extract_classes, is_tailwind_like, render_css,
+)
+from generator import BUTTON_VARIANTS, CTA_CLASSES, SiteGenerator
+from style_translator import TAILWIND_CLASSES
+
+# Subconjunto que usan los componentes y style_translator, con las declaraciones que genera
+# Tailwind v3 (el CDN que reemplaza el builder) con el tema de base.html. Los colores van en
+# hex en lugar de rgb(... / var(--tw-*-opacity)): el valor computado es el mismo.
+TAILWIND_OUTPUT = {
+    "bg-primary": "background-color:#007bff",
+    "bg-secondary": "background-color:#6c757d",
+    "bg-success": "background-color:#28a745",
+    "bg-danger": "background-color:#dc3545",
+    "bg-black/50": "background-color:rgb(0 0 0 / 0.5)",
+    "bg-transparent": "background-color:transparent",
+    "text-white": "color:#ffffff",
+    "text-primary": "color:#007bff",
+    "text-gray-600": "color:#4b5563",
+    "text-gray-900": "color:#111827",
+    "border-gray-200": "border-color:#e5e7eb",
+    "border-primary": "border-color:#007bff",
+    "border-2": "border-width:2px",
+    "border-t": "border-top-width:1px",
+    "text-center": "text-align:center",
+    "text-left": "text-align:left",
+    "text-right": "text-align:right",
+    "text-lg": "font-size:1.125rem;line-height:1.75rem",
+    "text-xl": "font-size:1.25rem;line-height:1.75rem",
+    "text-2xl": "font-size:1.5rem;line-height:2rem",
+    "text-5xl": "font-size:3rem;line-height:1",
+    "font-semibold": "font-weight:600",
+    "font-bold": "font-weight:700",
+    "italic": "font-style:italic",
+    "p-5": "padding:1.25rem",
+    "px-5": "padding-left:1.25rem;padding-right:1.25rem",
+    "py-10": "padding-top:2.5rem;padding-bottom:2.5rem",
+    "py-20": "padding-top:5rem;padding-bottom:5rem",
+    "m-0": "margin:0px",
+    "mx-auto": "margin-left:auto;margin-right:auto",
+    "mb-5": "margin-bottom:1.25rem",
+    "mt-5": "margin-top:1.25rem",
+    "h-10": "height:2.5rem",
+    "h-screen": "height:100vh",
+    "min-h-screen": "min-height:100vh",
+    "w-full": "width:100%",
+    "max-w-4xl": "max-width:56rem",
+    "max-w-7xl": "max-width:80rem",
+    "inset-0": "inset:0px",
+    "z-10": "z-index:10",
+    "rounded": "border-radius:0.25rem",
+    "rounded-lg": "border-radius:0.5rem",
+    "flex": "display:flex",
+    "inline-block": "display:inline-block",
+    "justify-between": "justify-content:space-between",
+    "items-center": "align-items:center",
+    "overflow-hidden": "overflow:hidden",
+    "pointer-events-none": "pointer-events:none",
+    "transition-all": "transition-property:all;transition-timing-function:cubic-bezier(0.4,0,0.2,1);"
+                      "transition-duration:150ms",
+    "duration-300": "transition-duration:300ms",
+    "shadow-lg": "box-shadow:0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)",
+    "-translate-y-1": "transform:translateY(-0.25rem)",
+    "leading-[64px]": "line-height:64px",
+}
+
+
+class TestTailwindCss:
+
+    def test_extract_only_known_utilities(self):
+        """Test que solo se extraen utilidades conocidas"""
+        html = '<div class="hero p-5 text-center"><a class=\'hover:bg-primary/90 btn\'>x</a></div>'
+        assert extract_classes(html) == ["hover:bg-primary/90", "p-5", "text-center"]
+
+    def test_rules(self):
+        """Test reglas de utilidades, variantes y valores arbitrarios"""
+        assert build_rule("px-8")[1] == ".px-8{padding-left:2rem;padding-right:2rem}"
+        assert build_rule("bg-black/50")[1] == r".bg-black\/50{background-color:rgb(0 0 0 / 0.5)}"
+        assert build_rule("text-[56px]")[1] == r".text-\[56px\]{font-size:56px}"
+        assert build_rule("hover:-translate-y-1")[1] == r".hover\:-translate-y-1:hover{transform:translateY(-0.25rem)}"
+        assert build_rule("dark:text-white")[1] == (
+            r"@media (prefers-color-scheme:dark){.dark\:text-white{color:#ffffff}}"
+        )
+        assert build_rule("md:hidden")[1] == r"@media (min-width:768px){.md\:hidden{display:none}}"
+        assert build_rule("theme-dark") is None
+        assert build_rule("p-foo") is None
+
+    def test_cdn_utilities(self):
+        """Test utilidades que el CDN generaba y el builder descartaba"""
+        assert build_rule("text-blue-500")[1] == ".text-blue-500{color:#3b82f6}"
+        assert build_rule("grid-cols-3")[1] == ".grid-cols-3{grid-template-columns:repeat(3,minmax(0,1fr))}"
+        assert build_rule("space-y-4")[1] == ".space-y-4>:not([hidden])~:not([hidden]){margin-top:1rem}"
+        assert build_rule("md:flex-row")[1] == r"@media (min-width:768px){.md\:flex-row{flex-direction:row}}"
+        assert build_rule("font-light")[1] == ".font-light{font-weight:300}"
+        assert build_rule("tracking-tight")[1] == ".tracking-tight{letter-spacing:-0.025em}"
+        assert build_rule("hover:bg-blue-600")[1] == r".hover\:bg-blue-600:hover{background-color:#2563eb}"
+        assert build_rule("w-1/2")[1] == r".w-1\/2{width:50%}"
+        assert build_rule("rounded-t-lg")[1] == (
+            ".rounded-t-lg{border-top-left-radius:0.5rem;border-top-right-radius:0.5rem}"
+        )
+
+    def test_stacked_variants(self):
+        """Test variantes encadenadas: breakpoint por fuera, estados en el selector"""
+        assert build_rule("md:hover:bg-blue-600")[1] == (
+            r"@media (min-width:768px){.md\:hover\:bg-blue-600:hover{background-color:#2563eb}}"
+        )
+        assert build_rule("group-hover:text-white")[1] == r".group:hover .group-hover\:text-white{color:#ffffff}"
+        assert build_rule("md:lg:flex") is None
+
+    @pytest.mark.parametrize("class_name", sorted(TAILWIND_OUTPUT))
+    def test_matches_tailwind_output(self, class_name):
+        """Test que el subconjunto soportado genera lo mismo que Tailwind"""
+        assert build_rule(class_name)[1] == f".{tailwind_css._escape(class_name)}{{{TAILWIND_OUTPUT[class_name]}}}"
+
+    def test_generator_classes_are_supported(self, tmp_path):
+        """Test que las clases que emiten los componentes no necesitan la hoja completa"""
+        generator = SiteGenerator(output_dir=str(tmp_path))
+        html = "".join(
+            generator.generate_component_html(Mock(type=component_type, content=content, styles={}))
+            for component_type, content in (
+                ("hero", {"title": "T", "subtitle": "S", "cta_text": "Ir"}),
+                ("text", {"text": "Hola", "alignment": "right"}),
+                ("image", {"url": "/a.png", "caption": "C"}),
+                ("button", {"text": "B", "variant": "outline"}),
+                ("header", {"title": "H", "logo": "/l.png", "menu_items": [{"text": "A", "link": "/"}]}),
+                ("footer", {"text": "F", "links": [{"text": "A", "url": "/"}]}),
+            )
+        )
+        names = set(extract_classes(html)) | set(CTA_CLASSES.split())
+        for classes in list(BUTTON_VARIANTS.values()) + list(TAILWIND_CLASSES.values()):
+            names.update(classes.split())
+
+        assert [name for name in names if is_tailwind_like(name) and build_rule(name) is None] == []
+
+    def test_unknown_utilities_use_full_stylesheet(self, monkeypatch):
+        """Test que una utilidad sin soporte importa la hoja completa en lugar de descartarse"""
+        monkeypatch.setattr(tailwind_css, "FALLBACK_STYLESHEET_URL", "https://cdn.example.com/tailwind.css")
+        html = '<div class="hero p-5 backdrop-blur text-section">x</div>'
+
+        assert extract_classes(html) == ["backdrop-blur", "p-5"]
+        css = render_css(extract_classes(html))
+        assert css.startswith('@import url("https://cdn.example.com/tailwind.css");\n' + PREFLIGHT)
+        assert ".p-5{padding:1.25rem}" in css
+        assert not render_css(["p-5"]).startswith("@import")
+
+    def test_unknown_utilities_get_their_own_stylesheet(self, tmp_path):
+        """Test que una página con utilidades sin soporte no comparte la hoja purgada"""
+        builder = TailwindBuilder(tmp_path)
+        known = builder.link(f'<link href="{STYLESHEET_PLACEHOLDER}"><p class="p-5">a</p>')
+        unknown = builder.link(f'<link href="{STYLESHEET_PLACEHOLDER}"><p class="p-5 sepia">b</p>')
+
+        assert builder.ensure(known) != builder.ensure(unknown)
+        assert builder.ensure(unknown).read_text().startswith("@import")
+
+    def test_fallback_can_be_disabled(self, monkeypatch):
+        """Test que sin hoja de respaldo las utilidades sin soporte se descartan"""
+        monkeypatch.setattr(tailwind_css, "FALLBACK_STYLESHEET_URL", "")
+
+        assert extract_classes('<p class="p-5 contrast-125">x</p>') == ["p-5"]
+        assert render_css(["p-5", "contrast-125"]) == render_css(["p-5"])
+
+    def test_unknown_utilities_are_logged(self, caplog):
+        """Test que una utilidad sin soporte se reporta una sola vez y las clases propias no"""
+        html = '<div class="hero md:bg-unknown-shade-1 blur-sm">x</div>'
+        with caplog.at_level("WARNING", logger="tailwind_css"):
+            assert extract_classes(html) == ["blur-sm", "md:bg-unknown-shade-1"]
+            extract_classes(html)
+
+        warnings = [record.getMessage() for record in caplog.records]
+        assert len(warnings) == 1
+        assert "md:bg-unknown-shade-1" in warnings[0] and "blur-sm" in warnings[0]
+        assert "hero" not in warnings[0]
+
+    def test_specific_utilities_come_last(self):
+        """Test que px/py se emiten después de p y las variantes al final"""
+        css = render_css(["hover:text-primary", "px-5", "p-5", "text-white"])
+        assert css.index(".p-5{") < css.index(".px-5{") < css.index(".text-white{") < css.index(".hover\\:text-primary")
+
+    def test_same_classes_share_a_stylesheet(self, tmp_path):
+        """Test que conjuntos de clases iguales usan el mismo archivo"""
+        builder = TailwindBuilder(tmp_path)
+        page_a = builder.link(f'<link href="{STYLESHEET_PLACEHOLDER}"><p class="p-5 flex">a</p>')
+        page_b = builder.link(f'<link href="{STYLESHEET_PLACEHOLDER}"><p class="flex p-5 custom">b</p>')
+        page_c = builder.link(f'<link href="{STYLESHEET_PLACEHOLDER}"><p class="p-4">c</p>')
+
+        assert builder.ensure(page_a) == builder.ensure(page_b)
+        assert builder.ensure(page_c) != builder.ensure(page_a)
+        assert len(list(tmp_path.glob("*.css"))) == 2
+        assert ".flex{display:flex}" in builder.ensure(page_a).read_text()
+
+
+class TestSiteGeneratorTailwind:
+
+    def test_deploy_links_purged_stylesheet(self, tmp_path):
+        """Test que la página enlaza su hoja purgada en lugar del CDN"""
+        generator = SiteGenerator(output_dir=str(tmp_path))
+        page = Mock(id=1, title="Tw", description="", slug="tw", subdomain="test", config={})
+        component = Mock(id=1, type="text", content={"text": "Hola", "alignment": "center"}, styles={}, position=0)
+        db = Mock()
+        db.query.return_value.filter.return_value.order_by.return_value.all.return_value = [component]
+
+        page_dir = Path(generator.deploy_page(page, db))
+
+        html = (page_dir / "index.html").read_text()
+        assert "cdn.tailwindcss.com" not in html
+        assert STYLESHEET_PLACEHOLDER not in html
+        [stylesheet] = (tmp_path / "_assets" / "css").glob("*.css")
+        assert f'href="/_tw/{stylesheet.name}"' in html
+        css = stylesheet.read_text()
+        assert ".max-w-4xl{max-width:56rem}" in css
+        assert ".text-right" not in css
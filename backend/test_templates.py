@@ -623,4 +623,101 @@ class TestTemplateCustomization:
         
         assert "Header Content" not in html2
         assert "Footer Content" not in html2
-        assert "googletagmanager" not in html2
\ No newline at end of file
+        assert "googletagmanager" not in html2
+
+class TestComponentTemplates:
+    """Tests para los templates de componentes y su registro"""
+    
+    @pytest.fixture
+    def temp_dir(self):
+        temp_dir = tempfile.mkdtemp()
+        yield temp_dir
+        shutil.rmtree(temp_dir)
+    
+    @pytest.fixture
+    def generator(self, temp_dir):
+        return SiteGenerator(output_dir=temp_dir)
+    
+    def _component(self, component_type, content, styles=None):
+        component = Mock(spec=Component)
+        component.type = component_type
+        component.content = content
+        component.styles = styles or {}
+        return component
+    
+    def test_builtin_types_are_registered(self):
+        """Test que los tipos existentes están en el registro (función o template)"""
+        from generator import COMPONENT_RENDERERS, COMPONENT_TEMPLATES
+        
+        for component_type in ("hero", "text", "image", "button", "header", "footer"):
+            assert component_type in COMPONENT_RENDERERS
+            assert component_type not in COMPONENT_TEMPLATES
+        assert (Path(__file__).parent / "templates" / COMPONENT_TEMPLATES["HeroIntroScroll"]).exists()
+    
+    def test_register_new_component_type(self, generator, temp_dir):
+        """Test que un tipo nuevo se registra con su template"""
+        from generator import COMPONENT_TEMPLATES, register_component
+        from jinja2 import DictLoader
+        
+        generator.component_env.loader = DictLoader({"custom/banner.html": '<div class="banner">{{ content["text"] }}</div>'})
+        register_component("Banner", "custom/banner.html")
+        try:
+            html = generator.generate_component_html(self._component("Banner", {"text": "Oferta"}))
+        finally:
+            del COMPONENT_TEMPLATES["Banner"]
+        
+        assert html == '<div class="banner">Oferta</div>'
+    
+    def test_templates_are_compiled_once(self, generator):
+        """Test que cada template de componente se carga una sola vez"""
+        with patch.object(generator.component_env, "get_template", wraps=generator.component_env.get_template) as get_template:
+            generator.generate_component_html(self._component("HeroIntroScroll", {"title": "uno"}))
+            generator.generate_component_html(self._component("HeroIntroScroll", {"title": "dos"}))
+            generator._generate_hero({"title": "tres"}, "")
+        
+        assert get_template.call_count == 1
+    
+    def test_globals_added_later_reach_templates(self, generator):
+        """Test que un global agregado al entorno después de crearlo llega al template"""
+        from generator import COMPONENT_TEMPLATES, register_component
+        from jinja2 import DictLoader
+        
+        generator.component_env.loader = DictLoader({"custom/promo.html": '<p>{{ promo_label }}</p>'})
+        generator.component_env.globals["promo_label"] = "Nuevo"
+        register_component("Promo", "custom/promo.html")
+        try:
+            html = generator.generate_component_html(self._component("Promo", {}))
+        finally:
+            del COMPONENT_TEMPLATES["Promo"]
+        
+        assert html == "<p>Nuevo</p>"
+    
+    def test_menu_items_rendered_in_order(self, generator):
+        """Test que el header renderiza el menú en el template"""
+        html = generator._generate_header({
+            "title": "Sitio",
+            "menu_items": [{"text": "Inicio", "link": "/"}, {"text": "Contacto"}]
+        }, "display: flex")
+        
+        assert html.index(">Inicio</a>") < html.index(">Contacto</a>")
+        assert 'href="#"' in html
+        assert "flex" in html
+    
+    def test_component_content_is_not_escaped(self, generator):
+        """Test que el HTML del editor se inserta sin escapar"""
+        html = generator._generate_text({"text": "<p><strong>Hola</strong></p>"}, "")
+        assert "<p><strong>Hola</strong></p>" in html
+    
+    def test_hero_intro_scroll(self, generator):
+        """Test render estático de HeroIntroScroll"""
+        html = generator.generate_component_html(self._component("HeroIntroScroll", {
+            "title": "Grande",
+            "description": "Scroll",
+            "image": "/bg.jpg",
+            "button": {"href": "/go", "label": "Ir"}
+        }))
+        
+        assert "Grande" in html
+        assert 'src="/bg.jpg"' in html
+        assert 'href="/go"' in html
+        assert "Componente no implementado" not in html
@@ -20,6 +20,8 @@ const Dashboard: React.FC = () => {
   const [pages, setPages] = useState<Page[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string>('');
+  const [nextCursor, setNextCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     loadPages();
@@ -79,7 +81,8 @@ const Dashboard: React.FC = () => {
   const loadPages = async () => {
     try {
       const pagesData = await pagesApi.getPages();
-      setPages(pagesData);
+      setPages(pagesData.items);
+      setNextCursor(pagesData.nextCursor);
     } catch (error: any) {
       const errorMessage = handleApiError(error);
       setError(errorMessage);
@@ -89,6 +92,23 @@ const Dashboard: React.FC = () => {
     }
   };
 
+  // Las páginas llegan de a una página del listado; el usuario pide las siguientes
+  const loadMorePages = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const pagesData = await pagesApi.getPages(nextCursor);
+      setPages(prev => [...prev, ...pagesData.items]);
+      setNextCursor(pagesData.nextCursor);
+    } catch (error: any) {
+      const errorMessage = handleApiError(error);
+      setError(errorMessage);
+      showNotification('error', errorMessage);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleDeletePage = async (pageId: number) => {
     if (window.confirm('¿Estás seguro de que quieres eliminar esta página?')) {
       try {
@@ -161,6 +181,18 @@ const Dashboard: React.FC = () => {
             ))
           )}
         </div>
+
+        {nextCursor && (
+          <div className="mt-6 text-center">
+            <button
+              onClick={loadMorePages}
+              disabled={loadingMore}
+              className="btn btn-secondary disabled:opacity-50"
+            >
+              {loadingMore ? 'Cargando...' : 'Cargar más páginas'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -26,6 +26,8 @@ const ModernPageBuilder: React.FC = () => {
   const [error, setError] = useState<string>('');
   const [saving, setSaving] = useState(false);
   const [deploying, setDeploying] = useState(false);
+  const [componentsCursor, setComponentsCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const sensors = useSensors(
     useSensor(PointerSensor, {
@@ -49,7 +51,8 @@ const ModernPageBuilder: React.FC = () => {
       setPage(pageData);
       
       const componentsData = await componentsApi.getComponents(pageData.id);
-      setComponents(componentsData.sort((a, b) => a.position - b.position));
+      setComponents(componentsData.items.sort((a, b) => a.position - b.position));
+      setComponentsCursor(componentsData.nextCursor);
     } catch (error: any) {
       const errorMessage = handleApiError(error);
       setError(errorMessage);
@@ -59,6 +62,34 @@ const ModernPageBuilder: React.FC = () => {
     }
   };
 
+  // Páginas muy largas: los componentes siguientes se piden a demanda
+  const loadMoreComponents = async () => {
+    if (!page || !componentsCursor) return;
+    try {
+      setLoadingMore(true);
+      const componentsData = await componentsApi.getComponents(page.id, componentsCursor);
+      setComponents(prev => [...prev, ...componentsData.items]);
+      setComponentsCursor(componentsData.nextCursor);
+    } catch (error: any) {
+      const errorMessage = handleApiError(error);
+      showNotification('error', errorMessage);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const loadMoreButton = componentsCursor && (
+    <div className="mt-4 text-center">
+      <button
+        onClick={loadMoreComponents}
+        disabled={loadingMore}
+        className="btn btn-secondary disabled:opacity-50"
+      >
+        {loadingMore ? 'Cargando...' : 'Cargar más componentes'}
+      </button>
+    </div>
+  );
+
   const createNewPage = async () => {
     try {
       const newPage = await pagesApi.createPage({
@@ -139,6 +170,12 @@ const ModernPageBuilder: React.FC = () => {
     
     if (!over || active.id === over.id) return;
 
+    // El reorden renumera la página entera: necesita todos sus componentes
+    if (componentsCursor) {
+      showNotification('warning', 'Carga todos los componentes antes de reordenarlos');
+      return;
+    }
+
     const activeIndex = components.findIndex(c => c.id === active.id);
     const overIndex = components.findIndex(c => c.id === over.id);
 
@@ -373,6 +410,7 @@ const ModernPageBuilder: React.FC = () => {
                 </div>
               </SortableContext>
             </DndContext>
+            {loadMoreButton}
           </div>
         </div>
       </div>
@@ -23,6 +23,8 @@ const PageBuilder: React.FC = () => {
   const [error, setError] = useState<string>('');
   const [saving, setSaving] = useState(false);
   const [deploying, setDeploying] = useState(false);
+  const [componentsCursor, setComponentsCursor] = useState<string | undefined>();
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     if (pageId) {
@@ -38,7 +40,8 @@ const PageBuilder: React.FC = () => {
       setPage(pageData);
       
       const componentsData = await componentsApi.getComponents(pageData.id);
-      setComponents(componentsData.sort((a, b) => a.position - b.position));
+      setComponents(componentsData.items.sort((a, b) => a.position - b.position));
+      setComponentsCursor(componentsData.nextCursor);
     } catch (error: any) {
       const errorMessage = handleApiError(error);
       setError(errorMessage);
@@ -48,6 +51,34 @@ const PageBuilder: React.FC = () => {
     }
   };
 
+  // Páginas muy largas: los componentes siguientes se piden a demanda
+  const loadMoreComponents = async () => {
+    if (!page || !componentsCursor) return;
+    try {
+      setLoadingMore(true);
+      const componentsData = await componentsApi.getComponents(page.id, componentsCursor);
+      setComponents(prev => [...prev, ...componentsData.items]);
+      setComponentsCursor(componentsData.nextCursor);
+    } catch (error: any) {
+      const errorMessage = handleApiError(error);
+      showNotification('error', errorMessage);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const loadMoreButton = componentsCursor && (
+    <div className="mt-4 text-center">
+      <button
+        onClick={loadMoreComponents}
+        disabled={loadingMore}
+        className="btn btn-secondary disabled:opacity-50"
+      >
+        {loadingMore ? 'Cargando...' : 'Cargar más componentes'}
+      </button>
+    </div>
+  );
+
   const createNewPage = async () => {
     try {
       const timestamp = Date.now();
@@ -167,6 +198,11 @@ const PageBuilder: React.FC = () => {
   };
 
   const handleReorderComponents = async (newOrder: Component[]) => {
+    // El reorden renumera la página entera: necesita todos sus componentes
+    if (componentsCursor) {
+      showNotification('warning', 'Carga todos los componentes antes de reordenarlos');
+      return;
+    }
     try {
       const componentIds = newOrder.map(comp => comp.id);
       await componentsApi.reorderComponents(page!.id, componentIds);
@@ -431,6 +467,7 @@ const PageBuilder: React.FC = () => {
             onSelectComponent={setSelectedComponent}
             onReorderComponents={handleReorderComponents}
           />
+          {loadMoreButton}
         </div>
 
         {/* Component Editor */}
@@ -9,6 +9,7 @@ import {
   DeploymentResponse, 
   DeploymentStatus,
   DeployedSitesResponse,
+  CursorPage,
   ApiError 
 } from '../types';
 
@@ -85,11 +86,17 @@ export const authApi = {
   },
 };
 
+// Los listados vienen paginados por cursor: se pide una página por vez y la UI
+// pide la siguiente con nextCursor cuando la necesita
+const getCursorPage = async <T>(url: string, cursor?: string): Promise<CursorPage<T>> => {
+  const response = await apiClient.get(url, { params: cursor ? { cursor } : undefined });
+  return { items: response.data, nextCursor: response.headers['x-next-cursor'] };
+};
+
 // Pages API
 export const pagesApi = {
-  getPages: async (): Promise<Page[]> => {
-    const response = await apiClient.get('/api/pages/');
-    return response.data;
+  getPages: async (cursor?: string): Promise<CursorPage<Page>> => {
+    return getCursorPage<Page>('/api/pages/', cursor);
   },
 
   getPage: async (id: number): Promise<Page> => {
@@ -119,9 +126,8 @@ export const pagesApi = {
 
 // Components API
 export const componentsApi = {
-  getComponents: async (pageId: number): Promise<Component[]> => {
-    const response = await apiClient.get(`/api/components/page/${pageId}`);
-    return response.data;
+  getComponents: async (pageId: number, cursor?: string): Promise<CursorPage<Component>> => {
+    return getCursorPage<Component>(`/api/components/page/${pageId}`, cursor);
   },
 
   getComponent: async (id: number): Promise<Component> => {
@@ -143,6 +149,18 @@ export const componentsApi = {
     await apiClient.delete(`/api/components/${id}`);
   },
 
+  batchComponents: async (
+    pageId: number,
+    changes: {
+      create?: Partial<Component>[];
+      update?: (Partial<Component> & { id: number })[];
+      delete?: number[];
+    }
+  ): Promise<Component[]> => {
+    const response = await apiClient.post(`/api/components/batch`, { page_id: pageId, ...changes });
+    return response.data;
+  },
+
   reorderComponents: async (pageId: number, componentIds: number[]): Promise<Component[]> => {
     const response = await apiClient.post(`/api/components/reorder`, {
       page_id: pageId,
@@ -86,6 +86,12 @@ export interface DeployedSitesResponse {
   deployed_sites: DeployedSite[];
 }
 
+// Una página de un listado paginado por cursor (nextCursor falta en la última)
+export interface CursorPage<T> {
+  items: T[];
+  nextCursor?: string;
+}
+
 export interface ApiError {
   detail: string;
 }
\ No newline at end of file